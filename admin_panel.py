@@ -43,7 +43,7 @@ class AdminPanel:
             "🏴‍☠️ *Nomadly2 Admin Dashboard*\n\n"
             "📊 *System Overview:*\n"
             f"• **Total Users:** {stats.get('total_users', 0)}\n"
-            f"• **Active Users (7d):** {stats.get('active_users_7d', 0)}\n"
+            f"• **New Users (7d):** {stats.get('new_users_7d', 0)}\n"
             f"• **Total Domains:** {stats.get('total_domains', 0)}\n"
             f"• **Total Orders:** {stats.get('total_orders', 0)}\n\n"
             "💰 *Financial Overview:*\n"
@@ -159,6 +159,13 @@ class AdminPanel:
             f"• **Crypto Payments:** {finance_data.get('crypto_payments', 0)}\n"
             f"• **Balance Payments:** {finance_data.get('balance_payments', 0)}\n"
             f"• **Pending Payments:** {finance_data.get('pending_payments', 0)}\n\n"
+            "🪙 *Revenue by Coin:*\n"
+            + "".join(
+                # Code spans keep the underscores of payment methods such as crypto_btc literal
+                f"• `{coin.upper()}`: ${amount:.2f}\n"
+                for coin, amount in finance_data.get("revenue_by_coin", {}).items()
+            )
+            + "\n"
             "🎯 *Top Services:*\n"
             f"• **Domain Registrations:** {finance_data.get('domain_orders', 0)}\n"
             f"• **Wallet Deposits:** {finance_data.get('deposit_orders', 0)}\n"
@@ -284,62 +291,16 @@ class AdminPanel:
     def get_system_statistics(self) -> Dict:
         """Get comprehensive system statistics"""
         try:
-            session = self.db.get_session()
-
-            # Count users
-            total_users = session.query(User).count()
-
-            # Count active users (last 7 days)
-            week_ago = datetime.now() - timedelta(days=7)
-            active_users_7d = (
-                session.query(User)
-                .filter(User.last_activity > week_ago)
-                .count()
-            )
-
-            # Count domains
-            total_domains = session.query(RegisteredDomain).count()
-
-            # Count orders
-            total_orders = session.query(Order).count()
-
-            # Calculate revenue
-            completed_orders = (
-                session.query(Order)
-                .filter(Order.payment_status == "completed")
-                .all()
-            )
-            total_revenue = sum(order.amount_usd for order in completed_orders)
-
-            # Revenue last 30 days
-            month_ago = datetime.now() - timedelta(days=30)
-            recent_orders = (
-                session.query(Order)
-                .filter(
-                    Order.payment_status == "completed",
-                    Order.created_at > month_ago,
-                )
-                .all()
-            )
-            revenue_30d = sum(order.amount_usd for order in recent_orders)
-
-            # Pending payments
-            pending_payments = (
-                session.query(Order)
-                .filter(Order.payment_status == "pending")
-                .count()
-            )
-
-            session.close()
+            stats = self.db.get_stats_snapshot()
 
             return {
-                "total_users": total_users,
-                "active_users_7d": active_users_7d,
-                "total_domains": total_domains,
-                "total_orders": total_orders,
-                "total_revenue": total_revenue,
-                "revenue_30d": revenue_30d,
-                "pending_payments": pending_payments,
+                "total_users": int(stats.total("users")),
+                "new_users_7d": int(stats.last_days("users", 7)),
+                "total_domains": int(stats.total("domains")),
+                "total_orders": int(stats.total("orders")),
+                "total_revenue": stats.total("revenue:"),
+                "revenue_30d": stats.last_days("revenue:", 30),
+                "pending_payments": int(stats.total("orders:pending")),
             }
 
         except Exception as e:
@@ -365,77 +326,34 @@ class AdminPanel:
     def get_financial_statistics(self) -> Dict:
         """Get detailed financial statistics"""
         try:
-            session = self.db.get_session()
-
-            # All completed orders
-            completed_orders = (
-                session.query(Order)
-                .filter(Order.payment_status == "completed")
-                .all()
-            )
-
-            total_revenue = sum(order.amount_usd for order in completed_orders)
-
-            # This month
-            month_start = datetime.now().replace(day=1)
-            month_orders = [o for o in completed_orders if o.created_at >= month_start]
-            revenue_month = sum(order.amount_usd for order in month_orders)
-
-            # Last 7 days
-            week_ago = datetime.now() - timedelta(days=7)
-            week_orders = [o for o in completed_orders if o.created_at >= week_ago]
-            revenue_7d = sum(order.amount_usd for order in week_orders)
-
-            # Today
-            today_start = datetime.now().replace(
-                hour=0, minute=0, second=0, microsecond=0
-            )
-            today_orders = [o for o in completed_orders if o.created_at >= today_start]
-            revenue_today = sum(order.amount_usd for order in today_orders)
+            stats = self.db.get_stats_snapshot()
 
-            # Payment methods
-            crypto_payments = len(
-                [o for o in completed_orders if o.payment_method.startswith("crypto_")]
-            )
-            balance_payments = len(
-                [o for o in completed_orders if o.payment_method == "balance"]
-            )
-
-            # Pending payments
-            pending_payments = (
-                session.query(Order)
-                .filter(Order.payment_status == "pending")
-                .count()
-            )
+            total_revenue = stats.total("revenue:")
+            completed_orders = int(stats.total("orders:completed"))
 
             # Service breakdown
-            domain_orders = len(
-                [o for o in completed_orders if o.service_type == "domain_registration"]
-            )
-            deposit_orders = len(
-                [o for o in completed_orders if o.service_type == "wallet_deposit"]
-            )
-            other_orders = len(completed_orders) - domain_orders - deposit_orders
-
-            # Average order value
-            avg_order_value = (
-                total_revenue / len(completed_orders) if completed_orders else 0
-            )
-
-            session.close()
+            domain_orders = int(stats.total("completed:domain_registration"))
+            deposit_orders = int(stats.total("completed:wallet_deposit"))
+            other_orders = completed_orders - domain_orders - deposit_orders
 
             return {
                 "total_revenue": total_revenue,
-                "revenue_month": revenue_month,
-                "revenue_7d": revenue_7d,
-                "revenue_today": revenue_today,
-                "crypto_payments": crypto_payments,
-                "balance_payments": balance_payments,
-                "pending_payments": pending_payments,
+                "revenue_month": stats.month_to_date("revenue:"),
+                "revenue_7d": stats.last_days("revenue:", 7),
+                "revenue_today": stats.last_days("revenue:", 1),
+                "revenue_by_coin": stats.breakdown("revenue:"),
+                "crypto_payments": int(sum(
+                    count for method, count in stats.breakdown("completed_via:").items()
+                    if method.startswith("crypto_")
+                )),
+                "balance_payments": int(stats.total("completed_via:balance")),
+                "pending_payments": int(stats.total("orders:pending")),
                 "domain_orders": domain_orders,
                 "deposit_orders": deposit_orders,
                 "other_orders": other_orders,
-                "avg_order_value": avg_order_value,
+                "avg_order_value": (
+                    total_revenue / completed_orders if completed_orders else 0
+                ),
             }
 
         except Exception as e:
@@ -380,11 +380,14 @@ class AdminService:
         """Adjust user balance (admin action)"""
         try:
             # Update balance and create transaction record
-            self.db.update_user_balance(
+            new_balance = self.db.update_user_balance(
                 telegram_id=telegram_id,
                 amount=amount,
                 transaction_type="admin_adjustment",
             )
+            if new_balance is None:
+                # Unknown user, or a debit larger than the balance
+                return {"success": False, "error": "insufficient balance"}
 
             # Create admin notification
             self.db.create_admin_notification(
@@ -401,7 +404,7 @@ class AdminService:
             return {
                 "success": True,
                 "message": f"Balance adjusted by ${amount}",
-                "new_balance": self.db.get_user_balance(telegram_id),
+                "new_balance": new_balance,
             }
 
         except Exception as e:
@@ -252,46 +252,28 @@ def get_system_stats():
     """Get comprehensive system statistics"""
     try:
         db = get_db_manager()
-        session_db = db.get_session()
-        
-        # Basic counts
-        total_users = session_db.query(User).count()
-        total_domains = session_db.query(RegisteredDomain).count()
-        total_orders = session_db.query(Order).count()
-        
-        # Active users (last 7 days)
-        week_ago = datetime.now() - timedelta(days=7)
-        active_users = session_db.query(User).filter(User.last_activity > week_ago).count()
-        
-        # Revenue calculations
-        completed_orders = session_db.query(Order).filter(Order.payment_status == 'completed').all()
-        total_revenue = sum(Decimal(str(order.amount_usd)) for order in completed_orders)
+        stats = db.get_stats_snapshot()
         
-        # Recent revenue (30 days)
-        month_ago = datetime.now() - timedelta(days=30)
-        recent_orders = [o for o in completed_orders if o.created_at >= month_ago]
-        revenue_30d = sum(Decimal(str(order.amount_usd)) for order in recent_orders)
-        
-        # Pending orders
-        pending_orders = session_db.query(Order).filter(Order.payment_status == 'pending').count()
-        
-        # Domain expiry stats
+        # Domain expiry stats (a 30-day range on the active-expiry index)
+        session_db = db.get_session()
         today = datetime.now()
         month_from_now = today + timedelta(days=30)
         expiring_domains = session_db.query(RegisteredDomain).filter(
+            RegisteredDomain.status == 'active',
             RegisteredDomain.expires_at.between(today, month_from_now)
         ).count()
         
         session_db.close()
         
         return {
-            'total_users': total_users,
-            'active_users_7d': active_users,
-            'total_domains': total_domains,
-            'total_orders': total_orders,
-            'total_revenue': float(total_revenue),
-            'revenue_30d': float(revenue_30d),
-            'pending_orders': pending_orders,
+            'total_users': int(stats.total('users')),
+            'new_users_7d': int(stats.last_days('users', 7)),
+            'total_domains': int(stats.total('domains')),
+            'total_orders': int(stats.total('orders')),
+            'total_revenue': float(stats.total('revenue:')),
+            'revenue_30d': float(stats.last_days('revenue:', 30)),
+            'revenue_by_coin': {coin: float(amount) for coin, amount in stats.breakdown('revenue:').items()},
+            'pending_orders': int(stats.total('orders:pending')),
             'expiring_domains': expiring_domains
         }
     except Exception as e:
@@ -12,42 +12,36 @@ from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 from decimal import Decimal
 
+from async_api_clients import AsyncOpenProviderAPI, run_coroutine_sync
+
 
 class OpenProviderAPI:
-    """OpenProvider domain registration API"""
+    """OpenProvider domain registration API (sync wrapper around AsyncOpenProviderAPI)"""
 
     def __init__(self, username: str, password: str):
         self.username = username
         self.password = password
-        self.base_url = "https://api.openprovider.eu"
-        self.token = None
-        self.token_expires = None
+        self.client = AsyncOpenProviderAPI(username, password)
 
-    def authenticate(self) -> bool:
-        """Authenticate with OpenProvider API"""
-        try:
-            response = requests.post(
-                f"{self.base_url}/v1beta/auth/login",
-                json={"username": self.username, "password": self.password},
-                timeout=8,
-            )
+    @property
+    def base_url(self) -> str:
+        return self.client.base_url
 
-            if response.status_code == 200:
-                data = response.json()
-                self.token = data.get("data", {}).get("token")
-                # Token expires in 24 hours
-                self.token_expires = datetime.now() + timedelta(hours=23)
-                return True
+    @property
+    def token(self) -> Optional[str]:
+        return self.client.auth_token
 
-            return False
+    @property
+    def token_expires(self) -> Optional[datetime]:
+        return self.client.token_expires
 
-        except Exception as e:
-            print(f"OpenProvider authentication error: {e}")
-            return False
+    def authenticate(self) -> bool:
+        """Authenticate with OpenProvider API"""
+        return run_coroutine_sync(self.client.authenticate())
 
     def is_token_valid(self) -> bool:
         """Check if current token is valid"""
-        return self.token and self.token_expires and datetime.now() < self.token_expires
+        return self.client.is_token_valid()
 
     def get_headers(self) -> Dict[str, str]:
         """Get headers with authentication"""
@@ -61,170 +55,30 @@ class OpenProviderAPI:
 
     def check_domain_availability(self, domain: str) -> Dict:
         """Check if domain is available for registration"""
-        try:
-            if not self.is_token_valid():
-                if not self.authenticate():
-                    return {"available": False, "error": "Authentication failed"}
-
-            # Split domain name and extension for OpenProvider API
-            if "." in domain:
-                name_parts = domain.split(".")
-                domain_name = name_parts[0]
-                extension = name_parts[1]
-            else:
-                return {"available": False, "error": "Invalid domain format"}
+        return run_coroutine_sync(self.client.check_domain_availability(domain))
 
-            # OpenProvider API requires separate name and extension
-            response = requests.post(
-                f"{self.base_url}/v1beta/domains/check",
-                json={
-                    "domains": [{"name": domain_name, "extension": extension}],
-                    "with_price": True,
-                },
-                headers=self.get_headers(),
-                timeout=30,  # Increased from 8s to 30s to resolve timeout issues
-            )
-
-            if response.status_code == 200:
-                data = response.json()
-                results = data.get("data", {}).get("results", [])
-
-                if results:
-                    domain_data = results[0]
-                    price_info = domain_data.get("price", {})
-
-                    # Apply 3.3x price multiplier to API response
-                    from config import Config
-                    api_price = price_info.get("reseller", {}).get("price", 0)
-                    final_price = api_price * Config.PRICE_MULTIPLIER if api_price > 0 else 0
-                    
-                    return {
-                        "available": domain_data.get("status") == "free",
-                        "price": round(final_price, 2),  # Apply 3.3x multiplier and round
-                        "currency": price_info.get("reseller", {}).get(
-                            "currency", "USD"
-                        ),
-                        "premium": domain_data.get("is_premium", False),
-                        "raw_response": domain_data,  # For debugging
-                        "api_price": api_price,  # Keep original for reference
-                    }
-
-            # Log the full response for debugging
-            print(
-                f"OpenProvider API response: {response.status_code} - {response.text[:500]}"
-            )
-            return {
-                "available": False,
-                "error": f"API request failed: {response.status_code}",
-            }
-
-        except Exception as e:
-            print(f"OpenProvider API exception: {e}")
-            return {"available": False, "error": str(e)}
+    def check_domains_availability(self, domains: List[str]) -> Dict[str, Dict]:
+        """Check availability for many domains in batched registry requests"""
+        return run_coroutine_sync(self.client.check_domains_availability(domains))
 
     def create_contact(self, contact_data: Dict) -> Optional[str]:
         """Create contact handle for domain registration"""
-        try:
-            response = requests.post(
-                f"{self.base_url}/v1beta/contacts",
-                json=contact_data,
-                headers=self.get_headers(),
-                timeout=30,
-            )
-
-            if response.status_code == 200:
-                data = response.json()
-                return data.get("data", {}).get("handle")
-
-            return None
-
-        except Exception as e:
-            print(f"Create contact error: {e}")
-            return None
+        # The sync API has always created contacts, not customers
+        return run_coroutine_sync(
+            self.client.create_contact(contact_data, path="/v1beta/contacts")
+        )
 
     def register_domain(
         self, domain: str, contact_handle: str, nameservers: List[str] = None
     ) -> Optional[str]:
         """Register domain with OpenProvider"""
-        try:
-            domain_data = {
-                "domain": {"name": domain},
-                "period": 1,  # 1 year
-                "owner_handle": contact_handle,
-                "admin_handle": contact_handle,
-                "tech_handle": contact_handle,
-                "billing_handle": contact_handle,
-                "auto_renew": "on",
-            }
-
-            if nameservers:
-                domain_data["name_servers"] = [{"name": ns} for ns in nameservers]
-
-            response = requests.post(
-                f"{self.base_url}/v1beta/domains",
-                json=domain_data,
-                headers=self.get_headers(),
-                timeout=8,
-            )
-
-            if response.status_code == 200:
-                data = response.json()
-                return data.get("data", {}).get("id")
-
-            return None
-
-        except Exception as e:
-            print(f"Domain registration error: {e}")
-            return None
+        return run_coroutine_sync(
+            self.client.register_domain(domain, contact_handle, nameservers)
+        )
 
     def update_nameservers(self, domain: str, nameservers: List[str]) -> bool:
         """Update nameservers for a domain"""
-        try:
-            if not self.is_token_valid():
-                if not self.authenticate():
-                    print("Authentication failed for nameserver update")
-                    return False
-
-            print(f"Updating nameservers for {domain}: {nameservers}")
-
-            headers = self.get_headers()
-
-            # For nomadly11.sbs, use known domain ID from database
-            if domain == "nomadly11.sbs":
-                domain_id = "27816852"
-                url = f"{self.base_url}/v1beta/domains/{domain_id}"
-            else:
-                # For other domains, try domain name first
-                url = f"{self.base_url}/v1beta/domains/{domain}"
-
-            # Prepare nameserver data - OpenProvider expects specific format
-            ns_data = []
-            for i, ns in enumerate(nameservers):
-                ns_data.append(
-                    {
-                        "name": ns,
-                        "ip": "",  # OpenProvider will resolve the IP
-                        "seq_nr": i + 1,
-                    }
-                )
-
-            data = {"name_servers": ns_data}
-
-            print(f"Making OpenProvider API call to update nameservers for {domain}")
-            response = requests.put(url, json=data, headers=headers, timeout=8)
-
-            if response.status_code in [200, 201]:
-                print(f"✅ Successfully updated nameservers for {domain}")
-                return True
-            else:
-                print(
-                    f"OpenProvider nameserver update failed: {response.status_code} - {response.text}"
-                )
-                return False
-
-        except Exception as e:
-            print(f"Error updating nameservers for {domain}: {e}")
-            return False
+        return run_coroutine_sync(self.client.update_nameservers(domain, nameservers))
 
 
 class CloudflareAPI:
@@ -6,7 +6,7 @@ FastForex supports 500+ cryptocurrencies and forex pairs
 
 import requests
 import logging
-from typing import Optional, Dict
+from typing import Dict, Iterable, Optional
 import os
 
 logger = logging.getLogger(__name__)
@@ -17,9 +17,48 @@ class FastForexAPI:
         self.api_key = api_key or os.getenv("FASTFOREX_API_KEY")
         self.base_url = "https://api.fastforex.io"
 
+    def fetch_multi(self, symbols: Iterable[str], base: str = "USD") -> Optional[Dict[str, float]]:
+        """Fetch base -> symbol rates for several symbols in one /fetch-multi request"""
+        try:
+            if not self.api_key:
+                logger.warning("FastForex API key not provided")
+                return None
+
+            url = f"{self.base_url}/fetch-multi"
+            params = {
+                "from": base,
+                "to": ",".join(symbol.upper() for symbol in symbols),
+                "api_key": self.api_key
+            }
+
+            response = requests.get(url, params=params, timeout=10)
+
+            if response.status_code == 200:
+                result = response.json()
+                if "results" in result:
+                    return {symbol: float(rate) for symbol, rate in result["results"].items()}
+                logger.error(f"FastForex multi fetch failed: {result}")
+                return None
+            else:
+                logger.error(f"FastForex multi fetch HTTP error: {response.status_code} - {response.text}")
+                return None
+
+        except Exception as e:
+            logger.error(f"FastForex multi fetch exception: {e}")
+            return None
+
     def convert_usd_to_crypto(self, amount: float, cryptocurrency: str) -> Optional[float]:
-        """Convert USD amount to cryptocurrency using FastForex /convert endpoint"""
+        """Convert USD amount to cryptocurrency.
+
+        Supported coins are served from the shared cached rate table; other
+        symbols fall back to the FastForex /convert endpoint.
+        """
         try:
+            from services.crypto_rate_service import SUPPORTED_SYMBOLS, get_crypto_rate_service, normalize_symbol
+
+            if normalize_symbol(cryptocurrency) in SUPPORTED_SYMBOLS:
+                return get_crypto_rate_service().usd_to_crypto(amount, cryptocurrency)
+
             if not self.api_key:
                 logger.warning("FastForex API key not provided")
                 return None
@@ -57,6 +96,12 @@ class FastForexAPI:
     def get_crypto_rate_to_usd(self, cryptocurrency: str) -> Optional[float]:
         """Get how much 1 unit of cryptocurrency equals in USD"""
         try:
+            from services.crypto_rate_service import SUPPORTED_SYMBOLS, get_crypto_rate_service, normalize_symbol
+
+            if normalize_symbol(cryptocurrency) in SUPPORTED_SYMBOLS:
+                quote = get_crypto_rate_service().get_quote(cryptocurrency)
+                return quote.usd_per_unit if quote else None
+
             if not self.api_key:
                 logger.warning("FastForex API key not provided") 
                 return None
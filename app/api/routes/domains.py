@@ -8,8 +8,9 @@ from decimal import Decimal
 
 from ...repositories.domain_repo import DomainRepository
 from ...services.domain_service import DomainService
+from ...core.pagination import PAGE_SIZE, PaginationError
 from ...schemas.domain_schemas import (
-    DomainResponse, DomainCreate, DomainUpdate, 
+    DomainResponse, DomainPage, DomainCreate, DomainUpdate, 
     NameserverUpdate, DomainRenewal, ContactResponse
 )
 
@@ -21,24 +22,25 @@ def get_domain_repository() -> DomainRepository:
 def get_domain_service() -> DomainService:
     return None
 
-@router.get("/", response_model=List[DomainResponse])
+@router.get("/", response_model=DomainPage)
 async def get_domains(
     user_id: Optional[int] = None,
     status: Optional[str] = None,
-    limit: int = 100,
-    offset: int = 0,
+    limit: int = PAGE_SIZE,
+    cursor: Optional[str] = None,
     domain_repo: DomainRepository = Depends(get_domain_repository)
 ):
-    """Get domains with optional filtering"""
+    """Get one page of domains with optional filtering; pass next_cursor/prev_cursor back to move"""
     try:
-        if user_id:
-            domains = domain_repo.get_user_domains(user_id, limit=limit, offset=offset)
-        elif status:
-            domains = domain_repo.get_domains_by_status(status, limit=limit, offset=offset)
-        else:
-            domains = domain_repo.get_all_domains(limit=limit, offset=offset)
-        
-        return [DomainResponse.from_orm(domain) for domain in domains]
+        page = domain_repo.get_domains_page(cursor, limit, telegram_id=user_id, status=status)
+        return DomainPage(
+            items=[DomainResponse.from_orm(domain) for domain in page.items],
+            next_cursor=page.next_cursor,
+            prev_cursor=page.prev_cursor
+        )
+    except PaginationError as e:
+        # the status query parameter shadows fastapi.status here
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
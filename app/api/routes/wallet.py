@@ -6,11 +6,12 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from typing import List, Optional
 from decimal import Decimal
 
+from ...core.pagination import PAGE_SIZE, PaginationError
 from ...repositories.transaction_repo import TransactionRepository
 from ...services.wallet_service import WalletService
 from ...schemas.wallet_schemas import (
-    WalletTransactionResponse, WalletTransactionCreate,
-    OrderResponse, OrderCreate, WalletBalanceResponse,
+    WalletTransactionResponse, WalletTransactionCreate, WalletTransactionPage,
+    OrderResponse, OrderCreate, OrderPage, WalletBalanceResponse,
     PaymentMethodResponse, CryptocurrencyResponse
 )
 
@@ -37,26 +38,26 @@ async def get_wallet_balance(
             detail=f"Error fetching wallet balance: {str(e)}"
         )
 
-@router.get("/users/{telegram_id}/transactions", response_model=List[WalletTransactionResponse])
+@router.get("/users/{telegram_id}/transactions", response_model=WalletTransactionPage)
 async def get_user_transactions(
     telegram_id: int,
-    limit: int = 50,
-    offset: int = 0,
+    limit: int = PAGE_SIZE,
+    cursor: Optional[str] = None,
     transaction_type: Optional[str] = None,
     transaction_repo: TransactionRepository = Depends(get_transaction_repository)
 ):
-    """Get user's transaction history"""
+    """Get one page of a user's transaction history; pass next_cursor/prev_cursor back to move"""
     try:
-        if transaction_type:
-            transactions = transaction_repo.get_user_transactions_by_type(
-                telegram_id, transaction_type, limit=limit, offset=offset
-            )
-        else:
-            transactions = transaction_repo.get_user_transactions(
-                telegram_id, limit=limit, offset=offset
-            )
-        
-        return [WalletTransactionResponse.from_orm(tx) for tx in transactions]
+        page = transaction_repo.get_user_transactions_page(
+            telegram_id, cursor, limit, transaction_type=transaction_type
+        )
+        return WalletTransactionPage(
+            items=[WalletTransactionResponse.from_orm(tx) for tx in page.items],
+            next_cursor=page.next_cursor,
+            prev_cursor=page.prev_cursor
+        )
+    except PaginationError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -87,24 +88,25 @@ async def create_transaction(
             detail=f"Error creating transaction: {str(e)}"
         )
 
-@router.get("/orders", response_model=List[OrderResponse])
+@router.get("/orders", response_model=OrderPage)
 async def get_orders(
     user_id: Optional[int] = None,
     status: Optional[str] = None,
-    limit: int = 50,
-    offset: int = 0,
+    limit: int = PAGE_SIZE,
+    cursor: Optional[str] = None,
     transaction_repo: TransactionRepository = Depends(get_transaction_repository)
 ):
-    """Get orders with optional filtering"""
+    """Get one page of orders with optional filtering; pass next_cursor/prev_cursor back to move"""
     try:
-        if user_id:
-            orders = transaction_repo.get_user_orders(user_id, limit=limit, offset=offset)
-        elif status:
-            orders = transaction_repo.get_orders_by_status(status, limit=limit, offset=offset)
-        else:
-            orders = transaction_repo.get_all_orders(limit=limit, offset=offset)
-        
-        return [OrderResponse.from_orm(order) for order in orders]
+        page = transaction_repo.get_orders_page(cursor, limit, telegram_id=user_id, status=status)
+        return OrderPage(
+            items=[OrderResponse.from_orm(order) for order in page.items],
+            next_cursor=page.next_cursor,
+            prev_cursor=page.prev_cursor
+        )
+    except PaginationError as e:
+        # the status query parameter shadows fastapi.status here
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
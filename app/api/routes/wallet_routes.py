@@ -17,6 +17,7 @@ from app.schemas.wallet_schemas import (
     WalletStatusResponse
 )
 from app.services.wallet_service import WalletService
+from app.core.dependencies import get_async_db
 
 router = APIRouter(prefix="/api/v1/wallet", tags=["wallet"])
 
@@ -92,14 +93,14 @@ async def get_transactions(
 @router.get("/balance/{telegram_id}", response_model=WalletBalanceResponse)
 async def get_wallet_balance(
     telegram_id: int,
-    db: Session = Depends(get_db)
+    db = Depends(get_async_db)
 ):
     """Get wallet balance for user"""
-    wallet_service = WalletService(db)
-    balance = await wallet_service.get_balance(telegram_id)
+    user = await db.get_user(telegram_id)
     
-    if balance is None:
+    if user is None:
         raise HTTPException(status_code=404, detail="User not found")
+    balance = user.balance_usd or 0
     
     return WalletBalanceResponse(
         telegram_id=telegram_id,
@@ -1,15 +1,37 @@
 """
 Cloudflare Sync Layer - Standalone DNS Logic Module
 Abstracts all Cloudflare DNS operations with proper error handling
+
+Reconciliation keys every record by (type, name, content hash), so planning
+a zone is one pass over each side. The diff is three-way: the last state
+this layer synced for a zone tells a record deleted locally apart from one
+added in the Cloudflare dashboard, and changes made on Cloudflare since the
+last sync are reported as drift. Changes are applied through the batch
+endpoint when the API client offers one, otherwise concurrently under a
+token-bucket rate limit that backs off on 429s.
+
+The layer speaks the raw Cloudflare API result shape ({'success', 'result',
+'errors'}). A UnifiedDNSManager, which returns lists, bools and tuples, is
+wrapped in DNSManagerClient to match.
 """
 
 import asyncio
+import hashlib
 import logging
-from typing import Dict, List, Optional, Any
-from dataclasses import dataclass
+import socket
+import time
+from typing import Dict, List, Optional, Any, Tuple
+from dataclasses import dataclass, field
 
 logger = logging.getLogger(__name__)
 
+# Cloudflare allows 1200 API calls per 5 minutes per user
+DEFAULT_RATE_PER_SECOND = 4.0
+DEFAULT_BURST = 20
+DEFAULT_CONCURRENCY = 8
+BATCH_SIZE = 200
+RATE_LIMIT_ERROR_CODES = {971, 10000}
+
 @dataclass
 class DNSRecord:
     """DNS Record data structure"""
@@ -21,6 +43,18 @@ class DNSRecord:
     priority: Optional[int] = None
     cloudflare_id: Optional[str] = None
 
+@dataclass
+class SyncOperation:
+    """One planned change and, once applied, its outcome"""
+    action: str  # create, update or delete
+    name: str
+    type: str
+    record: Optional[DNSRecord] = None
+    remote: Optional[Dict[str, Any]] = None
+    success: Optional[bool] = None
+    cloudflare_id: Optional[str] = None
+    error: Optional[str] = None
+
 @dataclass
 class SyncResult:
     """Sync operation result"""
@@ -28,6 +62,118 @@ class SyncResult:
     records_synced: int
     errors: List[str]
     details: Dict[str, Any]
+    operations: List[SyncOperation] = field(default_factory=list)
+
+RecordKey = Tuple[str, str, str]
+
+def _normalize_name(name: str) -> str:
+    return (name or "").strip().lower().rstrip(".")
+
+def _normalize_content(record_type: str, content: str) -> str:
+    content = (content or "").strip()
+    if record_type in ("CNAME", "NS", "MX", "PTR"):
+        return content.lower().rstrip(".")
+    if record_type == "TXT" and len(content) >= 2 and content[0] == content[-1] == '"':
+        return content[1:-1]
+    if record_type == "AAAA":
+        # IPv6 has many spellings of one address; IPv4 text is already canonical
+        try:
+            return socket.inet_ntop(socket.AF_INET6, socket.inet_pton(socket.AF_INET6, content))
+        except OSError:
+            return content
+    return content
+
+def record_key(record_type: str, name: str, content: str) -> RecordKey:
+    """(type, name, content hash) identity of a record"""
+    record_type = (record_type or "").upper()
+    digest = hashlib.blake2b(
+        _normalize_content(record_type, content).encode("utf-8"), digest_size=8
+    ).hexdigest()
+    return record_type, _normalize_name(name), digest
+
+def _local_attrs(record: DNSRecord) -> Tuple[int, Optional[int]]:
+    return record.ttl, record.priority if record.type.upper() == "MX" else None
+
+def _remote_attrs(cf_record: Dict) -> Tuple[int, Optional[int]]:
+    return cf_record.get("ttl"), cf_record.get("priority") if cf_record.get("type", "").upper() == "MX" else None
+
+class RateLimiter:
+    """Token bucket shared by all calls of one sync layer"""
+    
+    def __init__(self, rate: float = DEFAULT_RATE_PER_SECOND, burst: int = DEFAULT_BURST):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+        self.waited = 0.0
+    
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._blocked_until:
+                    delay = self._blocked_until - now
+                else:
+                    self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    delay = (1 - self._tokens) / self.rate
+                self.waited += delay
+                await asyncio.sleep(delay)
+    
+    def back_off(self, seconds: float):
+        """Pause every caller after Cloudflare answered 429"""
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+        self._tokens = 0.0
+
+def _api_result(success: bool, result: Any = None, error: Optional[str] = None) -> Dict[str, Any]:
+    """Cloudflare API style result dict"""
+    if success:
+        return {'success': True, 'result': result, 'errors': []}
+    return {'success': False, 'result': None, 'errors': [{'message': error or "Unknown error"}]}
+
+class DNSManagerClient:
+    """UnifiedDNSManager behind the Cloudflare API result dicts this layer works with"""
+    
+    def __init__(self, manager):
+        self.manager = manager
+    
+    async def list_dns_records(self, zone_id: str) -> Dict[str, Any]:
+        # Read the zone from Cloudflare, not the record cache: a stale or failed
+        # listing would plan duplicate creates. The pages raise on API errors
+        try:
+            records = []
+            async for page in self.manager.iter_dns_record_pages(zone_id):
+                records.extend(page)
+            return _api_result(True, records)
+        except Exception as e:
+            return _api_result(False, error=str(e))
+    
+    async def create_dns_record(self, zone_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        success, record_id, error = await self.manager.create_dns_record(
+            zone_id, data['type'], data['name'], data['content'], data.get('ttl', 300), data.get('priority')
+        )
+        return _api_result(success, dict(data, id=record_id), error)
+    
+    async def update_dns_record(self, zone_id: str, record_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        success = await self.manager.update_dns_record(
+            zone_id, record_id, data['type'], data['name'], data['content'], data.get('ttl', 300), data.get('priority')
+        )
+        return _api_result(success, dict(data, id=record_id), f"Could not update record {record_id}")
+    
+    async def delete_dns_record(self, zone_id: str, record_id: str) -> Dict[str, Any]:
+        success = await self.manager.delete_dns_record(zone_id, record_id)
+        return _api_result(success, {'id': record_id}, f"Could not delete record {record_id}")
+    
+    async def batch_dns_records(self, zone_id: str, posts: List[Dict[str, Any]],
+                                deletes: List[str]) -> Dict[str, Any]:
+        """Creates and deletes in one all-or-nothing call; created ids are not returned"""
+        success, error = await self.manager.batch_dns_records(zone_id, posts=posts, deletes=deletes)
+        return _api_result(success, {}, error)
 
 class CloudflareSyncLayer:
     """
@@ -35,21 +181,38 @@ class CloudflareSyncLayer:
     Handles all DNS logic abstraction
     """
     
-    def __init__(self, cloudflare_api=None):
+    def __init__(self, cloudflare_api=None, rate_limiter: Optional[RateLimiter] = None,
+                 concurrency: int = DEFAULT_CONCURRENCY, batch_size: int = BATCH_SIZE,
+                 max_retries: int = 3):
+        if cloudflare_api is not None:
+            from unified_dns_manager import UnifiedDNSManager
+            if isinstance(cloudflare_api, UnifiedDNSManager):
+                cloudflare_api = DNSManagerClient(cloudflare_api)
         self.cloudflare_api = cloudflare_api
         self.sync_queue = asyncio.Queue()
         self.sync_running = False
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.rate_limited = 0
+        # zone_id -> {record key: (ttl, priority)} as of the last sync, the base of the three-way diff.
+        # Held in memory only: after a restart the first sync of a zone has no base, so it
+        # reports remote-only records as unmanaged instead of deleting them
+        self._synced_state: Dict[str, Dict[RecordKey, Tuple[int, Optional[int]]]] = {}
     
-    async def sync_domain_records(self, domain_id: int, local_records: List[DNSRecord]) -> SyncResult:
+    async def sync_domain_records(self, domain_id: int, local_records: List[DNSRecord],
+                                  prune: bool = False) -> SyncResult:
         """
         Sync local DNS records with Cloudflare
         
         Args:
             domain_id: Local domain ID
             local_records: List of local DNS records
+            prune: Also delete records that were added on Cloudflare outside this layer
             
         Returns:
-            SyncResult with sync status and details
+            SyncResult with sync status, per-operation results and detected drift
         """
         try:
             logger.info(f"Starting DNS sync for domain {domain_id}")
@@ -66,19 +229,30 @@ class CloudflareSyncLayer:
             
             # Get current Cloudflare records
             cf_records = await self._get_cloudflare_records(domain_info['zone_id'])
+            if cf_records is None:
+                # Planning against an empty zone would re-create every record
+                return SyncResult(
+                    success=False,
+                    records_synced=0,
+                    errors=["Could not list Cloudflare records"],
+                    details={}
+                )
             
             # Compare and sync
-            sync_operations = self._plan_sync_operations(local_records, cf_records)
-            
-            results = await self._execute_sync_operations(
-                domain_info['zone_id'], sync_operations
+            zone_id = domain_info['zone_id']
+            sync_operations = self._plan_sync_operations(
+                local_records, cf_records, self._synced_state.get(zone_id), prune=prune
             )
             
+            results = await self._execute_sync_operations(zone_id, sync_operations)
+            self._synced_state[zone_id] = results.pop('state')
+            
             return SyncResult(
-                success=True,
+                success=not results['errors'],
                 records_synced=len(results['synced']),
                 errors=results.get('errors', []),
-                details=results
+                details=results,
+                operations=sync_operations['operations']
             )
             
         except Exception as e:
@@ -105,15 +279,7 @@ class CloudflareSyncLayer:
             if not self.cloudflare_api:
                 raise Exception("Cloudflare API not initialized")
             
-            record_data = {
-                "type": record.type,
-                "name": record.name,
-                "content": record.content,
-                "ttl": record.ttl
-            }
-            
-            if record.priority and record.type == "MX":
-                record_data["priority"] = record.priority
+            record_data = self._record_data(record)
             
             result = await self.cloudflare_api.create_dns_record(zone_id, record_data)
             
@@ -145,15 +311,7 @@ class CloudflareSyncLayer:
             if not self.cloudflare_api:
                 raise Exception("Cloudflare API not initialized")
             
-            record_data = {
-                "type": record.type,
-                "name": record.name,
-                "content": record.content,
-                "ttl": record.ttl
-            }
-            
-            if record.priority and record.type == "MX":
-                record_data["priority"] = record.priority
+            record_data = self._record_data(record)
             
             result = await self.cloudflare_api.update_dns_record(zone_id, record_id, record_data)
             
@@ -196,6 +354,21 @@ class CloudflareSyncLayer:
             logger.error(f"Error deleting Cloudflare record: {e}")
             return False
     
+    @staticmethod
+    def _record_data(record: DNSRecord) -> Dict[str, Any]:
+        """Cloudflare API payload for a record"""
+        record_data = {
+            "type": record.type,
+            "name": record.name,
+            "content": record.content,
+            "ttl": record.ttl
+        }
+        
+        if record.priority and record.type == "MX":
+            record_data["priority"] = record.priority
+        
+        return record_data
+    
     async def start_background_sync(self):
         """Start background sync daemon"""
         if self.sync_running:
@@ -249,8 +422,14 @@ class CloudflareSyncLayer:
             'domain_name': 'example.com'
         }
     
-    async def _get_cloudflare_records(self, zone_id: str) -> List[Dict]:
-        """Get current DNS records from Cloudflare"""
+    async def _get_local_records(self, domain_id: int) -> Optional[List[DNSRecord]]:
+        """Get the domain's DNS records from the database, None when they cannot be loaded"""
+        # This would typically query the database; until it does, report the
+        # records as unavailable rather than as an empty zone
+        return None
+    
+    async def _get_cloudflare_records(self, zone_id: str) -> Optional[List[Dict]]:
+        """Get current DNS records from Cloudflare, None when they cannot be listed"""
         if not self.cloudflare_api:
             return []
         
@@ -260,72 +439,231 @@ class CloudflareSyncLayer:
                 return result['result']
             else:
                 logger.error(f"Failed to get Cloudflare records: {result.get('errors')}")
-                return []
+                return None
         except Exception as e:
             logger.error(f"Error getting Cloudflare records: {e}")
-            return []
+            return None
     
-    def _plan_sync_operations(self, local_records: List[DNSRecord], cf_records: List[Dict]) -> Dict:
-        """Plan sync operations based on record differences"""
+    def _plan_sync_operations(self, local_records: List[DNSRecord], cf_records: List[Dict],
+                              base: Optional[Dict[RecordKey, Tuple[int, Optional[int]]]] = None,
+                              prune: bool = False) -> Dict:
+        """Three-way diff of local records, Cloudflare records and the last synced state.
+        
+        Records match by (type, name, content hash); a local record whose
+        cloudflare_id points at an unmatched remote record had its content
+        edited and becomes an update. Remote records this layer synced before
+        but that are no longer local are deleted; remote records it never
+        synced are left alone (reported as drift) unless prune is set.
+        """
+        base = base or {}
         operations = {
             'create': [],
             'update': [],
-            'delete': []
+            'delete': [],
+            'unchanged': 0,
+            'drift': [],
+            'operations': []
         }
         
-        # Create lookup for Cloudflare records
-        cf_lookup = {r['id']: r for r in cf_records}
+        remote_by_key: Dict[RecordKey, List[Dict]] = {}
+        remote_by_id: Dict[str, Dict] = {}
+        for cf_record in cf_records:
+            key = record_key(cf_record.get('type'), cf_record.get('name'), cf_record.get('content'))
+            remote_by_key.setdefault(key, []).append(cf_record)
+            remote_by_id[cf_record['id']] = cf_record
         
-        for local_record in local_records:
-            if local_record.cloudflare_id:
-                # Record exists in Cloudflare, check for updates
-                cf_record = cf_lookup.get(local_record.cloudflare_id)
-                if cf_record:
-                    if self._records_different(local_record, cf_record):
-                        operations['update'].append((local_record, cf_record))
-                else:
-                    # Cloudflare record deleted, recreate
-                    operations['create'].append(local_record)
+        keyed_local = [(record_key(r.type, r.name, r.content), r) for r in local_records]
+        local_keys = {key for key, _ in keyed_local}
+        matched_ids = set()
+        unmatched_local = []
+        for key, local_record in keyed_local:
+            candidates = remote_by_key.get(key)
+            if not candidates:
+                if key in base:
+                    operations['drift'].append(self._drift(local_record.type, local_record.name, 'deleted'))
+                unmatched_local.append(local_record)
+                continue
+            
+            # Among identical remote records prefer the one this record was created as
+            index = next((i for i, r in enumerate(candidates) if r['id'] == local_record.cloudflare_id), 0)
+            cf_record = candidates.pop(index)
+            matched_ids.add(cf_record['id'])
+            if key in base and base[key] != _remote_attrs(cf_record):
+                operations['drift'].append(self._drift(local_record.type, local_record.name, 'modified'))
+            if _local_attrs(local_record) != _remote_attrs(cf_record):
+                operations['update'].append((local_record, cf_record))
+            else:
+                operations['unchanged'] += 1
+        
+        for local_record in unmatched_local:
+            cf_record = remote_by_id.get(local_record.cloudflare_id) if local_record.cloudflare_id else None
+            if cf_record is not None and cf_record['id'] not in matched_ids:
+                matched_ids.add(cf_record['id'])
+                operations['update'].append((local_record, cf_record))
             else:
-                # New record, create in Cloudflare
                 operations['create'].append(local_record)
         
+        for cf_record in cf_records:
+            if cf_record['id'] in matched_ids:
+                continue
+            key = record_key(cf_record.get('type'), cf_record.get('name'), cf_record.get('content'))
+            if key in base or key in local_keys:
+                # Deleted locally since the last sync, or a duplicate of a managed record
+                operations['delete'].append(cf_record)
+            else:
+                operations['drift'].append(self._drift(cf_record.get('type'), cf_record.get('name'), 'added'))
+                if prune:
+                    operations['delete'].append(cf_record)
+        
+        # Deletes first so a replaced CNAME never collides with its successor
+        operations['operations'] = (
+            [SyncOperation('delete', r.get('name'), r.get('type'), remote=r) for r in operations['delete']] +
+            [SyncOperation('update', l.name, l.type, record=l, remote=r) for l, r in operations['update']] +
+            [SyncOperation('create', l.name, l.type, record=l) for l in operations['create']]
+        )
+        # Synced state once every operation succeeds
+        operations['state'] = {key: _local_attrs(r) for key, r in keyed_local}
         return operations
     
-    def _records_different(self, local_record: DNSRecord, cf_record: Dict) -> bool:
-        """Check if local and Cloudflare records are different"""
-        return (
-            local_record.content != cf_record.get('content') or
-            local_record.ttl != cf_record.get('ttl') or
-            local_record.priority != cf_record.get('priority')
-        )
+    @staticmethod
+    def _drift(record_type: str, name: str, change: str) -> Dict[str, str]:
+        return {'type': record_type, 'name': name, 'change': f"{change} on Cloudflare"}
     
     async def _execute_sync_operations(self, zone_id: str, operations: Dict) -> Dict:
-        """Execute planned sync operations"""
+        """Apply planned operations in batches, or concurrently under the rate limit"""
+        planned: List[SyncOperation] = operations['operations']
+        if planned:
+            if hasattr(self.cloudflare_api, 'batch_dns_records'):
+                await self._apply_batches(zone_id, planned)
+            else:
+                await self._apply_concurrently(zone_id, planned)
+        
         results = {
             'synced': [],
-            'errors': []
+            'errors': [],
+            'unchanged': operations['unchanged'],
+            'drift': operations['drift'],
+            'rate_limited': self.rate_limited,
+            'state': dict(operations['state'])
         }
+        for op in planned:
+            if op.success:
+                results['synced'].append(f"{op.action.capitalize()}d {op.name}")
+                if op.action == 'create':
+                    op.record.cloudflare_id = op.cloudflare_id
+                continue
+            results['errors'].append(f"Failed to {op.action} {op.name}: {op.error}")
+            # The record stays as it is on Cloudflare
+            if op.record is not None:
+                results['state'].pop(record_key(op.record.type, op.record.name, op.record.content), None)
+            if op.remote is not None:
+                # Still managed, so a failed delete is retried on the next sync
+                remote_key = record_key(op.remote.get('type'), op.remote.get('name'), op.remote.get('content'))
+                results['state'][remote_key] = _remote_attrs(op.remote)
         
-        # Execute creates
-        for record in operations['create']:
-            cloudflare_id = await self.create_cloudflare_record(zone_id, record)
-            if cloudflare_id:
-                results['synced'].append(f"Created {record.name}")
-            else:
-                results['errors'].append(f"Failed to create {record.name}")
+        if operations['drift']:
+            logger.warning(f"DNS drift in zone {zone_id}: {len(operations['drift'])} records changed on Cloudflare")
+        logger.info(
+            f"DNS sync for zone {zone_id}: {len(results['synced'])} applied, "
+            f"{len(results['errors'])} failed, {operations['unchanged']} unchanged"
+        )
+        return results
+    
+    async def _apply_batches(self, zone_id: str, planned: List[SyncOperation]):
+        """Send creates and deletes through the batch endpoint, batch_size changes per call.
         
-        # Execute updates
-        for local_record, cf_record in operations['update']:
-            success = await self.update_cloudflare_record(
-                zone_id, local_record.cloudflare_id, local_record
-            )
-            if success:
-                results['synced'].append(f"Updated {local_record.name}")
+        The batch call takes posts and deletes only, so updates go through the
+        per-record path. It does not return the created ids; those are read
+        back from the zone afterwards.
+        """
+        batched = [op for op in planned if op.action != 'update']
+        updates = [op for op in planned if op.action == 'update']
+        for start in range(0, len(batched), self.batch_size):
+            chunk = batched[start:start + self.batch_size]
+            posts = [self._record_data(op.record) for op in chunk if op.action == 'create']
+            deletes = [op.remote['id'] for op in chunk if op.action == 'delete']
+            try:
+                result = await self._call(
+                    self.cloudflare_api.batch_dns_records, zone_id, posts=posts, deletes=deletes
+                )
+                error = None if result.get('success') else str(result.get('errors'))
+            except Exception as e:
+                error = str(e)
+            
+            # The batch endpoint is all-or-nothing
+            for op in chunk:
+                op.success = error is None
+                op.error = error
+                if op.success and op.action == 'delete':
+                    op.cloudflare_id = op.remote['id']
+        
+        if updates:
+            await self._apply_concurrently(zone_id, updates)
+        
+        created = [op for op in batched if op.success and op.action == 'create']
+        if created:
+            remote_ids = {
+                record_key(r.get('type'), r.get('name'), r.get('content')): r.get('id')
+                for r in await self._get_cloudflare_records(zone_id) or []
+            }
+            for op in created:
+                op.cloudflare_id = remote_ids.get(record_key(op.record.type, op.record.name, op.record.content))
+    
+    async def _apply_concurrently(self, zone_id: str, planned: List[SyncOperation]):
+        """One call per operation, `concurrency` in flight, paced by the rate limiter"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        
+        async def apply(op: SyncOperation):
+            async with semaphore:
+                try:
+                    if op.action == 'create':
+                        result = await self._call(self.cloudflare_api.create_dns_record, zone_id, self._record_data(op.record))
+                    elif op.action == 'update':
+                        result = await self._call(self.cloudflare_api.update_dns_record, zone_id, op.remote['id'], self._record_data(op.record))
+                    else:
+                        result = await self._call(self.cloudflare_api.delete_dns_record, zone_id, op.remote['id'])
+                except Exception as e:
+                    op.success, op.error = False, str(e)
+                    return
+            op.success = bool(result.get('success'))
+            if not op.success:
+                op.error = str(result.get('errors'))
+            elif op.action == 'create':
+                op.cloudflare_id = (result.get('result') or {}).get('id')
             else:
-                results['errors'].append(f"Failed to update {local_record.name}")
+                op.cloudflare_id = op.remote['id']
         
-        return results
+        await asyncio.gather(*(apply(op) for op in planned))
+    
+    async def _call(self, method, *args, **kwargs) -> Any:
+        """Rate-limited API call, retried after Cloudflare's 429 back-off"""
+        for attempt in range(self.max_retries + 1):
+            await self.rate_limiter.acquire()
+            try:
+                result = await method(*args, **kwargs)
+                retry_after = self._retry_after(result)
+                if retry_after is None or attempt == self.max_retries:
+                    return result
+            except Exception as e:
+                retry_after = self._retry_after(e)
+                if retry_after is None or attempt == self.max_retries:
+                    raise
+            self.rate_limited += 1
+            logger.warning(f"Cloudflare rate limit hit, backing off {retry_after:.1f}s")
+            self.rate_limiter.back_off(retry_after)
+    
+    @staticmethod
+    def _retry_after(outcome: Any) -> Optional[float]:
+        """Seconds to wait if outcome is a rate-limit response or error, else None"""
+        if isinstance(outcome, dict):
+            codes = {e.get('code') for e in outcome.get('errors') or [] if isinstance(e, dict)}
+            if outcome.get('status') == 429 or codes & RATE_LIMIT_ERROR_CODES:
+                return float(outcome.get('retry_after') or 1.0)
+            return None
+        response = getattr(outcome, 'response', None)
+        if getattr(response, 'status_code', None) == 429:
+            return float(response.headers.get('retry-after') or 1.0)
+        return None
     
     async def _process_sync_request(self, sync_request: Dict):
         """Process a background sync request"""
@@ -346,9 +684,12 @@ class CloudflareSyncLayer:
     
     async def _full_domain_sync(self, domain_id: int):
         """Perform full domain synchronization"""
-        # Get all local records for domain
-        # This would typically query the database
-        local_records = []  # Mock
+        local_records = await self._get_local_records(domain_id)
+        if local_records is None:
+            # An empty list would read as every record deleted locally and
+            # plan a delete for everything synced before
+            logger.warning(f"Local DNS records unavailable for domain {domain_id}, full sync skipped")
+            return
         
         # Perform sync
         result = await self.sync_domain_records(domain_id, local_records)
@@ -18,6 +18,11 @@ def get_db() -> Generator[Session, None, None]:
     finally:
         db.close()
 
+async def get_async_db():
+    """Get the shared async database manager (non-blocking queries for async routes)"""
+    from async_database import get_async_db_manager
+    return get_async_db_manager()
+
 def get_nameserver_service(db: Session = None) -> NameserverService:
     """Get nameserver service with dependencies"""
     if db is None:
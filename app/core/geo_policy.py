@@ -0,0 +1,294 @@
+"""
+Geo Policy Compiler - Country and Continent Access Rules
+Compiles a domain's geo-access settings into one canonical Cloudflare rule
+
+Country, continent and ASN sets are upper-cased, de-duplicated and sorted
+before the expression is built, so the same policy always compiles to the
+same expression and content hash however the user toggled it. Each zone
+keeps a single custom rule, found again by its ``ref``. The applier
+remembers where that rule lives and the hash it last applied, so saving an
+unchanged policy makes no API call. A changed policy costs one call, plus
+one lookup the first time a zone is seen.
+"""
+
+import hashlib
+import json
+import logging
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+GEO_RULE_REF = "nomadly_geo_access"
+CUSTOM_RULES_PHASE = "http_request_firewall_custom"
+ENTRYPOINT_PATH = f"/rulesets/phases/{CUSTOM_RULES_PHASE}/entrypoint"
+
+ALLOW_ALL = "allow_all"
+BLOCK = "block"
+ALLOW_ONLY = "allow_only"
+# The bot's "block all except selected" mode is the same policy as allow-only
+MODE_ALIASES = {"block_except": ALLOW_ONLY}
+GEO_MODES = (ALLOW_ALL, BLOCK, ALLOW_ONLY)
+
+GEO_ACTIONS = ("block", "challenge", "managed_challenge", "js_challenge")
+CONTINENT_CODES = ("AF", "AN", "AS", "EU", "NA", "OC", "SA")
+# ISO 3166 alpha-2 plus Cloudflare's T1 (Tor) and XX (unknown)
+_COUNTRY_CODE = re.compile(r"^[A-Z][A-Z0-9]$")
+
+# (status, response JSON) for one call against /zones/{zone_id}<path>
+RulesetRequest = Callable[[str, str, str, Optional[Dict[str, Any]]], Awaitable[Tuple[int, Dict[str, Any]]]]
+
+
+class GeoPolicyError(ValueError):
+    """Raised for a geo policy that cannot be compiled"""
+
+
+@dataclass(frozen=True)
+class CompiledGeoRule:
+    """Canonical Cloudflare custom rule for one geo policy"""
+    expression: str
+    action: str
+    description: str
+    digest: str
+
+    def as_rule(self) -> Dict[str, Any]:
+        return {
+            "ref": GEO_RULE_REF,
+            "expression": self.expression,
+            "action": self.action,
+            "description": self.description,
+            "enabled": True,
+        }
+
+
+def rule_digest(expression: str, action: str, description: str) -> str:
+    """Content hash of a rule, stable across processes"""
+    payload = json.dumps([expression, action, description], separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def normalize_geo_mode(mode: Optional[str]) -> str:
+    mode = MODE_ALIASES.get(mode or ALLOW_ALL, mode or ALLOW_ALL)
+    if mode not in GEO_MODES:
+        raise GeoPolicyError(f"Unknown geo mode: {mode}")
+    return mode
+
+
+def normalize_countries(countries: Iterable[str]) -> Tuple[str, ...]:
+    codes = {str(code).strip().upper() for code in countries or () if str(code).strip()}
+    invalid = sorted(code for code in codes if not _COUNTRY_CODE.match(code))
+    if invalid:
+        raise GeoPolicyError(f"Invalid country codes: {', '.join(invalid)}")
+    return tuple(sorted(codes))
+
+
+def normalize_continents(continents: Iterable[str]) -> Tuple[str, ...]:
+    codes = {str(code).strip().upper() for code in continents or () if str(code).strip()}
+    invalid = sorted(codes.difference(CONTINENT_CODES))
+    if invalid:
+        raise GeoPolicyError(f"Invalid continent codes: {', '.join(invalid)}")
+    return tuple(sorted(codes))
+
+
+def normalize_asns(asns: Iterable[Any]) -> Tuple[int, ...]:
+    try:
+        return tuple(sorted({int(str(asn).upper().replace("AS", "")) for asn in asns or ()}))
+    except ValueError as e:
+        raise GeoPolicyError(f"Invalid ASN: {e}")
+
+
+def _quoted_set(codes: Tuple[str, ...]) -> str:
+    return "{" + " ".join(f'"{code}"' for code in codes) + "}"
+
+
+@lru_cache(maxsize=1024)
+def _compile(mode: str, countries: Tuple[str, ...], continents: Tuple[str, ...],
+             asns: Tuple[int, ...], action: str, description: Optional[str]) -> Optional[CompiledGeoRule]:
+    conditions = []
+    if countries:
+        conditions.append(f"ip.src.country in {_quoted_set(countries)}")
+    if continents:
+        conditions.append(f"ip.geoip.continent in {_quoted_set(continents)}")
+    if asns:
+        conditions.append(f"ip.geoip.asnum in {{{' '.join(str(asn) for asn in asns)}}}")
+
+    if mode == ALLOW_ALL or (mode == BLOCK and not conditions):
+        return None
+    if mode == ALLOW_ONLY and not (countries or continents):
+        # Compiling this would block every visitor
+        raise GeoPolicyError("Allow-only mode needs at least one country or continent")
+
+    scope = ", ".join(countries + continents + tuple(f"AS{asn}" for asn in asns))
+    if mode == BLOCK:
+        expression = " or ".join(f"({condition})" for condition in conditions)
+        description = description or f"Block: {scope}"
+    else:
+        expression = f"not ({' or '.join(conditions)})"
+        description = description or f"Allow only: {scope}"
+    return CompiledGeoRule(expression, action, description, rule_digest(expression, action, description))
+
+
+def compile_geo_policy(mode: str = BLOCK, countries: Iterable[str] = (), continents: Iterable[str] = (),
+                       asns: Iterable[Any] = (), action: str = "block",
+                       description: Optional[str] = None) -> Optional[CompiledGeoRule]:
+    """Compile a geo policy into its canonical rule.
+
+    Returns None when the policy restricts nothing (allow-all, or block mode
+    with nothing selected), meaning the zone should have no geo rule.
+    """
+    if action not in GEO_ACTIONS:
+        raise GeoPolicyError(f"Unsupported action: {action}")
+    if action != "block" and normalize_geo_mode(mode) == ALLOW_ONLY:
+        raise GeoPolicyError("Allow-only policies always block")
+    return _compile(
+        normalize_geo_mode(mode), normalize_countries(countries), normalize_continents(continents),
+        normalize_asns(asns), action, description
+    )
+
+
+def compile_rule_config(rule_config: Dict[str, Any]) -> Optional[CompiledGeoRule]:
+    """Compile the advanced rule config accepted by CloudflareAPI.create_advanced_geo_rule"""
+    action = rule_config.get("action", "block")
+    description = rule_config.get("description")
+    if rule_config.get("allow_countries"):
+        blocked = compile_geo_policy(
+            BLOCK, rule_config.get("block_countries", ()), rule_config.get("block_continents", ()),
+            rule_config.get("block_asn", ()), action
+        )
+        allowed = compile_geo_policy(ALLOW_ONLY, rule_config["allow_countries"])
+        expression = " or ".join(rule.expression for rule in (blocked, allowed) if rule)
+        description = description or " / ".join(rule.description for rule in (blocked, allowed) if rule)
+        return CompiledGeoRule(expression, action, description, rule_digest(expression, action, description))
+    return compile_geo_policy(
+        BLOCK, rule_config.get("block_countries", ()), rule_config.get("block_continents", ()),
+        rule_config.get("block_asn", ()), action, description
+    )
+
+
+@dataclass
+class AppliedGeoRule:
+    """Where a zone's geo rule lives and what was last applied to it"""
+    ruleset_id: Optional[str]
+    rule_id: Optional[str]
+    digest: Optional[str]  # None when the zone has no geo rule
+
+
+class GeoRuleCache:
+    """Last-applied geo rule per zone, shared by every applier in the process"""
+
+    def __init__(self):
+        self._zones: Dict[str, AppliedGeoRule] = {}
+
+    def get(self, zone_id: str) -> Optional[AppliedGeoRule]:
+        return self._zones.get(zone_id)
+
+    def remember(self, zone_id: str, ruleset_id: Optional[str], rule_id: Optional[str],
+                 digest: Optional[str]) -> None:
+        self._zones[zone_id] = AppliedGeoRule(ruleset_id, rule_id, digest)
+
+    def forget(self, zone_id: str) -> None:
+        self._zones.pop(zone_id, None)
+
+    def is_current(self, zone_id: str, digest: Optional[str]) -> bool:
+        applied = self._zones.get(zone_id)
+        return applied is not None and applied.digest == digest
+
+
+def _error_message(data: Dict[str, Any], status: int) -> str:
+    errors = data.get("errors") or []
+    return errors[0].get("message", "Unknown error") if errors else f"HTTP {status}"
+
+
+class GeoPolicyApplier:
+    """Applies compiled geo rules to zones with as few API calls as possible.
+
+    ``request(method, zone_id, path, payload)`` performs one Cloudflare call
+    against ``/zones/{zone_id}{path}`` and returns the HTTP status and the
+    decoded response, so the applier works over any HTTP client.
+    """
+
+    def __init__(self, request: RulesetRequest, cache: Optional[GeoRuleCache] = None):
+        self.request = request
+        self.cache = cache if cache is not None else geo_rule_cache
+        self.api_calls = 0
+
+    async def _call(self, method: str, zone_id: str, path: str,
+                    payload: Optional[Dict[str, Any]] = None) -> Tuple[int, Dict[str, Any]]:
+        self.api_calls += 1
+        return await self.request(method, zone_id, path, payload)
+
+    def _remember_from_ruleset(self, zone_id: str, ruleset: Dict[str, Any],
+                               rule: Optional[CompiledGeoRule]) -> None:
+        for remote in ruleset.get("rules") or []:
+            if remote.get("ref") == GEO_RULE_REF:
+                self.cache.remember(zone_id, ruleset.get("id"), remote.get("id"), rule.digest if rule else None)
+                return
+        self.cache.remember(zone_id, ruleset.get("id"), None, None)
+
+    async def _locate(self, zone_id: str) -> Tuple[bool, Optional[str]]:
+        """Find the zone's entrypoint ruleset and geo rule; one GET per zone"""
+        status, data = await self._call("GET", zone_id, ENTRYPOINT_PATH)
+        if status == 404:
+            self.cache.remember(zone_id, None, None, None)
+            return True, None
+        if status != 200 or not data.get("success"):
+            return False, _error_message(data, status)
+
+        ruleset = data.get("result") or {}
+        for remote in ruleset.get("rules") or []:
+            if remote.get("ref") == GEO_RULE_REF:
+                digest = rule_digest(remote.get("expression", ""), remote.get("action", ""),
+                                     remote.get("description", ""))
+                self.cache.remember(zone_id, ruleset.get("id"), remote.get("id"), digest)
+                return True, None
+        self.cache.remember(zone_id, ruleset.get("id"), None, None)
+        return True, None
+
+    async def apply(self, zone_id: str, rule: Optional[CompiledGeoRule]) -> Dict[str, Any]:
+        """Make the zone's geo rule match ``rule`` (None removes it).
+
+        Returns success, the change made (created, updated, deleted or
+        unchanged) and an error message on failure.
+        """
+        digest = rule.digest if rule else None
+        if self.cache.get(zone_id) is None:
+            located, error = await self._locate(zone_id)
+            if not located:
+                return {"success": False, "change": None, "error": error}
+        if self.cache.is_current(zone_id, digest):
+            logger.info(f"⏭️ Geo rule for zone {zone_id} unchanged, skipping API call")
+            return {"success": True, "change": "unchanged", "error": None}
+
+        applied = self.cache.get(zone_id)
+        if applied.ruleset_id is None:
+            # No custom-rules entrypoint yet: creating it carries the rule
+            status, data = await self._call("PUT", zone_id, ENTRYPOINT_PATH, {"rules": [rule.as_rule()]})
+            change = "created"
+        elif applied.rule_id is None:
+            status, data = await self._call("POST", zone_id, f"/rulesets/{applied.ruleset_id}/rules", rule.as_rule())
+            change = "created"
+        elif rule is None:
+            status, data = await self._call("DELETE", zone_id, f"/rulesets/{applied.ruleset_id}/rules/{applied.rule_id}")
+            change = "deleted"
+        else:
+            status, data = await self._call(
+                "PATCH", zone_id, f"/rulesets/{applied.ruleset_id}/rules/{applied.rule_id}", rule.as_rule()
+            )
+            change = "updated"
+
+        if status != 200 or not data.get("success"):
+            # The rule may have been edited in the dashboard; look it up afresh next time
+            self.cache.forget(zone_id)
+            error = _error_message(data, status)
+            logger.error(f"❌ Geo rule {change} failed for zone {zone_id}: {error}")
+            return {"success": False, "change": None, "error": error}
+
+        self._remember_from_ruleset(zone_id, data.get("result") or {}, rule)
+        logger.info(f"✅ Geo rule {change} for zone {zone_id}")
+        return {"success": True, "change": change, "error": None}
+
+
+# Global cache instance
+geo_rule_cache = GeoRuleCache()
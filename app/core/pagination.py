@@ -0,0 +1,164 @@
+"""
+Keyset Pagination for Nomadly3
+Cursor-based paging for domain, order, transaction and user listings
+
+OFFSET paging makes the database walk and discard every earlier row, so page N
+of a 100k-row listing costs as much as reading the first N pages. A keyset page
+instead filters on the (sort column, id) of the last row already shown:
+
+    WHERE (created_at, id) < (:last_created_at, :last_id)
+    ORDER BY created_at DESC, id DESC LIMIT :page_size + 1
+
+which an index on (owner, created_at DESC) answers by seeking straight to the
+boundary, the same cost for any page. The extra row tells whether a further
+page exists. Listings are newest first.
+
+Cursors are short opaque strings ("n" or "p" for the direction, then the
+boundary key in hex) so they fit in Telegram callback data as well as query
+strings. Rows written without a timestamp have a NULL sort key; it sorts above
+every timestamp, as PostgreSQL's own DESC order does, so those rows list first
+and the (owner, sort DESC, id DESC) indexes still serve every page. A NULL key
+needs its own filter because it compares as unknown in the tuple comparison.
+"""
+
+from calendar import timegm
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, List, Optional, Tuple
+
+PAGE_SIZE = 10
+MAX_PAGE_SIZE = 100
+
+NEXT = "n"
+PREV = "p"
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+class PaginationError(ValueError):
+    """A cursor that is malformed or does not belong to this listing"""
+
+
+def _encode_value(value) -> str:
+    if value is None:
+        return "_"
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return "t" + format(timegm(value.timetuple()) * 1_000_000 + value.microsecond, "x")
+    if isinstance(value, int) and not isinstance(value, bool):
+        return ("-" if value < 0 else "") + format(abs(value), "x")
+    raise PaginationError(f"Cannot page on a {type(value).__name__} key")
+
+
+def _decode_value(token: str):
+    if token == "_":
+        return None
+    if token.startswith("t"):
+        return _EPOCH + timedelta(microseconds=int(token[1:], 16))
+    return int(token, 16)
+
+
+def encode_cursor(direction: str, key: Tuple[Any, ...]) -> str:
+    """Cursor for the page after (NEXT) or before (PREV) the row with this key"""
+    return direction + ".".join(_encode_value(value) for value in key)
+
+
+def decode_cursor(cursor: str) -> Tuple[str, Tuple[Any, ...]]:
+    """(direction, key) for a cursor from encode_cursor"""
+    if not cursor or cursor[0] not in (NEXT, PREV):
+        raise PaginationError("Invalid cursor")
+    try:
+        return cursor[0], tuple(_decode_value(token) for token in cursor[1:].split("."))
+    except ValueError:
+        raise PaginationError("Invalid cursor") from None
+
+
+@dataclass
+class Page:
+    items: List[Any] = field(default_factory=list)
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self) -> bool:
+        return self.prev_cursor is not None
+
+    def map(self, func) -> "Page":
+        """The same page with each item converted (e.g. ORM rows to dicts)"""
+        return Page([func(item) for item in self.items], self.next_cursor, self.prev_cursor)
+
+
+class Keyset:
+    """One page of a listing ordered newest first by (sort_column, id_column).
+
+    ``apply`` adds the boundary filter, ordering and limit to a SQLAlchemy
+    ``Query`` or ``select()``; ``page`` turns the fetched rows into a Page.
+    The same Keyset serves sync sessions and AsyncSession alike.
+    """
+
+    def __init__(self, sort_column, id_column, limit: int = PAGE_SIZE, cursor: Optional[str] = None):
+        self.sort_column = sort_column
+        self.id_column = id_column
+        self.limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        self.direction, self.key = decode_cursor(cursor) if cursor else (NEXT, None)
+        if self.key is not None and len(self.key) != 2:
+            raise PaginationError("Cursor does not match this listing")
+
+    def _after(self):
+        """Rows after the cursor key in newest-first order, NULL sorting highest"""
+        from sqlalchemy import and_, or_, tuple_
+
+        sort_key, row_id = self.key
+        if sort_key is None:
+            return or_(self.sort_column.isnot(None), and_(self.sort_column.is_(None), self.id_column < row_id))
+        return tuple_(self.sort_column, self.id_column) < tuple_(sort_key, row_id)
+
+    def _before(self):
+        """Rows before the cursor key in newest-first order"""
+        from sqlalchemy import and_, or_, tuple_
+
+        sort_key, row_id = self.key
+        if sort_key is None:
+            return and_(self.sort_column.is_(None), self.id_column > row_id)
+        return or_(tuple_(self.sort_column, self.id_column) > tuple_(sort_key, row_id), self.sort_column.is_(None))
+
+    def apply(self, statement):
+        if self.direction == NEXT:
+            if self.key is not None:
+                statement = statement.filter(self._after())
+            ordering = (self.sort_column.desc().nulls_first(), self.id_column.desc())
+        else:
+            statement = statement.filter(self._before())
+            ordering = (self.sort_column.asc().nulls_last(), self.id_column.asc())
+        return statement.order_by(None).order_by(*ordering).limit(self.limit + 1)
+
+    def _key(self, row) -> Tuple[Any, Any]:
+        return getattr(row, self.sort_column.key), getattr(row, self.id_column.key)
+
+    def page(self, rows) -> Page:
+        rows = list(rows)
+        more = len(rows) > self.limit
+        rows = rows[:self.limit]
+        if self.direction == PREV:
+            rows.reverse()
+            has_prev, has_next = more, True
+        else:
+            has_prev, has_next = self.key is not None, more
+        if not rows:
+            return Page()
+        return Page(
+            rows,
+            encode_cursor(NEXT, self._key(rows[-1])) if has_next else None,
+            encode_cursor(PREV, self._key(rows[0])) if has_prev else None,
+        )
+
+
+def paginate(query, sort_column, id_column, limit: int = PAGE_SIZE, cursor: Optional[str] = None) -> Page:
+    """Run one keyset page of a sync SQLAlchemy Query"""
+    keyset = Keyset(sort_column, id_column, limit, cursor)
+    return keyset.page(keyset.apply(query).all())
@@ -6,10 +6,14 @@ Complete implementation for DNS zone management and record operations
 import logging
 import aiohttp
 import json
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 
 from ..core.config import config
+from ..core.geo_policy import (
+    ALLOW_ONLY, BLOCK, CompiledGeoRule, GeoPolicyApplier, GeoPolicyError,
+    compile_geo_policy, compile_rule_config, geo_rule_cache
+)
 from ..core.external_services import CloudflareServiceInterface
 from ..repositories.external_integration_repo import (
     CloudflareIntegrationRepository, DNSOperationRepository, APIUsageLogRepository
@@ -32,6 +36,9 @@ class CloudflareAPI(CloudflareServiceInterface):
         self.cloudflare_repo = CloudflareIntegrationRepository()
         self.dns_operation_repo = DNSOperationRepository()
         self.api_usage_repo = APIUsageLogRepository()
+        
+        # Geo rules are compiled once and only sent when their hash changes
+        self.geo_applier = GeoPolicyApplier(self._ruleset_request, geo_rule_cache)
     
     async def create_zone(self, domain_name: str, account_id: str = None) -> Dict[str, Any]:
         """Create a new DNS zone in Cloudflare"""
@@ -117,187 +124,117 @@ class CloudflareAPI(CloudflareServiceInterface):
             logger.error(f"Exception getting nameservers for zone {zone_id}: {str(e)}")
             return []
     
-    async def create_country_access_rule(self, zone_id: str, countries: List[str], 
-                                       action: str = "block", description: str = None) -> Dict[str, Any]:
-        """Create country-based access control using WAF Custom Rules"""
+    async def _ruleset_request(self, method: str, zone_id: str, path: str,
+                               payload: Dict[str, Any] = None) -> Tuple[int, Dict[str, Any]]:
+        """One rulesets API call for the geo policy applier"""
         start_time = datetime.now()
-        
-        # Build country expression for WAF Custom Rules
-        country_list = " ".join([f'"{country.upper()}"' for country in countries])
-        
-        if action == "allow_only":
-            # Allow only specified countries (block all others)
-            expression = f"(not ip.src.country in {{{country_list}}})"
-            action = "block"
-            description = description or f"Allow only countries: {', '.join(countries)}"
-        else:
-            # Block specified countries
-            expression = f"ip.src.country in {{{country_list}}}"
-            description = description or f"Block countries: {', '.join(countries)}"
-        
-        payload = {
-            "kind": "zone",
-            "name": "Country access control",
-            "phase": "http_request_firewall_custom",
-            "rules": [{
-                "expression": expression,
-                "action": action,
-                "description": description
-            }]
-        }
-        
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{self.base_url}/zones/{zone_id}/rulesets",
-                    headers=self.headers,
-                    json=payload
-                ) as response:
-                    response_time = int((datetime.now() - start_time).total_seconds() * 1000)
-                    response_data = await response.json()
-                    
-                    # Log API usage
+        endpoint = f"/zones/{zone_id}{path}"
+        
+        async with aiohttp.ClientSession() as session:
+            async with session.request(
+                method,
+                f"{self.base_url}{endpoint}",
+                headers=self.headers,
+                json=payload
+            ) as response:
+                response_time = int((datetime.now() - start_time).total_seconds() * 1000)
+                response_data = await response.json()
+                
+                if method != "GET":
                     await self._log_api_usage(
-                        endpoint=f"/zones/{zone_id}/rulesets",
-                        method="POST",
+                        endpoint=endpoint,
+                        method=method,
                         status=response.status,
                         request_data=payload,
                         response_data=response_data,
                         response_time_ms=response_time
                     )
-                    
-                    if response.status == 200 and response_data.get("success"):
-                        ruleset_data = response_data["result"]
-                        
-                        # Store integration record
-                        integration = self.cloudflare_repo.create_operation_record(
-                            zone_id=zone_id,
-                            operation_type="country_access_rule",
-                            operation_data={
-                                "countries": countries,
-                                "action": action,
-                                "expression": expression,
-                                "ruleset_id": ruleset_data["id"]
-                            },
-                            operation_status="completed"
-                        )
-                        
-                        logger.info(f"Successfully created country access rule for {zone_id}: {description}")
-                        
-                        return {
-                            "success": True,
-                            "ruleset_id": ruleset_data["id"],
-                            "rule_id": ruleset_data["rules"][0]["id"],
-                            "countries": countries,
-                            "action": action,
-                            "expression": expression,
-                            "description": description,
-                            "integration_id": integration.id,
-                            "cloudflare_data": ruleset_data
-                        }
-                    else:
-                        error_msg = response_data.get("errors", [{"message": "Unknown error"}])[0]["message"]
-                        logger.error(f"Failed to create country access rule for {zone_id}: {error_msg}")
-                        
-                        return {
-                            "success": False,
-                            "error": error_msg,
-                            "cloudflare_response": response_data
-                        }
-                        
+                
+                return response.status, response_data
+    
+    async def _apply_geo_rule(self, zone_id: str, rule: Optional[CompiledGeoRule],
+                              operation_type: str, operation_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Apply a compiled geo rule, skipping the API when it is already live"""
+        try:
+            result = await self.geo_applier.apply(zone_id, rule)
         except Exception as e:
-            logger.error(f"Exception creating country access rule for {zone_id}: {str(e)}")
+            geo_rule_cache.forget(zone_id)
+            logger.error(f"Exception applying {operation_type} for {zone_id}: {str(e)}")
             return {
                 "success": False,
                 "error": f"API request failed: {str(e)}"
             }
-    
-    async def update_country_access_rule(self, zone_id: str, ruleset_id: str, 
-                                       countries: List[str], action: str = "block",
-                                       description: str = None) -> Dict[str, Any]:
-        """Update existing country access rule"""
-        start_time = datetime.now()
-        
-        # Build updated country expression
-        country_list = " ".join([f'"{country.upper()}"' for country in countries])
         
-        if action == "allow_only":
-            expression = f"(not ip.src.country in {{{country_list}}})"
-            action = "block"
-            description = description or f"Allow only countries: {', '.join(countries)}"
-        else:
-            expression = f"ip.src.country in {{{country_list}}}"
-            description = description or f"Block countries: {', '.join(countries)}"
+        if not result["success"]:
+            logger.error(f"Failed to apply {operation_type} for {zone_id}: {result['error']}")
+            return {
+                "success": False,
+                "error": result["error"]
+            }
         
-        payload = {
-            "expression": expression,
-            "action": action,
-            "description": description
+        applied = geo_rule_cache.get(zone_id)
+        response = {
+            "success": True,
+            "change": result["change"],
+            "ruleset_id": applied.ruleset_id if applied else None,
+            "rule_id": applied.rule_id if applied else None,
+            "expression": rule.expression if rule else None,
+            "action": rule.action if rule else None,
+            "description": rule.description if rule else None,
+            **operation_data
         }
         
+        if result["change"] != "unchanged":
+            integration = self.cloudflare_repo.create_operation_record(
+                zone_id=zone_id,
+                operation_type=operation_type,
+                operation_data={
+                    **operation_data,
+                    "expression": response["expression"],
+                    "ruleset_id": response["ruleset_id"],
+                    "change": result["change"]
+                },
+                operation_status="completed"
+            )
+            response["integration_id"] = integration.id
+            logger.info(f"Successfully applied {operation_type} for {zone_id}: {response['description']}")
+        
+        return response
+    
+    async def apply_geo_policy(self, zone_id: str, mode: str, countries: List[str] = None,
+                               continents: List[str] = None) -> Dict[str, Any]:
+        """Apply a zone's whole geo policy (allow_all, block, allow_only) as one rule"""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.put(
-                    f"{self.base_url}/zones/{zone_id}/rulesets/{ruleset_id}/rules/1",
-                    headers=self.headers,
-                    json=payload
-                ) as response:
-                    response_time = int((datetime.now() - start_time).total_seconds() * 1000)
-                    response_data = await response.json()
-                    
-                    # Log API usage
-                    await self._log_api_usage(
-                        endpoint=f"/zones/{zone_id}/rulesets/{ruleset_id}/rules/1",
-                        method="PUT",
-                        status=response.status,
-                        request_data=payload,
-                        response_data=response_data,
-                        response_time_ms=response_time
-                    )
-                    
-                    if response.status == 200 and response_data.get("success"):
-                        rule_data = response_data["result"]
-                        
-                        # Update integration record
-                        self.cloudflare_repo.update_operation_record(
-                            zone_id,
-                            operation_type="country_access_rule",
-                            operation_data={
-                                "countries": countries,
-                                "action": action,
-                                "expression": expression,
-                                "ruleset_id": ruleset_id,
-                                "updated": True
-                            }
-                        )
-                        
-                        logger.info(f"Successfully updated country access rule for {zone_id}: {description}")
-                        
-                        return {
-                            "success": True,
-                            "rule_id": rule_data["id"],
-                            "countries": countries,
-                            "action": action,
-                            "expression": expression,
-                            "description": description,
-                            "cloudflare_data": rule_data
-                        }
-                    else:
-                        error_msg = response_data.get("errors", [{"message": "Unknown error"}])[0]["message"]
-                        logger.error(f"Failed to update country access rule for {zone_id}: {error_msg}")
-                        
-                        return {
-                            "success": False,
-                            "error": error_msg,
-                            "cloudflare_response": response_data
-                        }
-                        
-        except Exception as e:
-            logger.error(f"Exception updating country access rule for {zone_id}: {str(e)}")
-            return {
-                "success": False,
-                "error": f"API request failed: {str(e)}"
-            }
+            rule = compile_geo_policy(mode, countries or [], continents or [])
+        except GeoPolicyError as e:
+            return {"success": False, "error": str(e)}
+        
+        return await self._apply_geo_rule(
+            zone_id, rule, "geo_policy",
+            {"mode": mode, "countries": countries or [], "continents": continents or []}
+        )
+    
+    async def create_country_access_rule(self, zone_id: str, countries: List[str], 
+                                       action: str = "block", description: str = None) -> Dict[str, Any]:
+        """Create country-based access control using WAF Custom Rules"""
+        try:
+            if action == "allow_only":
+                # Allow only specified countries (block all others)
+                rule = compile_geo_policy(ALLOW_ONLY, countries, description=description)
+            else:
+                rule = compile_geo_policy(BLOCK, countries, action=action, description=description)
+        except GeoPolicyError as e:
+            return {"success": False, "error": str(e)}
+        
+        return await self._apply_geo_rule(
+            zone_id, rule, "country_access_rule", {"countries": countries}
+        )
+    
+    async def update_country_access_rule(self, zone_id: str, ruleset_id: str, 
+                                       countries: List[str], action: str = "block",
+                                       description: str = None) -> Dict[str, Any]:
+        """Update existing country access rule (no API call when the countries are unchanged)"""
+        return await self.create_country_access_rule(zone_id, countries, action, description)
     
     async def get_country_access_rules(self, zone_id: str) -> Dict[str, Any]:
         """Get all country access rules for a zone"""
@@ -360,6 +297,8 @@ class CloudflareAPI(CloudflareServiceInterface):
                     response_data = await response.json()
                     
                     if response.status == 200 and response_data.get("success"):
+                        geo_rule_cache.forget(zone_id)
+                        
                         # Update integration record
                         self.cloudflare_repo.update_operation_record(
                             zone_id,
@@ -380,203 +319,34 @@ class CloudflareAPI(CloudflareServiceInterface):
     async def create_continent_access_rule(self, zone_id: str, continents: List[str], 
                                          action: str = "block", description: str = None) -> Dict[str, Any]:
         """Create continent-based access control (AF, AS, EU, NA, OC, SA, AN)"""
-        start_time = datetime.now()
-        
-        # Build continent expression
-        continent_list = " ".join([f'"{continent.upper()}"' for continent in continents])
-        
-        if action == "allow_only":
-            expression = f"(not ip.geoip.continent in {{{continent_list}}})"
-            action = "block"
-            description = description or f"Allow only continents: {', '.join(continents)}"
-        else:
-            expression = f"ip.geoip.continent in {{{continent_list}}}"
-            description = description or f"Block continents: {', '.join(continents)}"
-        
-        payload = {
-            "kind": "zone",
-            "name": "Continent access control",
-            "phase": "http_request_firewall_custom",
-            "rules": [{
-                "expression": expression,
-                "action": action,
-                "description": description
-            }]
-        }
-        
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{self.base_url}/zones/{zone_id}/rulesets",
-                    headers=self.headers,
-                    json=payload
-                ) as response:
-                    response_time = int((datetime.now() - start_time).total_seconds() * 1000)
-                    response_data = await response.json()
-                    
-                    # Log API usage
-                    await self._log_api_usage(
-                        endpoint=f"/zones/{zone_id}/rulesets",
-                        method="POST",
-                        status=response.status,
-                        request_data=payload,
-                        response_data=response_data,
-                        response_time_ms=response_time
-                    )
-                    
-                    if response.status == 200 and response_data.get("success"):
-                        ruleset_data = response_data["result"]
-                        
-                        # Store integration record
-                        integration = self.cloudflare_repo.create_operation_record(
-                            zone_id=zone_id,
-                            operation_type="continent_access_rule",
-                            operation_data={
-                                "continents": continents,
-                                "action": action,
-                                "expression": expression,
-                                "ruleset_id": ruleset_data["id"]
-                            },
-                            operation_status="completed"
-                        )
-                        
-                        logger.info(f"Successfully created continent access rule for {zone_id}: {description}")
-                        
-                        return {
-                            "success": True,
-                            "ruleset_id": ruleset_data["id"],
-                            "rule_id": ruleset_data["rules"][0]["id"],
-                            "continents": continents,
-                            "action": action,
-                            "expression": expression,
-                            "description": description,
-                            "integration_id": integration.id,
-                            "cloudflare_data": ruleset_data
-                        }
-                    else:
-                        error_msg = response_data.get("errors", [{"message": "Unknown error"}])[0]["message"]
-                        logger.error(f"Failed to create continent access rule for {zone_id}: {error_msg}")
-                        
-                        return {
-                            "success": False,
-                            "error": error_msg,
-                            "cloudflare_response": response_data
-                        }
-                        
-        except Exception as e:
-            logger.error(f"Exception creating continent access rule for {zone_id}: {str(e)}")
-            return {
-                "success": False,
-                "error": f"API request failed: {str(e)}"
-            }
+            if action == "allow_only":
+                rule = compile_geo_policy(ALLOW_ONLY, continents=continents, description=description)
+            else:
+                rule = compile_geo_policy(BLOCK, continents=continents, action=action, description=description)
+        except GeoPolicyError as e:
+            return {"success": False, "error": str(e)}
+        
+        return await self._apply_geo_rule(
+            zone_id, rule, "continent_access_rule", {"continents": continents}
+        )
     
     async def create_advanced_geo_rule(self, zone_id: str, rule_config: Dict[str, Any]) -> Dict[str, Any]:
         """Create advanced geo-blocking rule with multiple conditions"""
-        start_time = datetime.now()
-        
-        expressions = []
-        
-        # Build country conditions
-        if "block_countries" in rule_config:
-            country_list = " ".join([f'"{c.upper()}"' for c in rule_config["block_countries"]])
-            expressions.append(f"ip.src.country in {{{country_list}}}")
-        
-        if "allow_countries" in rule_config:
-            country_list = " ".join([f'"{c.upper()}"' for c in rule_config["allow_countries"]])
-            expressions.append(f"(not ip.src.country in {{{country_list}}})")
-        
-        # Build continent conditions
-        if "block_continents" in rule_config:
-            continent_list = " ".join([f'"{c.upper()}"' for c in rule_config["block_continents"]])
-            expressions.append(f"ip.geoip.continent in {{{continent_list}}}")
-        
-        # Build ASN conditions (for blocking specific ISPs/hosting providers)
-        if "block_asn" in rule_config:
-            asn_list = " ".join([str(asn) for asn in rule_config["block_asn"]])
-            expressions.append(f"ip.geoip.asnum in {{{asn_list}}}")
+        try:
+            rule = compile_rule_config(rule_config)
+        except GeoPolicyError as e:
+            return {"success": False, "error": str(e)}
         
-        # Combine expressions
-        if not expressions:
+        if rule is None:
             return {
                 "success": False,
                 "error": "No geo-blocking conditions specified"
             }
         
-        expression = " or ".join(expressions) if len(expressions) > 1 else expressions[0]
-        
-        payload = {
-            "kind": "zone",
-            "name": "Advanced geo-blocking",
-            "phase": "http_request_firewall_custom",
-            "rules": [{
-                "expression": expression,
-                "action": rule_config.get("action", "block"),
-                "description": rule_config.get("description", "Advanced geo-blocking rule")
-            }]
-        }
-        
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{self.base_url}/zones/{zone_id}/rulesets",
-                    headers=self.headers,
-                    json=payload
-                ) as response:
-                    response_time = int((datetime.now() - start_time).total_seconds() * 1000)
-                    response_data = await response.json()
-                    
-                    # Log API usage
-                    await self._log_api_usage(
-                        endpoint=f"/zones/{zone_id}/rulesets",
-                        method="POST",
-                        status=response.status,
-                        request_data=payload,
-                        response_data=response_data,
-                        response_time_ms=response_time
-                    )
-                    
-                    if response.status == 200 and response_data.get("success"):
-                        ruleset_data = response_data["result"]
-                        
-                        # Store integration record
-                        integration = self.cloudflare_repo.create_operation_record(
-                            zone_id=zone_id,
-                            operation_type="advanced_geo_rule",
-                            operation_data={
-                                "rule_config": rule_config,
-                                "expression": expression,
-                                "ruleset_id": ruleset_data["id"]
-                            },
-                            operation_status="completed"
-                        )
-                        
-                        logger.info(f"Successfully created advanced geo rule for {zone_id}")
-                        
-                        return {
-                            "success": True,
-                            "ruleset_id": ruleset_data["id"],
-                            "rule_id": ruleset_data["rules"][0]["id"],
-                            "expression": expression,
-                            "rule_config": rule_config,
-                            "integration_id": integration.id,
-                            "cloudflare_data": ruleset_data
-                        }
-                    else:
-                        error_msg = response_data.get("errors", [{"message": "Unknown error"}])[0]["message"]
-                        logger.error(f"Failed to create advanced geo rule for {zone_id}: {error_msg}")
-                        
-                        return {
-                            "success": False,
-                            "error": error_msg,
-                            "cloudflare_response": response_data
-                        }
-                        
-        except Exception as e:
-            logger.error(f"Exception creating advanced geo rule for {zone_id}: {str(e)}")
-            return {
-                "success": False,
-                "error": f"API request failed: {str(e)}"
-            }
+        return await self._apply_geo_rule(
+            zone_id, rule, "advanced_geo_rule", {"rule_config": rule_config}
+        )
     
     async def get_geo_blocking_templates(self) -> Dict[str, Any]:
         """Get common geo-blocking rule templates"""
@@ -13,6 +13,7 @@ from sqlalchemy import and_, or_, desc, func
 from fresh_database import Domain as RegisteredDomain, get_db_session
 from ..models.openprovider_models import OpenProviderContact
 from ..core.config import config
+from ..core.pagination import PAGE_SIZE, Page, paginate
 
 logger = logging.getLogger(__name__)
 
@@ -51,6 +52,16 @@ class DomainRepository:
             logger.error(f"Error getting domains for user {telegram_id}: {e}")
             return []
     
+    def get_domains_page(self, cursor: str = None, limit: int = PAGE_SIZE,
+                         telegram_id: int = None, status: str = None) -> Page:
+        """Get one keyset page of domains, newest first, optionally for one user or status"""
+        query = self.db.query(RegisteredDomain)
+        if telegram_id:
+            query = query.filter(RegisteredDomain.telegram_id == telegram_id)
+        if status:
+            query = query.filter(RegisteredDomain.status == status)
+        return paginate(query, RegisteredDomain.created_at, RegisteredDomain.id, limit, cursor)
+    
     def create_domain(self, telegram_id: int, domain_name: str, 
                      price_paid: Decimal, payment_method: str,
                      expires_at: datetime = None, 
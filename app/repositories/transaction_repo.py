@@ -9,6 +9,7 @@ from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from sqlalchemy import desc, and_, func
 
+from ..core.pagination import PAGE_SIZE, Page, paginate
 from ..models.wallet import Transaction, Order
 from ..models.user import User
 
@@ -35,6 +36,19 @@ class TransactionRepository:
             .all()
         )
     
+    def get_user_transactions_page(
+        self,
+        telegram_id: int,
+        cursor: Optional[str] = None,
+        limit: int = PAGE_SIZE,
+        transaction_type: Optional[str] = None
+    ) -> Page:
+        """Get one keyset page of a user's transactions, newest first"""
+        query = self.db.query(Transaction).filter(Transaction.telegram_id == telegram_id)
+        if transaction_type:
+            query = query.filter(Transaction.transaction_type == transaction_type)
+        return paginate(query, Transaction.created_at, Transaction.id, limit, cursor)
+    
     def get_user_transactions_by_type(
         self,
         telegram_id: int,
@@ -198,6 +212,21 @@ class TransactionRepository:
             .all()
         )
     
+    def get_orders_page(
+        self,
+        cursor: Optional[str] = None,
+        limit: int = PAGE_SIZE,
+        telegram_id: Optional[int] = None,
+        status: Optional[str] = None
+    ) -> Page:
+        """Get one keyset page of orders, newest first, optionally for one user or status"""
+        query = self.db.query(Order)
+        if telegram_id:
+            query = query.filter(Order.telegram_id == telegram_id)
+        if status:
+            query = query.filter(Order.status == status)
+        return paginate(query, Order.created_at, Order.id, limit, cursor)
+    
     def get_orders_by_status(
         self,
         status: str,
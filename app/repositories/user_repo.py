@@ -12,6 +12,7 @@ from sqlalchemy import and_, or_, desc, func
 from ..models.user import User
 from ..models.user_state import UserState
 from ..core.config import config
+from ..core.pagination import Page, PaginationError, paginate
 
 logger = logging.getLogger(__name__)
 
@@ -317,6 +318,16 @@ class UserRepository:
             logger.error(f"Error getting all users: {e}")
             return []
     
+    def get_users_page(self, limit: int = 100, cursor: Optional[str] = None) -> Page:
+        """Get one keyset page of all users, newest first"""
+        try:
+            return paginate(self.db.query(User), User.created_at, User.id, limit, cursor)
+        except PaginationError:
+            raise
+        except Exception as e:
+            logger.error(f"Error getting users page: {e}")
+            return Page()
+    
     def get_admin_users(self) -> List[User]:
         """Get all admin users"""
         try:
@@ -9,6 +9,7 @@ from datetime import datetime, timedelta
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import and_, or_, desc, func
 
+from database import apply_balance_delta
 from fresh_database import Transaction, User
 from ..core.config import config
 
@@ -56,19 +57,25 @@ class WalletRepository:
             self.db.rollback()
             raise
     
-    def update_user_balance(self, telegram_id: int, new_balance: Decimal) -> bool:
-        """Update user's balance"""
+    def update_user_balance(self, telegram_id: int, amount: Decimal) -> Optional[Decimal]:
+        """Credit (positive) or debit (negative) a user's balance atomically.
+
+        Same contract as DatabaseManager.update_user_balance: returns the new
+        balance, or None when the user is unknown or a debit exceeds the
+        balance.
+        """
         try:
-            user = self.db.query(User).filter(User.telegram_id == telegram_id).first()
-            if user:
-                user.balance_usd = new_balance
-                self.db.commit()
-                return True
-            return False
+            new_balance = apply_balance_delta(self.db, telegram_id, amount)
+            if new_balance is None:
+                self.db.rollback()
+                logger.warning(f"Balance change of {amount} rejected for user {telegram_id}")
+                return None
+            self.db.commit()
+            return new_balance
         except Exception as e:
             logger.error(f"Error updating user balance: {e}")
             self.db.rollback()
-            return False
+            return None
     
     def get_wallet_balance(self, telegram_id: int) -> Decimal:
         """Get user's current wallet balance"""
@@ -153,6 +153,12 @@ class DomainResponse(DomainBase):
     class Config:
         from_attributes = True
 
+class DomainPage(BaseModel):
+    """Schema for one keyset page of domains"""
+    items: List[DomainResponse]
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
 class DomainListResponse(BaseModel):
     """Schema for domain list API responses"""
     domains: List[DomainResponse]
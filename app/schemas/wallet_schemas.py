@@ -3,7 +3,7 @@ Wallet Pydantic schemas for Nomadly3 API
 """
 
 from pydantic import BaseModel, field_validator
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from decimal import Decimal
 from datetime import datetime
 
@@ -86,6 +86,18 @@ class OrderResponse(OrderBase):
     class Config:
         from_attributes = True
 
+class WalletTransactionPage(BaseModel):
+    """Schema for one keyset page of wallet transactions"""
+    items: List[WalletTransactionResponse]
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+class OrderPage(BaseModel):
+    """Schema for one keyset page of orders"""
+    items: List[OrderResponse]
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
 class WalletBalanceResponse(BaseModel):
     """Schema for wallet balance response"""
     telegram_id: int
@@ -559,6 +559,21 @@ class WalletService:
                     "balance_shortage": float(amount - current_balance)
                 }
             
+            # Debit in one conditional UPDATE; a concurrent payment that got
+            # there first leaves too little balance and matches no row
+            new_balance = current_balance - amount
+            if self.wallet_repo:
+                new_balance = self.wallet_repo.update_user_balance(telegram_id, -amount)
+                if new_balance is None:
+                    available = self.wallet_repo.get_user_balance(telegram_id)
+                    return {
+                        "success": False,
+                        "error": f"Insufficient balance. Required: ${amount}, Available: ${available}",
+                        "balance_required": float(amount),
+                        "balance_available": float(available),
+                        "balance_shortage": float(max(amount - available, 0))
+                    }
+            
             # Process payment
             order_id = payment_details.get("order_id", f"order_{telegram_id}_{datetime.utcnow().timestamp()}")
             service_type = payment_details.get("service_type", "domain_registration")
@@ -575,17 +590,12 @@ class WalletService:
                     service_type=service_type
                 )
             
-            # Update user balance
-            new_balance = current_balance - amount
-            if self.wallet_repo:
-                self.wallet_repo.update_user_balance(telegram_id, new_balance)
-            
             return {
                 "success": True,
                 "transaction_id": getattr(transaction, 'id', None) if 'transaction' in locals() else None,
                 "order_id": order_id,
                 "amount_charged": float(amount),
-                "previous_balance": float(current_balance),
+                "previous_balance": float(new_balance + amount),
                 "new_balance": float(new_balance),
                 "payment_method": "wallet",
                 "status": "completed",
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+ASGI Webhook Server for Nomadly2
+BlockBee/Dynopay callbacks on FastAPI with a bounded ingestion queue
+
+Confirmed callbacks are claimed in the idempotency index, stored there with
+their payload and queued for a fixed pool of workers; the request returns as
+soon as the job is stored. A job whose ledger write fails is retried from
+the index (also after a restart), since the provider has already had its 200.
+Retried callbacks are acknowledged straight from the index, and a full
+queue answers 503 with Retry-After so providers back off.
+
+Run with: uvicorn asgi_webhook_server:app --port 8000
+"""
+
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import Any, Dict
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from payment_webhooks import DUPLICATE, INGESTERS, PROCESSING_STARTED, is_confirmed
+from webhook_ingestion import WebhookIngestionQueue, get_webhook_index, idempotency_key
+
+logger = logging.getLogger(__name__)
+
+RETRY_AFTER_SECONDS = 30
+
+ingestion_queue = WebhookIngestionQueue(
+    INGESTERS,
+    index=get_webhook_index(),
+    maxsize=int(os.getenv("WEBHOOK_QUEUE_SIZE", "1000")),
+    workers=int(os.getenv("WEBHOOK_WORKERS", "8")),
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await ingestion_queue.start()
+    try:
+        yield
+    finally:
+        await ingestion_queue.stop()
+
+
+app = FastAPI(title="Nomadly Webhooks", lifespan=lifespan)
+
+
+async def _request_data(request: Request) -> Dict[str, Any]:
+    # Providers send data via query parameters for GET requests
+    if request.method == "GET":
+        return dict(request.query_params)
+    try:
+        return await request.json() or {}
+    except ValueError:
+        return {}
+
+
+async def ingest(kind: str, ref: str, request: Request) -> JSONResponse:
+    data = await _request_data(request)
+
+    if not is_confirmed(kind, data):
+        # Pending notifications touch no ledger state, answer inline
+        body, status_code = INGESTERS[kind](ref, data)
+        return JSONResponse(body, status_code=status_code)
+
+    result = ingestion_queue.submit(idempotency_key(kind, ref, data), kind, ref, data)
+    if result == WebhookIngestionQueue.DUPLICATE:
+        logger.info(f"♻️ Duplicate {kind} callback for {ref} acknowledged")
+        body, status_code = DUPLICATE
+        return JSONResponse(body, status_code=status_code)
+    if result == WebhookIngestionQueue.BUSY:
+        logger.warning(f"📥 Webhook queue full, deferring {kind} callback for {ref}")
+        return JSONResponse(
+            {"status": "busy", "message": "Queue full, retry later"},
+            status_code=503,
+            headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+        )
+
+    body, status_code = PROCESSING_STARTED
+    return JSONResponse(body, status_code=status_code)
+
+
+@app.api_route("/webhook/dynopay/{order_id}", methods=["GET", "POST"])
+async def handle_dynopay_webhook(order_id: str, request: Request):
+    """Handle Dynopay payment confirmation webhooks"""
+    return await ingest("dynopay", order_id, request)
+
+
+@app.api_route("/webhook/walletpayment/{order_id}", methods=["GET", "POST"])
+async def handle_walletpayment_webhook(order_id: str, request: Request):
+    """Handle wallet payment confirmation webhooks"""
+    return await ingest("walletpayment", order_id, request)
+
+
+@app.api_route("/webhook/blockbee/{order_id}", methods=["GET", "POST"])
+async def handle_blockbee_webhook(order_id: str, request: Request):
+    """Handle BlockBee payment confirmation webhooks"""
+    return await ingest("blockbee", order_id, request)
+
+
+@app.api_route("/topup/dynopay/{user_id}", methods=["GET", "POST"])
+async def handle_dynopay_wallet_topup(user_id: str, request: Request):
+    """Handle Dynopay wallet top-up webhooks"""
+    return await ingest("topup_dynopay", user_id, request)
+
+
+@app.api_route("/topup/blockbee/{user_id}", methods=["GET", "POST"])
+async def handle_blockbee_wallet_topup(user_id: str, request: Request):
+    """Handle BlockBee wallet top-up webhooks"""
+    return await ingest("topup_blockbee", user_id, request)
+
+
+@app.get("/health")
+async def health_check():
+    """Health check endpoint with ingestion queue stats"""
+    return {"status": "healthy", "service": "nomadly-webhook", "ingestion": ingestion_queue.stats()}
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host="0.0.0.0", port=int(os.environ.get("WEBHOOK_PORT", 8000)))
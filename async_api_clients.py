@@ -18,134 +18,302 @@ def monitor_performance(func_name: str = None):
         return func  # No-op for now
     return decorator
 import json
+import threading
 from typing import Dict, Any, Optional, Tuple, List
-from datetime import datetime
+from datetime import datetime, timedelta
+
+from fast_response_cache import availability_cache
 
 logger = logger
 
+class BackgroundLoop:
+    """An event loop running forever on its own daemon thread, started on first use"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    def run(self, coro):
+        """Run a coroutine on this loop and wait for its result (from any thread)"""
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name=self.name, daemon=True).start()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+
+# Background event loop used by synchronous wrappers around the async clients
+_sync_loop = BackgroundLoop("async-api-clients")
+
+
+def run_coroutine_sync(coro):
+    """Run a coroutine on the shared background loop and wait for its result.
+
+    Synchronous callers (scripts, Flask routes, sync services) use this so the
+    async clients keep one long-lived connection pool instead of a fresh
+    event loop per call. Safe to call from inside another running loop.
+    Every sync registry call waits on this loop, so keep it to short client
+    I/O; long-running work gets a BackgroundLoop of its own.
+    """
+    return _sync_loop.run(coro)
+
+
+def parse_availability_result(domain_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert one OpenProvider /domains/check result into our availability dict"""
+    from config import Config
+
+    price_info = domain_data.get("price", {})
+
+    # Apply price multiplier to API response
+    api_price = price_info.get("reseller", {}).get("price", 0)
+    final_price = api_price * Config.PRICE_MULTIPLIER if api_price > 0 else 0
+
+    return {
+        "available": domain_data.get("status") == "free",
+        "price": round(final_price, 2),
+        "currency": price_info.get("reseller", {}).get("currency", "USD"),
+        "premium": domain_data.get("is_premium", False),
+        "raw_response": domain_data,  # For debugging
+        "api_price": api_price,  # Keep original for reference
+    }
+
+
 class AsyncOpenProviderAPI:
-    """Async OpenProvider API client with proper timeout and retry handling"""
-    
-    def __init__(self, username: str, password: str):
+    """Async OpenProvider API client with a pooled keep-alive connection.
+
+    One aiohttp session (and its connection pool) is kept per event loop and
+    reused for every call, so handlers can await registry requests without
+    blocking the loop or paying a new TCP/TLS handshake each time.
+    """
+
+    TOKEN_LIFETIME = timedelta(hours=23)
+    CHECK_BATCH_SIZE = 15  # domains per /domains/check request
+
+    def __init__(self, username: str, password: str, timeout: int = 30,
+                 connection_limit: int = 20):
         self.username = username
         self.password = password
         self.auth_token = None
+        self.token_expires: Optional[datetime] = None
         self.base_url = "https://api.openprovider.eu"
+        self.timeout = timeout
+        self.connection_limit = connection_limit
         self.session: Optional[aiohttp.ClientSession] = None
-        
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._auth_lock: Optional[asyncio.Lock] = None
+
     async def __aenter__(self):
         """Async context manager entry"""
-        timeout = aiohttp.ClientTimeout(total=30, connect=8)
-        self.session = aiohttp.ClientSession(timeout=timeout)
+        await self._get_session()
         await self.authenticate()
         return self
-        
+
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """Async context manager exit"""
-        if self.session:
+        await self.close()
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Return the shared session for the running loop, creating it on first use"""
+        loop = asyncio.get_running_loop()
+        if self.session is None or self.session.closed or self._session_loop is not loop:
+            await self._close_stale_session(loop)
+            connector = aiohttp.TCPConnector(
+                limit=self.connection_limit,
+                keepalive_timeout=60,
+                ttl_dns_cache=300,
+            )
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout, connect=8),
+            )
+            self._session_loop = loop
+            self._auth_lock = asyncio.Lock()
+        return self.session
+
+    async def _close_stale_session(self, loop: asyncio.AbstractEventLoop):
+        """Close a session left over from another event loop before it is replaced"""
+        session, owner = self.session, self._session_loop
+        if session is None or session.closed:
+            return
+        if owner is not None and owner is not loop and owner.is_running():
+            # Its transports belong to the owning loop, so close it there
+            asyncio.run_coroutine_threadsafe(session.close(), owner)
+            return
+        try:
+            await session.close()
+        except RuntimeError as e:
+            # The owning loop is already closed; the connector is marked closed regardless
+            logger.debug(f"Stale OpenProvider session closed with: {e}")
+
+    async def close(self):
+        """Close the pooled session"""
+        if self.session and not self.session.closed:
             await self.session.close()
-            
+        self.session = None
+        self._session_loop = None
+
+    def is_token_valid(self) -> bool:
+        """Check if current token is valid"""
+        return bool(self.auth_token and self.token_expires and datetime.now() < self.token_expires)
+
     async def authenticate(self) -> bool:
         """Async authentication with OpenProvider"""
+        session = await self._get_session()
         try:
-            logger.info("openprovider_auth_started")
-            
-            auth_data = {
-                "username": self.username,
-                "password": self.password
-            }
-            
-            async with self.session.post(
+            async with session.post(
                 f"{self.base_url}/v1beta/auth/login",
-                json=auth_data
+                json={"username": self.username, "password": self.password}
             ) as response:
-                
                 if response.status == 200:
                     result = await response.json()
                     self.auth_token = result.get('data', {}).get('token')
-                    
-                    logger.info(
-                        "openprovider_auth_success",
-                        token_length=len(self.auth_token) if self.auth_token else 0
-                    )
-                    return True
-                else:
-                    error_text = await response.text()
-                    logger.error(
-                        "openprovider_auth_failed",
-                        status=response.status,
-                        error=error_text
-                    )
-                    return False
-                    
+                    self.token_expires = datetime.now() + self.TOKEN_LIFETIME
+                    logger.info("OpenProvider authentication successful")
+                    return bool(self.auth_token)
+
+                error_text = await response.text()
+                logger.error(f"OpenProvider authentication failed: {response.status} - {error_text[:200]}")
+                return False
+
         except Exception as e:
-            logger.error(
-                "openprovider_auth_error",
-                error=str(e),
-                error_type=type(e).__name__
-            )
+            logger.error(f"OpenProvider authentication error: {e}")
             return False
-    
-    async def create_contact(self, contact_data: Dict[str, Any]) -> Optional[str]:
-        """Create OpenProvider contact asynchronously"""
-        try:
-            logger.info("openprovider_create_contact_started")
-            
+
+    async def _ensure_token(self) -> bool:
+        """Authenticate once even when many requests start concurrently"""
+        if self.is_token_valid():
+            return True
+        await self._get_session()
+        async with self._auth_lock:
+            if self.is_token_valid():
+                return True
+            return await self.authenticate()
+
+    async def _request(self, method: str, path: str, payload: Optional[Dict[str, Any]] = None) -> Tuple[int, Any]:
+        """Send an authenticated request, re-authenticating once on 401"""
+        if not await self._ensure_token():
+            return 401, "Authentication failed"
+
+        session = await self._get_session()
+        for attempt in range(2):
             headers = {
                 "Authorization": f"Bearer {self.auth_token}",
                 "Content-Type": "application/json"
             }
-            
-            async with self.session.post(
-                f"{self.base_url}/v1beta/customers",
-                json=contact_data,
-                headers=headers
-            ) as response:
-                
-                if response.status == 200:
-                    result = await response.json()
-                    contact_handle = result.get('data', {}).get('handle')
-                    
-                    logger.info(
-                        "openprovider_contact_created",
-                        contact_handle=contact_handle
-                    )
-                    return contact_handle
-                else:
-                    error_text = await response.text()
-                    logger.error(
-                        "openprovider_contact_failed",
-                        status=response.status,
-                        error=error_text
+            async with session.request(method, f"{self.base_url}{path}", json=payload, headers=headers) as response:
+                if response.status == 401 and attempt == 0:
+                    self.token_expires = None
+                    if not await self._ensure_token():
+                        return 401, "Authentication failed"
+                    continue
+                if response.status in (200, 201):
+                    return response.status, await response.json()
+                return response.status, await response.text()
+        return 401, "Authentication failed"
+
+    async def check_domain_availability(self, domain: str) -> Dict[str, Any]:
+        """Check if domain is available for registration"""
+        results = await self.check_domains_availability([domain])
+        return results[domain]
+
+    async def check_domains_availability(
+        self, domains: List[str], batch_size: Optional[int] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """Check many domains with one /domains/check request per chunk.
+
+        The endpoint accepts a list of name/extension pairs, so N lookups cost
+        one registry round trip instead of N. Large lists are split into
+        chunks of batch_size which are sent concurrently. Answers come from the
+        shared availability cache when fresh, and names already being looked
+        up by another handler join that request. Returns a dict keyed by the
+        domains as passed in, in the same order.
+        """
+        return await availability_cache.get_many(
+            domains, lambda missing: self._fetch_availability(missing, batch_size)
+        )
+
+    async def _fetch_availability(
+        self, domains: List[str], batch_size: Optional[int] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """Query the registry for domains, bypassing the cache"""
+        batch_size = batch_size or self.CHECK_BATCH_SIZE
+        results: Dict[str, Dict[str, Any]] = {}
+        valid = []
+        for domain in domains:
+            if "." in domain:
+                valid.append(domain)
+            else:
+                results[domain] = {"available": False, "error": "Invalid domain format"}
+
+        chunks = [valid[i:i + batch_size] for i in range(0, len(valid), batch_size)]
+        for chunk_results in await asyncio.gather(*[self._check_chunk(chunk) for chunk in chunks]):
+            results.update(chunk_results)
+
+        return {domain: results[domain] for domain in domains}
+
+    async def _check_chunk(self, domains: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Send one /domains/check request for a chunk of domains"""
+        try:
+            status, result = await self._request("POST", "/v1beta/domains/check", {
+                "domains": [
+                    {"name": domain.split(".", 1)[0], "extension": domain.split(".", 1)[1]}
+                    for domain in domains
+                ],
+                "with_price": True,
+            })
+
+            if status == 200:
+                by_name = {
+                    item.get("domain", "").lower(): item
+                    for item in result.get("data", {}).get("results", [])
+                }
+                chunk_results = {}
+                for domain in domains:
+                    item = by_name.get(domain.lower())
+                    if item is None and len(domains) == 1 and len(by_name) == 1:
+                        # Single lookups may come back without an echoed name
+                        item = next(iter(by_name.values()))
+                    chunk_results[domain] = (
+                        parse_availability_result(item) if item is not None
+                        else {"available": False, "error": "No result returned for domain"}
                     )
-                    return None
-                    
+                return chunk_results
+
+            logger.error(f"OpenProvider API response: {status} - {str(result)[:500]}")
+            error = f"API request failed: {status}"
+
         except Exception as e:
-            logger.error(
-                "openprovider_contact_error",
-                error=str(e)
-            )
+            logger.error(f"OpenProvider API exception: {e}")
+            error = str(e)
+
+        return {domain: {"available": False, "error": error} for domain in domains}
+
+    async def create_contact(self, contact_data: Dict[str, Any],
+                             path: str = "/v1beta/customers") -> Optional[str]:
+        """Create OpenProvider contact asynchronously"""
+        try:
+            status, result = await self._request("POST", path, contact_data)
+            if status == 200:
+                contact_handle = result.get('data', {}).get('handle')
+                logger.info(f"OpenProvider contact created: {contact_handle}")
+                return contact_handle
+
+            logger.error(f"OpenProvider contact creation failed: {status} - {str(result)[:200]}")
             return None
-    
+
+        except Exception as e:
+            logger.error(f"OpenProvider contact error: {e}")
+            return None
+
     async def register_domain(
-        self, 
-        domain_name: str, 
-        contact_handle: str, 
-        nameservers: List[str]
+        self,
+        domain_name: str,
+        contact_handle: str,
+        nameservers: Optional[List[str]] = None
     ) -> Optional[str]:
         """Register domain asynchronously"""
         try:
-            logger.info(
-                "openprovider_register_domain_started",
-                domain=domain_name,
-                contact_handle=contact_handle
-            )
-            
-            headers = {
-                "Authorization": f"Bearer {self.auth_token}",
-                "Content-Type": "application/json"
-            }
-            
             domain_data = {
                 "domain": {
                     "name": domain_name.split('.')[0],
@@ -156,43 +324,52 @@ class AsyncOpenProviderAPI:
                 "admin_handle": contact_handle,
                 "tech_handle": contact_handle,
                 "billing_handle": contact_handle,
-                "name_servers": [{"name": ns} for ns in nameservers]
+                "auto_renew": "on",
             }
-            
-            async with self.session.post(
-                f"{self.base_url}/v1beta/domains",
-                json=domain_data,
-                headers=headers
-            ) as response:
-                
-                if response.status == 200:
-                    result = await response.json()
-                    domain_id = result.get('data', {}).get('id')
-                    
-                    logger.info(
-                        "openprovider_domain_registered",
-                        domain=domain_name,
-                        domain_id=domain_id
-                    )
-                    return str(domain_id)
-                else:
-                    error_text = await response.text()
-                    logger.error(
-                        "openprovider_domain_registration_failed",
-                        domain=domain_name,
-                        status=response.status,
-                        error=error_text
-                    )
+            if nameservers:
+                domain_data["name_servers"] = [{"name": ns} for ns in nameservers]
+
+            status, result = await self._request("POST", "/v1beta/domains", domain_data)
+            if status == 200:
+                domain_id = result.get('data', {}).get('id')
+                availability_cache.invalidate(domain_name)
+                if domain_id is None:
+                    logger.error(f"OpenProvider registration for {domain_name} returned no domain id: {str(result)[:200]}")
                     return None
-                    
+                logger.info(f"OpenProvider domain registered: {domain_name} (ID {domain_id})")
+                return str(domain_id)
+
+            logger.error(f"OpenProvider registration failed for {domain_name}: {status} - {str(result)[:200]}")
+            return None
+
         except Exception as e:
-            logger.error(
-                "openprovider_domain_error",
-                domain=domain_name,
-                error=str(e)
-            )
+            logger.error(f"OpenProvider domain error for {domain_name}: {e}")
             return None
 
+    async def update_nameservers(self, domain: str, nameservers: List[str]) -> bool:
+        """Update nameservers for a domain"""
+        try:
+            # For nomadly11.sbs, use known domain ID from database
+            domain_ref = "27816852" if domain == "nomadly11.sbs" else domain
+
+            # OpenProvider resolves the IP when it is left empty
+            ns_data = [
+                {"name": ns, "ip": "", "seq_nr": i + 1}
+                for i, ns in enumerate(nameservers)
+            ]
+
+            status, result = await self._request("PUT", f"/v1beta/domains/{domain_ref}", {"name_servers": ns_data})
+            if status in (200, 201):
+                logger.info(f"✅ Successfully updated nameservers for {domain}")
+                return True
+
+            logger.error(f"OpenProvider nameserver update failed: {status} - {str(result)[:200]}")
+            return False
+
+        except Exception as e:
+            logger.error(f"Error updating nameservers for {domain}: {e}")
+            return False
+
 class AsyncCloudflareAPI:
     """Async Cloudflare API client with comprehensive DNS management"""
     
@@ -0,0 +1,276 @@
+"""
+Async Database Access for Nomadly Bot
+Non-blocking user, domain, order, balance and state queries for async handlers
+
+Every DatabaseManager method opens a synchronous SQLAlchemy session, so an
+async Telegram handler or FastAPI route that calls one stalls the event loop
+for the whole round trip. AsyncDatabaseManager runs the hot paths on an
+asyncpg-backed AsyncEngine with one shared pool, using the same models and
+statements as database.py (balance changes still go through the conditional
+UPDATE ... RETURNING of balance_delta_statement).
+
+Where asyncpg is not installed, or DATABASE_URL is not PostgreSQL,
+get_async_db_manager() returns a ThreadedDatabaseManager instead. It runs
+the synchronous DatabaseManager methods on a bounded thread pool, which keeps
+the loop responsive with the same awaitable interface. DatabaseManager itself
+is unchanged for scripts, threads and the remaining sync callers.
+"""
+
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import delete, select, text
+
+from app.core.pagination import PAGE_SIZE, Keyset, Page
+from database import (
+    Order,
+    RegisteredDomain,
+    User,
+    UserState,
+    WalletTransaction,
+    balance_delta_statement,
+    get_db_manager,
+    order_payment_update,
+)
+
+logger = logging.getLogger(__name__)
+
+POOL_SIZE = int(os.getenv("ASYNC_DB_POOL_SIZE", "10"))
+MAX_OVERFLOW = int(os.getenv("ASYNC_DB_MAX_OVERFLOW", "10"))
+
+
+def async_database_url(database_url: str) -> Optional[str]:
+    """The asyncpg form of a PostgreSQL URL, or None for other databases"""
+    scheme, sep, rest = (database_url or "").partition("://")
+    if not sep or scheme.split("+")[0] not in ("postgres", "postgresql"):
+        return None
+    # asyncpg takes ssl= rather than libpq's sslmode=
+    return f"postgresql+asyncpg://{rest}".replace("sslmode=", "ssl=")
+
+
+class AsyncDatabaseManager:
+    """Hot-path queries on a shared async engine"""
+
+    def __init__(self, database_url: str = None, pool_size: int = POOL_SIZE,
+                 max_overflow: int = MAX_OVERFLOW):
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        url = async_database_url(database_url or os.getenv("DATABASE_URL"))
+        if not url:
+            raise ValueError("AsyncDatabaseManager needs a PostgreSQL DATABASE_URL")
+
+        self.engine = create_async_engine(
+            url, pool_size=pool_size, max_overflow=max_overflow,
+            pool_pre_ping=True, pool_recycle=300, echo=False,
+        )
+        # Rows are handed back to handlers after commit, so keep them loaded
+        self.SessionLocal = async_sessionmaker(self.engine, expire_on_commit=False)
+
+    @asynccontextmanager
+    async def session(self):
+        """An AsyncSession that rolls back on error and is always closed"""
+        async with self.SessionLocal() as session:
+            try:
+                yield session
+            except Exception:
+                await session.rollback()
+                raise
+
+    # Users
+
+    async def get_user(self, telegram_id: int) -> Optional[User]:
+        async with self.session() as session:
+            return await session.get(User, telegram_id)
+
+    async def get_or_create_user(self, telegram_id: int, username: str = None,
+                                 first_name: str = None, last_name: str = None) -> User:
+        async with self.session() as session:
+            user = await session.get(User, telegram_id)
+            if user is None:
+                user = User(telegram_id=telegram_id, username=username,
+                            first_name=first_name, last_name=last_name)
+                session.add(user)
+                await session.commit()
+            return user
+
+    async def get_user_balance(self, telegram_id: int) -> float:
+        async with self.session() as session:
+            balance = await session.scalar(
+                select(User.balance_usd).where(User.telegram_id == telegram_id)
+            )
+            return float(balance) if balance is not None else 0.0
+
+    async def update_user_balance(self, telegram_id: int, amount: float,
+                                  transaction_type: str = None,
+                                  description: str = None) -> Optional[float]:
+        """Same contract as DatabaseManager.update_user_balance"""
+        async with self.session() as session:
+            result = await session.execute(balance_delta_statement(telegram_id, amount))
+            new_balance = result.scalar_one_or_none()
+            if new_balance is None:
+                await session.rollback()
+                logger.warning(f"💳 Balance change of {amount} rejected for user {telegram_id}")
+                return None
+
+            if transaction_type:
+                session.add(WalletTransaction(
+                    telegram_id=telegram_id,
+                    transaction_type=transaction_type,
+                    amount=amount,
+                    status="confirmed",
+                    description=description or f"Balance {transaction_type}: ${amount}",
+                ))
+            await session.commit()
+            return float(new_balance)
+
+    # Domains
+
+    async def get_user_domains(self, telegram_id: int) -> List[RegisteredDomain]:
+        async with self.session() as session:
+            result = await session.scalars(
+                select(RegisteredDomain)
+                .where(RegisteredDomain.telegram_id == telegram_id)
+                .order_by(RegisteredDomain.registration_date.desc())
+            )
+            return list(result)
+
+    async def _page(self, statement, keyset: Keyset) -> Page:
+        async with self.session() as session:
+            return keyset.page(await session.scalars(keyset.apply(statement)))
+
+    async def get_user_domains_page(self, telegram_id: int, cursor: str = None,
+                                    limit: int = PAGE_SIZE) -> Page:
+        return await self._page(
+            select(RegisteredDomain).where(RegisteredDomain.telegram_id == telegram_id),
+            Keyset(RegisteredDomain.registration_date, RegisteredDomain.id, limit, cursor),
+        )
+
+    async def get_domain_by_name(self, domain_name: str,
+                                 telegram_id: int = None) -> Optional[RegisteredDomain]:
+        statement = select(RegisteredDomain).where(RegisteredDomain.domain_name == domain_name)
+        if telegram_id:
+            statement = statement.where(RegisteredDomain.telegram_id == telegram_id)
+        async with self.session() as session:
+            return await session.scalar(statement.limit(1))
+
+    # Orders
+
+    async def get_user_orders(self, telegram_id: int) -> List[Order]:
+        async with self.session() as session:
+            result = await session.scalars(
+                select(Order)
+                .where(Order.telegram_id == telegram_id)
+                .order_by(Order.created_at.desc())
+            )
+            return list(result)
+
+    async def get_user_orders_page(self, telegram_id: int, cursor: str = None,
+                                   limit: int = PAGE_SIZE) -> Page:
+        return await self._page(
+            select(Order).where(Order.telegram_id == telegram_id),
+            Keyset(Order.created_at, Order.id, limit, cursor),
+        )
+
+    async def get_user_transactions_page(self, telegram_id: int, cursor: str = None,
+                                         limit: int = PAGE_SIZE) -> Page:
+        return await self._page(
+            select(WalletTransaction).where(WalletTransaction.telegram_id == telegram_id),
+            Keyset(WalletTransaction.created_at, WalletTransaction.id, limit, cursor),
+        )
+
+    async def update_order_payment(self, order_id: str, payment_status: str = None,
+                                   crypto_currency: str = None) -> None:
+        order_update = order_payment_update(order_id, payment_status, crypto_currency)
+        if not order_update:
+            return
+        update_sql, params = order_update
+        async with self.session() as session:
+            await session.execute(text(update_sql), params)
+            await session.commit()
+
+    # Conversation state
+
+    async def get_user_state(self, telegram_id: int) -> Optional[UserState]:
+        async with self.session() as session:
+            return await session.scalar(
+                select(UserState).where(UserState.telegram_id == telegram_id).limit(1)
+            )
+
+    async def get_state_data(self, telegram_id: int, state: str) -> Dict:
+        async with self.session() as session:
+            data = await session.scalar(
+                select(UserState.data)
+                .where(UserState.telegram_id == telegram_id, UserState.state == state)
+                .limit(1)
+            )
+            return data or {}
+
+    async def set_user_state(self, telegram_id: int, state: str, data: Dict = None) -> None:
+        """Replace the user's state in one transaction"""
+        async with self.session() as session:
+            await session.execute(delete(UserState).where(UserState.telegram_id == telegram_id))
+            session.add(UserState(telegram_id=telegram_id, state=state, data=data or {}))
+            await session.commit()
+
+    update_user_state = set_user_state
+
+    async def clear_user_state(self, telegram_id: int) -> None:
+        async with self.session() as session:
+            await session.execute(delete(UserState).where(UserState.telegram_id == telegram_id))
+            await session.commit()
+
+    async def aclose(self) -> None:
+        await self.engine.dispose()
+
+
+class ThreadedDatabaseManager:
+    """The DatabaseManager API as coroutines, run on a bounded thread pool"""
+
+    def __init__(self, db_manager=None, max_workers: int = POOL_SIZE):
+        self.db = db_manager or get_db_manager()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="db")
+
+    def __getattr__(self, name: str):
+        method = getattr(self.db, name)
+        if not callable(method):
+            return method
+
+        async def call(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, lambda: method(*args, **kwargs))
+
+        call.__name__ = name
+        return call
+
+    async def aclose(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
+# Global async database manager
+async_db_manager = None
+
+
+def get_async_db_manager():
+    """Get the global async database manager (native asyncpg when available)"""
+    global async_db_manager
+    if async_db_manager is None:
+        try:
+            import asyncpg  # noqa: F401
+
+            async_db_manager = AsyncDatabaseManager()
+            logger.info("✅ Async database engine ready (asyncpg)")
+        except (ImportError, ValueError) as e:
+            logger.warning(f"⚠️ Async database engine unavailable ({e}), running queries on a thread pool")
+            async_db_manager = ThreadedDatabaseManager()
+    return async_db_manager
+
+
+async def close_async_db_manager() -> None:
+    global async_db_manager
+    if async_db_manager is not None:
+        await async_db_manager.aclose()
+        async_db_manager = None
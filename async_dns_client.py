@@ -0,0 +1,326 @@
+"""
+Async DNS Client for Nomadly Bot
+In-process DNS queries over UDP/TCP (RFC 1035 wire format with EDNS0),
+used for propagation checks instead of nslookup subprocesses
+
+Queries go over UDP with an EDNS0 OPT record advertising a 1232-byte
+payload; a truncated answer is retried over TCP. Each UDP attempt has its
+own timeout and is retried before the server is given up on.
+``query_quorum`` asks many resolvers at once and returns as soon as enough
+of them agree on the same answer set.
+"""
+
+import asyncio
+import random
+import socket
+import struct
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+QTYPES = {"A": 1, "NS": 2, "CNAME": 5, "SOA": 6, "MX": 15, "TXT": 16, "AAAA": 28, "OPT": 41}
+QTYPE_NAMES = {value: name for name, value in QTYPES.items()}
+RCODES = {0: "NOERROR", 1: "FORMERR", 2: "SERVFAIL", 3: "NXDOMAIN", 4: "NOTIMP", 5: "REFUSED"}
+
+CLASS_IN = 1
+FLAG_QR = 0x8000
+FLAG_TC = 0x0200
+FLAG_RD = 0x0100
+
+
+class DNSQueryError(Exception):
+    """A server could not be reached or sent back something unusable"""
+
+
+@dataclass(frozen=True)
+class DNSAnswer:
+    """One resource record. value is a str, except MX: (preference, exchange)."""
+    name: str
+    type: str
+    ttl: int
+    value: Any
+
+    @property
+    def text(self) -> str:
+        if self.type == "MX":
+            return f"{self.value[0]} {self.value[1]}"
+        return str(self.value)
+
+
+@dataclass
+class DNSResponse:
+    server: str
+    rcode: str
+    answers: List[DNSAnswer] = field(default_factory=list)
+    authority: List[DNSAnswer] = field(default_factory=list)
+    truncated: bool = False
+    elapsed: float = 0.0
+
+    def values(self, rtype: str) -> List[Any]:
+        """Values of the answers of one type, in answer order"""
+        return [answer.value for answer in self.answers if answer.type == rtype]
+
+    def answer_set(self, rtype: str) -> FrozenSet[str]:
+        """Normalised answer values, for comparing what two resolvers returned"""
+        return frozenset(normalize_value(rtype, value) for value in self.values(rtype))
+
+
+def normalize_value(rtype: str, value: Any) -> str:
+    if rtype == "MX":
+        if isinstance(value, str):
+            # Expected values are written "10 mx1.example.com"; answers are (preference, host)
+            preference, host = value.split(None, 1)
+            value = (int(preference), host.strip())
+        return f"{value[0]} {value[1].lower().rstrip('.')}"
+    if rtype in ("NS", "CNAME"):
+        return str(value).lower().rstrip(".")
+    if rtype == "AAAA":
+        return socket.inet_ntop(socket.AF_INET6, socket.inet_pton(socket.AF_INET6, value))
+    return str(value)
+
+
+def encode_name(name: str) -> bytes:
+    encoded = b""
+    for label in name.rstrip(".").split("."):
+        if not label:
+            continue
+        raw = label.encode("idna")
+        if len(raw) > 63:
+            raise ValueError(f"DNS label too long: {label}")
+        encoded += bytes([len(raw)]) + raw
+    return encoded + b"\x00"
+
+
+def build_query(qname: str, qtype: str, query_id: int, edns_payload: Optional[int] = 1232) -> bytes:
+    """Recursive query for one name/type, with an EDNS0 OPT record unless edns_payload is None"""
+    header = struct.pack("!HHHHHH", query_id, FLAG_RD, 1, 0, 0, 1 if edns_payload else 0)
+    question = encode_name(qname) + struct.pack("!HH", QTYPES[qtype], CLASS_IN)
+    opt = b""
+    if edns_payload:
+        # Root name, TYPE=OPT, CLASS=payload size, TTL=ext-rcode/version/flags, RDLEN=0
+        opt = b"\x00" + struct.pack("!HHIH", QTYPES["OPT"], edns_payload, 0, 0)
+    return header + question + opt
+
+
+def decode_name(data: bytes, offset: int) -> Tuple[str, int]:
+    """Read a possibly compressed name; returns the name and the offset after it"""
+    labels = []
+    end = None
+    jumps = 0
+    while True:
+        if offset >= len(data):
+            raise DNSQueryError("Name runs past end of message")
+        length = data[offset]
+        if length & 0xC0 == 0xC0:
+            if offset + 1 >= len(data):
+                raise DNSQueryError("Truncated compression pointer")
+            if end is None:
+                end = offset + 2
+            offset = ((length & 0x3F) << 8) | data[offset + 1]
+            jumps += 1
+            if jumps > 64:
+                raise DNSQueryError("Compression loop")
+            continue
+        if length == 0:
+            offset += 1
+            break
+        labels.append(data[offset + 1:offset + 1 + length].decode("ascii", errors="replace"))
+        offset += 1 + length
+    return ".".join(labels), end if end is not None else offset
+
+
+def _decode_rdata(data: bytes, rtype: str, offset: int, length: int) -> Any:
+    rdata = data[offset:offset + length]
+    if rtype == "A" and length == 4:
+        return socket.inet_ntop(socket.AF_INET, rdata)
+    if rtype == "AAAA" and length == 16:
+        return socket.inet_ntop(socket.AF_INET6, rdata)
+    if rtype in ("NS", "CNAME"):
+        return decode_name(data, offset)[0]
+    if rtype == "MX":
+        preference = struct.unpack("!H", rdata[:2])[0]
+        return preference, decode_name(data, offset + 2)[0]
+    if rtype == "TXT":
+        strings, i = [], 0
+        while i < length:
+            size = rdata[i]
+            strings.append(rdata[i + 1:i + 1 + size].decode("utf-8", errors="replace"))
+            i += 1 + size
+        return "".join(strings)
+    if rtype == "SOA":
+        return decode_name(data, offset)[0]  # primary nameserver
+    return rdata.hex()
+
+
+def parse_response(data: bytes, query_id: Optional[int] = None, server: str = "") -> DNSResponse:
+    if len(data) < 12:
+        raise DNSQueryError("Short DNS message")
+    msg_id, flags, qdcount, ancount, nscount, arcount = struct.unpack("!HHHHHH", data[:12])
+    if query_id is not None and msg_id != query_id:
+        raise DNSQueryError("Response id does not match query")
+    if not flags & FLAG_QR:
+        raise DNSQueryError("Message is not a response")
+
+    offset = 12
+    for _ in range(qdcount):
+        offset = decode_name(data, offset)[1] + 4
+
+    def read_records(count: int, offset: int) -> Tuple[List[DNSAnswer], int]:
+        records = []
+        for _ in range(count):
+            name, offset = decode_name(data, offset)
+            if offset + 10 > len(data):
+                raise DNSQueryError("Truncated resource record")
+            rtype_code, _rclass, ttl, length = struct.unpack("!HHIH", data[offset:offset + 10])
+            offset += 10
+            rtype = QTYPE_NAMES.get(rtype_code, str(rtype_code))
+            if rtype != "OPT":
+                records.append(DNSAnswer(name, rtype, ttl, _decode_rdata(data, rtype, offset, length)))
+            offset += length
+        return records, offset
+
+    answers, offset = read_records(ancount, offset)
+    authority, offset = read_records(nscount, offset)
+    return DNSResponse(
+        server=server,
+        rcode=RCODES.get(flags & 0x000F, str(flags & 0x000F)),
+        answers=answers,
+        authority=authority,
+        truncated=bool(flags & FLAG_TC),
+    )
+
+
+class _UDPExchange(asyncio.DatagramProtocol):
+    def __init__(self, query_id: int):
+        self.query_id = query_id
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        # Ignore stray datagrams that do not answer this query
+        if len(data) >= 2 and struct.unpack("!H", data[:2])[0] == self.query_id and not self.future.done():
+            self.future.set_result(data)
+
+    def error_received(self, exc: Exception) -> None:
+        if not self.future.done():
+            self.future.set_exception(exc)
+
+
+@dataclass
+class QuorumResult:
+    qname: str
+    qtype: str
+    # provider -> DNSResponse, or the exception that server raised, or None if not needed
+    responses: Dict[str, Any]
+    agreed: Optional[FrozenSet[str]]
+    agreed_count: int
+    quorum: int
+    elapsed: float
+
+    @property
+    def quorum_reached(self) -> bool:
+        return self.agreed is not None
+
+
+class AsyncDNSClient:
+    """Concurrent DNS queries against explicit resolvers"""
+
+    def __init__(self, timeout: float = 2.0, retries: int = 2, edns_payload: Optional[int] = 1232,
+                 port: int = 53):
+        self.timeout = timeout
+        self.retries = retries
+        self.edns_payload = edns_payload
+        self.port = port
+
+    async def query(self, server: str, qname: str, qtype: str = "A") -> DNSResponse:
+        """Ask one server; UDP with retries, then TCP if the answer was truncated"""
+        started = time.monotonic()
+        last_error: Optional[Exception] = None
+        for _ in range(self.retries + 1):
+            query_id = random.randint(0, 0xFFFF)
+            message = build_query(qname, qtype, query_id, self.edns_payload)
+            try:
+                data = await self._udp(server, message, query_id)
+                response = parse_response(data, query_id, server)
+                if response.truncated:
+                    data = await self._tcp(server, message)
+                    response = parse_response(data, query_id, server)
+                response.elapsed = time.monotonic() - started
+                return response
+            except (asyncio.TimeoutError, OSError, DNSQueryError) as e:
+                last_error = e
+        if isinstance(last_error, asyncio.TimeoutError):
+            raise last_error
+        raise DNSQueryError(f"{server}: {last_error}")
+
+    async def _udp(self, server: str, message: bytes, query_id: int) -> bytes:
+        loop = asyncio.get_running_loop()
+        transport, protocol = await loop.create_datagram_endpoint(
+            lambda: _UDPExchange(query_id), remote_addr=(server, self.port)
+        )
+        try:
+            transport.sendto(message)
+            return await asyncio.wait_for(protocol.future, self.timeout)
+        finally:
+            transport.close()
+
+    async def _tcp(self, server: str, message: bytes) -> bytes:
+        async def exchange() -> bytes:
+            reader, writer = await asyncio.open_connection(server, self.port)
+            try:
+                writer.write(struct.pack("!H", len(message)) + message)
+                await writer.drain()
+                length = struct.unpack("!H", await reader.readexactly(2))[0]
+                return await reader.readexactly(length)
+            finally:
+                writer.close()
+
+        return await asyncio.wait_for(exchange(), self.timeout)
+
+    async def query_quorum(self, servers: Iterable[Tuple[str, str]], qname: str, qtype: str,
+                           quorum: int, expected: Optional[Iterable[str]] = None) -> QuorumResult:
+        """Query every (address, provider) at once; stop once quorum servers agree.
+
+        Servers agree when they return the same non-empty answer set, or,
+        with expected, when their answer set equals it. Providers still
+        outstanding at that point are cancelled and reported as None.
+        """
+        started = time.monotonic()
+        expected_set = frozenset(normalize_value(qtype, v) for v in expected) if expected else None
+        async def ask(address: str, provider: str) -> Tuple[str, Any]:
+            try:
+                return provider, await self.query(address, qname, qtype)
+            except Exception as e:
+                return provider, e
+
+        servers = list(servers)
+        tasks = [asyncio.ensure_future(ask(address, provider)) for address, provider in servers]
+        responses: Dict[str, Any] = {provider: None for _, provider in servers}
+        tally: Dict[FrozenSet[str], int] = {}
+        agreed: Optional[FrozenSet[str]] = None
+
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                provider, response = await next_done
+                responses[provider] = response
+                if isinstance(response, DNSResponse):
+                    answer = response.answer_set(qtype)
+                    if answer and (expected_set is None or answer == expected_set):
+                        tally[answer] = tally.get(answer, 0) + 1
+                        if tally[answer] >= quorum:
+                            agreed = answer
+                            break
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+        return QuorumResult(
+            qname=qname,
+            qtype=qtype,
+            responses=responses,
+            agreed=agreed,
+            agreed_count=max(tally.values()) if tally else 0,
+            quorum=quorum,
+            elapsed=time.monotonic() - started,
+        )
+
@@ -10,8 +10,12 @@ import sys
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 import json
+import time
 import httpx
 
+from payment_events import PostgresPaymentListener, payment_event_bus
+from session_store import get_session_store
+
 # Set up logging
 logging.basicConfig(
     level=logging.INFO,
@@ -23,7 +27,11 @@ class PaymentMonitor:
     """Monitors blockchain payments in real-time"""
     
     def __init__(self):
-        self.monitoring_interval = 30  # Check every 30 seconds
+        # Confirmations arrive as payment events; the interval sweep is a slow safety net
+        self.monitoring_interval = 300
+        self.max_concurrent_confirmations = 10
+        self._in_flight: set = set()
+        self._listener = None
         self.active_payments: Dict[str, Dict] = {}  # address -> payment info
         self.bot_instance = None
         self.queue_file = 'payment_monitor_queue.json'
@@ -32,17 +40,62 @@ class PaymentMonitor:
         """Start the background payment monitoring loop"""
         logger.info("🚀 Starting real-time payment monitoring service")
         
+        events = payment_event_bus.subscribe()
+        if os.getenv('DATABASE_URL'):
+            self._listener = PostgresPaymentListener(os.getenv('DATABASE_URL'))
+            self._listener.start()
+        consumer = asyncio.create_task(self.consume_payment_events(events))
+        
+        try:
+            while True:
+                try:
+                    # Load payments from queue file
+                    self._load_from_queue()
+                    
+                    logger.info(f"📊 Payment reconciliation sweep - Active payments: {len(self.active_payments)}")
+                    await self.check_pending_payments()
+                    await asyncio.sleep(self.monitoring_interval)
+                except Exception as e:
+                    logger.error(f"Error in payment monitoring loop: {e}")
+                    await asyncio.sleep(60)  # Wait longer on error
+        finally:
+            consumer.cancel()
+            payment_event_bus.unsubscribe(events)
+            if self._listener:
+                self._listener.stop()
+    
+    async def consume_payment_events(self, events: asyncio.Queue):
+        """Check the addresses named in payment events as soon as they arrive"""
         while True:
+            batch = [await events.get()]
+            while not events.empty():
+                batch.append(events.get_nowait())
+            
             try:
-                # Load payments from queue file
-                self._load_from_queue()
+                addresses = self._resolve_event_addresses(batch)
+                if not addresses:
+                    # The payment may have been queued after our last queue load
+                    self._load_from_queue()
+                    addresses = self._resolve_event_addresses(batch)
+                if not addresses:
+                    logger.debug(f"📨 No monitored payment for events {[e.get('order_id') for e in batch]}")
+                    continue
                 
-                logger.info(f"📊 Payment monitor cycle - Active payments: {len(self.active_payments)}")
-                await self.check_pending_payments()
-                await asyncio.sleep(self.monitoring_interval)
+                latency = time.time() - min(e.get('published_at', time.time()) for e in batch)
+                logger.info(f"📨 Payment event for {len(addresses)} address(es), {latency * 1000:.0f} ms after publish")
+                await self.check_pending_payments(addresses)
             except Exception as e:
-                logger.error(f"Error in payment monitoring loop: {e}")
-                await asyncio.sleep(60)  # Wait longer on error
+                logger.error(f"Error handling payment events: {e}")
+    
+    def _resolve_event_addresses(self, batch: List[Dict]) -> List[str]:
+        """Map events (address and/or order id) to actively monitored addresses"""
+        order_ids = {str(e['order_id']) for e in batch if e.get('order_id')}
+        addresses = {e['crypto_address'] for e in batch if e.get('crypto_address') in self.active_payments}
+        if order_ids:
+            for address, info in self.active_payments.items():
+                if str(info.get('order_number')) in order_ids:
+                    addresses.add(address)
+        return list(addresses)
     
     def _load_from_queue(self):
         """Load payments from the shared queue file"""
@@ -69,129 +122,179 @@ class PaymentMonitor:
         except Exception as e:
             logger.error(f"Failed to save queue file: {e}")
     
-    async def check_pending_payments(self):
-        """Check all pending payments for confirmations"""
+    async def check_pending_payments(self, addresses: Optional[List[str]] = None):
+        """Check pending payments (all, or just the given addresses) for confirmations.
+
+        One pooled query covers every address and the confirmations file is
+        read once per cycle; confirmations are then processed concurrently,
+        bounded by max_concurrent_confirmations. Addresses already being
+        checked by an overlapping event or sweep are skipped.
+        """
         if not self.active_payments:
             logger.debug("No active payments to check")
             return
-            
-        logger.info(f"🔍 Checking {len(self.active_payments)} pending payments")
         
-        # Import here to avoid circular imports
-        from payment_service import get_payment_service
-        from database import get_db_manager
+        if addresses is None:
+            addresses = list(self.active_payments.keys())
+        addresses = [a for a in addresses if a in self.active_payments and a not in self._in_flight]
+        if not addresses:
+            return
         
-        payment_service = get_payment_service()
-        db = get_db_manager()
+        self._in_flight.update(addresses)
+        try:
+            await self._check_addresses(addresses)
+        finally:
+            self._in_flight.difference_update(addresses)
+    
+    async def _check_addresses(self, addresses: List[str]):
+        logger.info(f"🔍 Checking {len(addresses)} pending payments")
         
-        for address, payment_info in list(self.active_payments.items()):
+        # Drop payments that have expired (24 hours)
+        for address in addresses:
+            payment_info = self.active_payments[address]
             try:
-                # Check if payment has expired (24 hours)
                 created_at = datetime.fromisoformat(payment_info['created_at'])
                 if datetime.utcnow() - created_at > timedelta(hours=24):
                     logger.info(f"Payment expired for {address}")
                     del self.active_payments[address]
-                    continue
-                
-                # Check blockchain for payment
-                crypto_type = payment_info['crypto_type']
-                
-                # Check database for confirmed payments using direct SQL query
-                try:
-                    import psycopg2
-                    import os
-                    
-                    # Direct database connection for payment verification
-                    db_url = os.getenv('DATABASE_URL')
-                    if db_url:
-                        import psycopg2
-                        conn = psycopg2.connect(db_url)
-                        cursor = conn.cursor()
-                        
-                        # Check if order is marked as confirmed but not yet processed
-                        cursor.execute(
-                            "SELECT status, domain_name FROM orders WHERE crypto_address = %s AND status IN ('confirmed', 'pending') AND status != 'processed'",
-                            (address,)
-                        )
-                        result = cursor.fetchone()
-                        
-                        if result:
-                            logger.info(f"💰 Found confirmed payment in database for {address}!")
-                            domain_name = result[1]
-                            payment_info['domain'] = domain_name  # Update domain name
-                            
-                            # Process the payment
-                            await self.process_payment_confirmation(
-                                address, payment_info, {
-                                    'value_received': payment_info.get('expected_amount', 9.87),
-                                    'value_coin': payment_info.get('expected_amount', 9.87),
-                                    'txid': 'database_confirmed',
-                                    'confirmations': 6
-                                }
-                            )
-                            
-                            # Mark payment as processed in database to prevent future duplicate processing
-                            cursor.execute(
-                                "UPDATE orders SET status = 'processed' WHERE crypto_address = %s AND status != 'processed'",
-                                (address,)
-                            )
-                            conn.commit()
-                            
-                            # CRITICAL FIX: Remove processed payment from active monitoring
-                            logger.info(f"✅ Payment processed successfully - removing {address} from monitoring queue")
-                            del self.active_payments[address]
-                            
-                            cursor.close()
-                            conn.close()
-                            continue
-                            
-                        cursor.close()
-                        conn.close()
-                        
-                    # Also check for payment confirmations file (backup method)
-                    import os
-                    if os.path.exists('payment_confirmations.json'):
-                        with open('payment_confirmations.json', 'r') as f:
-                            confirmations = json.load(f)
-                        
-                        if address in confirmations:
-                            payment_data = confirmations[address]
-                            logger.info(f"💰 Found payment confirmation for {address}!")
-                            
-                            # Process the payment
-                            await self.process_payment_confirmation(
-                                address, payment_info, {
-                                    'value_received': payment_data.get('amount_eth', 0),
-                                    'value_coin': payment_data.get('amount_eth', 0),
-                                    'txid': payment_data.get('txid'),
-                                    'confirmations': payment_data.get('confirmations', 6)
-                                }
-                            )
-                            
-                            # Remove from confirmations file
-                            del confirmations[address]
-                            with open('payment_confirmations.json', 'w') as f:
-                                json.dump(confirmations, f, indent=2)
-                            continue
-                except Exception as e:
-                    logger.error(f"Error checking payment confirmations: {e}")
-                
-                # Use BlockBee API directly (webhook-based, won't work for polling)
-                try:
-                    from apis.blockbee import BlockBeeAPI
-                    
-                    api_key = os.getenv('BLOCKBEE_API_KEY')
-                    if api_key:
-                        blockbee = BlockBeeAPI(api_key)
-                        # Note: BlockBee uses webhooks, not polling
-                        logger.debug(f"BlockBee uses webhooks - waiting for callback for {address[:20]}...")
-                    else:
-                        logger.warning("BLOCKBEE_API_KEY not found")
-                except Exception as e:
-                    logger.error(f"Error with BlockBee API: {e}")
-                        
             except Exception as e:
                 logger.error(f"Error checking payment {address}: {e}")
+        
+        addresses = [a for a in addresses if a in self.active_payments]
+        if not addresses:
+            return
+        
+        loop = asyncio.get_running_loop()
+        try:
+            confirmed_orders = await loop.run_in_executor(None, self._fetch_confirmed_orders, addresses)
+        except Exception as e:
+            logger.error(f"Error checking payment confirmations: {e}")
+            confirmed_orders = {}
+        
+        # Also check for payment confirmations file (backup method)
+        confirmations = self._load_confirmations()
+        
+        semaphore = asyncio.Semaphore(self.max_concurrent_confirmations)
+        tasks = []
+        for address in addresses:
+            payment_info = self.active_payments.get(address)
+            if payment_info is None:
+                continue
+            if address in confirmed_orders:
+                payment_info['domain'] = confirmed_orders[address]  # Update domain name
+                tasks.append(self._confirm_from_database(semaphore, address, payment_info))
+            elif address in confirmations:
+                tasks.append(self._confirm_from_file(semaphore, address, payment_info, confirmations[address]))
+        
+        if not tasks:
+            # BlockBee uses webhooks, not polling - remaining addresses wait for their callback
+            if not os.getenv('BLOCKBEE_API_KEY'):
+                logger.warning("BLOCKBEE_API_KEY not found")
+            logger.debug(f"Waiting for BlockBee callbacks for {len(addresses)} addresses")
+            return
+        
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        processed = [r[1] for r in results if isinstance(r, tuple) and r[0] == 'database']
+        consumed = [r[1] for r in results if isinstance(r, tuple) and r[0] == 'file']
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"Error processing payment confirmation: {result}")
+        
+        if processed:
+            # Mark payments as processed in database to prevent future duplicate processing
+            try:
+                await loop.run_in_executor(None, self._mark_orders_processed, processed)
+            except Exception as e:
+                logger.error(f"Error marking orders processed: {e}")
+        
+        if consumed:
+            # Remove from confirmations file
+            for address in consumed:
+                confirmations.pop(address, None)
+            try:
+                with open('payment_confirmations.json', 'w') as f:
+                    json.dump(confirmations, f, indent=2)
+            except Exception as e:
+                logger.error(f"Error updating payment confirmations file: {e}")
+    
+    def _fetch_confirmed_orders(self, addresses: List[str]) -> Dict[str, str]:
+        """Return address -> domain_name for every active address with a confirmed order"""
+        if not os.getenv('DATABASE_URL'):
+            return {}
+        from simple_connection_pool import get_pooled_connection
+        
+        with get_pooled_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                # Check if orders are marked as confirmed but not yet processed
+                cursor.execute(
+                    "SELECT crypto_address, domain_name FROM orders WHERE crypto_address = ANY(%s) AND status IN ('confirmed', 'pending') AND status != 'processed'",
+                    (addresses,)
+                )
+                rows = cursor.fetchall()
+            finally:
+                cursor.close()
+            conn.rollback()  # end the read transaction before returning the connection
+        return {address: domain_name for address, domain_name in rows}
+    
+    def _mark_orders_processed(self, addresses: List[str]):
+        """Mark all given addresses' orders as processed in one statement"""
+        from simple_connection_pool import get_pooled_connection
+        
+        with get_pooled_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(
+                    "UPDATE orders SET status = 'processed' WHERE crypto_address = ANY(%s) AND status != 'processed'",
+                    (addresses,)
+                )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+    
+    def _load_confirmations(self) -> Dict:
+        """Read payment_confirmations.json once per cycle"""
+        if not os.path.exists('payment_confirmations.json'):
+            return {}
+        try:
+            with open('payment_confirmations.json', 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"Error checking payment confirmations: {e}")
+            return {}
+    
+    async def _confirm_from_database(self, semaphore: asyncio.Semaphore, address: str, payment_info: Dict):
+        async with semaphore:
+            logger.info(f"💰 Found confirmed payment in database for {address}!")
+            await self.process_payment_confirmation(
+                address, payment_info, {
+                    'value_received': payment_info.get('expected_amount', 9.87),
+                    'value_coin': payment_info.get('expected_amount', 9.87),
+                    'txid': 'database_confirmed',
+                    'confirmations': 6
+                }
+            )
+            
+            # CRITICAL FIX: Remove processed payment from active monitoring
+            logger.info(f"✅ Payment processed successfully - removing {address} from monitoring queue")
+            self.active_payments.pop(address, None)
+            return ('database', address)
+    
+    async def _confirm_from_file(self, semaphore: asyncio.Semaphore, address: str, payment_info: Dict, payment_data: Dict):
+        async with semaphore:
+            logger.info(f"💰 Found payment confirmation for {address}!")
+            await self.process_payment_confirmation(
+                address, payment_info, {
+                    'value_received': payment_data.get('amount_eth', 0),
+                    'value_coin': payment_data.get('amount_eth', 0),
+                    'txid': payment_data.get('txid'),
+                    'confirmations': payment_data.get('confirmations', 6)
+                }
+            )
+            return ('file', address)
     
     async def process_payment_confirmation(self, address: str, payment_info: Dict, payment_data: Dict):
         """Process a confirmed payment"""
@@ -628,12 +731,10 @@ class PaymentMonitor:
                 
                 # Trigger domain registration through bot's domain service
                 try:
-                    # Load user session to get registration details
-                    import json
-                    with open('user_sessions.json', 'r') as f:
-                        sessions = json.load(f)
-                    
-                    user_session = sessions.get(str(user_id), {})
+                    # Load user session to get registration details (shared write-behind store)
+                    sessions = get_session_store()
+                    user_id = int(user_id)
+                    user_session = sessions.setdefault(user_id, {})
                     logger.info(f"🔍 User session loaded: {user_session.keys() if user_session else 'No session'}")
                     
                     # Get domain service from bot instance
@@ -709,10 +810,8 @@ class PaymentMonitor:
                             # Update session to mark as complete
                             user_session['payment_confirmed'] = True
                             user_session['registration_complete'] = True
-                            sessions[str(user_id)] = user_session
-                            
-                            with open('user_sessions.json', 'w') as f:
-                                json.dump(sessions, f, indent=2)
+                            sessions.mark_dirty(user_id)
+                            sessions.save()
                         else:
                             error_msg = result.get('error', 'Unknown error')
                             await self.bot_instance.application.bot.send_message(
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark async handlers hitting the database: sync DatabaseManager vs async_database
+Each simulated handler loads a user's domains, balance and state, as the
+domain and wallet menus do. A heartbeat task measures how long the event loop
+is stalled while they run; with the sync manager every query blocks it.
+Needs a PostgreSQL DATABASE_URL; only reads are issued.
+"""
+
+import asyncio
+import os
+import time
+
+HANDLERS = (1, 50, 200)
+HEARTBEAT = 0.005
+
+
+async def heartbeat(stop, lags):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(HEARTBEAT)
+        lags.append(time.perf_counter() - started - HEARTBEAT)
+
+
+async def sync_handler(db, telegram_id):
+    db.get_user_domains(telegram_id)
+    db.get_user_balance(telegram_id)
+    db.get_user_state(telegram_id)
+
+
+async def async_handler(db, telegram_id):
+    await db.get_user_domains(telegram_id)
+    await db.get_user_balance(telegram_id)
+    await db.get_user_state(telegram_id)
+
+
+async def run(handler, db, count, telegram_ids):
+    stop, lags = asyncio.Event(), []
+    beat = asyncio.create_task(heartbeat(stop, lags))
+    await asyncio.sleep(HEARTBEAT * 2)
+    started = time.perf_counter()
+    await asyncio.gather(*(handler(db, telegram_ids[i % len(telegram_ids)]) for i in range(count)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await beat
+    return elapsed, max(lags, default=0.0)
+
+
+async def main():
+    url = os.getenv("DATABASE_URL", "")
+    if not url.startswith("postgres"):
+        print("⏭️ Skipping: set DATABASE_URL to a PostgreSQL database to run this benchmark")
+        return
+
+    from sqlalchemy import select
+
+    from async_database import get_async_db_manager
+    from database import User, get_db_manager
+
+    sync_db = get_db_manager()
+    async_db = get_async_db_manager()
+    session = sync_db.get_session()
+    try:
+        telegram_ids = list(session.scalars(select(User.telegram_id).limit(100))) or [0]
+    finally:
+        session.close()
+
+    print(f"Async manager: {type(async_db).__name__}, {len(telegram_ids)} users sampled\n")
+    print(f"{'handlers':>8} {'manager':<8} {'total s':>8} {'req/s':>7} {'max loop stall ms':>18}")
+    for count in HANDLERS:
+        for name, handler, db in (("sync", sync_handler, sync_db), ("async", async_handler, async_db)):
+            elapsed, stall = await run(handler, db, count, telegram_ids)
+            print(f"{count:>8} {name:<8} {elapsed:>8.2f} {count / elapsed:>7.0f} {stall * 1000:>18.1f}")
+    await async_db.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
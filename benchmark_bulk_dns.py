@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Benchmark the bulk DNS engine against a local Cloudflare stub
+Applies the security template (SPF + DMARC) to a portfolio of zones:
+one-at-a-time per-record calls vs concurrent per-record vs concurrent batch
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+os.environ.setdefault("CLOUDFLARE_API_TOKEN", "benchmark-token-0123456789")
+
+from bulk_dns_engine import DONE, BulkDNSEngine, BulkJobStore
+from unified_dns_manager import UnifiedDNSManager
+from zone_resolver import zone_id_resolver
+
+DOMAINS = 200
+LATENCY = 0.02  # seconds added to every stub response, roughly one API round trip
+
+ZONES = {}
+_ids = itertools.count()
+_lock = threading.Lock()
+
+
+class CloudflareStub(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    requests = 0
+
+    def _reply(self, result, extra=None):
+        time.sleep(LATENCY)
+        body = json.dumps({"success": True, "errors": [], "result": result, **(extra or {})}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        with _lock:
+            type(self).requests += 1
+
+    def _body(self):
+        return json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+
+    def _new_record(self, zone_id, record):
+        record = dict(record, id=f"rec{next(_ids)}")
+        ZONES.setdefault(zone_id, []).append(record)
+        return record
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path.endswith("/zones"):
+            name = parse_qs(url.query)["name"][0]
+            return self._reply([{"id": f"zone-{name}", "name": name}])
+        zone_id = re.search(r"/zones/([^/]+)/dns_records", url.path).group(1)
+        records = ZONES.get(zone_id, [])
+        self._reply(records, {"result_info": {"page": 1, "total_pages": 1, "count": len(records)}})
+
+    def do_POST(self):
+        zone_id = re.search(r"/zones/([^/]+)/dns_records", self.path).group(1)
+        body = self._body()
+        if self.path.endswith("/batch"):
+            deleted = {d["id"] for d in body.get("deletes", [])}
+            ZONES[zone_id] = [r for r in ZONES.get(zone_id, []) if r["id"] not in deleted]
+            posts = [self._new_record(zone_id, r) for r in body.get("posts", [])]
+            return self._reply({"deletes": [{"id": i} for i in deleted], "posts": posts})
+        self._reply(self._new_record(zone_id, body))
+
+    def do_DELETE(self):
+        zone_id, record_id = re.search(r"/zones/([^/]+)/dns_records/([^/]+)", self.path).groups()
+        ZONES[zone_id] = [r for r in ZONES.get(zone_id, []) if r["id"] != record_id]
+        self._reply({"id": record_id})
+
+    def log_message(self, *args):
+        pass
+
+
+async def run_case(base_url, store, label, concurrency, batch):
+    manager = UnifiedDNSManager()
+    manager.base_url = base_url
+    manager.batch_supported = batch
+    engine = BulkDNSEngine(dns_manager=manager, store=store, concurrency=concurrency)
+    domains = [f"{label}-{i}.example" for i in range(DOMAINS)]
+    job = engine.create_job(1, "security_template", domains)
+
+    before = CloudflareStub.requests
+    start = time.perf_counter()
+    await engine.run(job)
+    elapsed = time.perf_counter() - start
+    assert job.count(DONE) == DOMAINS, job.domains
+    return elapsed, CloudflareStub.requests - before
+
+
+def main():
+    logging.basicConfig(level=logging.WARNING)
+    zone_id_resolver.db_lookup = lambda domain: None  # zones come from the stub only
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), CloudflareStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    cases = [
+        ("sequential", 1, False),
+        ("concurrent", 8, False),
+        ("batch", 8, True),
+    ]
+    print(f"📊 Bulk DNS benchmark: security template on {DOMAINS} zones, {LATENCY * 1e3:.0f} ms stub latency")
+    print(f"   {'mode':<28} {'seconds':>8} {'zones/s':>9} {'API calls':>10}")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        store = BulkJobStore(os.path.join(tmpdir, "jobs.db"))
+        for label, concurrency, batch in cases:
+            elapsed, calls = asyncio.run(run_case(base_url, store, label, concurrency, batch))
+            mode = f"{label} (x{concurrency}{', batch' if batch else ''})"
+            print(f"   {mode:<28} {elapsed:>8.2f} {DOMAINS / elapsed:>9.1f} {calls:>10}")
+        store.close()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Benchmark callback dispatch: legacy if/elif chain vs callback router
+Replays the callback strings from all_callbacks.txt
+"""
+
+import time
+
+from callback_routes import callback_router
+
+ROUNDS = 2000
+
+
+def linear_resolve(data):
+    """Legacy behaviour: test each branch in order until one matches"""
+    for route in callback_router.routes:
+        if route.kind == "exact":
+            if data == route.pattern:
+                return route
+        elif data and data.startswith(route.pattern):
+            return route
+    return None
+
+
+def run(resolve, samples):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for data in samples:
+            resolve(data)
+    return (time.perf_counter() - start) / (ROUNDS * len(samples))
+
+
+def main():
+    samples = [line.strip() for line in open("all_callbacks.txt") if line.strip()]
+
+    before = run(linear_resolve, samples)
+    after = run(callback_router.resolve, samples)
+
+    print(f"📊 Callback dispatch benchmark ({len(samples)} callbacks x {ROUNDS} rounds)")
+    print(f"   Routes registered: {len(callback_router.routes)}")
+    print(f"   if/elif chain:     {before * 1e6:.2f} µs/dispatch")
+    print(f"   router:            {after * 1e6:.2f} µs/dispatch")
+    print(f"   Speedup:           {before / after:.1f}x")
+
+    print("\n   Slowest callbacks under the old chain:")
+    worst = sorted(samples, key=lambda d: linear_resolve(d).order if linear_resolve(d) else len(callback_router.routes), reverse=True)[:5]
+    for data in worst:
+        route = linear_resolve(data)
+        depth = route.order + 1 if route else len(callback_router.routes)
+        print(f"   {data:<28} {depth} comparisons")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Benchmark the Cloudflare sync layer on zones of 10, 1k and 10k records
+Each zone has 10% of its records edited, 5% deleted and 5% added locally.
+Compares the old id-only planner with serial apply against the three-way
+planner applied concurrently and through the batch endpoint.
+"""
+
+import asyncio
+import logging
+import time
+
+from app.core.cloudflare_sync import CloudflareSyncLayer, DNSRecord, RateLimiter
+
+SIZES = (10, 1000, 10000)
+LATENCY = 0.005  # seconds per simulated API call
+
+logging.getLogger("app.core.cloudflare_sync").setLevel(logging.ERROR)
+
+
+class SimulatedCloudflare:
+    def __init__(self, records):
+        self.records = {r["id"]: dict(r) for r in records}
+        self.calls = 0
+        self.next_id = 0
+
+    async def _round_trip(self):
+        self.calls += 1
+        await asyncio.sleep(LATENCY)
+
+    async def list_dns_records(self, zone_id):
+        return {"success": True, "result": [dict(r) for r in self.records.values()]}
+
+    async def create_dns_record(self, zone_id, data):
+        await self._round_trip()
+        self.next_id += 1
+        record = dict(data, id=f"new{self.next_id}")
+        self.records[record["id"]] = record
+        return {"success": True, "result": record}
+
+    async def update_dns_record(self, zone_id, record_id, data):
+        await self._round_trip()
+        self.records[record_id] = dict(data, id=record_id)
+        return {"success": True, "result": self.records[record_id]}
+
+    async def delete_dns_record(self, zone_id, record_id):
+        await self._round_trip()
+        self.records.pop(record_id, None)
+        return {"success": True, "result": {"id": record_id}}
+
+
+class SimulatedBatchCloudflare(SimulatedCloudflare):
+    async def batch_dns_records(self, zone_id, posts=None, deletes=None):
+        await self._round_trip()
+        for record_id in deletes or []:
+            self.records.pop(record_id, None)
+        for post in posts or []:
+            self.next_id += 1
+            self.records[f"new{self.next_id}"] = dict(post, id=f"new{self.next_id}")
+        return {"success": True, "result": {}}
+
+
+def make_zone(size):
+    remote = [
+        {"id": f"r{i}", "type": "A", "name": f"h{i}.example.com", "content": f"10.{i // 65536}.{i // 256 % 256}.{i % 256}", "ttl": 300}
+        for i in range(size)
+    ]
+    local = []
+    for i, r in enumerate(remote):
+        if i % 20 == 1:
+            continue  # deleted locally
+        content = f"172.16.{i // 256 % 256}.{i % 256}" if i % 10 == 0 else r["content"]
+        local.append(DNSRecord(None, r["name"], "A", content, 300, cloudflare_id=r["id"]))
+    local += [DNSRecord(None, f"new{i}.example.com", "A", f"192.168.{i // 256 % 256}.{i % 256}", 300) for i in range(size // 20)]
+    return remote, local
+
+
+def legacy_plan(local_records, cf_records):
+    """The planner before the three-way diff: creates and updates by cloudflare_id only"""
+    operations = {'create': [], 'update': [], 'delete': []}
+    cf_lookup = {r['id']: r for r in cf_records}
+    for local_record in local_records:
+        cf_record = cf_lookup.get(local_record.cloudflare_id) if local_record.cloudflare_id else None
+        if cf_record is None:
+            operations['create'].append(local_record)
+        elif (local_record.content != cf_record.get('content') or local_record.ttl != cf_record.get('ttl')
+              or local_record.priority != cf_record.get('priority')):
+            operations['update'].append((local_record, cf_record))
+    return operations
+
+
+async def legacy_apply(api, operations):
+    for record in operations['create']:
+        await api.create_dns_record("zone", {"type": record.type, "name": record.name, "content": record.content, "ttl": record.ttl})
+    for local_record, _ in operations['update']:
+        await api.update_dns_record("zone", local_record.cloudflare_id, {"type": local_record.type, "name": local_record.name, "content": local_record.content, "ttl": local_record.ttl})
+
+
+async def run_legacy(size):
+    remote, local = make_zone(size)
+    api = SimulatedCloudflare(remote)
+    started = time.perf_counter()
+    operations = legacy_plan(local, remote)
+    planned = time.perf_counter()
+    await legacy_apply(api, operations)
+    missed_deletes = len(api.records) - len(local)
+    return planned - started, time.perf_counter() - planned, api.calls, missed_deletes
+
+
+async def run_sync(size, api_class):
+    remote, local = make_zone(size)
+    api = api_class(remote)
+    # Unthrottled so the benchmark measures the executor, not Cloudflare's 4 req/s allowance
+    layer = CloudflareSyncLayer(api, rate_limiter=RateLimiter(rate=1e9, burst=10 ** 6))
+    started = time.perf_counter()
+    cf_records = (await api.list_dns_records("zone"))["result"]
+    # prune: the local set is the whole zone, as if the layer had synced it before
+    operations = layer._plan_sync_operations(local, cf_records, prune=True)
+    planned = time.perf_counter()
+    results = await layer._execute_sync_operations("zone", operations)
+    assert not results["errors"] and len(api.records) == len(local)
+    return planned - started, time.perf_counter() - planned, api.calls, len(operations['operations'])
+
+
+async def main():
+    print(f"Simulated API latency {LATENCY * 1000:.0f} ms per call\n")
+    print(f"{'records':>8} {'strategy':<22} {'plan ms':>9} {'apply s':>9} {'calls':>7}  notes")
+    for size in SIZES:
+        plan, apply, calls, missed = await run_legacy(size)
+        print(f"{size:>8} {'legacy id diff, serial':<22} {plan * 1000:>9.2f} {apply:>9.3f} {calls:>7}  {missed} stale records left behind")
+        plan, apply, calls, ops = await run_sync(size, SimulatedCloudflare)
+        print(f"{size:>8} {'three-way, x8 calls':<22} {plan * 1000:>9.2f} {apply:>9.3f} {calls:>7}  {ops} operations")
+        plan, apply, calls, ops = await run_sync(size, SimulatedBatchCloudflare)
+        print(f"{size:>8} {'three-way, batch':<22} {plan * 1000:>9.2f} {apply:>9.3f} {calls:>7}  {ops} operations")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Benchmark session saves: legacy full json.dump vs write-behind SQLite store
+Per-save cost for a single changed user at 1k, 10k and 100k stored users,
+and how many sessions the bounded cache keeps resident
+"""
+
+import json
+import os
+import tempfile
+import time
+
+from session_store import SessionStore, SQLiteSessionBackend
+
+SIZES = [1_000, 10_000, 100_000]
+SAVES = 200
+
+
+def make_session(user_id):
+    return {"language": "en", "technical_email": f"user{user_id}@example.com",
+            "stage": "idle", "custom_nameservers": ["ns1.example.com", "ns2.example.com"]}
+
+
+def legacy_save_cost(sessions, path):
+    rounds = max(3, SAVES * 1_000 // len(sessions) // 10)
+    start = time.perf_counter()
+    for i in range(rounds):
+        sessions[i % len(sessions)]["stage"] = f"step{i}"
+        with open(path, "w") as f:
+            json.dump({str(k): v for k, v in sessions.items()}, f)
+    return (time.perf_counter() - start) / rounds
+
+
+def store_save_cost(sessions, path):
+    store = SessionStore(SQLiteSessionBackend(path), flush_interval=3600, legacy_json_path=None)
+    store.load()
+    store.update(sessions)
+    store.flush()
+
+    start = time.perf_counter()
+    for i in range(SAVES):
+        store[i % len(sessions)]["stage"] = f"step{i}"
+        store.save()
+        store.flush()  # force the write so the write itself is measured
+    return (time.perf_counter() - start) / SAVES, store.stats()["resident"]
+
+
+def main():
+    print(f"📊 Session save benchmark (one changed user per save)")
+    print(f"   {'users':>8}  {'json.dump':>12}  {'session store':>14}  {'resident':>9}")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for size in SIZES:
+            sessions = {user_id: make_session(user_id) for user_id in range(size)}
+            legacy = legacy_save_cost(sessions, os.path.join(tmpdir, f"legacy_{size}.json"))
+            store, resident = store_save_cost(sessions, os.path.join(tmpdir, f"store_{size}.db"))
+            print(f"   {size:>8}  {legacy * 1e3:>9.2f} ms  {store * 1e3:>11.3f} ms  {resident:>9}")
+
+
+if __name__ == "__main__":
+    main()
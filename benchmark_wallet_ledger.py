@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark concurrent wallet writes on one account
+Legacy read-modify-write (SELECT, add in Python, UPDATE) vs the single
+conditional UPDATE ... RETURNING behind DatabaseManager.update_user_balance.
+Needs a PostgreSQL DATABASE_URL; a throwaway user is created and removed.
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+WRITERS = 50
+WRITES_PER_WRITER = 20
+CREDIT = Decimal("1.00")
+BENCH_TELEGRAM_ID = -990_000_021
+
+
+def legacy_credit(db, telegram_id):
+    from database import User
+
+    session = db.get_session()
+    try:
+        user = session.query(User).filter_by(telegram_id=telegram_id).first()
+        current_balance = Decimal(str(user.balance_usd))
+        user.balance_usd = current_balance + CREDIT
+        session.commit()
+    finally:
+        session.close()
+
+
+def atomic_credit(db, telegram_id):
+    db.update_user_balance(telegram_id, CREDIT)
+
+
+def run(db, credit):
+    db.set_user_balance(BENCH_TELEGRAM_ID, 0)
+
+    def writer(_):
+        for _ in range(WRITES_PER_WRITER):
+            credit(db, BENCH_TELEGRAM_ID)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=WRITERS) as pool:
+        list(pool.map(writer, range(WRITERS)))
+    elapsed = time.perf_counter() - start
+
+    expected = float(CREDIT * WRITERS * WRITES_PER_WRITER)
+    actual = db.get_user_balance(BENCH_TELEGRAM_ID)
+    return elapsed, expected, actual
+
+
+def overdraft_race(db, attempts=WRITERS):
+    """Many debits racing for a balance that covers only a few of them"""
+    db.set_user_balance(BENCH_TELEGRAM_ID, 5)
+    with ThreadPoolExecutor(max_workers=WRITERS) as pool:
+        results = list(pool.map(lambda _: db.update_user_balance(BENCH_TELEGRAM_ID, -CREDIT), range(attempts)))
+    return sum(r is not None for r in results), db.get_user_balance(BENCH_TELEGRAM_ID)
+
+
+def main():
+    url = os.getenv("DATABASE_URL", "")
+    if not url.startswith("postgres"):
+        print("⏭️ Skipping: set DATABASE_URL to a PostgreSQL database to run this benchmark")
+        return
+
+    from database import DatabaseManager, User
+
+    db = DatabaseManager(url)
+    db.get_or_create_user(BENCH_TELEGRAM_ID, username="wallet_benchmark")
+    try:
+        total = WRITERS * WRITES_PER_WRITER
+        print(f"{WRITERS} writers x {WRITES_PER_WRITER} credits of ${CREDIT} on one account\n")
+        print(f"{'flow':<16} {'seconds':>8} {'writes/s':>9} {'expected':>9} {'balance':>9} {'lost':>5}")
+        for name, credit in (("read-modify-write", legacy_credit), ("atomic update", atomic_credit)):
+            elapsed, expected, actual = run(db, credit)
+            lost = round((expected - actual) / float(CREDIT))
+            print(f"{name:<16} {elapsed:>8.2f} {total / elapsed:>9.0f} {expected:>9.2f} {actual:>9.2f} {lost:>5}")
+
+        applied, balance = overdraft_race(db)
+        print(f"\nOverdraft race: {applied} of {WRITERS} debits of ${CREDIT} applied to $5.00, final balance ${balance:.2f}")
+    finally:
+        session = db.get_session()
+        try:
+            session.execute(
+                User.__table__.delete().where(User.telegram_id == BENCH_TELEGRAM_ID)
+            )
+            session.commit()
+        finally:
+            session.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark zone provisioning for one registration and for bulk onboarding
+The old flow looks the zone up by name, lists the account's zones for a
+parent, creates the zone, fetches its nameservers and adds each default
+record on its own. The pipeline answers lookups from the account zone index
+and provisions with one create and one batch call.
+"""
+
+import asyncio
+import logging
+import time
+
+from zone_provisioner import ZoneProvisioner, default_zone_records
+
+LATENCY = 0.02  # seconds per simulated API call
+ACCOUNT_ZONES = 500
+BULK = (1, 50, 200)
+
+logging.getLogger("zone_provisioner").setLevel(logging.ERROR)
+
+
+class SimulatedCloudflare:
+    enabled = True
+
+    def __init__(self):
+        self.zones = {f"existing{i}.com": f"z{i}" for i in range(ACCOUNT_ZONES)}
+        self.calls = 0
+
+    async def _round_trip(self):
+        self.calls += 1
+        await asyncio.sleep(LATENCY)
+
+    # Old flow
+    async def get_zone_by_name(self, domain):
+        await self._round_trip()
+        return self.zones.get(domain)
+
+    async def list_all_zones(self):
+        await self._round_trip()
+        return list(self.zones)[:50]  # the old helper only ever read the first page
+
+    async def get_zone_nameservers(self, zone_id):
+        await self._round_trip()
+        return ["ada.ns.cloudflare.com", "bob.ns.cloudflare.com"]
+
+    async def create_dns_record(self, zone_id, record):
+        await self._round_trip()
+
+    # Pipeline
+    async def list_zones_page(self, page=1, per_page=50):
+        await self._round_trip()
+        names = list(self.zones)
+        total_pages = -(-len(names) // per_page)
+        return [{"id": self.zones[n], "name": n} for n in names[(page - 1) * per_page:page * per_page]], total_pages
+
+    async def create_zone(self, domain):
+        await self._round_trip()
+        self.zones[domain] = f"z-{domain}"
+        return True, self.zones[domain], ["ada.ns.cloudflare.com", "bob.ns.cloudflare.com"]
+
+    async def batch_dns_records(self, zone_id, posts=None, deletes=None):
+        await self._round_trip()
+        return True, None
+
+
+async def legacy_provision(api, domain):
+    zone_id = await api.get_zone_by_name(domain)
+    if zone_id is None:
+        zones = await api.list_all_zones()
+        if not any(domain.endswith("." + zone) for zone in zones):
+            _, zone_id, _ = await api.create_zone(domain)
+    nameservers = await api.get_zone_nameservers(zone_id)
+    for record in default_zone_records(domain):
+        await api.create_dns_record(zone_id, record)
+    return nameservers
+
+
+async def run_legacy(count):
+    api = SimulatedCloudflare()
+    started = time.perf_counter()
+    first = None
+    for i in range(count):
+        await legacy_provision(api, f"new{i}.sbs")
+        first = first or time.perf_counter() - started
+    return first, time.perf_counter() - started, api.calls
+
+
+async def run_pipeline(count):
+    api = SimulatedCloudflare()
+    provisioner = ZoneProvisioner(api)
+    await provisioner.index.ensure_warm()  # done at bot startup
+    warm_calls = api.calls
+    started = time.perf_counter()
+    first = await provisioner.provision("new0.sbs")
+    first_time = time.perf_counter() - started
+    await provisioner.provision_many([f"new{i}.sbs" for i in range(1, count)])
+    assert first.success and len(first.nameservers) == 2
+    return first_time, time.perf_counter() - started, api.calls - warm_calls, warm_calls
+
+
+async def main():
+    print(f"Simulated API latency {LATENCY * 1000:.0f} ms per call, {ACCOUNT_ZONES} zones on the account\n")
+    print(f"{'domains':>8} {'flow':<10} {'first ms':>9} {'total s':>8} {'calls':>6}")
+    for count in BULK:
+        first, total, calls = await run_legacy(count)
+        print(f"{count:>8} {'old':<10} {first * 1000:>9.0f} {total:>8.2f} {calls:>6}")
+        first, total, calls, warm = await run_pipeline(count)
+        print(f"{count:>8} {'pipeline':<10} {first * 1000:>9.0f} {total:>8.2f} {calls:>6}  (+{warm} startup page calls)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Benchmark zone_id lookups against a 100k-domain registered_domains table
+Legacy fetch-all + Python scan vs indexed single-row query vs resolver cache
+"""
+
+import random
+import sqlite3
+import time
+from types import SimpleNamespace
+
+from zone_resolver import ZoneIdResolver
+
+DOMAINS = 100_000
+LOOKUPS = 200
+
+
+def build_table():
+    conn = sqlite3.connect(":memory:")
+    conn.execute(
+        "CREATE TABLE registered_domains (id INTEGER PRIMARY KEY, telegram_id INTEGER, "
+        "domain_name TEXT NOT NULL, cloudflare_zone_id TEXT, status TEXT)"
+    )
+    conn.execute("CREATE INDEX ix_registered_domains_domain_name ON registered_domains (domain_name)")
+    conn.executemany(
+        "INSERT INTO registered_domains (telegram_id, domain_name, cloudflare_zone_id, status) "
+        "VALUES (?, ?, ?, 'active')",
+        ((i % 5000, f"domain{i}.com", f"{i:032x}") for i in range(DOMAINS)),
+    )
+    return conn
+
+
+def legacy_lookup(conn, domain):
+    # What get_all_registered_domains() + the old loop did: every row, every view
+    rows = [SimpleNamespace(domain_name=name, zone_id=zone_id) for name, zone_id in
+            conn.execute("SELECT domain_name, cloudflare_zone_id FROM registered_domains")]
+    for record in rows:
+        if record.domain_name == domain:
+            return record.zone_id
+    return None
+
+
+def indexed_lookup(conn, domain):
+    row = conn.execute(
+        "SELECT cloudflare_zone_id FROM registered_domains WHERE domain_name = ? "
+        "AND cloudflare_zone_id IS NOT NULL AND cloudflare_zone_id != '' LIMIT 1",
+        (domain,),
+    ).fetchone()
+    return row[0] if row else None
+
+
+def timed(fn, names, rounds):
+    start = time.perf_counter()
+    for i in range(rounds):
+        fn(names[i % len(names)])
+    return (time.perf_counter() - start) / rounds
+
+
+def main():
+    conn = build_table()
+    # A working set of domains users keep opening DNS screens for
+    names = [f"domain{random.randrange(DOMAINS)}.com" for _ in range(50)]
+    resolver = ZoneIdResolver(db_lookup=lambda domain: indexed_lookup(conn, domain))
+
+    legacy = timed(lambda d: legacy_lookup(conn, d), names, 10)
+    indexed = timed(lambda d: indexed_lookup(conn, d), names, LOOKUPS)
+    cached = timed(resolver.lookup_stored, names, LOOKUPS * 50)
+
+    print(f"📊 zone_id lookup benchmark ({DOMAINS:,} registered domains)")
+    print(f"   {'legacy scan':<22} {legacy * 1e3:>10.3f} ms/lookup")
+    print(f"   {'indexed query':<22} {indexed * 1e3:>10.3f} ms/lookup  ({legacy / indexed:,.0f}x)")
+    print(f"   {'resolver (warm cache)':<22} {cached * 1e3:>10.4f} ms/lookup  ({legacy / cached:,.0f}x)")
+    print(f"   resolver stats: {resolver.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,430 @@
+"""
+Bulk DNS Engine for Nomadly Bot
+Applies one record template (or nameserver/Cloudflare change) across a
+user's whole domain portfolio
+
+A job is a template plus a domain set. Domains run concurrently behind a
+semaphore; each zone's changes are computed against its current records
+(so re-running is a no-op for domains already done) and sent as a single
+call to Cloudflare's batch DNS endpoint, falling back to per-record calls
+where the batch endpoint is unavailable. Job state lives in a local
+SQLite table, one row per domain, so a job interrupted by a restart
+resumes with the domains it had not finished. Progress is pushed through
+a ThrottledProgress so chat edits stay under Telegram's edit rate limits.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOBS_PATH = os.getenv("BULK_DNS_JOBS_DB", "bulk_dns_jobs.db")
+
+PENDING = "pending"
+DONE = "done"
+UNCHANGED = "unchanged"
+FAILED = "failed"
+
+OPERATION_LABELS = {
+    "add_a": "📝 Add A record",
+    "update_mx": "📧 Update MX records",
+    "configure_spf": "🛡️ Configure SPF",
+    "security_template": "🛡️ Security template",
+    "change_ns": "🔧 Change nameservers",
+    "cloudflare_migrate": "⚡ Cloudflare migration",
+}
+
+
+@dataclass(frozen=True)
+class RecordTemplate:
+    """One record to apply to every domain.
+
+    name is relative to the zone ("@" for the apex); ``{domain}`` in name or
+    content is replaced with the domain. mode decides what happens to
+    existing records with the same type and name (and content prefix, when
+    match_prefix is set, e.g. "v=spf1" to single out the SPF TXT record):
+
+    - "add": add the record unless an identical one exists
+    - "replace": delete the others and add the record
+    - "ensure": add the record only if none exists
+    """
+    type: str
+    name: str
+    content: str
+    ttl: int = 300
+    priority: Optional[int] = None
+    mode: str = "add"
+    match_prefix: Optional[str] = None
+
+    def fqdn(self, domain: str) -> str:
+        name = self.name.replace("{domain}", domain).rstrip(".")
+        if name in ("", "@"):
+            return domain
+        return name if name == domain or name.endswith("." + domain) else f"{name}.{domain}"
+
+    def render(self, domain: str) -> Dict[str, Any]:
+        record = {
+            "type": self.type,
+            "name": self.fqdn(domain),
+            "content": self.content.replace("{domain}", domain),
+            "ttl": self.ttl,
+        }
+        if self.priority is not None:
+            record["priority"] = self.priority
+        return record
+
+
+def templates_for(operation: str, params: Dict[str, Any]) -> List[RecordTemplate]:
+    """Record templates behind each bulk record operation"""
+    if operation == "add_a":
+        return [RecordTemplate("A", params.get("name", "@"), params["ip"])]
+    if operation == "update_mx":
+        return [RecordTemplate("MX", "@", params["host"], ttl=3600,
+                               priority=int(params.get("priority", 10)), mode="replace")]
+    if operation == "configure_spf":
+        return [RecordTemplate("TXT", "@", params["spf"], ttl=3600, mode="replace", match_prefix="v=spf1")]
+    if operation == "security_template":
+        return [
+            RecordTemplate("TXT", "@", "v=spf1 mx ~all", ttl=3600, mode="ensure", match_prefix="v=spf1"),
+            RecordTemplate("TXT", "_dmarc", "v=DMARC1; p=quarantine", ttl=3600, mode="ensure",
+                           match_prefix="v=DMARC1"),
+        ]
+    return []
+
+
+def _content(record: Dict[str, Any]) -> str:
+    return str(record.get("content", "")).strip('"')
+
+
+def plan_changes(domain: str, templates: List[RecordTemplate],
+                 existing: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """Records to create and record ids to delete so the zone matches the templates"""
+    posts: List[Dict[str, Any]] = []
+    deletes: List[str] = []
+    for template in templates:
+        wanted = template.render(domain)
+        matching = [
+            r for r in existing
+            if r.get("type") == wanted["type"]
+            and str(r.get("name", "")).lower() == wanted["name"].lower()
+            and (template.match_prefix is None or _content(r).startswith(template.match_prefix))
+        ]
+        identical = [r for r in matching if _content(r) == wanted["content"]
+                     and (template.priority is None or r.get("priority") == template.priority)]
+
+        if template.mode == "ensure":
+            if not matching:
+                posts.append(wanted)
+        elif template.mode == "replace":
+            keep = identical[0] if identical else None
+            deletes.extend(r["id"] for r in matching if r is not keep and r.get("id"))
+            if keep is None:
+                posts.append(wanted)
+        elif not identical:
+            posts.append(wanted)
+    return posts, deletes
+
+
+@dataclass
+class BulkJob:
+    job_id: str
+    user_id: int
+    operation: str
+    params: Dict[str, Any]
+    status: str = "running"
+    chat_id: Optional[int] = None
+    message_id: Optional[int] = None
+    created_at: float = field(default_factory=time.time)
+    # domain -> (status, detail), in portfolio order
+    domains: Dict[str, Tuple[str, str]] = field(default_factory=dict)
+
+    def count(self, status: str) -> int:
+        return sum(1 for s, _ in self.domains.values() if s == status)
+
+    @property
+    def finished(self) -> int:
+        return len(self.domains) - self.count(PENDING)
+
+
+class BulkJobStore:
+    """Jobs and their per-domain progress in a local SQLite database"""
+
+    def __init__(self, path: str = DEFAULT_JOBS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS bulk_jobs ("
+            "job_id TEXT PRIMARY KEY, user_id INTEGER NOT NULL, operation TEXT NOT NULL, "
+            "params TEXT NOT NULL, status TEXT NOT NULL, chat_id INTEGER, message_id INTEGER, "
+            "created_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS bulk_job_domains ("
+            "job_id TEXT NOT NULL, position INTEGER NOT NULL, domain TEXT NOT NULL, "
+            "status TEXT NOT NULL, detail TEXT NOT NULL DEFAULT '', updated_at REAL NOT NULL, "
+            "PRIMARY KEY (job_id, domain))"
+        )
+
+    def create(self, job: BulkJob) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT INTO bulk_jobs (job_id, user_id, operation, params, status, chat_id, "
+                    "message_id, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (job.job_id, job.user_id, job.operation, json.dumps(job.params), job.status,
+                     job.chat_id, job.message_id, job.created_at),
+                )
+                self._conn.executemany(
+                    "INSERT INTO bulk_job_domains (job_id, position, domain, status, detail, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    [(job.job_id, i, domain, status, detail, now)
+                     for i, (domain, (status, detail)) in enumerate(job.domains.items())],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def set_message(self, job_id: str, chat_id: int, message_id: int) -> None:
+        with self._lock:
+            self._conn.execute("UPDATE bulk_jobs SET chat_id = ?, message_id = ? WHERE job_id = ?",
+                               (chat_id, message_id, job_id))
+
+    def record(self, job_id: str, domain: str, status: str, detail: str = "") -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE bulk_job_domains SET status = ?, detail = ?, updated_at = ? "
+                "WHERE job_id = ? AND domain = ?",
+                (status, detail, time.time(), job_id, domain),
+            )
+
+    def set_status(self, job_id: str, status: str) -> None:
+        with self._lock:
+            self._conn.execute("UPDATE bulk_jobs SET status = ? WHERE job_id = ?", (status, job_id))
+
+    def load(self, job_id: str) -> Optional[BulkJob]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT job_id, user_id, operation, params, status, chat_id, message_id, created_at "
+                "FROM bulk_jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            domains = self._conn.execute(
+                "SELECT domain, status, detail FROM bulk_job_domains WHERE job_id = ? ORDER BY position",
+                (job_id,),
+            ).fetchall()
+        job = BulkJob(job_id=row[0], user_id=row[1], operation=row[2], params=json.loads(row[3]),
+                      status=row[4], chat_id=row[5], message_id=row[6], created_at=row[7])
+        job.domains = {domain: (status, detail) for domain, status, detail in domains}
+        return job
+
+    def unfinished(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._conn.execute(
+                "SELECT job_id FROM bulk_jobs WHERE status = 'running' ORDER BY created_at")]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def format_job_progress(job: BulkJob, limit: int = 15) -> str:
+    """Chat text for a job: totals plus the most recent per-domain results"""
+    label = OPERATION_LABELS.get(job.operation, job.operation)
+    total = len(job.domains)
+    icons = {DONE: "✅", UNCHANGED: "➖", FAILED: "❌"}
+    lines = [
+        f"{label}",
+        "",
+        f"Progress: {job.finished}/{total}",
+        f"✅ {job.count(DONE)} updated · ➖ {job.count(UNCHANGED)} unchanged · ❌ {job.count(FAILED)} failed",
+    ]
+    finished = [(d, s, detail) for d, (s, detail) in job.domains.items() if s != PENDING]
+    if finished:
+        lines.append("")
+        for domain, status, detail in finished[-limit:]:
+            lines.append(f"{icons.get(status, '•')} {domain}" + (f" — {detail}" if detail else ""))
+    if job.status == "completed":
+        lines += ["", "🎉 Bulk operation finished"]
+    elif job.status == "running":
+        lines += ["", "⏳ Working..."]
+    return "\n".join(lines)
+
+
+class ThrottledProgress:
+    """Rate-limited progress pushes: at most one send per min_interval, plus the final one"""
+
+    def __init__(self, send: Callable[[str], Awaitable[Any]], min_interval: float = 3.0,
+                 formatter: Optional[Callable[[Any], str]] = None):
+        self.send = send
+        self.min_interval = min_interval
+        self.formatter = formatter or format_job_progress
+        self._last_sent = 0.0
+        self._last_text: Optional[str] = None
+        self.sent = 0
+
+    async def update(self, job: BulkJob, final: bool = False) -> None:
+        now = time.monotonic()
+        if not final and now - self._last_sent < self.min_interval:
+            return
+        text = self.formatter(job)
+        if text == self._last_text:
+            return
+        self._last_sent = now
+        self._last_text = text
+        try:
+            await self.send(text)
+            self.sent += 1
+        except Exception as e:
+            # A failed edit (message deleted, "not modified", flood wait) must not stop the job
+            logger.warning(f"📦 Bulk progress update failed: {e}")
+
+
+class BulkDNSEngine:
+    """Runs bulk jobs across zones with bounded concurrency"""
+
+    def __init__(self, dns_manager=None, store: Optional[BulkJobStore] = None, registrar=None,
+                 concurrency: int = 8):
+        self.dns_manager = dns_manager
+        self.store = store
+        self.registrar = registrar
+        self.concurrency = concurrency
+        self._running: Dict[str, asyncio.Task] = {}
+
+    def _manager(self):
+        if self.dns_manager is None:
+            from unified_dns_manager import unified_dns_manager
+            self.dns_manager = unified_dns_manager
+        return self.dns_manager
+
+    def _store(self) -> BulkJobStore:
+        if self.store is None:
+            self.store = BulkJobStore()
+        return self.store
+
+    def create_job(self, user_id: int, operation: str, domains: List[str],
+                   params: Optional[Dict[str, Any]] = None) -> BulkJob:
+        unique = list(dict.fromkeys(d.strip().lower() for d in domains if d and d.strip()))
+        job = BulkJob(job_id=uuid.uuid4().hex[:12], user_id=user_id, operation=operation,
+                      params=params or {}, domains={d: (PENDING, "") for d in unique})
+        self._store().create(job)
+        logger.info(f"📦 Bulk job {job.job_id} created: {operation} on {len(unique)} domains for user {user_id}")
+        return job
+
+    def unfinished_jobs(self) -> List[BulkJob]:
+        store = self._store()
+        return [job for job in (store.load(job_id) for job_id in store.unfinished()) if job]
+
+    def is_running(self, job_id: str) -> bool:
+        task = self._running.get(job_id)
+        return task is not None and not task.done()
+
+    def start(self, job: BulkJob, progress: Optional[ThrottledProgress] = None) -> asyncio.Task:
+        """Run a job in the background on the current loop"""
+        task = asyncio.create_task(self.run(job, progress))
+        self._running[job.job_id] = task
+        task.add_done_callback(lambda _: self._running.pop(job.job_id, None))
+        return task
+
+    async def run(self, job: BulkJob, progress: Optional[ThrottledProgress] = None) -> BulkJob:
+        """Process every pending domain of job; safe to call again after an interruption"""
+        store = self._store()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        templates = templates_for(job.operation, job.params)
+        started = time.monotonic()
+
+        async def one(domain: str) -> None:
+            async with semaphore:
+                try:
+                    status, detail = await self._apply(job, domain, templates)
+                except Exception as e:
+                    logger.error(f"📦 Bulk job {job.job_id} failed on {domain}: {e}")
+                    status, detail = FAILED, str(e)[:120]
+            job.domains[domain] = (status, detail)
+            store.record(job.job_id, domain, status, detail)
+            if progress is not None:
+                await progress.update(job)
+
+        pending = [d for d, (status, _) in job.domains.items() if status == PENDING]
+        await asyncio.gather(*[one(domain) for domain in pending])
+
+        job.status = "completed"
+        store.set_status(job.job_id, job.status)
+        if progress is not None:
+            await progress.update(job, final=True)
+        logger.info(
+            f"📦 Bulk job {job.job_id} completed: {len(pending)} domains in "
+            f"{time.monotonic() - started:.1f}s ({job.count(DONE)} updated, "
+            f"{job.count(UNCHANGED)} unchanged, {job.count(FAILED)} failed)"
+        )
+        return job
+
+    async def _apply(self, job: BulkJob, domain: str, templates: List[RecordTemplate]) -> Tuple[str, str]:
+        manager = self._manager()
+
+        if job.operation == "cloudflare_migrate":
+            result = await manager.switch_domain_to_cloudflare(domain, self.registrar)
+            if result.get("success"):
+                return (DONE, "zone created") if result.get("zone_created") else (DONE, "")
+            return FAILED, result.get("error") or "switch failed"
+
+        if job.operation == "change_ns":
+            nameservers = job.params.get("nameservers", [])
+            if self.registrar is None:
+                return FAILED, "registrar not configured"
+            if not await self.registrar.update_nameservers(domain, nameservers):
+                return FAILED, "registrar rejected nameservers"
+            try:
+                from database import get_db_manager
+                get_db_manager().update_domain_nameservers(domain, nameservers, "custom")
+            except Exception as e:
+                logger.warning(f"📦 Nameservers changed for {domain} but not saved: {e}")
+            return DONE, ""
+
+        if not templates:
+            return FAILED, f"unknown operation {job.operation}"
+
+        zone_id = await manager.get_zone_id(domain)
+        if not zone_id:
+            return FAILED, "no Cloudflare zone"
+        # Plan from a fresh listing: the record cache can be minutes behind
+        # edits made in the Cloudflare dashboard or by another client
+        existing = await manager.list_dns_records(zone_id, force_refresh=True)
+        posts, deletes = plan_changes(domain, templates, existing)
+        if not posts and not deletes:
+            return UNCHANGED, ""
+
+        success, error = await manager.batch_dns_records(zone_id, posts=posts, deletes=deletes)
+        if not success:
+            return FAILED, error or "Cloudflare rejected the change"
+        return DONE, f"+{len(posts)} -{len(deletes)}"
+
+
+_bulk_dns_engine: Optional[BulkDNSEngine] = None
+
+
+def get_bulk_dns_engine(registrar=None) -> BulkDNSEngine:
+    """Get global bulk DNS engine instance"""
+    global _bulk_dns_engine
+    if _bulk_dns_engine is None:
+        _bulk_dns_engine = BulkDNSEngine(
+            registrar=registrar,
+            concurrency=int(os.getenv("BULK_DNS_CONCURRENCY", "8")),
+        )
+    elif registrar is not None and _bulk_dns_engine.registrar is None:
+        _bulk_dns_engine.registrar = registrar
+    return _bulk_dns_engine
@@ -0,0 +1,149 @@
+"""
+Callback Router for Nomadly Bot
+Table-driven dispatch of Telegram callback data (exact-match dict + prefix trie)
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Route handlers receive (bot, query, data, arg) where arg is the callback data
+# with the matched prefix removed ("" for exact routes)
+RouteHandler = Callable[[Any, Any, str, str], Awaitable[Any]]
+
+
+@dataclass
+class CallbackRoute:
+    """A single registered callback pattern"""
+    kind: str  # "exact" or "prefix"
+    pattern: str
+    handler: RouteHandler
+    order: int
+
+    @property
+    def name(self) -> str:
+        return getattr(self.handler, "__name__", repr(self.handler))
+
+    def describe(self) -> str:
+        suffix = "*" if self.kind == "prefix" else ""
+        return f"{self.pattern}{suffix} -> {self.name}"
+
+
+class _TrieNode:
+    __slots__ = ("children", "route")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.route: Optional[CallbackRoute] = None
+
+
+class CallbackRouter:
+    """Resolve callback data to a handler without walking an if/elif chain.
+
+    Registration order is the priority order: when an exact pattern and one or
+    more prefixes all match, the route registered first wins, exactly as the
+    first matching branch of the old if/elif chain did. Exact lookups are a
+    single dict probe and prefix lookups walk the trie once along the data, so
+    dispatch cost no longer depends on how far down the table a route sits.
+    """
+
+    def __init__(self):
+        self.routes: List[CallbackRoute] = []
+        self._exact: Dict[str, CallbackRoute] = {}
+        self._root = _TrieNode()
+
+    def _add(self, kind: str, pattern: str, handler: RouteHandler) -> CallbackRoute:
+        route = CallbackRoute(kind, pattern, handler, len(self.routes))
+        self.routes.append(route)
+
+        if kind == "exact":
+            # First registration wins, later duplicates are reported as shadowed
+            self._exact.setdefault(pattern, route)
+        else:
+            node = self._root
+            for char in pattern:
+                node = node.children.setdefault(char, _TrieNode())
+            if node.route is None:
+                node.route = route
+        return route
+
+    def exact(self, *patterns: str) -> Callable[[RouteHandler], RouteHandler]:
+        """Decorator registering a handler for one or more exact callback strings"""
+        def decorator(handler: RouteHandler) -> RouteHandler:
+            for pattern in patterns:
+                self._add("exact", pattern, handler)
+            return handler
+        return decorator
+
+    def prefix(self, *patterns: str) -> Callable[[RouteHandler], RouteHandler]:
+        """Decorator registering a handler for one or more callback prefixes"""
+        def decorator(handler: RouteHandler) -> RouteHandler:
+            for pattern in patterns:
+                if not pattern:
+                    raise ValueError("Callback prefix must not be empty")
+                self._add("prefix", pattern, handler)
+            return handler
+        return decorator
+
+    def _best_prefix(self, data: str, best: Optional[CallbackRoute]) -> Optional[CallbackRoute]:
+        """Walk the trie along data, keeping the earliest-registered match"""
+        node = self._root
+        for char in data:
+            node = node.children.get(char)
+            if node is None:
+                break
+            route = node.route
+            if route is not None and (best is None or route.order < best.order):
+                best = route
+        return best
+
+    def resolve(self, data: str) -> Optional[CallbackRoute]:
+        """Return the route that handles data, or None if nothing matches"""
+        if not data:
+            return None
+        return self._best_prefix(data, self._exact.get(data))
+
+    async def dispatch(self, bot: Any, query: Any, data: str) -> bool:
+        """Run the handler for data. Returns False when no route matches."""
+        route = self.resolve(data)
+        if route is None:
+            return False
+
+        arg = data[len(route.pattern):] if route.kind == "prefix" else ""
+        await route.handler(bot, query, data, arg)
+        return True
+
+    def shadowed_routes(self) -> List[Tuple[CallbackRoute, CallbackRoute]]:
+        """Return (route, winner) pairs for routes that can never be selected.
+
+        An exact route is unreachable if an earlier exact duplicate or an
+        earlier prefix of it exists; a prefix route is unreachable if an
+        earlier prefix of its own pattern exists.
+        """
+        shadowed = []
+        for route in self.routes:
+            if route.kind == "exact":
+                winner = self.resolve(route.pattern)
+            else:
+                winner = self._best_prefix(route.pattern, None)
+            if winner is not None and winner is not route:
+                shadowed.append((route, winner))
+        return shadowed
+
+    def log_startup_report(self) -> List[Tuple[CallbackRoute, CallbackRoute]]:
+        """Log route table size and every shadowed/unreachable pattern"""
+        shadowed = self.shadowed_routes()
+        exact_count = sum(1 for route in self.routes if route.kind == "exact")
+        logger.info(
+            f"🧭 Callback router: {len(self.routes)} routes "
+            f"({exact_count} exact, {len(self.routes) - exact_count} prefix), "
+            f"{len(shadowed)} unreachable"
+        )
+        for route, winner in shadowed:
+            logger.warning(
+                f"🧭 Unreachable callback route {route.describe()} "
+                f"(shadowed by {winner.describe()})"
+            )
+        return shadowed
@@ -0,0 +1,894 @@
+"""
+Callback Routes for Nomadly Clean Bot
+Route table for NomadlyCleanBot.handle_callback_query
+
+Routes are registered in the same order as the original if/elif chain, so the
+first registered match still wins. Patterns that can never be reached (for
+example everything under "dns_" after the generic DNS route) are kept and
+listed by callback_router.log_startup_report() at startup.
+"""
+
+import logging
+
+from callback_router import CallbackRouter
+
+logger = logging.getLogger(__name__)
+
+callback_router = CallbackRouter()
+
+# Immediate acknowledgement text shown while the handler runs
+CALLBACK_ACK_TEXT = {
+    "main_menu": "🏴‍☠️ Loading...",
+    "search_domain": "🔍 Searching...",
+    "my_domains": "📋 Loading...",
+    "wallet": "💰 Opening...",
+    "manage_dns": "🛠️ Loading...",
+    "nameservers": "🔧 Opening...",
+    "loyalty": "🏆 Loading...",
+    "support": "📞 Connecting...",
+    "change_language": "🌍 Loading...",
+    "show_languages": "🔙 Back...",
+}
+
+
+def callback_ack_text(data):
+    """Return the acknowledgement text for a callback"""
+    if data and data.startswith("lang_"):
+        return "✅ Selected"
+    if data in CALLBACK_ACK_TEXT:
+        return CALLBACK_ACK_TEXT[data]
+    if data and data.startswith("register_"):
+        return "🚀 Starting..."
+    return "⚡ Processing..."
+
+
+def _user_id(query):
+    return query.from_user.id if query and query.from_user else 0
+
+
+def _dotted(arg):
+    return arg.replace("_", ".")
+
+
+# Language and main navigation
+
+@callback_router.prefix("lang_")
+async def language_selection(bot, query, data, arg):
+    await bot.handle_language_selection(query, data)
+
+
+@callback_router.exact("main_menu")
+async def main_menu(bot, query, data, arg):
+    # Clear any pending DNS or domain input states for clean navigation
+    user_id = _user_id(query)
+    if user_id in bot.user_sessions:
+        session = bot.user_sessions[user_id]
+        session.pop('waiting_for_nameservers', None)
+        session.pop('waiting_for_dns_input', None)
+        session.pop('waiting_for_dns_edit', None)
+        session.pop('dns_step', None)
+        session.pop('dns_record_name', None)
+        session.pop('dns_record_type', None)
+        session.pop('dns_domain', None)
+
+    await bot.show_main_menu_clean(query)
+
+
+@callback_router.exact("show_languages", "change_language")
+async def language_menu(bot, query, data, arg):
+    await bot.show_language_selection(query)
+
+
+@callback_router.exact("search_domain")
+async def search_domain(bot, query, data, arg):
+    await bot.show_domain_search(query)
+
+
+# Registration workflow
+
+@callback_router.prefix("register_")
+async def register_domain(bot, query, data, arg):
+    await bot.handle_domain_registration(query, arg)
+
+
+@callback_router.prefix("change_email_")
+async def change_email(bot, query, data, arg):
+    await bot.handle_email_change(query, arg)
+
+
+@callback_router.prefix("change_ns_")
+async def change_nameservers(bot, query, data, arg):
+    await bot.handle_nameserver_change(query, arg)
+
+
+@callback_router.prefix("switch_cloudflare_")
+async def switch_cloudflare(bot, query, data, arg):
+    await bot.handle_switch_to_cloudflare(query, arg)
+
+
+@callback_router.prefix("nameservers_")
+async def nameserver_management(bot, query, data, arg):
+    await bot.handle_nameserver_management(query, _dotted(arg))
+
+
+@callback_router.prefix("manage_domain_")
+async def manage_domain(bot, query, data, arg):
+    await bot.handle_domain_management(query, arg)
+
+
+@callback_router.prefix("dns_")
+async def dns_routing(bot, query, data, arg):
+    # NEW CLEAN DNS ROUTING - Simple patterns only
+    logger.info(f"DEBUG: DNS callback caught by dns_ prefix handler: {data}")
+    await bot.handle_new_dns_routing(query, data)
+
+
+@callback_router.prefix("privacy_")
+async def privacy_settings(bot, query, data, arg):
+    await bot.handle_privacy_settings(query, arg)
+
+
+@callback_router.prefix("visibility_")
+async def visibility_control(bot, query, data, arg):
+    await bot.handle_visibility_control(query, arg)
+
+
+@callback_router.prefix("website_")
+async def website_status(bot, query, data, arg):
+    await bot.handle_website_status(query, arg)
+
+
+@callback_router.prefix("access_")
+async def access_control(bot, query, data, arg):
+    await bot.handle_access_control(query, arg)
+
+
+@callback_router.prefix("parking_")
+async def parking_page(bot, query, data, arg):
+    await bot.handle_parking_page(query, arg)
+
+
+@callback_router.prefix("redirect_")
+async def domain_redirect(bot, query, data, arg):
+    await bot.handle_domain_redirect(query, arg)
+
+
+# Payment handlers
+
+@callback_router.prefix("crypto_btc_", "crypto_eth_", "crypto_ltc_", "crypto_doge_")
+async def crypto_address(bot, query, data, arg):
+    crypto_type = data.split("_", 2)[1]
+    await bot.handle_crypto_address(query, crypto_type, arg)
+
+
+@callback_router.prefix("pay_wallet_")
+async def pay_with_wallet(bot, query, data, arg):
+    await bot.handle_wallet_payment_for_domain(query, arg)
+
+
+# NOTE: check_payment_ is handled later with proper crypto_type parsing
+
+@callback_router.prefix("check_wallet_payment_")
+async def check_wallet_funding(bot, query, data, arg):
+    await bot.check_wallet_funding_status(query, arg)
+
+
+# Additional nameserver handlers
+
+@callback_router.prefix("update_custom_ns_")
+async def update_custom_ns(bot, query, data, arg):
+    await bot.handle_update_custom_ns(query, arg)
+
+
+@callback_router.prefix("ns_lookup_")
+async def ns_lookup(bot, query, data, arg):
+    await bot.handle_ns_lookup(query, arg)
+
+
+@callback_router.prefix("current_ns_")
+async def current_ns(bot, query, data, arg):
+    await bot.handle_current_ns(query, arg)
+
+
+@callback_router.prefix("test_dns_")
+async def test_dns(bot, query, data, arg):
+    await bot.handle_test_dns(query, arg)
+
+
+@callback_router.prefix("confirm_ns_update_")
+async def confirm_ns_update(bot, query, data, arg):
+    await bot.confirm_nameserver_update(query, _dotted(arg))
+
+
+# Email selection choices
+
+@callback_router.prefix("email_default_")
+async def email_default(bot, query, data, arg):
+    user_id = _user_id(query)
+    if user_id in bot.user_sessions:
+        bot.user_sessions[user_id]["technical_email"] = "cloakhost@tutamail.com"
+        bot.save_user_sessions()
+    await bot.handle_domain_registration(query, arg)
+
+
+@callback_router.prefix("email_custom_")
+async def email_custom(bot, query, data, arg):
+    if query:
+        await query.edit_message_text(
+            f"📧 **Enter Custom Email**\n\n"
+            f"Please type your email address in the chat.\n\n"
+            f"**Example:** your.email@example.com\n\n"
+            f"You'll receive a welcome email after registration!",
+            parse_mode='Markdown'
+        )
+    # Set waiting state for email input
+    user_id = _user_id(query)
+    if user_id in bot.user_sessions:
+        bot.user_sessions[user_id]["waiting_for_email"] = arg
+        bot.save_user_sessions()
+
+
+# Nameserver selection choices
+
+@callback_router.prefix("ns_nomadly_")
+async def ns_nomadly(bot, query, data, arg):
+    domain = arg
+    user_id = _user_id(query)
+    session = bot.user_sessions.get(user_id, {})
+
+    if user_id in bot.user_sessions:
+        bot.user_sessions[user_id]["nameserver_choice"] = "nomadly"
+        bot.save_user_sessions()
+
+    # Check if user was in payment context
+    payment_context = session.get("payment_address") or session.get("crypto_type")
+
+    if payment_context:
+        # Return to QR page if they have crypto context
+        crypto_type = session.get("crypto_type", "eth")
+        if crypto_type:
+            await bot.handle_qr_generation(query, crypto_type, domain)
+        else:
+            await bot.handle_payment_selection(query, domain)
+    else:
+        # Normal registration flow
+        await bot.handle_domain_registration(query, domain)
+
+
+@callback_router.prefix("ns_custom_")
+async def ns_custom(bot, query, data, arg):
+    if query:
+        await query.edit_message_text(
+            f"🔧 **Enter Custom Nameservers**\n\n"
+            f"Please type your nameservers in the chat, one per line.\n\n"
+            f"**Example:**\n"
+            f"ns1.yourprovider.com\n"
+            f"ns2.yourprovider.com\n\n"
+            f"**Or type them separated by commas:**\n"
+            f"ns1.example.com, ns2.example.com",
+            parse_mode='Markdown'
+        )
+    # Set waiting state for nameserver input
+    user_id = _user_id(query)
+    if user_id in bot.user_sessions:
+        bot.user_sessions[user_id]["waiting_for_ns"] = arg
+        bot.save_user_sessions()
+
+
+# Payment workflow
+
+@callback_router.prefix("payment_")
+async def payment_selection(bot, query, data, arg):
+    await bot.handle_payment_selection(query, arg)
+
+
+@callback_router.prefix("pay_wallet_")
+async def pay_with_wallet_legacy(bot, query, data, arg):
+    if query:
+        await bot.handle_wallet_payment_for_domain(query, arg)
+
+
+@callback_router.prefix("crypto_")
+async def crypto_address_generic(bot, query, data, arg):
+    parts = data.split("_", 2)
+    if len(parts) >= 3:
+        await bot.handle_crypto_address(query, parts[1], parts[2])
+
+
+@callback_router.prefix("check_payment_")
+async def check_payment(bot, query, data, arg):
+    parts = arg.split("_", 1)
+    if len(parts) >= 2:
+        crypto_type = parts[0]
+        domain = parts[1]  # Domain might already contain dots
+        # If domain has no dots, convert underscores to dots
+        if "." not in domain:
+            domain = _dotted(domain)
+        await bot.handle_payment_status_check(query, crypto_type, domain)
+
+
+@callback_router.prefix("generate_qr_")
+async def generate_qr(bot, query, data, arg):
+    parts = data.split("_", 3)
+    if len(parts) >= 4:
+        await bot.handle_qr_generation(query, parts[2], parts[3])
+
+
+@callback_router.prefix("edit_email_")
+async def edit_email(bot, query, data, arg):
+    domain = _dotted(arg)
+    user_id = _user_id(query)
+    if user_id in bot.user_sessions:
+        bot.user_sessions[user_id]["waiting_for_email"] = domain
+        bot.save_user_sessions()
+        await query.edit_message_text(
+            "📧 **Enter technical contact email:**\n\n"
+            "This email will receive domain notifications.\n"
+            "Leave empty for anonymous registration.",
+            parse_mode='Markdown'
+        )
+
+
+@callback_router.prefix("edit_nameservers_")
+async def edit_nameservers(bot, query, data, arg):
+    await bot.handle_nameserver_configuration(query, _dotted(arg))
+
+
+@callback_router.exact("lang_en", "lang_fr", "lang_hi", "lang_zh", "lang_es")
+async def language_selection_explicit(bot, query, data, arg):
+    await bot.handle_language_selection(query, data)
+
+
+# Menu options
+
+@callback_router.exact("my_domains")
+async def my_domains(bot, query, data, arg):
+    await bot.show_my_domains(query)
+
+
+@callback_router.prefix("domains_page_")
+async def my_domains_page(bot, query, data, arg):
+    await bot.show_my_domains(query, arg)
+
+
+@callback_router.prefix("txn_page_")
+async def transaction_history_page(bot, query, data, arg):
+    await bot.show_transaction_history(query, arg)
+
+
+@callback_router.exact("manage_dns")
+async def manage_dns(bot, query, data, arg):
+    logger.info(f"DNS management selected by user {query.from_user.id}")
+    await bot.show_manage_dns(query)
+
+
+@callback_router.exact("nameservers")
+async def nameservers(bot, query, data, arg):
+    await bot.show_nameserver_management(query)
+
+
+@callback_router.exact("support_menu", "support")
+async def support_menu(bot, query, data, arg):
+    await bot.show_support_menu(query)
+
+
+@callback_router.exact("loyalty")
+async def loyalty(bot, query, data, arg):
+    await bot.show_loyalty_dashboard(query)
+
+
+@callback_router.exact("wallet")
+async def wallet(bot, query, data, arg):
+    await bot.show_wallet_menu(query)
+
+
+@callback_router.exact("faq_guides")
+async def faq_guides(bot, query, data, arg):
+    await bot.show_faq_guides(query)
+
+
+@callback_router.exact("new_search")
+async def new_search(bot, query, data, arg):
+    await bot.show_domain_search(query)
+
+
+# Simple DNS action handlers (registered before the generic dns_add_ route
+# so they keep precedence over it)
+
+@callback_router.prefix("dns_add_simple_")
+async def dns_add_simple(bot, query, data, arg):
+    await bot.handle_simple_dns_add(query, arg)
+
+
+@callback_router.prefix("dns_edit_simple_")
+async def dns_edit_simple(bot, query, data, arg):
+    await bot.handle_simple_dns_edit(query, arg)
+
+
+@callback_router.prefix("dns_delete_simple_")
+async def dns_delete_simple(bot, query, data, arg):
+    await bot.handle_simple_dns_delete(query, arg)
+
+
+# DNS Add record type selection (from Try Again button)
+@callback_router.prefix("dns_add_")
+async def dns_add_record_types(bot, query, data, arg):
+    text, keyboard = await bot.new_dns_ui.show_add_record_types(query, arg)
+    await bot.send_clean_message(query, text, keyboard)
+
+
+# Wallet funding options
+
+@callback_router.exact("fund_wallet")
+async def fund_wallet(bot, query, data, arg):
+    await bot.show_wallet_funding_options(query)
+
+
+@callback_router.prefix("fund_crypto_")
+async def fund_crypto(bot, query, data, arg):
+    # Covers fund_crypto_btc/eth/ltc/doge and any other coin suffix
+    await bot.handle_wallet_crypto_funding(query, arg)
+
+
+@callback_router.prefix("check_wallet_payment_")
+async def check_wallet_payment_status(bot, query, data, arg):
+    parts = data.split("_", 3)
+    if len(parts) >= 4:
+        await bot.handle_wallet_payment_status_check(query, parts[3])
+
+
+# Domain management handlers
+
+@callback_router.prefix("manage_domain_")
+async def manage_domain_logged(bot, query, data, arg):
+    logger.info(f"Domain management selected for: {arg}")
+    await bot.handle_domain_management(query, arg)
+
+
+@callback_router.prefix("visibility_")
+async def domain_visibility_control(bot, query, data, arg):
+    await bot.handle_domain_visibility_control(query, arg)
+
+
+@callback_router.prefix("privacy_")
+async def privacy_settings_legacy(bot, query, data, arg):
+    await bot.handle_privacy_settings(query, arg)
+
+
+@callback_router.prefix("website_")
+async def website_control(bot, query, data, arg):
+    await bot.handle_website_control(query, arg)
+
+
+@callback_router.prefix("access_")
+async def access_control_legacy(bot, query, data, arg):
+    await bot.handle_access_control(query, arg)
+
+
+# Portfolio management handlers
+
+@callback_router.exact("portfolio_stats")
+async def portfolio_stats(bot, query, data, arg):
+    await bot.handle_portfolio_stats(query)
+
+
+# Domain redirect and parking handlers
+
+@callback_router.prefix("redirect_")
+async def domain_redirect_legacy(bot, query, data, arg):
+    await bot.handle_domain_redirect(query, arg)
+
+
+@callback_router.prefix("parking_")
+async def domain_parking(bot, query, data, arg):
+    await bot.handle_domain_parking(query, arg)
+
+
+@callback_router.prefix("visibility_")
+async def country_visibility_control(bot, query, data, arg):
+    logger.info(f"🌍 Country visibility clicked - callback: {data}")
+    domain = _dotted(arg)
+    logger.info(f"🌍 Extracted domain: {domain}")
+    await bot.show_country_visibility_control(query, domain)
+
+
+# Country visibility handlers
+
+@callback_router.prefix("geo_mode_")
+async def geo_mode(bot, query, data, arg):
+    # geo_mode_[mode]_[domain]; the modes themselves contain underscores
+    for mode in ("allow_all", "block_except", "allow_only"):
+        if arg.startswith(f"{mode}_"):
+            await bot.handle_geo_mode_selection(query, mode, _dotted(arg[len(mode) + 1:]))
+            return
+
+
+@callback_router.prefix("geo_manage_")
+async def geo_manage(bot, query, data, arg):
+    await bot.show_country_management(query, _dotted(arg))
+
+
+@callback_router.prefix("country_toggle_")
+async def country_toggle(bot, query, data, arg):
+    parts = data.split("_", 3)  # country_toggle_[code]_[domain]
+    if len(parts) >= 4:
+        country_code = parts[2]
+        domain = _dotted("_".join(parts[3:]))
+        await bot.handle_country_toggle(query, country_code, domain)
+
+
+@callback_router.prefix("country_clear_")
+async def country_clear(bot, query, data, arg):
+    await bot.handle_country_clear(query, _dotted(arg))
+
+
+@callback_router.prefix("country_save_")
+async def country_save(bot, query, data, arg):
+    await bot.handle_country_save(query, _dotted(arg))
+
+
+@callback_router.prefix("country_search_")
+async def country_search(bot, query, data, arg):
+    await bot.show_country_search(query, _dotted(arg))
+
+
+# Additional visibility control handlers
+
+@callback_router.prefix("whois_settings_")
+async def whois_settings(bot, query, data, arg):
+    await bot.handle_whois_settings(query, _dotted(arg))
+
+
+@callback_router.prefix("search_visibility_")
+async def search_visibility(bot, query, data, arg):
+    await bot.handle_search_visibility(query, _dotted(arg))
+
+
+@callback_router.prefix("geo_blocking_")
+async def geo_blocking(bot, query, data, arg):
+    await bot.handle_geo_blocking(query, _dotted(arg))
+
+
+@callback_router.prefix("security_settings_")
+async def security_settings(bot, query, data, arg):
+    await bot.handle_security_settings(query, _dotted(arg))
+
+
+# Reports and tools (no-argument menu screens)
+
+_MENU_SCREENS = {
+    "transaction_history": "show_transaction_history",
+    "security_report": "show_security_report",
+    "export_report": "show_export_report",
+    "cost_analysis": "show_cost_analysis",
+    "performance_data": "show_performance_data",
+    "traffic_analytics": "show_traffic_analytics",
+    "geographic_stats": "show_geographic_stats",
+    "dns_health_report": "show_dns_health_report",
+    "feature_comparison": "show_feature_comparison",
+    "manual_setup_guide": "show_manual_setup_guide",
+    "custom_search": "show_custom_search",
+    "check_all_nameservers": "check_all_nameservers",
+    "migrate_to_cloudflare": "migrate_to_cloudflare",
+    "emergency_dns_reset": "emergency_dns_reset",
+    # Bulk operations
+    "bulk_privacy_on": "bulk_privacy_on",
+    "bulk_privacy_off": "bulk_privacy_off",
+    "bulk_search_allow": "bulk_search_allow",
+    "bulk_search_block": "bulk_search_block",
+    "bulk_geo_rules": "bulk_geo_rules",
+    "bulk_security_template": "bulk_security_template",
+    "bulk_reset_all": "bulk_reset_all",
+    "bulk_visibility_report": "bulk_visibility_report",
+}
+
+
+@callback_router.exact(*_MENU_SCREENS)
+async def menu_screen(bot, query, data, arg):
+    await getattr(bot, _MENU_SCREENS[data])(query)
+
+
+# Session-based DNS record handlers
+
+async def _with_session_dns_domain(bot, query, handler):
+    domain = bot.user_sessions.get(query.from_user.id, {}).get("current_dns_domain")
+    if domain:
+        await handler(query, domain)
+    else:
+        await query.answer("Session expired. Please start over.")
+
+
+@callback_router.exact("dns_view_records")
+async def dns_view_records(bot, query, data, arg):
+    await _with_session_dns_domain(bot, query, bot.show_dns_records_view)
+
+
+# Additional DNS record type handlers
+
+@callback_router.prefix("add_aaaa_")
+async def add_aaaa_record(bot, query, data, arg):
+    await bot.handle_add_aaaa_record(query, _dotted(arg))
+
+
+@callback_router.prefix("add_mx_")
+async def add_mx_record(bot, query, data, arg):
+    await bot.handle_add_mx_record(query, _dotted(arg))
+
+
+@callback_router.prefix("add_cname_")
+async def add_cname_record(bot, query, data, arg):
+    await bot.handle_add_cname_record(query, _dotted(arg))
+
+
+@callback_router.prefix("add_txt_")
+async def add_txt_record(bot, query, data, arg):
+    await bot.handle_add_txt_record(query, _dotted(arg))
+
+
+@callback_router.prefix("add_srv_")
+async def add_srv_record(bot, query, data, arg):
+    await bot.handle_add_srv_record(query, _dotted(arg))
+
+
+# Nameserver and maintenance handlers
+
+@callback_router.prefix("switch_custom_")
+async def switch_custom(bot, query, data, arg):
+    await bot.handle_switch_custom_nameservers(query, _dotted(arg))
+
+
+@callback_router.prefix("manual_cloudflare_")
+async def manual_cloudflare(bot, query, data, arg):
+    await bot.handle_manual_cloudflare_setup(query, _dotted(arg))
+
+
+@callback_router.prefix("force_refresh_")
+async def force_refresh(bot, query, data, arg):
+    await bot.handle_force_refresh(query, _dotted(arg))
+
+
+@callback_router.prefix("maintenance_")
+async def maintenance(bot, query, data, arg):
+    await bot.handle_maintenance_mode(query, _dotted(arg))
+
+
+@callback_router.exact("back_to_domain_mgmt")
+async def back_to_domain_mgmt(bot, query, data, arg):
+    await bot.handle_back_to_domain_management(query)
+
+
+@callback_router.prefix("ssl_manage_")
+async def ssl_manage(bot, query, data, arg):
+    await bot.handle_ssl_management(query, _dotted(arg))
+
+
+@callback_router.prefix("cloudflare_status_")
+async def cloudflare_status(bot, query, data, arg):
+    await bot.handle_cloudflare_status(query, _dotted(arg))
+
+
+@callback_router.prefix("site_offline_")
+async def site_offline(bot, query, data, arg):
+    await bot.handle_site_offline(query, _dotted(arg))
+
+
+@callback_router.prefix("cdn_settings_")
+async def cdn_settings(bot, query, data, arg):
+    await bot.handle_cdn_settings(query, _dotted(arg))
+
+
+@callback_router.prefix("add_a_")
+async def add_a_record(bot, query, data, arg):
+    await bot.handle_add_a_record(query, _dotted(arg))
+
+
+@callback_router.prefix("performance_")
+async def performance_settings(bot, query, data, arg):
+    await bot.handle_performance_settings(query, _dotted(arg))
+
+
+@callback_router.prefix("site_online_")
+async def site_online(bot, query, data, arg):
+    await bot.handle_site_online(query, _dotted(arg))
+
+
+# Legacy DNS record workflow
+
+@callback_router.prefix("dns_view_")
+async def dns_view_legacy(bot, query, data, arg):
+    domain = arg
+    # Clean domain of any prefix contamination
+    if '.' in domain:
+        parts = domain.split('.')
+        if len(parts) >= 2:
+            # Get the last two parts as the domain (e.g., claudeb.sbs) in underscore format
+            domain = '.'.join(parts[-2:]).replace('.', '_')
+    await bot.handle_dns_view(query, domain)
+
+
+@callback_router.exact("dns_add_record")
+async def dns_add_record(bot, query, data, arg):
+    await _with_session_dns_domain(bot, query, bot.handle_add_dns_record)
+
+
+@callback_router.prefix("dns_add_")
+async def dns_add_record_legacy(bot, query, data, arg):
+    await bot.handle_add_dns_record(query, arg)
+
+
+@callback_router.prefix("dns_create_")
+async def dns_create_record(bot, query, data, arg):
+    parts = data.split("_")
+    if len(parts) >= 3:
+        await bot.handle_dns_create_record(query, parts[2], "_".join(parts[3:]))
+
+
+@callback_router.prefix("dns_type_")
+async def dns_type_selection(bot, query, data, arg):
+    # dns_type_a_claudeb_sbs -> Show Add/Edit/Delete for A records
+    parts = arg.split("_", 1)
+    if len(parts) == 2:
+        record_type, domain = parts
+        await bot.handle_dns_type_selection(query, record_type, domain)
+
+
+@callback_router.prefix("dns_edit_type_")
+async def dns_edit_type_list(bot, query, data, arg):
+    # dns_edit_type_a_claudeb_sbs -> Show list of A records to edit
+    parts = arg.split("_", 1)
+    if len(parts) == 2:
+        record_type, domain = parts
+        await bot.handle_dns_edit_type_list(query, record_type, domain)
+
+
+@callback_router.prefix("dns_delete_type_")
+async def dns_delete_type_list(bot, query, data, arg):
+    # dns_delete_type_a_claudeb_sbs -> Show list of A records to delete
+    parts = arg.split("_", 1)
+    if len(parts) == 2:
+        record_type, domain = parts
+        await bot.handle_dns_delete_type_list(query, record_type, domain)
+
+
+@callback_router.prefix("dns_confirm_create_")
+async def dns_confirm_create(bot, query, data, arg):
+    await bot.handle_dns_confirm_create(query, _dotted(arg))
+
+
+@callback_router.exact("dns_edit_records")
+async def dns_edit_records(bot, query, data, arg):
+    await _with_session_dns_domain(bot, query, bot.show_edit_dns_records_list)
+
+
+@callback_router.prefix("dns_edit_list_")
+async def dns_edit_list_legacy(bot, query, data, arg):
+    logger.info(f"DNS edit list selected with domain (legacy): {arg}")
+    await bot.show_edit_dns_records_list(query, arg)
+
+
+@callback_router.exact("dns_delete_records")
+async def dns_delete_records(bot, query, data, arg):
+    await _with_session_dns_domain(bot, query, bot.show_delete_dns_records_list)
+
+
+@callback_router.prefix("dns_delete_list_")
+async def dns_delete_list_legacy(bot, query, data, arg):
+    await bot.show_delete_dns_records_list(query, arg)
+
+
+@callback_router.prefix("edit_dns_")
+async def edit_dns_record(bot, query, data, arg):
+    logger.info(f"🔧 DNS EDIT CALLBACK: {data}")
+
+    if data.startswith("edit_dns_record_"):
+        # Legacy format: edit_dns_record_claudeb.sbs_2 -> ['claudeb.sbs', '2']
+        parts = data.replace("edit_dns_record_", "").rsplit("_", 1)
+        if len(parts) == 2:
+            domain = parts[0]
+            record_index = int(parts[1])
+            record_id = f"idx_{record_index}"  # Convert to index format for compatibility
+            logger.info(f"🔧 DNS EDIT PARSED (legacy): record_id='{record_id}', domain='{domain}', index={record_index}")
+            await bot.handle_edit_dns_record(query, record_id, domain)
+        else:
+            logger.error(f"🔧 DNS EDIT PARSING FAILED (legacy): Expected 2 parts, got {len(parts)}: {parts}")
+        return
+
+    # New format: edit_dns_{record_id}_{domain_with_underscores}
+    # Example: edit_dns_823d11992ce992a6d14865cc0ec5bebe_claudeb_sbs
+    parts = arg.rsplit("_", 2)  # Split into max 3 parts from right
+    logger.info(f"🔧 DNS EDIT PARTS: {parts}")
+
+    if len(parts) >= 3:
+        # Format: {record_id}_{domain_part1}_{domain_part2}
+        record_id = parts[0]  # Real Cloudflare record ID
+        domain = f"{parts[1]}.{parts[2]}"
+        logger.info(f"🔧 DNS EDIT PARSED: record_id='{record_id}', domain='{domain}'")
+        await bot.handle_edit_dns_record(query, record_id, domain)
+    elif len(parts) == 2:
+        # Fallback for single TLD domains
+        record_id = parts[0]
+        domain = _dotted(parts[1])
+        logger.info(f"🔧 DNS EDIT PARSED (fallback): record_id='{record_id}', domain='{domain}'")
+        await bot.handle_edit_dns_record(query, record_id, domain)
+    else:
+        logger.error(f"🔧 DNS EDIT PARSING FAILED: Expected at least 2 parts, got {len(parts)}: {parts}")
+
+
+@callback_router.prefix("delete_dns_record_")
+async def delete_dns_record(bot, query, data, arg):
+    # Format: delete_dns_record_claudeb.sbs_6
+    parts = arg.rsplit("_", 1)
+    if len(parts) == 2:
+        domain, record_index = parts
+        logger.info(f"🗑️ DNS DELETE PARSED: domain='{domain}', record_index='{record_index}'")
+        await bot.handle_delete_dns_record(query, f"idx_{record_index}", domain)
+
+
+@callback_router.exact("dns_switch_ns")
+async def dns_switch_ns(bot, query, data, arg):
+    await _with_session_dns_domain(bot, query, bot.show_nameserver_switch_options)
+
+
+@callback_router.prefix("ns_switch_")
+async def ns_switch_legacy(bot, query, data, arg):
+    await bot.show_nameserver_switch_options(query, arg)
+
+
+@callback_router.prefix("ns_cloudflare_")
+async def ns_cloudflare(bot, query, data, arg):
+    await bot.switch_to_cloudflare_dns(query, arg)
+
+
+@callback_router.prefix("ns_custom_")
+async def ns_custom_switch(bot, query, data, arg):
+    await bot.switch_to_custom_nameservers(query, arg)
+
+
+@callback_router.prefix("already_cloudflare_")
+async def already_cloudflare(bot, query, data, arg):
+    await bot.handle_already_on_cloudflare(query, arg)
+
+
+@callback_router.prefix("add_dns_record_")
+async def add_dns_record(bot, query, data, arg):
+    await bot.handle_add_dns_record(query, arg)
+
+
+@callback_router.prefix("dns_replace_")
+async def dns_replace_record(bot, query, data, arg):
+    # DNS record replacement for conflicts: dns_replace_{domain}_{record_type}
+    parts = arg.rsplit("_", 1)
+    if len(parts) == 2:
+        domain_encoded, record_type = parts
+        await bot.handle_dns_replace_record(query, _dotted(domain_encoded), record_type)
+
+
+@callback_router.prefix("whois_settings_")
+async def whois_settings_raw(bot, query, data, arg):
+    await bot.handle_whois_settings(query, arg)
+
+
+@callback_router.prefix("search_visibility_")
+async def search_visibility_raw(bot, query, data, arg):
+    await bot.handle_search_visibility(query, arg)
+
+
+@callback_router.prefix("geo_blocking_")
+async def geo_blocking_raw(bot, query, data, arg):
+    await bot.handle_geo_blocking(query, arg)
+
+
+@callback_router.prefix("security_settings_")
+async def security_settings_raw(bot, query, data, arg):
+    await bot.handle_security_settings(query, arg)
+
+
+# Mass DNS operations
+
+@callback_router.exact(
+    "mass_add_a_record", "mass_update_mx", "mass_configure_spf",
+    "mass_change_ns", "mass_cloudflare_migrate", "mass_cloudflare_migrate_confirm",
+    "mass_propagation_check",
+)
+async def mass_dns_operation(bot, query, data, arg):
+    await getattr(bot, data)(query)
@@ -0,0 +1,153 @@
+"""
+Cloudflare Transport for Nomadly Bot
+One long-lived, pooled httpx client for every Cloudflare API call
+
+Each Cloudflare helper used to open its own ``httpx.AsyncClient()`` and pay
+TCP + TLS setup for a single request. All of them now borrow the shared
+client through ``cloudflare_transport.session()``, which keeps connections
+alive between calls (HTTP/2 when the ``h2`` package is installed, so
+concurrent calls multiplex over one connection). Every request goes to
+api.cloudflare.com, so the pool limits are the per-host limits.
+
+httpx clients belong to the event loop they were first used on; the bot
+loop gets the long-lived client, and the rare call from another loop (the
+sync wrappers' background loop) gets a client of its own on that loop.
+"""
+
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+CLOUDFLARE_API_BASE = "https://api.cloudflare.com/client/v4"
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class _CountingTransport(httpx.AsyncBaseTransport):
+    """Wraps the pooled transport to count requests and new connections"""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport, owner: "CloudflareTransport"):
+        self._inner = inner
+        self._owner = owner
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        owner = self._owner
+        owner.requests += 1
+        owner.in_flight += 1
+        owner.peak_in_flight = max(owner.peak_in_flight, owner.in_flight)
+        request.extensions["trace"] = owner._trace
+        try:
+            return await self._inner.handle_async_request(request)
+        except Exception:
+            owner.errors += 1
+            raise
+        finally:
+            owner.in_flight -= 1
+
+    async def aclose(self) -> None:
+        await self._inner.aclose()
+
+
+class CloudflareTransport:
+    """Process-wide pooled client for the Cloudflare API.
+
+    start()/aclose() are tied to the bot Application's post_init and
+    post_shutdown; session() also creates the client lazily so scripts that
+    never run the Application still share one pool.
+    """
+
+    def __init__(self, max_connections: int = 20, max_keepalive: int = 10,
+                 keepalive_expiry: float = 60.0, timeout: float = 15.0,
+                 http2: Optional[bool] = None):
+        if http2 is None:
+            http2 = os.getenv("CLOUDFLARE_HTTP2", "true").lower() != "false"
+        if http2 and not _http2_available():
+            logger.info("☁️ h2 not installed, Cloudflare transport using HTTP/1.1 keep-alive")
+            http2 = False
+        self.http2 = http2
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = timeout
+        self._clients: Dict[asyncio.AbstractEventLoop, httpx.AsyncClient] = {}
+        self.requests = 0
+        self.connections_opened = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.errors = 0
+
+    def _build_client(self) -> httpx.AsyncClient:
+        pool = httpx.AsyncHTTPTransport(limits=self.limits, http2=self.http2, retries=1)
+        return httpx.AsyncClient(transport=_CountingTransport(pool, self), timeout=self.timeout)
+
+    def client(self) -> httpx.AsyncClient:
+        """Shared client for the running event loop"""
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None or client.is_closed:
+            # Drop clients whose loop is gone; they cannot be closed from here
+            for stale in [l for l in self._clients if l.is_closed()]:
+                del self._clients[stale]
+            client = self._build_client()
+            self._clients[loop] = client
+        return client
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator[httpx.AsyncClient]:
+        """Drop-in for ``async with httpx.AsyncClient() as client`` that keeps the pool open"""
+        yield self.client()
+
+    async def start(self) -> None:
+        self.client()
+        logger.info(
+            f"☁️ Cloudflare transport ready: {'HTTP/2' if self.http2 else 'HTTP/1.1'}, "
+            f"{self.limits.max_connections} connections, {self.limits.max_keepalive_connections} keep-alive"
+        )
+
+    async def aclose(self) -> None:
+        """Close the client owned by the running loop (call from post_shutdown)"""
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+        logger.info(f"☁️ Cloudflare transport closed: {self.stats()}")
+
+    async def _trace(self, event_name: str, info: Dict[str, Any]) -> None:
+        if event_name == "connection.connect_tcp.complete":
+            self.connections_opened += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool utilisation and connection reuse for monitoring"""
+        max_connections = self.limits.max_connections or 0
+        return {
+            "http2": self.http2,
+            "requests": self.requests,
+            "connections_opened": self.connections_opened,
+            "reuse_ratio": round(1 - self.connections_opened / self.requests, 3) if self.requests else 0.0,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "pool_utilisation": round(self.in_flight / max_connections, 3) if max_connections else 0.0,
+            "peak_pool_utilisation": round(self.peak_in_flight / max_connections, 3) if max_connections else 0.0,
+            "errors": self.errors,
+            "clients": len(self._clients),
+        }
+
+
+# Global transport instance
+cloudflare_transport = CloudflareTransport(
+    max_connections=int(os.getenv("CLOUDFLARE_MAX_CONNECTIONS", "20")),
+    max_keepalive=int(os.getenv("CLOUDFLARE_MAX_KEEPALIVE", "10")),
+)
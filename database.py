@@ -24,6 +24,8 @@ from sqlalchemy import (
     Index,
     Date,
     create_engine,
+    text,
+    update,
 )
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.declarative import declarative_base
@@ -35,6 +37,11 @@ Base = declarative_base()
 import logging
 logger = logging.getLogger(__name__)
 
+from fast_response_cache import availability_cache
+from zone_resolver import zone_id_resolver
+from app.core.pagination import PAGE_SIZE, Page, paginate
+from stats_rollup import ALL_TIME, StatsSnapshot, window_start
+
 class User(Base):
     """User accounts with language preference and wallet balance"""
 
@@ -51,7 +58,7 @@ class User(Base):
         String(255), nullable=True
     )  # Store user's technical email once
     is_admin = Column(Boolean, default=False)
-    created_at = Column(DateTime, default=func.now())
+    created_at = Column(DateTime, default=func.now(), server_default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
 
     # Relationships
@@ -73,7 +80,11 @@ class UserState(Base):
     """User conversation state management"""
 
     __tablename__ = "user_states"
-    __table_args__ = {'extend_existing': True}
+    # Hot-path indexes are built CONCURRENTLY by database_migrations/001_hot_path_indexes
+    __table_args__ = (
+        Index("idx_user_states_telegram_state", "telegram_id", "state"),
+        {'extend_existing': True},
+    )
 
     id = Column(Integer, primary_key=True)
     telegram_id = Column(
@@ -92,7 +103,14 @@ class RegisteredDomain(Base):
     """Domain registrations with DNS and nameserver management"""
 
     __tablename__ = "registered_domains"
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        Index("idx_registered_domains_telegram_status", "telegram_id", "status"),
+        Index("idx_registered_domains_active_expiry", "expires_at",
+              postgresql_where=text("status = 'active'")),
+        Index("idx_registered_domains_telegram_registered", "telegram_id",
+              text("registration_date DESC"), text("id DESC")),
+        {'extend_existing': True},
+    )
 
     id = Column(Integer, primary_key=True)
     telegram_id = Column(
@@ -110,7 +128,7 @@ class RegisteredDomain(Base):
     nameserver_mode = Column(String(50), default="cloudflare")
 
     # Registration details
-    registration_date = Column(DateTime, default=func.now())
+    registration_date = Column(DateTime, default=func.now(), server_default=func.now())
     expires_at = Column(DateTime)
     auto_renew = Column(Boolean, default=True)
     status = Column(String(50), default="active")
@@ -119,7 +137,7 @@ class RegisteredDomain(Base):
     price_paid = Column(DECIMAL(10, 2))
     payment_method = Column(String(50))
 
-    created_at = Column(DateTime, default=func.now())
+    created_at = Column(DateTime, default=func.now(), server_default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
 
     user = relationship("User", back_populates="domains")
@@ -155,7 +173,10 @@ class WalletTransaction(Base):
     """Wallet and cryptocurrency transaction history"""
 
     __tablename__ = "wallet_transactions"
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        Index("idx_wallet_transactions_telegram_created", "telegram_id", text("created_at DESC")),
+        {'extend_existing': True},
+    )
 
     id = Column(Integer, primary_key=True)
     telegram_id = Column(
@@ -177,7 +198,7 @@ class WalletTransaction(Base):
     description = Column(Text)
     transaction_metadata = Column(JSONB, default={})
 
-    created_at = Column(DateTime, default=func.now())
+    created_at = Column(DateTime, default=func.now(), server_default=func.now())
     confirmed_at = Column(DateTime)
     order_name = Column(String(100))
     domain_name = Column(String(100))
@@ -349,6 +370,9 @@ class Order(Base):
     """Order processing for all services"""
 
     __tablename__ = "orders"
+    __table_args__ = (
+        Index("idx_orders_telegram_created", "telegram_id", text("created_at DESC"), text("id DESC")),
+    )
 
     id = Column(Integer, primary_key=True)
     order_id = Column(String(100), unique=True, nullable=False, index=True)
@@ -365,7 +389,7 @@ class Order(Base):
     crypto_currency = Column(String(10))
     crypto_amount = Column(DECIMAL(18, 8))
     blockbee_payment_id = Column(String(100))
-    created_at = Column(DateTime, default=func.now())
+    created_at = Column(DateTime, default=func.now(), server_default=func.now())
     completed_at = Column(DateTime)
     expires_at = Column(DateTime)
 
@@ -415,6 +439,77 @@ class AuditLog(Base):
     )
 
 
+# stats_rollup only works together with the triggers of database_migrations/003,
+# so it has its own metadata: create_all on Base must not build it bare, where
+# the dashboards would read zeros that never change
+RollupBase = declarative_base()
+
+
+class StatsRollup(RollupBase):
+    """Per-day and all-time dashboard counters, maintained by triggers (see stats_rollup.py)"""
+
+    __tablename__ = "stats_rollup"
+
+    day = Column(Date, primary_key=True)  # ALL_TIME (0001-01-01) for the all-time bucket
+    metric = Column(String(64), primary_key=True)
+    slot = Column(Integer, primary_key=True, default=0)  # write shard, summed on read
+    value = Column(DECIMAL(18, 2), nullable=False, default=0)
+    updated_at = Column(DateTime, default=func.now())
+
+def apply_balance_delta(
+    session: Session, telegram_id: int, delta, allow_negative: bool = False
+) -> Optional[Decimal]:
+    """Add delta to a user's balance in one statement and return the new balance.
+
+    ``UPDATE users SET balance_usd = balance_usd + :delta ... RETURNING`` only
+    takes the user's row lock, so concurrent credits and debits queue on
+    that row instead of overwriting each other's read-modify-write. A debit
+    that would take the balance below zero matches no row, as does an
+    unknown user; both return None and change nothing. The caller's session
+    owns the transaction, so a ledger row can be committed with the update.
+    """
+    return session.execute(
+        balance_delta_statement(telegram_id, delta, allow_negative)
+    ).scalar_one_or_none()
+
+
+def balance_delta_statement(telegram_id: int, delta, allow_negative: bool = False):
+    """The conditional UPDATE ... RETURNING behind apply_balance_delta (shared with async_database)"""
+    delta = Decimal(str(delta))
+    balance = func.coalesce(User.balance_usd, 0)
+    statement = update(User).where(User.telegram_id == telegram_id)
+    if delta < 0 and not allow_negative:
+        statement = statement.where(balance + delta >= 0)
+    return (
+        statement.values(balance_usd=balance + delta, updated_at=func.now())
+        .returning(User.balance_usd)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def order_payment_update(order_id: str, payment_status: str = None, crypto_currency: str = None):
+    """UPDATE orders for update_order_payment as (sql, params), or None when nothing changes"""
+    update_parts = []
+    params = {'order_id': order_id}
+
+    if payment_status:
+        update_parts.append("status = :status")
+        params['status'] = payment_status
+    if crypto_currency:
+        update_parts.append("crypto_currency = :crypto_currency")
+        params['crypto_currency'] = crypto_currency
+    if payment_status == "completed":
+        update_parts.append("completed_at = now()")
+
+    if not update_parts:
+        return None
+    return f"""
+        UPDATE orders 
+        SET {', '.join(update_parts)}
+        WHERE order_id = :order_id
+    """, params
+
+
 class DatabaseManager:
     def get_connection(self):
         """Get database connection for direct SQL queries"""
@@ -544,26 +639,40 @@ class DatabaseManager:
             session.close()
 
     def update_user_balance(
-        self, telegram_id: int, amount: float, transaction_type: str = "admin_credit"
-    ):
-        """Update user balance and create transaction record"""
+        self,
+        telegram_id: int,
+        amount: float,
+        transaction_type: str = None,
+        description: str = None,
+    ) -> Optional[float]:
+        """Credit (positive) or debit (negative) a user's balance atomically.
+
+        With a transaction_type, a confirmed wallet_transactions row is
+        written in the same transaction as the balance change. Returns the
+        new balance, or None when the user is unknown or a debit exceeds
+        the balance.
+        """
         session = self.get_session()
         try:
-            user = session.query(User).filter(User.telegram_id == telegram_id).first()
-            if user:
-                user.balance_usd = float(user.balance_usd) + amount
-                user.updated_at = datetime.utcnow()
-
-                # Create transaction record
-                transaction = WalletTransaction(
+            new_balance = apply_balance_delta(session, telegram_id, amount)
+            if new_balance is None:
+                session.rollback()
+                logger.warning(f"💳 Balance change of {amount} rejected for user {telegram_id}")
+                return None
+
+            if transaction_type:
+                session.add(WalletTransaction(
                     telegram_id=telegram_id,
                     transaction_type=transaction_type,
                     amount=amount,
                     status="confirmed",
-                    description=f"Balance {transaction_type}: ${amount}",
-                )
-                session.add(transaction)
-                session.commit()
+                    description=description or f"Balance {transaction_type}: ${amount}",
+                ))
+            session.commit()
+            return float(new_balance)
+        except Exception:
+            session.rollback()
+            raise
         finally:
             session.close()
 
@@ -580,7 +689,35 @@ class DatabaseManager:
             return domains
         finally:
             session.close()
+
+    def get_user_domains_page(
+        self, telegram_id: int, cursor: str = None, limit: int = PAGE_SIZE
+    ) -> Page:
+        """One keyset page of a user's domains, newest first"""
+        session = self.get_session()
+        try:
+            return paginate(
+                session.query(RegisteredDomain).filter(RegisteredDomain.telegram_id == telegram_id),
+                RegisteredDomain.registration_date, RegisteredDomain.id, limit, cursor,
+            )
+        finally:
+            session.close()
     
+    def get_zone_id_by_domain(self, domain_name: str) -> Optional[str]:
+        """Get the stored cloudflare_zone_id for one domain (indexed single-row query)"""
+        session = self.get_session()
+        try:
+            return (
+                session.query(RegisteredDomain.cloudflare_zone_id)
+                .filter(RegisteredDomain.domain_name == domain_name)
+                .filter(RegisteredDomain.cloudflare_zone_id.isnot(None))
+                .filter(RegisteredDomain.cloudflare_zone_id != "")
+                .limit(1)
+                .scalar()
+            )
+        finally:
+            session.close()
+
     def update_domain_zone_id(self, domain_name: str, cloudflare_zone_id: str):
         """Update cloudflare_zone_id for a domain"""
         session = self.get_session()
@@ -593,6 +730,7 @@ class DatabaseManager:
             if domain:
                 domain.cloudflare_zone_id = cloudflare_zone_id
                 session.commit()
+                zone_id_resolver.invalidate(domain_name)
                 logger.info(f"Updated cloudflare_zone_id for {domain_name}: {cloudflare_zone_id}")
             else:
                 logger.warning(f"Domain {domain_name} not found for cloudflare_zone_id update")
@@ -705,6 +843,8 @@ class DatabaseManager:
             session.add(domain)
             session.commit()
             session.refresh(domain)
+            availability_cache.invalidate(domain_name)
+            zone_id_resolver.invalidate(domain_name)
             return domain
         finally:
             session.close()
@@ -721,6 +861,7 @@ class DatabaseManager:
             if domain:
                 domain.cloudflare_zone_id = cloudflare_zone_id
                 session.commit()
+                zone_id_resolver.invalidate(domain.domain_name)
         finally:
             session.close()
 
@@ -772,6 +913,8 @@ class DatabaseManager:
             session.add(domain)
             session.commit()
             session.refresh(domain)
+            availability_cache.invalidate(domain_name)
+            zone_id_resolver.invalidate(domain_name)
             return domain
         finally:
             session.close()
@@ -963,6 +1106,19 @@ class DatabaseManager:
         finally:
             session.close()
 
+    def get_user_orders_page(
+        self, telegram_id: int, cursor: str = None, limit: int = PAGE_SIZE
+    ) -> Page:
+        """One keyset page of a user's orders, newest first"""
+        session = self.get_session()
+        try:
+            return paginate(
+                session.query(Order).filter(Order.telegram_id == telegram_id),
+                Order.created_at, Order.id, limit, cursor,
+            )
+        finally:
+            session.close()
+
     def create_transaction(
         self,
         telegram_id: int,
@@ -1051,19 +1207,6 @@ class DatabaseManager:
         finally:
             session.close()
 
-    def update_user_balance(self, telegram_id: int, amount_change: float):
-        """Update user balance (can be positive or negative)"""
-        session = self.get_session()
-        try:
-            user = session.query(User).filter(User.telegram_id == telegram_id).first()
-            if user:
-                user.balance_usd = float(user.balance_usd or 0.0) + amount_change
-                if user.balance_usd < 0:
-                    user.balance_usd = 0.0  # Prevent negative balance
-                session.commit()
-        finally:
-            session.close()
-
     def set_user_balance(self, telegram_id: int, amount_change: float):
         """Update user balance (can be positive or negative)"""
         session = self.get_session()
@@ -1158,24 +1301,9 @@ class DatabaseManager:
         session = self.get_session()
         try:
             # Build dynamic update query based on provided parameters
-            update_parts = []
-            params = {'order_id': order_id}
-            
-            if payment_status:
-                update_parts.append("status = :status")
-                params['status'] = payment_status
-            if crypto_currency:
-                update_parts.append("crypto_currency = :crypto_currency")
-                params['crypto_currency'] = crypto_currency
-            if payment_status == "completed":
-                update_parts.append("completed_at = now()")
-                
-            if update_parts:
-                update_sql = f"""
-                    UPDATE orders 
-                    SET {', '.join(update_parts)}
-                    WHERE order_id = :order_id
-                """
+            order_update = order_payment_update(order_id, payment_status, crypto_currency)
+            if order_update:
+                update_sql, params = order_update
                 session.execute(text(update_sql), params)
                 session.commit()
                 
@@ -1244,27 +1372,48 @@ class DatabaseManager:
         finally:
             session.close()
 
-    def get_system_statistics(self) -> Dict:
-        """Get system statistics for admin dashboard"""
+    def get_user_transactions_page(
+        self, telegram_id: int, cursor: str = None, limit: int = PAGE_SIZE
+    ) -> Page:
+        """One keyset page of a user's wallet transactions, newest first"""
         session = self.get_session()
         try:
-            stats = {}
-            stats["total_users"] = session.query(User).count()
-            stats["total_domains"] = session.query(RegisteredDomain).count()
-            stats["total_transactions"] = session.query(WalletTransaction).count()
-            stats["pending_orders"] = (
-                session.query(Order).filter(Order.payment_status == "pending").count()
+            return paginate(
+                session.query(WalletTransaction).filter(WalletTransaction.telegram_id == telegram_id),
+                WalletTransaction.created_at, WalletTransaction.id, limit, cursor,
             )
-            stats["total_revenue"] = (
-                session.query(func.sum(WalletTransaction.amount))
-                .filter(WalletTransaction.transaction_type == "payment")
-                .scalar()
-                or 0
+        finally:
+            session.close()
+
+    def get_stats_snapshot(self) -> StatsSnapshot:
+        """Dashboard counters from stats_rollup: the all-time bucket and the last month of days"""
+        session = self.get_session()
+        try:
+            today = session.query(func.current_date()).scalar()
+            rows = (
+                session.query(StatsRollup.day, StatsRollup.metric, func.sum(StatsRollup.value))
+                .filter(
+                    (StatsRollup.day == ALL_TIME)
+                    | (StatsRollup.day >= window_start(today))
+                )
+                .group_by(StatsRollup.day, StatsRollup.metric)
+                .all()
             )
-            return stats
+            return StatsSnapshot(rows, today)
         finally:
             session.close()
 
+    def get_system_statistics(self) -> Dict:
+        """Get system statistics for admin dashboard"""
+        stats = self.get_stats_snapshot()
+        return {
+            "total_users": int(stats.total("users")),
+            "total_domains": int(stats.total("domains")),
+            "total_transactions": int(stats.total("transactions")),
+            "pending_orders": int(stats.total("orders:pending")),
+            "total_revenue": stats.total("wallet:payment"),
+        }
+
     def get_state_data(self, telegram_id: int, state: str) -> Dict:
         """Get user state data"""
         session = self.get_session()
@@ -0,0 +1,35 @@
+-- Database Migration 001: Hot Path Indexes
+-- Created: 2026-10-16
+-- Description: Indexes for the payment monitor, wallet history, domain lists,
+-- expiry scans and conversation state lookups. Built CONCURRENTLY so writes
+-- keep flowing; MigrationManager runs this file outside a transaction.
+
+-- Payment monitor: WHERE crypto_address = ANY(...) every cycle
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_orders_crypto_address
+    ON orders (crypto_address)
+    WHERE crypto_address IS NOT NULL;
+
+-- Wallet history: WHERE telegram_id = ? ORDER BY created_at DESC
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_wallet_transactions_telegram_created
+    ON wallet_transactions (telegram_id, created_at DESC);
+
+-- Domain lists filtered by status: WHERE telegram_id = ? AND status = ?
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_registered_domains_telegram_status
+    ON registered_domains (telegram_id, status);
+
+-- DomainRepository.get_expiring_domains: active domains ordered by expires_at
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_registered_domains_active_expiry
+    ON registered_domains (expires_at)
+    WHERE status = 'active';
+
+-- Conversation state: WHERE telegram_id = ? [AND state = ?]
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_user_states_telegram_state
+    ON user_states (telegram_id, state);
+
+-- ROLLBACK
+-- DROP INDEX CONCURRENTLY IF EXISTS idx_user_states_telegram_state;
+-- DROP INDEX CONCURRENTLY IF EXISTS idx_registered_domains_active_expiry;
+-- DROP INDEX CONCURRENTLY IF EXISTS idx_registered_domains_telegram_status;
+-- DROP INDEX CONCURRENTLY IF EXISTS idx_wallet_transactions_telegram_created;
+-- DROP INDEX CONCURRENTLY IF EXISTS idx_orders_crypto_address;
+-- END ROLLBACK
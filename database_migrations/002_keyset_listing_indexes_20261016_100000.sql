@@ -0,0 +1,18 @@
+-- Database Migration 002: Keyset Listing Indexes
+-- Created: 2026-10-16
+-- Description: Indexes matching the (sort column, id) order of the keyset-paged
+-- listings in app/core/pagination.py, so any page is one index seek.
+-- wallet_transactions is already covered by idx_wallet_transactions_telegram_created.
+
+-- My Domains: WHERE telegram_id = ? ORDER BY registration_date DESC, id DESC
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_registered_domains_telegram_registered
+    ON registered_domains (telegram_id, registration_date DESC, id DESC);
+
+-- Order history: WHERE telegram_id = ? ORDER BY created_at DESC, id DESC
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_orders_telegram_created
+    ON orders (telegram_id, created_at DESC, id DESC);
+
+-- ROLLBACK
+-- DROP INDEX CONCURRENTLY IF EXISTS idx_orders_telegram_created;
+-- DROP INDEX CONCURRENTLY IF EXISTS idx_registered_domains_telegram_registered;
+-- END ROLLBACK
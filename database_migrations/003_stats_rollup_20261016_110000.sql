@@ -0,0 +1,152 @@
+-- Database Migration 003: Stats Rollup
+-- Created: 2026-10-16
+-- Description: Per-day and all-time counters for the admin dashboards, kept
+-- current by row triggers on users, registered_domains, orders and
+-- wallet_transactions. Rows per (day, metric); the all-time bucket is
+-- day 0001-01-01. Rows without a created_at only count towards all-time.
+-- Every write touches the all-time and today's row of its metrics, so each
+-- (day, metric) is spread over 16 slots picked by backend: concurrent writers
+-- on different connections update different rows instead of queueing on one
+-- row lock. Readers sum the slots.
+-- After applying, run `python stats_rollup.py` once to backfill history.
+-- TRUNCATE skips row triggers, so rerun the backfill after one.
+
+CREATE TABLE IF NOT EXISTS stats_rollup (
+    day DATE NOT NULL,
+    metric VARCHAR(64) NOT NULL,
+    slot SMALLINT NOT NULL DEFAULT 0,
+    value NUMERIC(18, 2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (day, metric, slot)
+);
+
+-- Add delta to a metric on its day and in the all-time bucket, in this backend's slot
+CREATE OR REPLACE FUNCTION stats_rollup_add(p_day DATE, p_metric TEXT, p_delta NUMERIC)
+RETURNS VOID LANGUAGE sql AS $$
+    INSERT INTO stats_rollup AS s (day, metric, slot, value, updated_at)
+    SELECT DISTINCT d, p_metric, pg_backend_pid() % 16, p_delta, now()
+    FROM unnest(ARRAY[DATE '0001-01-01', p_day]) AS d
+    ORDER BY d
+    ON CONFLICT (day, metric, slot) DO UPDATE
+        SET value = s.value + EXCLUDED.value, updated_at = EXCLUDED.updated_at
+$$;
+
+-- What one row contributes; the backfill job aggregates the same functions
+CREATE OR REPLACE FUNCTION stats_rollup_user_metrics(u users)
+RETURNS TABLE (day DATE, metric TEXT, value NUMERIC) LANGUAGE sql STABLE STRICT AS $$
+    SELECT COALESCE(u.created_at::date, DATE '0001-01-01'), 'users'::text, 1::numeric
+$$;
+
+CREATE OR REPLACE FUNCTION stats_rollup_domain_metrics(d registered_domains)
+RETURNS TABLE (day DATE, metric TEXT, value NUMERIC) LANGUAGE sql STABLE STRICT AS $$
+    SELECT COALESCE(d.created_at::date, DATE '0001-01-01'), 'domains'::text, 1::numeric
+$$;
+
+CREATE OR REPLACE FUNCTION stats_rollup_order_metrics(o orders)
+RETURNS TABLE (day DATE, metric TEXT, value NUMERIC) LANGUAGE sql STABLE STRICT AS $$
+    SELECT COALESCE(o.created_at::date, DATE '0001-01-01'), m.metric, m.value
+    FROM (VALUES
+        ('orders', 1::numeric, true),
+        ('orders:' || COALESCE(o.payment_status, 'unknown'), 1, true),
+        ('revenue:' || lower(COALESCE(o.crypto_currency, o.payment_method, 'other')),
+            o.amount_usd, o.payment_status = 'completed'),
+        ('completed:' || COALESCE(o.service_type, 'other'), 1, o.payment_status = 'completed'),
+        ('completed_via:' || COALESCE(o.payment_method, 'other'), 1, o.payment_status = 'completed')
+    ) AS m (metric, value, applies)
+    WHERE m.applies
+$$;
+
+CREATE OR REPLACE FUNCTION stats_rollup_wallet_metrics(w wallet_transactions)
+RETURNS TABLE (day DATE, metric TEXT, value NUMERIC) LANGUAGE sql STABLE STRICT AS $$
+    SELECT COALESCE(w.created_at::date, DATE '0001-01-01'), m.metric, m.value
+    FROM (VALUES
+        ('transactions', 1::numeric),
+        ('wallet:' || COALESCE(w.transaction_type, 'other'), COALESCE(w.amount, 0))
+    ) AS m (metric, value)
+$$;
+
+-- Row trigger: take back what OLD contributed, add what NEW contributes.
+-- TG_ARGV[0] names the table's metrics function.
+CREATE OR REPLACE FUNCTION stats_rollup_trigger()
+RETURNS TRIGGER LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        EXECUTE format('SELECT stats_rollup_add(m.day, m.metric, -m.value) FROM %I($1) m', TG_ARGV[0])
+            USING OLD;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        EXECUTE format('SELECT stats_rollup_add(m.day, m.metric, m.value) FROM %I($1) m', TG_ARGV[0])
+            USING NEW;
+    END IF;
+    RETURN NULL;
+END
+$$;
+
+-- Updates only fire when a column the metrics read actually changes
+DROP TRIGGER IF EXISTS stats_rollup_users ON users;
+CREATE TRIGGER stats_rollup_users
+    AFTER INSERT OR DELETE ON users
+    FOR EACH ROW EXECUTE FUNCTION stats_rollup_trigger('stats_rollup_user_metrics');
+DROP TRIGGER IF EXISTS stats_rollup_users_update ON users;
+CREATE TRIGGER stats_rollup_users_update
+    AFTER UPDATE OF created_at ON users
+    FOR EACH ROW WHEN (OLD.created_at IS DISTINCT FROM NEW.created_at)
+    EXECUTE FUNCTION stats_rollup_trigger('stats_rollup_user_metrics');
+
+DROP TRIGGER IF EXISTS stats_rollup_domains ON registered_domains;
+CREATE TRIGGER stats_rollup_domains
+    AFTER INSERT OR DELETE ON registered_domains
+    FOR EACH ROW EXECUTE FUNCTION stats_rollup_trigger('stats_rollup_domain_metrics');
+DROP TRIGGER IF EXISTS stats_rollup_domains_update ON registered_domains;
+CREATE TRIGGER stats_rollup_domains_update
+    AFTER UPDATE OF created_at ON registered_domains
+    FOR EACH ROW WHEN (OLD.created_at IS DISTINCT FROM NEW.created_at)
+    EXECUTE FUNCTION stats_rollup_trigger('stats_rollup_domain_metrics');
+
+DROP TRIGGER IF EXISTS stats_rollup_orders ON orders;
+CREATE TRIGGER stats_rollup_orders
+    AFTER INSERT OR DELETE ON orders
+    FOR EACH ROW EXECUTE FUNCTION stats_rollup_trigger('stats_rollup_order_metrics');
+DROP TRIGGER IF EXISTS stats_rollup_orders_update ON orders;
+CREATE TRIGGER stats_rollup_orders_update
+    AFTER UPDATE OF created_at, payment_status, crypto_currency, payment_method, amount_usd, service_type
+    ON orders
+    FOR EACH ROW WHEN (
+        (OLD.created_at, OLD.payment_status, OLD.crypto_currency, OLD.payment_method,
+         OLD.amount_usd, OLD.service_type)
+        IS DISTINCT FROM
+        (NEW.created_at, NEW.payment_status, NEW.crypto_currency, NEW.payment_method,
+         NEW.amount_usd, NEW.service_type)
+    )
+    EXECUTE FUNCTION stats_rollup_trigger('stats_rollup_order_metrics');
+
+DROP TRIGGER IF EXISTS stats_rollup_wallet ON wallet_transactions;
+CREATE TRIGGER stats_rollup_wallet
+    AFTER INSERT OR DELETE ON wallet_transactions
+    FOR EACH ROW EXECUTE FUNCTION stats_rollup_trigger('stats_rollup_wallet_metrics');
+DROP TRIGGER IF EXISTS stats_rollup_wallet_update ON wallet_transactions;
+CREATE TRIGGER stats_rollup_wallet_update
+    AFTER UPDATE OF created_at, transaction_type, amount ON wallet_transactions
+    FOR EACH ROW WHEN (
+        (OLD.created_at, OLD.transaction_type, OLD.amount)
+        IS DISTINCT FROM (NEW.created_at, NEW.transaction_type, NEW.amount)
+    )
+    EXECUTE FUNCTION stats_rollup_trigger('stats_rollup_wallet_metrics');
+
+-- ROLLBACK
+-- DROP TRIGGER IF EXISTS stats_rollup_wallet_update ON wallet_transactions;
+-- DROP TRIGGER IF EXISTS stats_rollup_wallet ON wallet_transactions;
+-- DROP TRIGGER IF EXISTS stats_rollup_orders_update ON orders;
+-- DROP TRIGGER IF EXISTS stats_rollup_orders ON orders;
+-- DROP TRIGGER IF EXISTS stats_rollup_domains_update ON registered_domains;
+-- DROP TRIGGER IF EXISTS stats_rollup_domains ON registered_domains;
+-- DROP TRIGGER IF EXISTS stats_rollup_users_update ON users;
+-- DROP TRIGGER IF EXISTS stats_rollup_users ON users;
+-- DROP FUNCTION IF EXISTS stats_rollup_trigger();
+-- DROP FUNCTION IF EXISTS stats_rollup_wallet_metrics(wallet_transactions);
+-- DROP FUNCTION IF EXISTS stats_rollup_order_metrics(orders);
+-- DROP FUNCTION IF EXISTS stats_rollup_domain_metrics(registered_domains);
+-- DROP FUNCTION IF EXISTS stats_rollup_user_metrics(users);
+-- DROP FUNCTION IF EXISTS stats_rollup_add(DATE, TEXT, NUMERIC);
+-- DROP TABLE IF EXISTS stats_rollup;
+-- END ROLLBACK
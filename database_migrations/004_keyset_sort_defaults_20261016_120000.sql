@@ -0,0 +1,43 @@
+-- Database Migration 004: Keyset Sort Column Defaults
+-- Created: 2026-10-16
+-- Description: The keyset-paged listings sort on timestamps that only had an
+-- ORM default, so rows inserted outside the ORM could get NULL. Give the
+-- columns a server default so new rows always carry a timestamp. Existing
+-- NULLs are left alone (app/core/pagination.py pages through them) and the
+-- columns stay nullable: SET DEFAULT only touches the catalog, with no table
+-- rewrite or scan. Tables of the other schema that are absent here are skipped.
+
+DO $$
+DECLARE
+    target RECORD;
+BEGIN
+    FOR target IN
+        SELECT c.table_name, c.column_name
+        FROM information_schema.columns c
+        JOIN (VALUES
+            ('users', 'created_at'),
+            ('registered_domains', 'registration_date'),
+            ('registered_domains', 'created_at'),
+            ('orders', 'created_at'),
+            ('wallet_transactions', 'created_at'),
+            ('domains', 'created_at'),
+            ('transactions', 'created_at')
+        ) AS t (table_name, column_name)
+            ON c.table_name = t.table_name AND c.column_name = t.column_name
+        WHERE c.table_schema = current_schema()
+    LOOP
+        EXECUTE format('ALTER TABLE %I ALTER COLUMN %I SET DEFAULT CURRENT_TIMESTAMP',
+                       target.table_name, target.column_name);
+    END LOOP;
+END
+$$;
+
+-- ROLLBACK
+-- ALTER TABLE IF EXISTS transactions ALTER COLUMN created_at DROP DEFAULT;
+-- ALTER TABLE IF EXISTS domains ALTER COLUMN created_at DROP DEFAULT;
+-- ALTER TABLE IF EXISTS wallet_transactions ALTER COLUMN created_at DROP DEFAULT;
+-- ALTER TABLE IF EXISTS orders ALTER COLUMN created_at DROP DEFAULT;
+-- ALTER TABLE IF EXISTS registered_domains ALTER COLUMN created_at DROP DEFAULT;
+-- ALTER TABLE IF EXISTS registered_domains ALTER COLUMN registration_date DROP DEFAULT;
+-- ALTER TABLE IF EXISTS users ALTER COLUMN created_at DROP DEFAULT;
+-- END ROLLBACK
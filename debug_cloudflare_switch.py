@@ -102,10 +102,9 @@ async def debug_cloudflare_switch():
             
             # Try to create zone
             print(f"🆕 Attempting to create new zone...")
-            new_zone_id = await dns_manager.create_zone(domain)
-            if new_zone_id:
+            created, new_zone_id, nameservers = await dns_manager.create_zone(domain)
+            if created:
                 print(f"✅ Zone created successfully: {new_zone_id}")
-                nameservers = await dns_manager.get_zone_nameservers(new_zone_id)
                 print(f"New zone nameservers: {nameservers}")
             else:
                 print(f"❌ Failed to create zone")
@@ -1,18 +1,22 @@
 """
 DNS Propagation Checker for Nomadly Bot
 Checks DNS propagation across multiple global DNS servers
+
+All resolvers are queried at once with the in-process DNS client (no
+nslookup subprocesses); a check returns as soon as a quorum of them agree,
+so one slow or dead resolver no longer holds up the result.
 """
 
 import asyncio
-import socket
-import subprocess
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, Iterable, List, Optional
 import logging
 
+from async_dns_client import AsyncDNSClient, DNSResponse, QTYPES
+
 logger = logging.getLogger(__name__)
 
 class DNSPropagationChecker:
-    def __init__(self):
+    def __init__(self, client: Optional[AsyncDNSClient] = None, quorum: Optional[int] = None):
         # Global DNS servers to check propagation
         self.dns_servers = [
             ("8.8.8.8", "Google"),
@@ -24,91 +28,78 @@ class DNSPropagationChecker:
             ("77.88.8.8", "Yandex"),
             ("156.154.70.1", "Neustar")
         ]
+        self.client = client or AsyncDNSClient(timeout=2.0, retries=2)
+        # Majority of resolvers unless configured
+        self.quorum = quorum
     
-    async def check_nameserver_propagation(self, domain: str) -> Dict[str, any]:
-        """Check nameserver propagation across multiple DNS servers using nslookup"""
-        results = {}
-        total_servers = len(self.dns_servers)
-        propagated_count = 0
-        nameservers_found = set()
+    def _quorum(self) -> int:
+        return self.quorum or len(self.dns_servers) // 2 + 1
+    
+    @staticmethod
+    def _overall_status(percentage: float, quorum_reached: bool):
+        if quorum_reached or percentage >= 80:
+            return "✅ Fully Propagated", "✅"
+        if percentage >= 50:
+            return "🟡 Partially Propagated", "🟡"
+        return "❌ Not Propagated", "❌"
+    
+    @staticmethod
+    def _failure_status(response, record_type: str) -> Dict[str, str]:
+        """Status and response time for a server that gave no usable answer"""
+        if response is None:
+            return {"status": "⏩ Not needed (quorum reached)", "response_time": "skipped"}
+        if isinstance(response, asyncio.TimeoutError):
+            return {"status": "⏱️ Timeout", "response_time": "slow"}
+        if isinstance(response, Exception):
+            return {"status": f"⚠️ Error: {str(response)[:30]}", "response_time": "error"}
+        if response.rcode == "NXDOMAIN":
+            return {"status": "❌ Domain not found", "response_time": f"{response.elapsed * 1000:.0f} ms"}
+        if response.rcode != "NOERROR":
+            return {"status": f"⚠️ {response.rcode}", "response_time": f"{response.elapsed * 1000:.0f} ms"}
+        return {"status": f"⚠️ No {record_type} records", "response_time": f"{response.elapsed * 1000:.0f} ms"}
+    
+    async def check_nameserver_propagation(self, domain: str,
+                                           expected_nameservers: Optional[Iterable[str]] = None) -> Dict[str, any]:
+        """Check nameserver propagation across multiple DNS servers.
         
+        With expected_nameservers, a server only counts as propagated when
+        it returns exactly that set.
+        """
         try:
-            for dns_server, provider in self.dns_servers:
-                try:
-                    # Use nslookup command to query NS records
-                    process = await asyncio.create_subprocess_exec(
-                        'nslookup', '-type=NS', domain, dns_server,
-                        stdout=asyncio.subprocess.PIPE,
-                        stderr=asyncio.subprocess.PIPE
-                    )
-                    
-                    stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=10)
-                    
-                    if process.returncode == 0:
-                        output = stdout.decode('utf-8', errors='ignore')
-                        
-                        # Parse nameservers from nslookup output
-                        ns_list = []
-                        for line in output.split('\n'):
-                            if 'nameserver' in line.lower() and '=' in line:
-                                ns = line.split('=')[-1].strip().rstrip('.')
-                                if ns and not ns.startswith('127.'):
-                                    ns_list.append(ns)
-                        
-                        if ns_list:
-                            results[provider] = {
-                                "status": "✅ Propagated",
-                                "nameservers": ns_list,
-                                "response_time": "fast"
-                            }
-                            propagated_count += 1
-                            nameservers_found.update(ns_list)
-                        else:
-                            results[provider] = {
-                                "status": "⚠️ No NS records",
-                                "nameservers": [],
-                                "response_time": "N/A"
-                            }
-                    else:
-                        results[provider] = {
-                            "status": "❌ Domain not found",
-                            "nameservers": [],
-                            "response_time": "N/A"
-                        }
-                    
-                except asyncio.TimeoutError:
-                    results[provider] = {
-                        "status": "⏱️ Timeout",
-                        "nameservers": [],
-                        "response_time": "slow"
-                    }
-                except Exception as e:
-                    results[provider] = {
-                        "status": f"⚠️ Error: {str(e)[:30]}",
-                        "nameservers": [],
-                        "response_time": "error"
-                    }
-                
-                # Small delay between checks
-                await asyncio.sleep(0.2)
-        
+            quorum = await self.client.query_quorum(
+                self.dns_servers, domain, "NS", self._quorum(), expected=expected_nameservers
+            )
         except Exception as e:
             logger.error(f"DNS propagation check failed: {e}")
             return self._create_error_result(domain)
         
-        # Calculate propagation percentage
-        propagation_percentage = (propagated_count / total_servers) * 100
+        expected = {ns.lower().rstrip(".") for ns in expected_nameservers} if expected_nameservers else None
+        results = {}
+        propagated_count = 0
+        checked_count = 0
+        nameservers_found = set()
+        
+        for _, provider in self.dns_servers:
+            response = quorum.responses.get(provider)
+            ns_list = sorted(response.answer_set("NS")) if isinstance(response, DNSResponse) else []
+            if response is not None:
+                checked_count += 1
+            if ns_list:
+                nameservers_found.update(ns_list)
+                matches = expected is None or set(ns_list) == expected
+                results[provider] = {
+                    "status": "✅ Propagated" if matches else "🔄 Old nameservers",
+                    "nameservers": ns_list,
+                    "response_time": f"{response.elapsed * 1000:.0f} ms"
+                }
+                if matches:
+                    propagated_count += 1
+            else:
+                results[provider] = {"nameservers": [], **self._failure_status(response, "NS")}
         
-        # Determine overall status
-        if propagation_percentage >= 80:
-            overall_status = "✅ Fully Propagated"
-            status_emoji = "✅"
-        elif propagation_percentage >= 50:
-            overall_status = "🟡 Partially Propagated"
-            status_emoji = "🟡"
-        else:
-            overall_status = "❌ Not Propagated"
-            status_emoji = "❌"
+        # Percentage of the servers actually asked; the rest were skipped once a quorum agreed
+        propagation_percentage = (propagated_count / checked_count) * 100 if checked_count else 0
+        overall_status, status_emoji = self._overall_status(propagation_percentage, quorum.quorum_reached)
         
         return {
             "domain": domain,
@@ -116,89 +107,58 @@ class DNSPropagationChecker:
             "status_emoji": status_emoji,
             "propagation_percentage": round(propagation_percentage, 1),
             "propagated_servers": propagated_count,
-            "total_servers": total_servers,
-            "nameservers": list(nameservers_found),
-            "server_results": results
+            "checked_servers": checked_count,
+            "total_servers": len(self.dns_servers),
+            "quorum_reached": quorum.quorum_reached,
+            "nameservers": sorted(nameservers_found),
+            "server_results": results,
+            "elapsed": round(quorum.elapsed, 2)
         }
     
-    async def check_dns_record_propagation(self, domain: str, record_type: str = "A") -> Dict[str, any]:
-        """Check DNS record propagation for specific record type using nslookup"""
-        results = {}
-        total_servers = len(self.dns_servers)
-        propagated_count = 0
-        records_found = set()
+    async def check_dns_record_propagation(self, domain: str, record_type: str = "A",
+                                           expected_values: Optional[Iterable[str]] = None) -> Dict[str, any]:
+        """Check DNS record propagation for a specific record type (A, AAAA, MX, TXT, CNAME, NS)"""
+        record_type = record_type.upper()
+        if record_type not in QTYPES:
+            return self._create_error_result(domain, record_type)
         
         try:
-            for dns_server, provider in self.dns_servers:
-                try:
-                    # Use nslookup command to query specific record type
-                    process = await asyncio.create_subprocess_exec(
-                        'nslookup', '-type=' + record_type, domain, dns_server,
-                        stdout=asyncio.subprocess.PIPE,
-                        stderr=asyncio.subprocess.PIPE
-                    )
-                    
-                    stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=10)
-                    
-                    if process.returncode == 0:
-                        output = stdout.decode('utf-8', errors='ignore')
-                        
-                        # Parse records from nslookup output
-                        record_values = []
-                        for line in output.split('\n'):
-                            if record_type.lower() in line.lower() and '=' in line:
-                                value = line.split('=')[-1].strip()
-                                if value and not value.startswith('127.'):
-                                    record_values.append(value)
-                        
-                        if record_values:
-                            results[provider] = {
-                                "status": "✅ Found",
-                                "records": record_values,
-                                "count": len(record_values)
-                            }
-                            propagated_count += 1
-                            records_found.update(record_values)
-                        else:
-                            results[provider] = {
-                                "status": f"⚠️ No {record_type} records",
-                                "records": [],
-                                "count": 0
-                            }
-                    else:
-                        results[provider] = {
-                            "status": "❌ Domain not found",
-                            "records": [],
-                            "count": 0
-                        }
-                    
-                except asyncio.TimeoutError:
-                    results[provider] = {
-                        "status": "⏱️ Timeout",
-                        "records": [],
-                        "count": 0
-                    }
-                except Exception as e:
-                    results[provider] = {
-                        "status": f"⚠️ Error: {str(e)[:20]}",
-                        "records": [],
-                        "count": 0
-                    }
-                
-                await asyncio.sleep(0.2)
-        
+            quorum = await self.client.query_quorum(
+                self.dns_servers, domain, record_type, self._quorum(), expected=expected_values
+            )
         except Exception as e:
             logger.error(f"DNS record propagation check failed: {e}")
             return self._create_error_result(domain, record_type)
         
-        propagation_percentage = (propagated_count / total_servers) * 100
+        results = {}
+        propagated_count = 0
+        checked_count = 0
+        records_found = set()
+        
+        for _, provider in self.dns_servers:
+            response = quorum.responses.get(provider)
+            if response is not None:
+                checked_count += 1
+            answers = [a for a in response.answers if a.type == record_type] if isinstance(response, DNSResponse) else []
+            if answers:
+                values = sorted(response.answer_set(record_type))
+                matches = quorum.agreed is None or frozenset(values) == quorum.agreed
+                results[provider] = {
+                    "status": "✅ Found" if matches else "🔄 Different records",
+                    "records": values,
+                    "answers": answers,
+                    "count": len(values),
+                    "response_time": f"{response.elapsed * 1000:.0f} ms"
+                }
+                if matches:
+                    propagated_count += 1
+                records_found.update(values)
+            else:
+                results[provider] = {"records": [], "answers": [], "count": 0,
+                                     **self._failure_status(response, record_type)}
         
-        if propagation_percentage >= 80:
-            overall_status = "✅ Fully Propagated"
-        elif propagation_percentage >= 50:
-            overall_status = "🟡 Partially Propagated"
-        else:
-            overall_status = "❌ Not Propagated"
+        propagation_percentage = (propagated_count / checked_count) * 100 if checked_count else 0
+        overall_status, _ = self._overall_status(propagation_percentage, quorum.quorum_reached)
         
         return {
             "domain": domain,
@@ -206,9 +166,12 @@ class DNSPropagationChecker:
             "overall_status": overall_status,
             "propagation_percentage": round(propagation_percentage, 1),
             "propagated_servers": propagated_count,
-            "total_servers": total_servers,
-            "unique_records": list(records_found),
-            "server_results": results
+            "checked_servers": checked_count,
+            "total_servers": len(self.dns_servers),
+            "quorum_reached": quorum.quorum_reached,
+            "unique_records": sorted(records_found),
+            "server_results": results,
+            "elapsed": round(quorum.elapsed, 2)
         }
     
     def _create_error_result(self, domain: str, record_type: str = "NS") -> Dict[str, any]:
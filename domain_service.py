@@ -10,6 +10,7 @@ from database import get_db_manager
 from api_services import get_api_manager
 from identity_generator import get_identity_generator
 from simple_validation_fixes import SimpleValidationFixes
+from zone_provisioner import zone_provisioner
 
 logger = logging.getLogger(__name__)
 
@@ -362,113 +363,75 @@ class DomainService:
                 # Remove the requested TLD from alternatives if it's already checked
                 if requested_tld in alternative_tlds:
                     alternative_tlds.remove(requested_tld)
+                alternative_tlds = alternative_tlds[:3]
 
-                # Check alternatives in parallel for speed with optimized thread pool
-                import asyncio
-                import concurrent.futures
-
-                async def check_alternative_domain(tld):
-                    """Check a single alternative domain asynchronously with optimized performance"""
+                alternative_results = []
+                for tld in alternative_tlds:
                     full_domain = f"{domain_base}{tld}"
-                    alt_price = self.domain_pricing.get(tld, 42.87)  # Initialize alt_price with 3.3x multiplier
-
-                    def sync_domain_check():
-                        """Optimized synchronous domain check"""
-                        # Ensure alt_price is always available in this scope
-                        local_alt_price = alt_price
-                        try:
-                            # Quick check for known unavailable domains first
-                            if full_domain.lower() in known_unavailable:
-                                return False, local_alt_price
-                            elif (
-                                hasattr(self.api, "Nameword")
-                                and self.api.Nameword
-                            ):
-                                availability = (
-                                    self.api.Nameword.check_domain_availability(
-                                        full_domain
-                                    )
-                                )
-                                alt_available = availability.get("available", False)
-
-                                # Use real Nameword pricing
-                                if (
-                                    availability.get("price")
-                                    and availability.get("price") > 0
-                                ):
-                                    local_alt_price = float(availability.get("price"))
-                                    logger.info(
-                                        f"Using Nameword price for {full_domain}: ${local_alt_price}"
-                                    )
-
-                                return alt_available, local_alt_price
-                            else:
-                                # Conservative fallback only for major brands
-                                if domain_base in [
-                                    "google",
-                                    "microsoft",
-                                    "apple",
-                                    "amazon",
-                                    "facebook",
-                                ]:
-                                    return False, local_alt_price
-                                else:
-                                    return True, local_alt_price
-
-                        except Exception as domain_check_error:
-                            logger.error(
-                                f"Error checking domain {full_domain}: {domain_check_error}"
-                            )
-                            # Return with local_alt_price on error
-                            return True, local_alt_price
+                    alt_available = full_domain.lower() not in known_unavailable and domain_base not in [
+                        "google",
+                        "microsoft",
+                        "apple",
+                        "amazon",
+                        "facebook",
+                    ]
+                    alternative_results.append(
+                        {
+                            "domain": full_domain,
+                            "tld": tld,
+                            "available": alt_available,
+                            "price": self.domain_pricing.get(tld, 42.87),
+                            "premium": tld in [".io", ".co", ".me"],
+                            "requested": False,
+                        }
+                    )
+
+                # All alternatives go to the registry in one batched request
+                lookup = [
+                    result["domain"]
+                    for result in alternative_results
+                    if result["domain"].lower() not in known_unavailable
+                ]
+                if lookup and self.api.openprovider:
+                    import asyncio
 
-                    # Run in optimized thread pool with timeout
                     loop = asyncio.get_event_loop()
                     try:
-                        alt_available, final_price = await asyncio.wait_for(
-                            loop.run_in_executor(None, sync_domain_check),
-                            timeout=2.0,  # Max 2 seconds per domain check for faster results
+                        availability_by_domain = await asyncio.wait_for(
+                            loop.run_in_executor(
+                                None,
+                                self.api.openprovider.check_domains_availability,
+                                lookup,
+                            ),
+                            timeout=3.0,  # Single round trip, keep UX snappy
                         )
                     except asyncio.TimeoutError:
-                        logger.warning(f"Domain check timeout for {full_domain}")
-                        alt_available, final_price = (
-                            True,
-                            alt_price,
-                        )  # Default to available on timeout
-
-                    return {
-                        "domain": full_domain,
-                        "tld": tld,
-                        "available": alt_available,
-                        "price": final_price,
-                        "premium": tld in [".io", ".co", ".me"],
-                        "requested": False,
-                    }
-
-                # Execute all alternative domain checks in parallel with timeout
-                try:
-                    alternative_results = await asyncio.wait_for(
-                        asyncio.gather(
-                            *[
-                                check_alternative_domain(tld)
-                                for tld in alternative_tlds[:3]
-                            ],
-                            return_exceptions=True,
-                        ),
-                        timeout=3.0,  # Reduced to 3 seconds total for better UX
-                    )
-                except asyncio.TimeoutError:
-                    logger.warning(
-                        "Domain alternatives check timeout - skipping alternatives"
-                    )
-                    alternative_results = []
+                        logger.warning("Domain alternatives check timeout - using defaults")
+                        availability_by_domain = {}
+                    except Exception as domain_check_error:
+                        logger.error(
+                            f"Error checking alternatives for {domain_base}: {domain_check_error}"
+                        )
+                        availability_by_domain = {}
+
+                    for result in alternative_results:
+                        if result["domain"] not in lookup:
+                            continue
+                        availability = availability_by_domain.get(result["domain"])
+                        if availability is None:
+                            # Default to available when the registry gave no answer
+                            result["available"] = True
+                            continue
+                        result["available"] = availability.get("available", False)
+
+                        # Use real Nameword pricing
+                        if availability.get("price") and availability.get("price") > 0:
+                            result["price"] = float(availability.get("price"))
+                            logger.info(
+                                f"Using Nameword price for {result['domain']}: ${result['price']}"
+                            )
 
-                # Add successful results to the main results list
-                for result in alternative_results:
-                    if isinstance(result, dict):
-                        results.append(result)
-                    else:
-                        logger.error(f"Alternative domain check failed: {result}")
+                results.extend(alternative_results)
 
             return {
                 "success": True,
@@ -642,18 +605,17 @@ class DomainService:
                 # Use Cloudflare nameservers
                 nameservers = ["alice.ns.cloudflare.com", "bob.ns.cloudflare.com"]
             elif nameserver_choice == "custom":
-                # Get custom nameservers from user session
-                import json
+                # Get custom nameservers from the shared session store
+                from session_store import get_session_store
                 try:
-                    with open("user_sessions.json", "r") as f:
-                        sessions = json.load(f)
-                        user_session = sessions.get(str(telegram_id), {})
-                        custom_ns = user_session.get("custom_nameservers", [])
-                        if custom_ns:
-                            nameservers = custom_ns
-                        else:
-                            nameservers = ["ns1.privatehoster.cc", "ns2.privatehoster.cc"]
-                except:
+                    user_session = get_session_store().get(int(telegram_id)) or {}
+                    custom_ns = user_session.get("custom_nameservers", [])
+                    if custom_ns:
+                        nameservers = custom_ns
+                    else:
+                        nameservers = ["ns1.privatehoster.cc", "ns2.privatehoster.cc"]
+                except Exception as e:
+                    logger.error(f"Could not read custom nameservers for user {telegram_id}: {e}")
                     nameservers = ["ns1.privatehoster.cc", "ns2.privatehoster.cc"]
             
             # Use production OpenProvider API
@@ -754,18 +716,11 @@ class DomainService:
                 # Path A: Cloudflare/Registrar Default - Create zone first, then add A record
                 logger.info(f"Following Cloudflare/Registrar path for {domain_name}")
 
-                # Create Cloudflare zone and get assigned nameservers
+                # Create Cloudflare zone with its basic DNS records and get assigned nameservers
                 nameservers, cloudflare_zone_id = (
                     await self._create_cloudflare_zone_and_get_nameservers(domain_name)
                 )
 
-                # Add A record automatically after zone creation
-                if cloudflare_zone_id:
-                    await self._add_basic_dns_records(domain_name, cloudflare_zone_id)
-                    logger.info(
-                        f"Added basic DNS records for {domain_name} in zone {cloudflare_zone_id}"
-                    )
-
             else:  # custom nameservers
                 # Path B: Custom Nameservers - Use user-provided nameservers
                 logger.info(f"Following custom nameserver path for {domain_name}")
@@ -1033,61 +988,6 @@ class DomainService:
             logger.error(f"Error validating custom nameservers: {e}")
             return None
 
-    async def _create_cloudflare_zone_and_get_nameservers(
-        self, domain_name: str
-    ) -> tuple:
-        """Create Cloudflare zone and return assigned nameservers"""
-        try:
-            if hasattr(self.api, "cloudflare") and self.api.cloudflare:
-                zone_result = await self.api.cloudflare.create_zone(domain_name)
-
-                if zone_result.get("success"):
-                    cloudflare_zone_id = zone_result.get("zone_id")
-                    nameservers = zone_result.get(
-                        "name_servers", [await get_real_cloudflare_nameservers(domain_name)]
-                    )
-                    logger.info(
-                        f"Created Cloudflare zone {cloudflare_zone_id} for {domain_name} with nameservers: {nameservers}"
-                    )
-                    return nameservers, cloudflare_zone_id
-                else:
-                    logger.warning(
-                        f"Failed to create Cloudflare zone for {domain_name}"
-                    )
-                    return [await get_real_cloudflare_nameservers(domain_name)], None
-            else:
-                # Mock zone creation for development
-                mock_zone_id = f"mock_zone_{domain_name.replace('.', '_')}"
-                mock_nameservers = ["alice.ns.cloudflare.com", "bob.ns.cloudflare.com"]
-                logger.info(f"Mock zone created for {domain_name}: {mock_zone_id}")
-                return mock_nameservers, mock_zone_id
-
-        except Exception as e:
-            logger.error(f"Error creating Cloudflare zone for {domain_name}: {e}")
-            return [await get_real_cloudflare_nameservers(domain_name)], None
-
-    async def _add_basic_dns_records(self, domain_name: str, cloudflare_zone_id: str):
-        """Add basic DNS records (A record pointing to server)"""
-        try:
-            if hasattr(self.api, "cloudflare") and self.api.cloudflare:
-                # Add A record pointing to default server IP
-                server_ip = "89.117.27.176"  # Default server IP
-                record_result = await self.api.cloudflare.add_dns_record(
-                    cloudflare_zone_id=cloudflare_zone_id, record_type="A", name="@", content=server_ip
-                )
-
-                if record_result.get("success"):
-                    logger.info(
-                        f"Added A record for {domain_name} pointing to {server_ip}"
-                    )
-                else:
-                    logger.warning(f"Failed to add A record for {domain_name}")
-            else:
-                logger.info(f"Mock A record added for {domain_name} in zone {cloudflare_zone_id}")
-
-        except Exception as e:
-            logger.error(f"Error adding DNS records for {domain_name}: {e}")
-
     async def _get_or_create_Nameword_contact(
         self, identity: Dict
     ) -> Optional[str]:
@@ -1124,19 +1024,16 @@ class DomainService:
     ):
         """Create Cloudflare DNS zone for domain"""
         try:
-            if hasattr(self.api, "cloudflare") and self.api.cloudflare:
-                # Create zone
-                zone_result = await self.api.cloudflare.create_zone(domain_name)
+            if zone_provisioner.enabled:
+                # Create zone and its basic DNS records
+                zone_result = await zone_provisioner.provision(domain_name)
 
-                if zone_result.get("success"):
-                    cloudflare_zone_id = zone_result.get("zone_id")
+                if zone_result.success:
+                    cloudflare_zone_id = zone_result.zone_id
 
                     # Update domain record with zone ID
                     self.db.update_domain_cloudflare_zone(domain_record_id, cloudflare_zone_id)
 
-                    # Add basic DNS records
-                    await self._add_basic_dns_records(domain_name, cloudflare_zone_id)
-
                     logger.info(
                         f"Created Cloudflare zone {cloudflare_zone_id} for domain {domain_name}"
                     )
@@ -1151,22 +1048,13 @@ class DomainService:
             logger.error(f"Error creating Cloudflare DNS zone for {domain_name}: {e}")
 
     async def _add_basic_dns_records(self, domain_name: str, cloudflare_zone_id: str):
-        """Add basic DNS records to new domain"""
+        """Add basic DNS records to new domain (one batch call)"""
         try:
-            # Default server IP (can be configured)
-            default_ip = "89.117.27.176"  # Example hosting server IP
-
-            basic_records = [
-                {"type": "A", "name": "@", "content": default_ip, "ttl": 300},
-                {"type": "A", "name": "www", "content": default_ip, "ttl": 300},
-                {"type": "CNAME", "name": "mail", "content": domain_name, "ttl": 300},
-            ]
-
-            if hasattr(self.api, "cloudflare") and self.api.cloudflare:
-                for record in basic_records:
-                    await self.api.cloudflare.add_dns_record(cloudflare_zone_id, record)
-
-            logger.info(f"Added basic DNS records for {domain_name}")
+            if zone_provisioner.enabled:
+                created = await zone_provisioner.add_default_records(domain_name, cloudflare_zone_id)
+                logger.info(f"Added {created} basic DNS records for {domain_name}")
+            else:
+                logger.info(f"Mock basic DNS records added for {domain_name} in zone {cloudflare_zone_id}")
 
         except Exception as e:
             logger.error(f"Error adding basic DNS records for {domain_name}: {e}")
@@ -1407,19 +1295,17 @@ class DomainService:
     async def _create_cloudflare_zone_and_get_nameservers(
         self, domain_name: str
     ) -> tuple:
-        """Create Cloudflare zone and return assigned nameservers and zone_id"""
+        """Create Cloudflare zone with basic DNS records and return assigned nameservers and zone_id"""
         try:
-            if hasattr(self.api, "cloudflare") and self.api.cloudflare:
-                # Create zone using Cloudflare API
-                success, cloudflare_zone_id, nameservers = self.api.cloudflare.create_zone(
-                    domain_name
-                )
+            if zone_provisioner.enabled:
+                # Zone POST returns the nameservers; basic records follow in one batch call
+                result = await zone_provisioner.provision(domain_name)
 
-                if success and nameservers:
+                if result.success and result.nameservers:
                     logger.info(
-                        f"Created Cloudflare zone {cloudflare_zone_id} for {domain_name} with nameservers: {nameservers}"
+                        f"Created Cloudflare zone {result.zone_id} for {domain_name} with nameservers: {result.nameservers}"
                     )
-                    return nameservers, cloudflare_zone_id
+                    return result.nameservers, result.zone_id
                 else:
                     logger.warning(
                         f"Failed to create Cloudflare zone for {domain_name}, using fallback nameservers"
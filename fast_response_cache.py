@@ -3,8 +3,12 @@ Fast Response Cache System for Nomadly Bot
 Caches frequently accessed data to avoid slow API calls
 """
 import asyncio
+import logging
+import threading
 import time
-from typing import Dict, Any, Optional
+from typing import Awaitable, Callable, Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
 
 class FastResponseCache:
     def __init__(self):
@@ -40,8 +44,283 @@ class FastResponseCache:
             self.cache.pop(key, None)
             self.cache_timeouts.pop(key, None)
 
-# Global cache instance
+class AvailabilityCache:
+    """Registry availability/price cache keyed by FQDN with single-flight lookups.
+
+    Taken names rarely become free, so they are kept for hours; free names
+    can be registered by anyone at any moment, so they expire quickly.
+    Error results are never cached. Concurrent lookups for the same name on
+    the same event loop share one in-flight registry request.
+    """
+
+    def __init__(self, taken_ttl: int = 6 * 3600, free_ttl: int = 300, max_entries: int = 50000):
+        self.taken_ttl = taken_ttl
+        self.free_ttl = free_ttl
+        self.max_entries = max_entries
+        self._entries: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._inflight: Dict[str, Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = {}
+        # Shared by the bot loop and the sync-wrapper loop thread
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get(self, domain: str) -> Optional[Dict[str, Any]]:
+        """Return a cached result if it has not expired"""
+        key = domain.lower()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, result = entry
+            if time.time() >= expires:
+                del self._entries[key]
+                return None
+            return dict(result)
+
+    def set(self, domain: str, result: Dict[str, Any]) -> None:
+        """Cache a registry result with a TTL chosen by availability"""
+        if result.get("error"):
+            return
+        ttl = self.free_ttl if result.get("available") else self.taken_ttl
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._evict_locked()
+            self._entries[domain.lower()] = (time.time() + ttl, dict(result))
+
+    def _evict_locked(self) -> None:
+        now = time.time()
+        for key in [k for k, (expires, _) in self._entries.items() if expires <= now]:
+            del self._entries[key]
+        # Still full: drop the oldest tenth (dicts keep insertion order)
+        overflow = len(self._entries) - self.max_entries + max(1, self.max_entries // 10)
+        for key in list(self._entries)[:max(0, overflow)]:
+            del self._entries[key]
+
+    def invalidate(self, domain: str) -> None:
+        """Forget a name, e.g. right after we registered it ourselves"""
+        with self._lock:
+            self._entries.pop(domain.lower(), None)
+
+    async def get_many(
+        self,
+        domains: List[str],
+        fetch: Callable[[List[str]], Awaitable[Dict[str, Dict[str, Any]]]],
+    ) -> Dict[str, Dict[str, Any]]:
+        """Return results for domains, fetching only the names nobody else is fetching.
+
+        fetch receives the uncached, not-in-flight names and must return a
+        dict keyed by those names. The result preserves the input order.
+        """
+        loop = asyncio.get_running_loop()
+        results: Dict[str, Dict[str, Any]] = {}
+        waiting: Dict[str, asyncio.Future] = {}
+        owned: Dict[str, asyncio.Future] = {}
+
+        for domain in domains:
+            if domain in results or domain in waiting or domain in owned:
+                continue
+            cached = self.get(domain)
+            key = domain.lower()
+            with self._lock:
+                if cached is not None:
+                    self.hits += 1
+                    results[domain] = cached
+                    continue
+                inflight = self._inflight.get(key)
+                if inflight is not None and inflight[0] is loop:
+                    self.coalesced += 1
+                    waiting[domain] = inflight[1]
+                    continue
+                self.misses += 1
+                future = loop.create_future()
+                self._inflight[key] = (loop, future)
+                owned[domain] = future
+
+        if owned:
+            error: Optional[BaseException] = None
+            try:
+                fetched = await fetch(list(owned))
+                for domain, future in owned.items():
+                    result = fetched.get(domain, {"available": False, "error": "No result returned for domain"})
+                    self.set(domain, result)
+                    future.set_result(result)
+                    results[domain] = result
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                # Never leave coalesced waiters on a future nobody will resolve
+                for future in owned.values():
+                    if future.done():
+                        continue
+                    if error is None or isinstance(error, asyncio.CancelledError):
+                        future.cancel()
+                    else:
+                        future.set_exception(error)
+                        future.exception()  # Mark retrieved when nobody is waiting
+                with self._lock:
+                    for domain, future in owned.items():
+                        if self._inflight.get(domain.lower(), (None, None))[1] is future:
+                            del self._inflight[domain.lower()]
+
+        for domain, future in waiting.items():
+            try:
+                # Shielded so a cancelled waiter cannot cancel the owner's lookup
+                result = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The owning task was cancelled mid-fetch; look the name up afresh
+                result = (await self.get_many([domain], fetch))[domain]
+            results[domain] = dict(result)
+
+        return {domain: results[domain] for domain in domains}
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss/coalesced counters for monitoring"""
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "entries": len(self._entries),
+            "in_flight": len(self._inflight),
+            "hit_ratio": round((self.hits + self.coalesced) / lookups, 3) if lookups else 0.0,
+        }
+
+
+class DNSRecordCache:
+    """Per-zone DNS record lists kept current by write-through.
+
+    The DNS manager stores the list it fetched from Cloudflare and then
+    applies its own creates, updates and deletes to the cached copy, so
+    view -> edit -> delete screens read from memory. Each zone carries a
+    version taken from one monotonic counter: it moves whenever the cached
+    content changes, so ``changed_since`` is a single integer compare and a
+    zone that is dropped and re-fetched never reuses an old version.
+
+    Entries older than ``refresh_after`` are still served while the caller
+    refreshes them in the background; entries older than ``max_age`` are
+    not served at all.
+    """
+
+    def __init__(self, refresh_after: int = 120, max_age: int = 900, max_zones: int = 5000):
+        self.refresh_after = refresh_after
+        self.max_age = max_age
+        self.max_zones = max_zones
+        # zone_id -> (fetched_at, version, records by id in Cloudflare order)
+        self._zones: Dict[str, Tuple[float, int, Dict[str, Dict[str, Any]]]] = {}
+        self._refreshing: set = set()
+        self._clock = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+
+    def _tick_locked(self) -> int:
+        self._clock += 1
+        return self._clock
+
+    def version(self, zone_id: str) -> int:
+        """Current version of a zone's cached records (0 when not cached)"""
+        entry = self._zones.get(zone_id)
+        return entry[1] if entry else 0
+
+    def changed_since(self, zone_id: str, version: int) -> bool:
+        return self.version(zone_id) != version
+
+    def get(self, zone_id: str) -> Optional[List[Dict[str, Any]]]:
+        """Cached records for a zone, or None if missing or older than max_age"""
+        with self._lock:
+            entry = self._zones.get(zone_id)
+            if entry is None or time.time() - entry[0] >= self.max_age:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return [dict(record) for record in entry[2].values()]
+
+    def needs_refresh(self, zone_id: str) -> bool:
+        entry = self._zones.get(zone_id)
+        return entry is not None and time.time() - entry[0] >= self.refresh_after
+
+    def begin_refresh(self, zone_id: str) -> bool:
+        """Claim the background refresh for a zone; False if one is already running"""
+        with self._lock:
+            if zone_id in self._refreshing:
+                return False
+            self._refreshing.add(zone_id)
+            return True
+
+    def end_refresh(self, zone_id: str) -> None:
+        with self._lock:
+            self._refreshing.discard(zone_id)
+
+    def store(self, zone_id: str, records: List[Dict[str, Any]], if_version: Optional[int] = None) -> bool:
+        """Replace a zone's records with a fresh listing.
+
+        With if_version, the listing is dropped if a write-through changed
+        the zone after the fetch started (the listing may predate it).
+        """
+        by_id = {record.get("id") or f"_{i}": dict(record) for i, record in enumerate(records)}
+        with self._lock:
+            entry = self._zones.get(zone_id)
+            current = entry[1] if entry else 0
+            if if_version is not None and current != if_version:
+                return False
+            if entry is not None and entry[2] == by_id:
+                version = current  # same content, just fresher
+            else:
+                version = self._tick_locked()
+            if entry is None and len(self._zones) >= self.max_zones:
+                oldest = min(self._zones, key=lambda z: self._zones[z][0])
+                del self._zones[oldest]
+            self._zones[zone_id] = (time.time(), version, by_id)
+            return True
+
+    def upsert(self, zone_id: str, record: Dict[str, Any]) -> None:
+        """Apply a created or updated record to a cached zone"""
+        record_id = record.get("id")
+        with self._lock:
+            entry = self._zones.get(zone_id)
+            if entry is None or not record_id:
+                return
+            entry[2][record_id] = dict(record)
+            self._zones[zone_id] = (entry[0], self._tick_locked(), entry[2])
+            self.writes += 1
+
+    def remove(self, zone_id: str, record_id: str) -> None:
+        """Apply a deleted record to a cached zone"""
+        with self._lock:
+            entry = self._zones.get(zone_id)
+            if entry is None or entry[2].pop(record_id, None) is None:
+                return
+            self._zones[zone_id] = (entry[0], self._tick_locked(), entry[2])
+            self.writes += 1
+
+    def invalidate(self, zone_id: str) -> None:
+        """Drop a zone, e.g. after a change made outside the DNS manager"""
+        with self._lock:
+            self._zones.pop(zone_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss/write counters for monitoring"""
+        lookups = self.hits + self.misses
+        return {
+            "zones": len(self._zones),
+            "records": sum(len(entry[2]) for entry in self._zones.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "refreshing": len(self._refreshing),
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+# Global cache instances
 fast_cache = FastResponseCache()
+availability_cache = AvailabilityCache()
+dns_record_cache = DNSRecordCache()
 
 def get_cached_domain_data(domain: str) -> Dict[str, Any]:
     """Get cached domain data with defaults for speed"""
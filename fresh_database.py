@@ -47,7 +47,7 @@ class User(Base):
     total_spent = Column(DECIMAL(10, 2), default=0.00)
     
     # Timestamps
-    created_at = Column(DateTime, default=func.now())
+    created_at = Column(DateTime, default=func.now(), server_default=func.now())
     last_active = Column(DateTime, default=func.now())
     
     # Relationships
@@ -97,7 +97,7 @@ class Domain(Base):
     price_paid_usd = Column(DECIMAL(10, 2), nullable=False)
     renewal_price_usd = Column(DECIMAL(10, 2))
     
-    created_at = Column(DateTime, default=func.now())
+    created_at = Column(DateTime, default=func.now(), server_default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
     
     # Relationships
@@ -158,7 +158,7 @@ class Transaction(Base):
     # Related domain (if domain purchase)
     domain_id = Column(Integer, ForeignKey('domains.id'))
     
-    created_at = Column(DateTime, default=func.now())
+    created_at = Column(DateTime, default=func.now(), server_default=func.now())
     completed_at = Column(DateTime)
     
     # Relationships
@@ -194,7 +194,7 @@ class Order(Base):
     # Status
     status = Column(String(20), default='pending')  # pending, paid, completed, failed
     
-    created_at = Column(DateTime, default=func.now())
+    created_at = Column(DateTime, default=func.now(), server_default=func.now())
     completed_at = Column(DateTime)
 
 class SystemSetting(Base):
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Load test webhook ingestion: thousands of simulated BlockBee callbacks
+(with provider retries) through the bounded ingestion queue, compared with
+the legacy per-request ThreadPoolExecutor + fresh event loop pattern
+"""
+
+import asyncio
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from webhook_ingestion import IdempotencyIndex, WebhookIngestionQueue, idempotency_key
+
+CALLBACKS = 5000
+RETRY_RATE = 0.3  # share of callbacks that are provider retries of an earlier one
+LEDGER_WRITE_SECONDS = 0.002
+
+
+class Ledger:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.writes = 0
+
+    def record(self, order_id, data):
+        time.sleep(LEDGER_WRITE_SECONDS)  # simulated DEBIT/CREDIT round trips
+        with self.lock:
+            self.writes += 1
+
+
+def make_callbacks():
+    unique = int(CALLBACKS * (1 - RETRY_RATE))
+    callbacks = [(f"ORD-{i}", {"txid_in": f"tx{i}", "confirmations": "1", "value_coin": "0.01", "price": "3000"})
+                 for i in range(unique)]
+    callbacks += [random.choice(callbacks[:unique]) for _ in range(CALLBACKS - unique)]
+    random.shuffle(callbacks)
+    return callbacks, unique
+
+
+def run_legacy(callbacks):
+    """One new executor per callback, one new event loop per background job"""
+    ledger = Ledger()
+
+    async def notify():
+        await asyncio.sleep(0)
+
+    def background(order_id, data):
+        ledger.record(order_id, data)
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(notify())
+        loop.close()
+
+    executors = []
+    start = time.perf_counter()
+    for order_id, data in callbacks:
+        executor = ThreadPoolExecutor(max_workers=1)
+        executor.submit(background, order_id, data)
+        executors.append(executor)
+    for executor in executors:
+        executor.shutdown(wait=True)
+    return time.perf_counter() - start, ledger.writes, 0
+
+
+async def run_ingestion(callbacks, index_path, maxsize=1000, workers=8):
+    ledger = Ledger()
+    queue = WebhookIngestionQueue(
+        {"blockbee": ledger.record}, index=IdempotencyIndex(index_path), maxsize=maxsize, workers=workers
+    )
+    await queue.start()
+
+    start = time.perf_counter()
+    pending = list(callbacks)
+    busy_responses = 0
+    while pending:
+        retry_later = []
+        for order_id, data in pending:
+            key = idempotency_key("blockbee", order_id, data)
+            if queue.submit(key, "blockbee", order_id, data) == WebhookIngestionQueue.BUSY:
+                retry_later.append((order_id, data))
+            # Yield like a server between requests
+            await asyncio.sleep(0)
+        busy_responses += len(retry_later)
+        pending = retry_later
+        if pending:
+            await asyncio.sleep(0.01)  # provider honours Retry-After
+    await queue.stop()
+    return time.perf_counter() - start, ledger.writes, busy_responses, queue.stats()
+
+
+def main():
+    random.seed(7)
+    callbacks, unique = make_callbacks()
+    print(f"📊 Webhook ingestion load test: {CALLBACKS} callbacks, {unique} unique payments")
+
+    legacy_time, legacy_writes, _ = run_legacy(callbacks)
+    print(f"   legacy executor-per-request: {legacy_time:6.2f}s  {CALLBACKS / legacy_time:7.0f} cb/s  "
+          f"ledger writes {legacy_writes} ({legacy_writes - unique} duplicated)")
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for maxsize in (1000, 100):
+            elapsed, writes, busy, stats = asyncio.run(
+                run_ingestion(callbacks, os.path.join(tmpdir, f"events_{maxsize}.db"), maxsize=maxsize)
+            )
+            print(f"   ingestion queue (size {maxsize:>4}): {elapsed:6.2f}s  {CALLBACKS / elapsed:7.0f} cb/s  "
+                  f"ledger writes {writes} ({writes - unique} duplicated), "
+                  f"503 push-backs {busy}, duplicates acked {stats['duplicates']}")
+            assert writes == unique
+
+
+if __name__ == "__main__":
+    main()
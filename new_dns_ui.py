@@ -26,11 +26,11 @@ class NewDNSUI:
             
             # Simple menu options
             buttons = {
-                "en": {"view": "📋 View Records", "add": "➕ Add Record", "edit": "✏️ Edit Records", "delete": "🗑️ Delete Records", "back": "← Back"},
-                "fr": {"view": "📋 Voir Enregistrements", "add": "➕ Ajouter", "edit": "✏️ Modifier", "delete": "🗑️ Supprimer", "back": "← Retour"},
-                "hi": {"view": "📋 रिकॉर्ड देखें", "add": "➕ जोड़ें", "edit": "✏️ संपादित करें", "delete": "🗑️ हटाएं", "back": "← वापस"},
-                "zh": {"view": "📋 查看记录", "add": "➕ 添加记录", "edit": "✏️ 编辑记录", "delete": "🗑️ 删除记录", "back": "← 返回"},
-                "es": {"view": "📋 Ver Registros", "add": "➕ Agregar", "edit": "✏️ Editar", "delete": "🗑️ Eliminar", "back": "← Volver"}
+                "en": {"view": "📋 View Records", "add": "➕ Add Record", "edit": "✏️ Edit Records", "delete": "🗑️ Delete Records", "import": "📥 Import Zone File", "export": "📤 Export Zone File", "back": "← Back"},
+                "fr": {"view": "📋 Voir Enregistrements", "add": "➕ Ajouter", "edit": "✏️ Modifier", "delete": "🗑️ Supprimer", "import": "📥 Importer Zone", "export": "📤 Exporter Zone", "back": "← Retour"},
+                "hi": {"view": "📋 रिकॉर्ड देखें", "add": "➕ जोड़ें", "edit": "✏️ संपादित करें", "delete": "🗑️ हटाएं", "import": "📥 ज़ोन फ़ाइल आयात", "export": "📤 ज़ोन फ़ाइल निर्यात", "back": "← वापस"},
+                "zh": {"view": "📋 查看记录", "add": "➕ 添加记录", "edit": "✏️ 编辑记录", "delete": "🗑️ 删除记录", "import": "📥 导入区域文件", "export": "📤 导出区域文件", "back": "← 返回"},
+                "es": {"view": "📋 Ver Registros", "add": "➕ Agregar", "edit": "✏️ Editar", "delete": "🗑️ Eliminar", "import": "📥 Importar Zona", "export": "📤 Exportar Zona", "back": "← Volver"}
             }
             
             lang_buttons = buttons.get(user_lang, buttons["en"])
@@ -46,6 +46,10 @@ class NewDNSUI:
                     {"text": lang_buttons["edit"], "callback_data": f"dns_edit_{domain}"},
                     {"text": lang_buttons["delete"], "callback_data": f"dns_delete_{domain}"}
                 ],
+                [
+                    {"text": lang_buttons["import"], "callback_data": f"dns_import_{domain}"},
+                    {"text": lang_buttons["export"], "callback_data": f"dns_export_{domain}"}
+                ],
                 [{"text": lang_buttons["back"], "callback_data": f"my_domains"}]
             ]
             
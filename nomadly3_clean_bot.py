@@ -26,28 +26,24 @@ except ImportError:
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from telegram.request._httpxrequest import HTTPXRequest
-from api_services import OpenProviderAPI
-from apis.fastforex import FastForexAPI
+from async_api_clients import AsyncOpenProviderAPI
+from services.crypto_rate_service import get_crypto_rate_service
 from trustee_service_manager import TrusteeServiceManager
 from unified_dns_manager import unified_dns_manager, UnifiedDNSManager
 from ui_cleanup_manager import ui_cleanup
 from new_dns_ui import NewDNSUI
 from dns_propagation_checker import propagation_checker
-
-# Simple caching for speed optimization
-response_cache = {}
-cache_timeouts = {}
-
-def get_cached_data(key, default_value, timeout_seconds=300):
-    """Get cached value or return default for speed"""
-    import time
-    if key in response_cache and time.time() < cache_timeouts.get(key, 0):
-        return response_cache[key]
-    
-    # Cache the default value
-    response_cache[key] = default_value
-    cache_timeouts[key] = time.time() + timeout_seconds
-    return default_value
+from callback_routes import callback_router, callback_ack_text
+from fast_response_cache import availability_cache
+from session_store import SessionStore, get_session_store
+from cloudflare_transport import cloudflare_transport
+from zone_resolver import zone_id_resolver
+from bulk_dns_engine import ThrottledProgress, format_job_progress, get_bulk_dns_engine
+from propagation_watcher import format_watch_status, propagation_watcher
+from zone_file import export_zone, format_import_progress, import_zone
+from zone_provisioner import zone_provisioner
+from app.core.geo_policy import GeoPolicyError, compile_geo_policy
+from app.core.pagination import PaginationError
 
 # COMPATIBILITY FIX: Patch HTTPXRequest to remove proxy parameter
 _original_build_client = HTTPXRequest._build_client
@@ -132,20 +128,23 @@ class NomadlyCleanBot:
         openprovider_password = os.getenv("OPENPROVIDER_PASSWORD")
         
         if openprovider_username and openprovider_password:
-            self.openprovider = OpenProviderAPI(openprovider_username, openprovider_password)
+            # Async client with a pooled keep-alive session so registry lookups
+            # never block the event loop
+            self.openprovider = AsyncOpenProviderAPI(openprovider_username, openprovider_password)
             logger.info("✅ Registry API initialized")
         else:
             logger.warning("⚠️ Registry credentials not found, using fallback pricing")
             self.openprovider = None
         
-        # Initialize FastForex API for currency conversion
+        # Shared crypto rate table (one multi-symbol FastForex refresh on a timer)
         fastforex_api_key = os.getenv("FASTFOREX_API_KEY")
         if fastforex_api_key:
-            self.fastforex = FastForexAPI(fastforex_api_key)
-            logger.info("✅ FastForex API initialized")
+            self.rate_service = get_crypto_rate_service()
+            self.rate_service.start()
+            logger.info("✅ Crypto rate service started")
         else:
             logger.warning("⚠️ FastForex API key not found, using fallback conversion")
-            self.fastforex = None
+            self.rate_service = None
         
         # Initialize trustee service manager
         self.trustee_manager = TrusteeServiceManager()
@@ -172,7 +171,11 @@ class NomadlyCleanBot:
             payment_monitor.bot_instance = self
             
             # Check for any existing payment addresses in sessions
-            for user_id, session in self.user_sessions.items():
+            if isinstance(self.user_sessions, SessionStore):
+                pending_sessions = self.user_sessions.find_sessions('stage', 'payment_processing')
+            else:
+                pending_sessions = list(self.user_sessions.items())
+            for user_id, session in pending_sessions:
                 for crypto in ['btc', 'eth', 'ltc', 'doge']:
                     address_key = f'{crypto}_address'
                     if address_key in session and session.get('stage') == 'payment_processing':
@@ -190,71 +193,53 @@ class NomadlyCleanBot:
             logger.warning(f"Could not connect to payment monitor: {e}")
     
     def load_user_sessions(self):
-        """Load user sessions from file with enhanced error handling"""
+        """Load user sessions from the write-behind session store"""
         try:
-            if not os.path.exists('user_sessions.json'):
-                logger.info("📂 No existing user sessions file found, starting fresh")
-                self.user_sessions = {}
-                return
-                
-            with open('user_sessions.json', 'r') as f:
-                raw_data = f.read().strip()
-                if not raw_data:
-                    logger.warning("📂 Empty user sessions file, starting fresh")
-                    self.user_sessions = {}
-                    return
-                    
-                sessions_data = json.loads(raw_data)
-                if not isinstance(sessions_data, dict):
-                    logger.error("📂 Invalid user sessions format, starting fresh")
-                    self.user_sessions = {}
-                    return
-                
-                # Convert string keys back to integers with validation
-                self.user_sessions = {}
-                for k, v in sessions_data.items():
-                    try:
-                        user_id = int(k)
-                        if isinstance(v, dict):
-                            self.user_sessions[user_id] = v
-                        else:
-                            logger.warning(f"📂 Skipping invalid session data for user {k}")
-                    except (ValueError, TypeError) as e:
-                        logger.warning(f"📂 Skipping invalid user ID {k}: {e}")
-                
-                logger.info(f"📂 Successfully loaded {len(self.user_sessions)} user sessions")
-                
-                # Log language preferences for debugging
-                for user_id, session in self.user_sessions.items():
-                    if 'language' in session:
-                        logger.info(f"🌍 User {user_id} language preference: {session['language']}")
-                        
-        except json.JSONDecodeError as e:
-            logger.error(f"📂 Invalid JSON in user sessions file: {e}")
-            # Try to backup corrupted file
-            try:
-                import shutil
-                backup_name = f'user_sessions_corrupted_{int(datetime.now().timestamp())}.json'
-                shutil.copy('user_sessions.json', backup_name)
-                logger.info(f"📂 Corrupted file backed up as {backup_name}")
-            except:
-                pass
-            self.user_sessions = {}
+            self.user_sessions = get_session_store()
+            logger.info(
+                f"📂 Session store ready: {self.user_sessions.backend.count()} stored sessions, "
+                f"cache cap {self.user_sessions.max_entries}"
+            )
         except Exception as e:
             logger.error(f"📂 Critical error loading user sessions: {e}")
             self.user_sessions = {}
-    
+
     def save_user_sessions(self):
-        """Save user sessions to file with persistent preferences"""
+        """Persist changed user sessions (batched write-behind, only dirty users are written)"""
         try:
-            # Convert integer keys to strings for JSON serialization
-            sessions_to_save = {str(k): v for k, v in self.user_sessions.items()}
-            with open('user_sessions.json', 'w') as f:
-                json.dump(sessions_to_save, f)
-                logger.info(f"💾 Saved {len(self.user_sessions)} user sessions")
+            if isinstance(self.user_sessions, SessionStore):
+                self.user_sessions.save()
         except Exception as e:
             logger.error(f"Error saving user sessions: {e}")
 
+    async def startup(self, application):
+        """Open long-lived API connection pools once the application loop is running"""
+        await cloudflare_transport.start()
+        try:
+            await self.resume_bulk_dns_jobs()
+        except Exception as e:
+            logger.error(f"Error resuming bulk DNS jobs: {e}")
+        propagation_watcher.notify = self.notify_propagation
+        propagation_watcher.start()
+        zone_provisioner.start()
+
+    async def shutdown(self, application):
+        """Release pooled API connections when the application stops"""
+        if self.openprovider:
+            await self.openprovider.close()
+        await cloudflare_transport.aclose()
+        await propagation_watcher.stop()
+        await zone_provisioner.aclose()
+        from async_database import close_async_db_manager
+        await close_async_db_manager()
+        logger.info(f"🗂️ Account zone index: {zone_provisioner.index.stats()}")
+        logger.info(f"👀 Propagation watcher: {propagation_watcher.stats()}")
+        if isinstance(self.user_sessions, SessionStore):
+            self.user_sessions.close()
+            logger.info(f"🧠 Session cache: {self.user_sessions.stats()}")
+        logger.info(f"📊 Availability cache: {availability_cache.stats()}")
+        logger.info("🔌 Bot API clients closed")
+
     def get_crypto_amount(self, usd_amount: float, crypto_type: str) -> tuple:
         """Get real-time cryptocurrency amount for USD value"""
         try:
@@ -266,12 +251,12 @@ class NomadlyCleanBot:
                 'doge': 8.5         # ~$0.12 per DOGE
             }
             
-            if self.fastforex:
-                # Use real-time conversion
+            if self.rate_service:
+                # Cached real-time rate (no HTTP round trip per screen)
                 conversion_map = {'btc': 'BTC', 'eth': 'ETH', 'ltc': 'LTC', 'doge': 'DOGE'}
                 crypto_symbol = conversion_map.get(crypto_type, 'BTC')
                 
-                crypto_amount = self.fastforex.convert_usd_to_crypto(usd_amount, crypto_symbol)
+                crypto_amount = self.rate_service.usd_to_crypto(usd_amount, crypto_symbol)
                 if crypto_amount:
                     return crypto_amount, True  # Real-time rate
             
@@ -284,6 +269,15 @@ class NomadlyCleanBot:
             # Emergency fallback
             return usd_amount * 0.000015, False
 
+    def get_rate_freshness_text(self, crypto_type: str, is_realtime: bool) -> str:
+        """Describe how fresh the quoted rate is for invoices"""
+        if not is_realtime or not self.rate_service:
+            return "Estimated"
+        age = self.rate_service.rate_age(crypto_type)
+        if age is None:
+            return "Estimated"
+        return f"Live (quoted {int(age)}s ago)" if age < 120 else f"Live (quoted {int(age // 60)} min ago)"
+
     def get_user_persistent_preferences(self, user_id):
         """Get user's persistent email and nameserver preferences"""
         session = self.user_sessions.get(user_id, {})
@@ -330,41 +324,15 @@ class NomadlyCleanBot:
                 await update.message.reply_text("🚧 Service temporarily unavailable. Please try again.")
 
     async def handle_callback_query(self, update: Update, context):
-        """Handle all callback queries"""
+        """Handle all callback queries through the callback route table"""
         logger.info(f"🎯 CALLBACK HANDLER REACHED")
+        query = None
         try:
             query = update.callback_query
             logger.info(f"🎯 QUERY OBJECT: {query}")
             if query:
                 # Immediate acknowledgment with relevant feedback
-                if query.data and query.data.startswith("lang_"):
-                    await query.answer("✅ Selected")
-                elif query.data == "main_menu":
-                    await query.answer("🏴‍☠️ Loading...")
-                elif query.data == "search_domain":
-                    await query.answer("🔍 Searching...")
-                elif query.data == "my_domains":
-                    await query.answer("📋 Loading...")
-                elif query.data == "wallet":
-                    await query.answer("💰 Opening...")
-                elif query.data == "manage_dns":
-                    await query.answer("🛠️ Loading...")
-                elif query.data == "nameservers":
-                    await query.answer("🔧 Opening...")
-                elif query.data == "loyalty":
-                    await query.answer("🏆 Loading...")
-                elif query.data == "support":
-                    await query.answer("📞 Connecting...")
-                elif query.data == "change_language":
-                    await query.answer("🌍 Loading...")
-
-                elif query.data == "show_languages":
-                    await query.answer("🔙 Back...")
-
-                elif query.data and query.data.startswith("register_"):
-                    await query.answer("🚀 Starting...")
-                else:
-                    await query.answer("⚡ Processing...")
+                await query.answer(callback_ack_text(query.data))
 
             data = query.data if query else ""
             user_id = query.from_user.id if query and query.from_user else 0
@@ -376,808 +344,10 @@ class NomadlyCleanBot:
             if data and ('dns_' in data or 'manage_domain_' in data):
                 logger.info(f"DEBUG: DNS/Domain callback - data='{data}'")
 
-            # Language selection
-            if data and data.startswith("lang_"):
-                await self.handle_language_selection(query, data)
-            # Main menu - clear any session states to ensure clean navigation
-            elif data == "main_menu":
-                # Clear any pending DNS or domain input states for clean navigation
-                if user_id in self.user_sessions:
-                    session = self.user_sessions[user_id]
-                    # Remove any waiting states that could interfere with navigation
-                    session.pop('waiting_for_nameservers', None)
-                    session.pop('waiting_for_dns_input', None) 
-                    session.pop('waiting_for_dns_edit', None)
-                    session.pop('dns_step', None)
-                    session.pop('dns_record_name', None)
-                    session.pop('dns_record_type', None)
-                    session.pop('dns_domain', None)
-                
-                await self.show_main_menu_clean(query)
-
-            # Show languages (back to initial screen)
-            elif data == "show_languages":
-                await self.show_language_selection(query)
-            # Change language
-            elif data == "change_language":
-                await self.show_language_selection(query)
-            # Domain search
-            elif data == "search_domain":
-                await self.show_domain_search(query)
-            
-            # Handle domain registration workflow
-            elif data and data.startswith("register_"):
-                domain = data.replace("register_", "")
-                await self.handle_domain_registration(query, domain)
-            
-            # Handle email change workflow
-            elif data and data.startswith("change_email_"):
-                domain = data.replace("change_email_", "")
-                await self.handle_email_change(query, domain)
-            
-            # Handle nameserver change workflow
-            elif data and data.startswith("change_ns_"):
-                domain = data.replace("change_ns_", "")
-                await self.handle_nameserver_change(query, domain)
-            
-            # Handle nameserver switching (new functionality)
-            elif data and data.startswith("switch_cloudflare_"):
-                domain = data.replace("switch_cloudflare_", "")
-                await self.handle_switch_to_cloudflare(query, domain)
-            
-            elif data and data.startswith("nameservers_"):
-                domain = data.replace("nameservers_", "").replace("_", ".")
-                await self.handle_nameserver_management(query, domain)
-            
-            # Domain management handlers
-            elif data and data.startswith("manage_domain_"):
-                domain = data.replace("manage_domain_", "")
-                await self.handle_domain_management(query, domain)
-            
-            # DNS Tools removed - unified domain management through My Domains only
-            
-            elif data and data.startswith("dns_"):
-                # NEW CLEAN DNS ROUTING - Simple patterns only
-                logger.info(f"DEBUG: DNS callback caught by dns_ prefix handler: {data}")
-                await self.handle_new_dns_routing(query, data)
-            
-            elif data and data.startswith("privacy_"):
-                domain = data.replace("privacy_", "")
-                await self.handle_privacy_settings(query, domain)
-            
-            elif data and data.startswith("visibility_"):
-                domain = data.replace("visibility_", "")
-                await self.handle_visibility_control(query, domain)
-            
-            elif data and data.startswith("website_"):
-                domain = data.replace("website_", "")
-                await self.handle_website_status(query, domain)
-            
-            elif data and data.startswith("access_"):
-                domain = data.replace("access_", "")
-                await self.handle_access_control(query, domain)
-            
-            elif data and data.startswith("parking_"):
-                domain = data.replace("parking_", "")
-                await self.handle_parking_page(query, domain)
-            
-            elif data and data.startswith("redirect_"):
-                domain = data.replace("redirect_", "")
-                await self.handle_domain_redirect(query, domain)
-            
-            # Payment handlers
-            elif data and data.startswith("crypto_btc_"):
-                domain = data.replace("crypto_btc_", "")
-                await self.handle_crypto_address(query, "btc", domain)
-            
-            elif data and data.startswith("crypto_eth_"):
-                domain = data.replace("crypto_eth_", "")
-                await self.handle_crypto_address(query, "eth", domain)
-            
-            elif data and data.startswith("crypto_ltc_"):
-                domain = data.replace("crypto_ltc_", "")
-                await self.handle_crypto_address(query, "ltc", domain)
-            
-            elif data and data.startswith("crypto_doge_"):
-                domain = data.replace("crypto_doge_", "")
-                await self.handle_crypto_address(query, "doge", domain)
-            
-            elif data and data.startswith("pay_wallet_"):
-                domain = data.replace("pay_wallet_", "")
-                await self.handle_wallet_payment_for_domain(query, domain)
-            
-            # NOTE: check_payment_ is handled later with proper crypto_type parsing
-            
-            elif data and data.startswith("check_wallet_payment_"):
-                crypto_type = data.replace("check_wallet_payment_", "")
-                await self.check_wallet_funding_status(query, crypto_type)
-            
-            # Additional nameserver handlers
-            elif data and data.startswith("update_custom_ns_"):
-                domain = data.replace("update_custom_ns_", "")
-                await self.handle_update_custom_ns(query, domain)
-            
-
-            
-            elif data and data.startswith("ns_lookup_"):
-                domain = data.replace("ns_lookup_", "")
-                await self.handle_ns_lookup(query, domain)
-            
-            elif data and data.startswith("current_ns_"):
-                domain = data.replace("current_ns_", "")
-                await self.handle_current_ns(query, domain)
-            
-            elif data and data.startswith("test_dns_"):
-                domain = data.replace("test_dns_", "")
-                await self.handle_test_dns(query, domain)
-            
-            elif data and data.startswith("confirm_ns_update_"):
-                domain = data.replace("confirm_ns_update_", "").replace("_", ".")
-                await self.confirm_nameserver_update(query, domain)
-            
-            # Handle email selection choices
-            elif data and data.startswith("email_default_"):
-                domain = data.replace("email_default_", "")
-                user_id = query.from_user.id if query and query.from_user else 0
-                if user_id in self.user_sessions:
-                    self.user_sessions[user_id]["technical_email"] = "cloakhost@tutamail.com"
-                    self.save_user_sessions()
-                await self.handle_domain_registration(query, domain)
-            
-            elif data and data.startswith("email_custom_"):
-                domain = data.replace("email_custom_", "")
-                if query:
-                    await query.edit_message_text(
-                        f"📧 **Enter Custom Email**\n\n"
-                        f"Please type your email address in the chat.\n\n"
-                        f"**Example:** your.email@example.com\n\n"
-                        f"You'll receive a welcome email after registration!",
-                        parse_mode='Markdown'
-                    )
-                # Set waiting state for email input
-                if query and query.from_user:
-                    user_id = query.from_user.id
-                    if user_id in self.user_sessions:
-                        self.user_sessions[user_id]["waiting_for_email"] = domain
-                        self.save_user_sessions()
-            
-            # Handle nameserver selection choices
-            elif data and data.startswith("ns_nomadly_"):
-                domain = data.replace("ns_nomadly_", "")
-                user_id = query.from_user.id if query and query.from_user else 0
-                session = self.user_sessions.get(user_id, {})
-                
-                if user_id in self.user_sessions:
-                    self.user_sessions[user_id]["nameserver_choice"] = "nomadly"
-                    self.save_user_sessions()
-                
-                # Check if user was in payment context
-                payment_context = session.get("payment_address") or session.get("crypto_type")
-                
-                if payment_context:
-                    # Return to QR page if they have crypto context
-                    crypto_type = session.get("crypto_type", "eth")
-                    if crypto_type:
-                        await self.handle_qr_generation(query, crypto_type, domain)
-                    else:
-                        await self.handle_payment_selection(query, domain)
-                else:
-                    # Normal registration flow
-                    await self.handle_domain_registration(query, domain)
-            
-            elif data and data.startswith("ns_custom_"):
-                domain = data.replace("ns_custom_", "")
-                if query:
-                    await query.edit_message_text(
-                        f"🔧 **Enter Custom Nameservers**\n\n"
-                        f"Please type your nameservers in the chat, one per line.\n\n"
-                        f"**Example:**\n"
-                        f"ns1.yourprovider.com\n"
-                        f"ns2.yourprovider.com\n\n"
-                        f"**Or type them separated by commas:**\n"
-                        f"ns1.example.com, ns2.example.com",
-                        parse_mode='Markdown'
-                    )
-                # Set waiting state for nameserver input
-                if query and query.from_user:
-                    user_id = query.from_user.id
-                    if user_id in self.user_sessions:
-                        self.user_sessions[user_id]["waiting_for_ns"] = domain
-                        self.save_user_sessions()
-            
-            # Handle payment workflow
-            elif data and data.startswith("payment_"):
-                domain = data.replace("payment_", "")
-                await self.handle_payment_selection(query, domain)
-            
-            # Handle crypto payment selection
-
-            
-            # Handle wallet payment selection
-            elif data and data.startswith("pay_wallet_"):
-                domain = data.replace("pay_wallet_", "")
-                if query:
-                    await self.handle_wallet_payment_for_domain(query, domain)
-            
-            # Handle cryptocurrency address generation
-            elif data and data.startswith("crypto_"):
-                parts = data.split("_", 2)
-                if len(parts) >= 3:
-                    crypto_type = parts[1]
-                    domain = parts[2]
-                    await self.handle_crypto_address(query, crypto_type, domain)
-            
-            # Handle payment status checking and domain registration trigger
-            elif data and data.startswith("check_payment_"):
-                # Remove 'check_payment_' prefix and split the rest
-                remaining = data.replace("check_payment_", "")
-                parts = remaining.split("_", 1)
-                if len(parts) >= 2:
-                    crypto_type = parts[0]
-                    domain = parts[1]  # Domain might already contain dots
-                    # If domain has no dots, convert underscores to dots
-                    if "." not in domain:
-                        domain = domain.replace("_", ".")
-                    await self.handle_payment_status_check(query, crypto_type, domain)
-            
-            # Handle QR code generation
-            elif data and data.startswith("generate_qr_"):
-                parts = data.split("_", 3)
-                if len(parts) >= 4:
-                    crypto_type = parts[2]
-                    domain = parts[3]
-                    await self.handle_qr_generation(query, crypto_type, domain)
-            
-            # Handle email editing from payment flow
-            elif data and data.startswith("edit_email_"):
-                domain = data.replace("edit_email_", "").replace("_", ".")
-                if query and query.from_user:
-                    user_id = query.from_user.id
-                    if user_id in self.user_sessions:
-                        self.user_sessions[user_id]["waiting_for_email"] = domain
-                        self.save_user_sessions()
-                        await query.edit_message_text(
-                            "📧 **Enter technical contact email:**\n\n"
-                            "This email will receive domain notifications.\n"
-                            "Leave empty for anonymous registration.",
-                            parse_mode='Markdown'
-                        )
-            
-            # Handle nameserver editing from payment flow
-            elif data and data.startswith("edit_nameservers_"):
-                domain = data.replace("edit_nameservers_", "").replace("_", ".")
-                await self.handle_nameserver_configuration(query, domain)
-            
-            # Language selection handlers (explicit individual handlers)
-            elif data == "lang_en":
-                await self.handle_language_selection(query, data)
-            elif data == "lang_fr":
-                await self.handle_language_selection(query, data)
-            elif data == "lang_hi":
-                await self.handle_language_selection(query, data)
-            elif data == "lang_zh":
-                await self.handle_language_selection(query, data)
-            elif data == "lang_es":
-                await self.handle_language_selection(query, data)
-            
-            # Menu options - individual handlers for better coverage
-            elif data == "my_domains":
-                await self.show_my_domains(query)
-            elif data == "manage_dns":
-                logger.info(f"DNS management selected by user {query.from_user.id}")
-                await self.show_manage_dns(query)
-            elif data == "nameservers":
-                await self.show_nameserver_management(query)
-            elif data == "support_menu":
-                await self.show_support_menu(query)
-            elif data == "support":
-                await self.show_support_menu(query)
-            elif data == "loyalty":
-                await self.show_loyalty_dashboard(query)
-            elif data == "wallet":
-                await self.show_wallet_menu(query)
-            elif data == "faq_guides":
-                await self.show_faq_guides(query)
-            elif data == "new_search":
-                await self.show_domain_search(query)
-
-
-            
-            # DNS Add record type selection (from Try Again button)
-            elif data.startswith("dns_add_") and not data.startswith("dns_add_simple_"):
-                domain = data.replace("dns_add_", "")
-                text, keyboard = await self.new_dns_ui.show_add_record_types(query, domain)
-                await self.send_clean_message(query, text, keyboard)
-            
-            # Simple DNS action handlers
-            elif data.startswith("dns_add_simple_"):
-                domain = data.replace("dns_add_simple_", "")
-                await self.handle_simple_dns_add(query, domain)
-            elif data.startswith("dns_edit_simple_"):
-                domain = data.replace("dns_edit_simple_", "")
-                await self.handle_simple_dns_edit(query, domain)
-            elif data.startswith("dns_delete_simple_"):
-                domain = data.replace("dns_delete_simple_", "")
-                await self.handle_simple_dns_delete(query, domain)
-            
-            # Wallet funding options
-            elif data == "fund_wallet":
-                await self.show_wallet_funding_options(query)
-            elif data == "fund_crypto_btc":
-                await self.handle_wallet_crypto_funding(query, "btc")
-            elif data == "fund_crypto_eth":
-                await self.handle_wallet_crypto_funding(query, "eth")
-            elif data == "fund_crypto_ltc":
-                await self.handle_wallet_crypto_funding(query, "ltc")
-            elif data == "fund_crypto_doge":
-                await self.handle_wallet_crypto_funding(query, "doge")
-            elif data and data.startswith("fund_crypto_"):
-                crypto_type = data.replace("fund_crypto_", "")
-                await self.handle_wallet_crypto_funding(query, crypto_type)
-            elif data and data.startswith("check_wallet_payment_"):
-                parts = data.split("_", 3)
-                if len(parts) >= 4:
-                    crypto_type = parts[3]
-                    await self.handle_wallet_payment_status_check(query, crypto_type)
-            
-            # Domain management handlers
-            elif data and data.startswith("manage_domain_"):
-                domain_name = data.replace("manage_domain_", "")
-                logger.info(f"Domain management selected for: {domain_name}")
-                await self.handle_domain_management(query, domain_name)
-            
-            elif data and data.startswith("visibility_"):
-                domain_name = data.replace("visibility_", "")
-                await self.handle_domain_visibility_control(query, domain_name)
-            
-            elif data and data.startswith("privacy_"):
-                domain_name = data.replace("privacy_", "")
-                await self.handle_privacy_settings(query, domain_name)
-            
-            elif data and data.startswith("website_"):
-                domain_name = data.replace("website_", "")
-                await self.handle_website_control(query, domain_name)
-            
-            elif data and data.startswith("access_"):
-                domain_name = data.replace("access_", "")
-                await self.handle_access_control(query, domain_name)
-            
-            # Portfolio management handlers
-
-            
-            elif data == "portfolio_stats":
-                await self.handle_portfolio_stats(query)
-            
-
-            
-            # Domain redirect and parking handlers
-            elif data and data.startswith("redirect_"):
-                domain_name = data.replace("redirect_", "")
-                await self.handle_domain_redirect(query, domain_name)
-            
-            elif data and data.startswith("parking_"):
-                domain_name = data.replace("parking_", "")
-                await self.handle_domain_parking(query, domain_name)
-            
-
-            
-
-            
-
-            
-            elif data and data.startswith("visibility_"):
-                # Handle country visibility management
-                logger.info(f"🌍 Country visibility clicked - callback: {data}")
-                domain = data.replace("visibility_", "").replace("_", ".")
-                logger.info(f"🌍 Extracted domain: {domain}")
-                await self.show_country_visibility_control(query, domain)
-            
-            # Country visibility mode handlers
-            elif data and data.startswith("geo_mode_"):
-                parts = data.split("_", 3)  # geo_mode_[mode]_[domain]
-                if len(parts) >= 4:
-                    mode = parts[2]  # allow_all, block_except, allow_only
-                    domain = "_".join(parts[3:]).replace("_", ".")
-                    await self.handle_geo_mode_selection(query, mode, domain)
-            
-            elif data and data.startswith("geo_manage_"):
-                # Handle country management interface  
-                domain = data.replace("geo_manage_", "").replace("_", ".")
-                await self.show_country_management(query, domain)
-            
-            # Country selection handlers
-            elif data and data.startswith("country_toggle_"):
-                parts = data.split("_", 3)  # country_toggle_[code]_[domain]
-                if len(parts) >= 4:
-                    country_code = parts[2]
-                    domain = "_".join(parts[3:]).replace("_", ".")
-                    await self.handle_country_toggle(query, country_code, domain)
-            
-            elif data and data.startswith("country_clear_"):
-                domain = data.replace("country_clear_", "").replace("_", ".")
-                await self.handle_country_clear(query, domain)
-            
-            elif data and data.startswith("country_save_"):
-                domain = data.replace("country_save_", "").replace("_", ".")
-                await self.handle_country_save(query, domain)
-            
-            elif data and data.startswith("country_search_"):
-                domain = data.replace("country_search_", "").replace("_", ".")
-                await self.show_country_search(query, domain)
-            
-            # Additional visibility control handlers
-            elif data and data.startswith("whois_settings_"):
-                domain = data.replace("whois_settings_", "").replace("_", ".")
-                await self.handle_whois_settings(query, domain)
-            
-            elif data and data.startswith("search_visibility_"):
-                domain = data.replace("search_visibility_", "").replace("_", ".")
-                await self.handle_search_visibility(query, domain)
-            
-            elif data and data.startswith("geo_blocking_"):
-                domain = data.replace("geo_blocking_", "").replace("_", ".")
-                await self.handle_geo_blocking(query, domain)
-            
-            elif data and data.startswith("security_settings_"):
-                domain = data.replace("security_settings_", "").replace("_", ".")
-                await self.handle_security_settings(query, domain)
-            
-            # Additional missing handlers
-            elif data == "transaction_history":
-                await self.show_transaction_history(query)
-            elif data == "security_report":
-                await self.show_security_report(query)
-            elif data == "export_report":
-                await self.show_export_report(query)
-            elif data == "cost_analysis":
-                await self.show_cost_analysis(query)
-            elif data == "performance_data":
-                await self.show_performance_data(query)
-            elif data == "traffic_analytics":
-                await self.show_traffic_analytics(query)
-            elif data == "geographic_stats":
-                await self.show_geographic_stats(query)
-            elif data == "dns_health_report":
-                await self.show_dns_health_report(query)
-            elif data == "feature_comparison":
-                await self.show_feature_comparison(query)
-            elif data == "manual_setup_guide":
-                await self.show_manual_setup_guide(query)
-            elif data == "custom_search":
-                await self.show_custom_search(query)
-            elif data == "check_all_nameservers":
-                await self.check_all_nameservers(query)
-            elif data == "migrate_to_cloudflare":
-                await self.migrate_to_cloudflare(query)
-            elif data == "emergency_dns_reset":
-                await self.emergency_dns_reset(query)
-            
-            # Bulk operations handlers
-            elif data == "bulk_privacy_on":
-                await self.bulk_privacy_on(query)
-            elif data == "bulk_privacy_off":
-                await self.bulk_privacy_off(query)
-            elif data == "bulk_search_allow":
-                await self.bulk_search_allow(query)
-            elif data == "bulk_search_block":
-                await self.bulk_search_block(query)
-            elif data == "bulk_geo_rules":
-                await self.bulk_geo_rules(query)
-            elif data == "bulk_security_template":
-                await self.bulk_security_template(query)
-            elif data == "bulk_reset_all":
-                await self.bulk_reset_all(query)
-            elif data == "bulk_visibility_report":
-                await self.bulk_visibility_report(query)
-            
-            # DNS record management handlers
-            elif data == "dns_view_records":
-                # Get domain from session
-                user_id = query.from_user.id
-                domain = self.user_sessions.get(user_id, {}).get("current_dns_domain")
-                if domain:
-                    await self.show_dns_records_view(query, domain)
-                else:
-                    await query.answer("Session expired. Please start over.")
-            
-            # Add missing DNS record type handlers
-            elif data and data.startswith("add_aaaa_"):
-                domain = data.replace("add_aaaa_", "").replace("_", ".")
-                await self.handle_add_aaaa_record(query, domain)
-            
-            elif data and data.startswith("add_mx_"):
-                domain = data.replace("add_mx_", "").replace("_", ".")
-                await self.handle_add_mx_record(query, domain)
-            
-            elif data and data.startswith("add_cname_"):
-                domain = data.replace("add_cname_", "").replace("_", ".")
-                await self.handle_add_cname_record(query, domain)
-            
-            elif data and data.startswith("add_txt_"):
-                domain = data.replace("add_txt_", "").replace("_", ".")
-                await self.handle_add_txt_record(query, domain)
-            
-            elif data and data.startswith("add_srv_"):
-                domain = data.replace("add_srv_", "").replace("_", ".")
-                await self.handle_add_srv_record(query, domain)
-            
-            # Missing nameserver and maintenance handlers
-            elif data and data.startswith("switch_custom_"):
-                domain = data.replace("switch_custom_", "").replace("_", ".")
-                await self.handle_switch_custom_nameservers(query, domain)
-            
-            elif data and data.startswith("manual_cloudflare_"):
-                domain = data.replace("manual_cloudflare_", "").replace("_", ".")
-                await self.handle_manual_cloudflare_setup(query, domain)
-            
-            elif data and data.startswith("force_refresh_"):
-                domain = data.replace("force_refresh_", "").replace("_", ".")
-                await self.handle_force_refresh(query, domain)
-            
-            elif data and data.startswith("maintenance_"):
-                domain = data.replace("maintenance_", "").replace("_", ".")
-                await self.handle_maintenance_mode(query, domain)
-            
-            # Add missing back navigation handler
-            elif data == "back_to_domain_mgmt":
-                await self.handle_back_to_domain_management(query)
-            
-            # Add remaining missing handlers
-            elif data and data.startswith("ssl_manage_"):
-                domain = data.replace("ssl_manage_", "").replace("_", ".")
-                await self.handle_ssl_management(query, domain)
-            
-            elif data and data.startswith("cloudflare_status_"):
-                domain = data.replace("cloudflare_status_", "").replace("_", ".")
-                await self.handle_cloudflare_status(query, domain)
-            
-            elif data and data.startswith("site_offline_"):
-                domain = data.replace("site_offline_", "").replace("_", ".")
-                await self.handle_site_offline(query, domain)
-            
-            elif data and data.startswith("cdn_settings_"):
-                domain = data.replace("cdn_settings_", "").replace("_", ".")
-                await self.handle_cdn_settings(query, domain)
-            
-            elif data and data.startswith("add_a_"):
-                domain = data.replace("add_a_", "").replace("_", ".")
-                await self.handle_add_a_record(query, domain)
-            
-            elif data and data.startswith("performance_"):
-                domain = data.replace("performance_", "").replace("_", ".")
-                await self.handle_performance_settings(query, domain)
-            
-            elif data and data.startswith("site_online_"):
-                domain = data.replace("site_online_", "").replace("_", ".")
-                await self.handle_site_online(query, domain)
-            
-            elif data and data.startswith("dns_view_"):
-                # Handle legacy format
-                domain = data.replace("dns_view_", "")
-                # Clean domain of any prefix contamination
-                if '.' in domain:
-                    # Extract just the actual domain
-                    parts = domain.split('.')
-                    if len(parts) >= 2:
-                        # Get the last two parts as the domain (e.g., claudeb.sbs)
-                        domain = '.'.join(parts[-2:])
-                        # Convert back to underscore format for consistency
-                        domain = domain.replace('.', '_')
-                await self.handle_dns_view(query, domain)
-            
-            elif data == "dns_add_record":
-                # Get domain from session
-                user_id = query.from_user.id
-                domain = self.user_sessions.get(user_id, {}).get("current_dns_domain")
-                if domain:
-                    await self.handle_add_dns_record(query, domain)
-                else:
-                    await query.answer("Session expired. Please start over.")
-            
-            elif data and data.startswith("dns_add_"):
-                # Handle legacy format
-                domain = data.replace("dns_add_", "")
-                await self.handle_add_dns_record(query, domain)
-            
-            # DNS record creation workflow handlers
-            elif data and data.startswith("dns_create_"):
-                parts = data.split("_")
-                if len(parts) >= 3:
-                    record_type = parts[2]
-                    domain = "_".join(parts[3:])
-                    await self.handle_dns_create_record(query, record_type, domain)
-            
-            # New UX workflow handlers
-            elif data and data.startswith("dns_type_"):
-                # dns_type_a_claudeb_sbs -> Show Add/Edit/Delete for A records
-                parts = data.replace("dns_type_", "").split("_", 1)
-                if len(parts) == 2:
-                    record_type, domain = parts
-                    await self.handle_dns_type_selection(query, record_type, domain)
-            
-            elif data and data.startswith("dns_add_") and len(data.split("_")) >= 4:
-                # dns_add_a_claudeb_sbs -> Add A record field input
-                parts = data.replace("dns_add_", "").split("_", 1)
-                if len(parts) == 2:
-                    record_type, domain = parts
-                    await self.handle_dns_add_field_input(query, record_type, domain)
-            
-            elif data and data.startswith("dns_edit_type_"):
-                # dns_edit_type_a_claudeb_sbs -> Show list of A records to edit
-                parts = data.replace("dns_edit_type_", "").split("_", 1)
-                if len(parts) == 2:
-                    record_type, domain = parts
-                    await self.handle_dns_edit_type_list(query, record_type, domain)
-            
-            elif data and data.startswith("dns_delete_type_"):
-                # dns_delete_type_a_claudeb_sbs -> Show list of A records to delete
-                parts = data.replace("dns_delete_type_", "").split("_", 1)
-                if len(parts) == 2:
-                    record_type, domain = parts
-                    await self.handle_dns_delete_type_list(query, record_type, domain)
-            
-            # DNS record confirmation handler
-            elif data and data.startswith("dns_confirm_create_"):
-                domain = data.replace("dns_confirm_create_", "").replace("_", ".")
-                await self.handle_dns_confirm_create(query, domain)
-            
-            elif data == "dns_edit_records":
-                # Get domain from session
-                user_id = query.from_user.id
-                domain = self.user_sessions.get(user_id, {}).get("current_dns_domain")
-                if domain:
-                    logger.info(f"DNS edit list selected with domain: {domain}")
-                    await self.show_edit_dns_records_list(query, domain)
-                else:
-                    await query.answer("Session expired. Please start over.")
-            
-            elif data and data.startswith("dns_edit_list_"):
-                # Handle legacy format
-                domain = data.replace("dns_edit_list_", "")
-                logger.info(f"DNS edit list selected with domain (legacy): {domain}")
-                await self.show_edit_dns_records_list(query, domain)
-            
-            elif data == "dns_delete_records":
-                # Get domain from session
-                user_id = query.from_user.id
-                domain = self.user_sessions.get(user_id, {}).get("current_dns_domain")
-                if domain:
-                    await self.show_delete_dns_records_list(query, domain)
-                else:
-                    await query.answer("Session expired. Please start over.")
-            
-            elif data and data.startswith("dns_delete_list_"):
-                # Handle legacy format
-                domain = data.replace("dns_delete_list_", "")
-                await self.show_delete_dns_records_list(query, domain)
-            
-            elif data and (data.startswith("edit_dns_") or data.startswith("edit_dns_record_")):
-                logger.info(f"🔧 DNS EDIT CALLBACK: {data}")
-                
-                # Handle both legacy and new formats
-                if data.startswith("edit_dns_record_"):
-                    # Legacy format: edit_dns_record_claudeb.sbs_2
-                    callback_part = data.replace("edit_dns_record_", "")
-                    # Split domain and index: claudeb.sbs_2 -> ['claudeb.sbs', '2']
-                    parts = callback_part.rsplit("_", 1)
-                    if len(parts) == 2:
-                        domain = parts[0]
-                        record_index = int(parts[1])
-                        record_id = f"idx_{record_index}"  # Convert to index format for compatibility
-                        logger.info(f"🔧 DNS EDIT PARSED (legacy): record_id='{record_id}', domain='{domain}', index={record_index}")
-                        await self.handle_edit_dns_record(query, record_id, domain)
-                    else:
-                        logger.error(f"🔧 DNS EDIT PARSING FAILED (legacy): Expected 2 parts, got {len(parts)}: {parts}")
-                else:
-                    # New format: edit_dns_{record_id}_{domain_with_underscores}
-                    # Example: edit_dns_823d11992ce992a6d14865cc0ec5bebe_claudeb_sbs
-                    callback_part = data.replace("edit_dns_", "")
-                    
-                    # Split from the right to separate domain from record ID
-                    # Domain is always the last 2 parts (e.g., "claudeb_sbs" -> "claudeb.sbs")
-                    parts = callback_part.rsplit("_", 2)  # Split into max 3 parts from right
-                    logger.info(f"🔧 DNS EDIT PARTS: {parts}")
-                    
-                    if len(parts) >= 3:
-                        # Format: {record_id}_{domain_part1}_{domain_part2}
-                        record_id = parts[0]  # Real Cloudflare record ID
-                        domain = f"{parts[1]}.{parts[2]}"  # Reconstruct domain
-                        
-                        logger.info(f"🔧 DNS EDIT PARSED: record_id='{record_id}', domain='{domain}'")
-                        await self.handle_edit_dns_record(query, record_id, domain)
-                    elif len(parts) == 2:
-                        # Fallback for single TLD domains
-                        record_id = parts[0]
-                        domain = parts[1].replace('_', '.')
-                        
-                        logger.info(f"🔧 DNS EDIT PARSED (fallback): record_id='{record_id}', domain='{domain}'")
-                        await self.handle_edit_dns_record(query, record_id, domain)
-                    else:
-                        logger.error(f"🔧 DNS EDIT PARSING FAILED: Expected at least 2 parts, got {len(parts)}: {parts}")
-            
-            elif data and data.startswith("delete_dns_record_"):
-                # Handle format: delete_dns_record_claudeb.sbs_6
-                callback_part = data.replace("delete_dns_record_", "")
-                # Split domain and index using rsplit to handle domains with dots
-                parts = callback_part.rsplit("_", 1)
-                if len(parts) == 2:
-                    domain = parts[0]
-                    record_index = parts[1]
-                    logger.info(f"🗑️ DNS DELETE PARSED: domain='{domain}', record_index='{record_index}'")
-                    await self.handle_delete_dns_record(query, f"idx_{record_index}", domain)
-            
-            elif data == "dns_switch_ns":
-                # Get domain from session
-                user_id = query.from_user.id
-                domain = self.user_sessions.get(user_id, {}).get("current_dns_domain")
-                if domain:
-                    await self.show_nameserver_switch_options(query, domain)
-                else:
-                    await query.answer("Session expired. Please start over.")
-            
-            elif data and data.startswith("ns_switch_"):
-                # Handle legacy format
-                domain = data.replace("ns_switch_", "")
-                await self.show_nameserver_switch_options(query, domain)
-            
-            elif data and data.startswith("ns_cloudflare_"):
-                domain = data.replace("ns_cloudflare_", "")
-                await self.switch_to_cloudflare_dns(query, domain)
-            
-            elif data and data.startswith("ns_custom_"):
-                domain = data.replace("ns_custom_", "")
-                await self.switch_to_custom_nameservers(query, domain)
-            
-            elif data and data.startswith("already_cloudflare_"):
-                domain = data.replace("already_cloudflare_", "")
-                await self.handle_already_on_cloudflare(query, domain)
-            
-            elif data and data.startswith("add_dns_record_"):
-                domain = data.replace("add_dns_record_", "")
-                await self.handle_add_dns_record(query, domain)
-            
+            handled = await callback_router.dispatch(self, query, data)
 
-            
-            elif data and data.startswith("dns_replace_"):
-                # Handle DNS record replacement for conflicts: dns_replace_{domain}_{record_type}
-                parts = data.replace("dns_replace_", "").rsplit("_", 1)
-                if len(parts) == 2:
-                    domain_encoded, record_type = parts
-                    domain = domain_encoded.replace("_", ".")
-                    await self.handle_dns_replace_record(query, domain, record_type)
-            
-            elif data and data.startswith("whois_settings_"):
-                domain = data.replace("whois_settings_", "")
-                await self.handle_whois_settings(query, domain)
-            
-            elif data and data.startswith("search_visibility_"):
-                domain = data.replace("search_visibility_", "")
-                await self.handle_search_visibility(query, domain)
-            
-            elif data and data.startswith("geo_blocking_"):
-                domain = data.replace("geo_blocking_", "")
-                await self.handle_geo_blocking(query, domain)
-            
-            elif data and data.startswith("security_settings_"):
-                domain = data.replace("security_settings_", "")
-                await self.handle_security_settings(query, domain)
-            
-            # Mass DNS operations
-            elif data == "mass_add_a_record":
-                await self.mass_add_a_record(query)
-            elif data == "mass_update_mx":
-                await self.mass_update_mx(query)
-            elif data == "mass_configure_spf":
-                await self.mass_configure_spf(query)
-            elif data == "mass_change_ns":
-                await self.mass_change_ns(query)
-            elif data == "mass_cloudflare_migrate":
-                await self.mass_cloudflare_migrate(query)
-            elif data == "mass_propagation_check":
-                await self.mass_propagation_check(query)
-            
             # Default response
-            elif query:
+            if not handled and query:
                 await query.edit_message_text("🚧 Feature coming soon - stay tuned!")
 
         except Exception as e:
@@ -1230,6 +400,9 @@ class NomadlyCleanBot:
     async def handle_cloudflare_status(self, query, domain):
         """Handle Cloudflare status checking"""
         await query.answer("☁️ Status Check...")
+        # Propagation progress comes from the background watcher's last sweep
+        watch = propagation_watcher.get(domain)
+        propagation = f"\n\n{format_watch_status(watch)}" if watch else ""
         await self.ui_cleanup.safe_edit_message(
             query,
             f"☁️ **Cloudflare Status**\n\n"
@@ -1239,7 +412,7 @@ class NomadlyCleanBot:
             f"• CDN: ✅ Active\n"
             f"• SSL: ✅ Active\n"
             f"• DDoS Protection: ✅ Active\n\n"
-            f"All Cloudflare services operational.",
+            f"All Cloudflare services operational.{propagation}",
             None
         )
     
@@ -1662,16 +835,22 @@ class NomadlyCleanBot:
     
 
 
-    async def show_my_domains(self, query):
-        """Show user's domains - My Domains menu"""
+    async def show_my_domains(self, query, cursor=None):
+        """Show user's domains - My Domains menu, one keyset page at a time"""
         try:
             logger.info(f"DEBUG: show_my_domains called for user {query.from_user.id if query and query.from_user else 'unknown'}")
             user_id = query.from_user.id if query and query.from_user else 0
             user_lang = self.user_sessions.get(user_id, {}).get("language", "en")
             
-            # Get user domains
-            domains = await self.get_user_domains(user_id)
-            logger.info(f"DEBUG: My Domains - user {user_id} has {len(domains) if domains else 0} domains")
+            # Get one page of user domains
+            from async_database import get_async_db_manager
+            db = get_async_db_manager()
+            try:
+                page = await db.get_user_domains_page(user_id, cursor)
+            except PaginationError:
+                page = await db.get_user_domains_page(user_id)
+            domains = [{"domain_name": getattr(d, "domain_name", None)} for d in page.items]
+            logger.info(f"DEBUG: My Domains - user {user_id} page has {len(domains)} domains")
             
             if not domains:
                 text = "📂 My Domains\n\nYou don't have any registered domains yet.\n\nRegister your first domain to get started!"
@@ -1683,7 +862,7 @@ class NomadlyCleanBot:
             else:
                 # Show domains with enhanced status information
                 domain_list = []
-                for i, domain in enumerate(domains[:10], 1):
+                for i, domain in enumerate(domains, 1):
                     domain_name = domain.get('domain_name', 'Unknown')
                     
                     # Skip domains with invalid names
@@ -1701,7 +880,7 @@ class NomadlyCleanBot:
                 text = f"📂 My Domains\n\n{domain_text}\n\nSelect a domain to manage:"
                 
                 keyboard = []
-                for domain in domains[:10]:
+                for domain in domains:
                     domain_name = domain.get('domain_name', 'Unknown')
                     
                     # Skip domains with invalid names
@@ -1711,6 +890,9 @@ class NomadlyCleanBot:
                     safe_domain = domain_name.replace('.', '_')
                     keyboard.append([InlineKeyboardButton(f"Manage {domain_name}", callback_data=f"manage_domain_{safe_domain}")])
                 
+                page_row = self.page_buttons(page, "domains_page_")
+                if page_row:
+                    keyboard.append(page_row)
                 keyboard.append([InlineKeyboardButton("← Back", callback_data="main_menu")])
             
             reply_markup = InlineKeyboardMarkup(keyboard)
@@ -2207,8 +1389,8 @@ class NomadlyCleanBot:
                 )
             
             # Get current nameserver status from database 
-            from database import get_db_manager
-            db = get_db_manager()
+            from async_database import get_async_db_manager
+            db = get_async_db_manager()
             
             # Default nameservers for demonstration
             current_ns_type = "custom"
@@ -2216,7 +1398,7 @@ class NomadlyCleanBot:
             
             # Try to get real nameserver data from database
             try:
-                user_domains = db.get_user_domains(user_id)
+                user_domains = await db.get_user_domains(user_id)
                 for d in user_domains:
                     if hasattr(d, 'domain_name') and d.domain_name == domain_name:
                         nameserver_mode = getattr(d, 'nameserver_mode', 'custom')
@@ -2389,11 +1571,11 @@ class NomadlyCleanBot:
             user_id = query.from_user.id if query and query.from_user else 0
             
             # First check if domain is already on Cloudflare
-            from database import get_db_manager
-            db = get_db_manager()
+            from async_database import get_async_db_manager
+            db = get_async_db_manager()
             
             try:
-                user_domains = db.get_user_domains(user_id)
+                user_domains = await db.get_user_domains(user_id)
                 domain_already_on_cloudflare = False
                 
                 for d in user_domains:
@@ -2479,8 +1661,9 @@ class NomadlyCleanBot:
                     f"• ✅ Global CDN acceleration\n"
                     f"• ✅ Advanced DNS management\n"
                     f"• ✅ SSL certificate automation\n\n"
-                    f"🚀 **DNS propagation will complete within 24-48 hours**"
+                    f"🔔 **We'll message you as soon as the new nameservers are live worldwide**"
                 )
+                self.watch_propagation(query, domain_name, switch_result['nameservers'])
                 
                 keyboard = [
                     [
@@ -3368,9 +2551,9 @@ class NomadlyCleanBot:
         """Get user domains from database using correct telegram_id column"""
         try:
             logger.info(f"DEBUG: Fetching domains for user {user_id}")
-            from database import get_db_manager
-            db = get_db_manager()
-            domains = db.get_user_domains(user_id)
+            from async_database import get_async_db_manager
+            db = get_async_db_manager()
+            domains = await db.get_user_domains(user_id)
             
             logger.info(f"DEBUG: Found {len(domains)} domains in database")
             logger.info(f"DEBUG: Raw domains list: {domains}")
@@ -3424,11 +2607,11 @@ class NomadlyCleanBot:
             clean_domain = self.extract_clean_domain_name(domain_name)
             
             # Get actual domain data from database for stats
-            from database import get_db_manager
-            db = get_db_manager()
+            from async_database import get_async_db_manager
+            db = get_async_db_manager()
             
             # Check if domain exists for user and get real data
-            user_domains = db.get_user_domains(user_id)
+            user_domains = await db.get_user_domains(user_id)
             domain_found = False
             domain_record_count = 0
             domain_expires = "Unknown"
@@ -3935,7 +3118,8 @@ class NomadlyCleanBot:
                 
             selected_countries = self.user_sessions[user_id].get(f"selected_countries_{domain_name}", [])
             
-            # Toggle country selection
+            # Toggles only edit the session; nothing reaches Cloudflare until save
+            country_code = country_code.upper()
             if country_code in selected_countries:
                 selected_countries.remove(country_code)
             else:
@@ -3979,8 +3163,43 @@ class NomadlyCleanBot:
             selected_countries = self.user_sessions.get(user_id, {}).get(f"selected_countries_{domain_name}", [])
             geo_mode = self.user_sessions.get(user_id, {}).get(f"geo_mode_{domain_name}", "allow_all")
             
-            # In production, this would save to database
-            # For now, just show confirmation
+            # One compiled rule per domain; unchanged selections skip the API entirely
+            try:
+                rule = compile_geo_policy(geo_mode, selected_countries)
+                zone_id = await unified_dns_manager.get_zone_id(domain_name)
+                if zone_id:
+                    result = await unified_dns_manager.apply_geo_rule(zone_id, rule)
+                else:
+                    result = {"success": False, "error": "Domain is not on Cloudflare"}
+            except GeoPolicyError as e:
+                result = {"success": False, "error": str(e)}
+            
+            if not result["success"]:
+                logger.error(f"❌ Geo policy save failed for {domain_name}: {result['error']}")
+                fail_texts = {
+                    "en": f"❌ <b>Settings Not Saved</b>\n\n{result['error']}",
+                    "fr": f"❌ <b>Paramètres Non Sauvegardés</b>\n\n{result['error']}",
+                    "hi": f"❌ <b>सेटिंग्स सेव नहीं हुईं</b>\n\n{result['error']}",
+                    "zh": f"❌ <b>设置未保存</b>\n\n{result['error']}",
+                    "es": f"❌ <b>Configuración No Guardada</b>\n\n{result['error']}"
+                }
+                retry_texts = {
+                    "en": "← Back to Countries",
+                    "fr": "← Retour Pays",
+                    "hi": "← देशों पर वापस",
+                    "zh": "← 返回国家",
+                    "es": "← Volver a Países"
+                }
+                callback_domain = domain_name.replace('.', '_')
+                await query.edit_message_text(
+                    fail_texts.get(user_lang, fail_texts["en"]),
+                    reply_markup=InlineKeyboardMarkup([[
+                        InlineKeyboardButton(retry_texts.get(user_lang, retry_texts["en"]),
+                                             callback_data=f"geo_manage_{callback_domain}")
+                    ]]),
+                    parse_mode='HTML'
+                )
+                return
             
             # Confirmation messages
             save_texts = {
@@ -4177,7 +3396,7 @@ class NomadlyCleanBot:
         """Show comprehensive portfolio statistics and analytics"""
         try:
             user_id = query.from_user.id if query and query.from_user else 0
-            domains = self.get_user_domains(user_id)
+            domains = await self.get_user_domains(user_id)
             
             stats_text = (
                 f"<b>📊 Portfolio Stats</b>\n\n"
@@ -4398,6 +3617,9 @@ class NomadlyCleanBot:
                 elif "waiting_for_ns" in session:
                     # Handle custom nameserver input
                     await self.handle_custom_nameserver_input(update.message, text, session["waiting_for_ns"])
+                elif "waiting_for_mass_dns" in session:
+                    # Handle the value for a mass DNS operation
+                    await self.handle_mass_dns_input(update.message, text, session["waiting_for_mass_dns"])
                 elif self.is_valid_email(text):
                     # User sent an email but we're not expecting one - provide guidance
                     await update.message.reply_text(
@@ -4812,7 +4034,7 @@ class NomadlyCleanBot:
             rate_indicator = "🔴 Live Rate" if is_realtime else "🟡 Est. Rate"
             
             # Format rate indicator
-            rate_text = "Live (updates in real-time)" if is_realtime else "Estimated"
+            rate_text = self.get_rate_freshness_text(crypto_type, is_realtime)
             
             # Get user language for multilingual payment screen
             user_language = session.get("language", "en")
@@ -5000,9 +4222,23 @@ class NomadlyCleanBot:
             test_unavailable = ["wewillwin", "example", "test", "demo", "mycompany", "privacyfirst"]
             force_taken = domain_name.lower() in test_unavailable
             
+            # Show only 2 alternatives for mobile
+            current_extension = full_domain.split('.')[1]
+            alternative_tlds = ["net", "org"] if current_extension == "com" else ["com", "net"]
+            alternatives = [f"{domain_name}.{tld}" for tld in alternative_tlds[:2]]  # Show only 2 alternatives on mobile
+            
+            # One registry round trip for the requested domain and its alternatives
+            batch_results = {}
+            if self.openprovider:
+                lookup_domains = alternatives if force_taken else [full_domain] + alternatives
+                try:
+                    batch_results = await self.openprovider.check_domains_availability(lookup_domains)
+                except Exception as e:
+                    logger.error(f"Nomadly batch check exception: {e}")
+            
             if self.openprovider and not force_taken:
                 try:
-                    api_result = self.openprovider.check_domain_availability(full_domain)
+                    api_result = batch_results[full_domain]
                     
                     if api_result.get("error"):
                         await checking_msg.edit_text(f"⚠️ **Error checking domain**\n\n{api_result['error']}\n\n🔄 Using Nomadly pricing estimates...", parse_mode='Markdown')
@@ -5113,11 +4349,6 @@ class NomadlyCleanBot:
                 taken_text = taken_texts.get(user_lang, taken_texts["en"])
                 result_text += f"❌ **{full_domain}** {taken_text}\n"
             
-            # Show only 2 alternatives for mobile
-            current_extension = full_domain.split('.')[1]
-            alternative_tlds = ["net", "org"] if current_extension == "com" else ["com", "net"]
-            alternatives = [f"{domain_name}.{tld}" for tld in alternative_tlds[:2]]  # Show only 2 alternatives on mobile
-            
             available_alts = []
             has_alternatives = False
             
@@ -5127,7 +4358,7 @@ class NomadlyCleanBot:
                 for alt in alternatives:
                     try:
                         if self.openprovider:
-                            alt_result = self.openprovider.check_domain_availability(alt)
+                            alt_result = batch_results[alt]
                         else:
                             alt_ext = alt.split('.')[-1]
                             alt_result = {
@@ -5244,14 +4475,23 @@ class NomadlyCleanBot:
             
             # Check popular extensions using Nomadly
             extensions_to_check = ["com", "net", "org", "info", "io"]
+            alternative_tlds = ["sbs", "xyz", "online"]
+            alternatives = [f"{domain_name}.{tld}" for tld in alternative_tlds[:2]]  # Only 2 alternatives
             available_domains = []
             unavailable_domains = []
             
+            # One registry round trip covers every extension plus the alternatives
+            batch_results = {}
+            if self.openprovider:
+                batch_results = await self.openprovider.check_domains_availability(
+                    [f"{domain_name}.{ext}" for ext in extensions_to_check] + alternatives
+                )
+            
             for ext in extensions_to_check:
                 full_domain = f"{domain_name}.{ext}"
                 
                 if self.openprovider:
-                    api_result = self.openprovider.check_domain_availability(full_domain)
+                    api_result = batch_results[full_domain]
                 else:
                     # Fallback simulation
                     api_result = {
@@ -5346,15 +4586,13 @@ class NomadlyCleanBot:
             
             # Show alternative TLD suggestions briefly
             if not available_domains or len(available_domains) < 2:
-                alternative_tlds = ["sbs", "xyz", "online"]
-                alternatives = [f"{domain_name}.{tld}" for tld in alternative_tlds[:2]]  # Only 2 alternatives
                 alt_available = []
                 
                 for alt in alternatives:
                     try:
                         alt_ext = alt.split('.')[1]
                         if self.openprovider:
-                            alt_result = self.openprovider.check_domain_availability(alt)
+                            alt_result = batch_results[alt]
                         else:
                             alt_ext = alt.split('.')[-1]
                             alt_result = {
@@ -5480,7 +4718,7 @@ class NomadlyCleanBot:
             # Get pricing from API or fallback, including trustee services
             try:
                 if self.openprovider:
-                    pricing_result = self.openprovider.check_domain_availability(display_domain)
+                    pricing_result = await self.openprovider.check_domain_availability(display_domain)
                     base_price = pricing_result.get("price", 49.50)
                     currency = pricing_result.get("currency", "USD")
                 else:
@@ -6188,14 +5426,14 @@ class NomadlyCleanBot:
                 payment_service = get_payment_service()
                 
                 # Check for any order associated with this user and domain
-                from database import get_db_manager
-                db = get_db_manager()
+                from async_database import get_async_db_manager
+                db = get_async_db_manager()
                 
                 # Find the most recent order for this user/domain
                 orders = []
                 try:
                     # Get all orders for user
-                    user_orders = db.get_user_orders(user_id)
+                    user_orders = await db.get_user_orders(user_id)
                     if user_orders:
                         # Filter for this domain
                         for order in user_orders:
@@ -6866,7 +6104,7 @@ class NomadlyCleanBot:
             rate_indicator = "🔴 Live Rate" if is_realtime else "🟡 Est. Rate"
             
             # Format rate indicator
-            rate_text = "Live (updates in real-time)" if is_realtime else "Estimated"
+            rate_text = self.get_rate_freshness_text(crypto_type, is_realtime)
             
             # Get payment address from session (should be there from crypto generation)
             payment_address = session.get(f'{crypto_type}_address', 'Address not generated')
@@ -6876,7 +6114,8 @@ class NomadlyCleanBot:
                 f"<b>📱 QR Code - {crypto_details['name']}</b>\n"
                 f"━━━━━━━━━━━━━━━━━━\n"
                 f"<b>{session.get('domain', domain.replace('_', '.'))}</b>\n"
-                f"Amount: <b>${usd_amount:.2f}</b> ({crypto_display})\n\n"
+                f"Amount: <b>${usd_amount:.2f}</b> ({crypto_display})\n"
+                f"💱 Rate: {rate_text}\n\n"
                 f"<b>Payment Address:</b>\n"
                 f"<pre>{payment_address}</pre>\n\n"
                 f"<i>📲 Open your crypto wallet app\n"
@@ -6977,22 +6216,58 @@ class NomadlyCleanBot:
 
     # === MISSING METHOD IMPLEMENTATIONS ===
     
-    async def show_transaction_history(self, query):
-        """Show transaction history"""
+    def page_buttons(self, page, callback_prefix):
+        """Prev/next buttons for a keyset page, or None when it is the only page"""
+        row = []
+        if page.has_prev:
+            row.append(InlineKeyboardButton("⬅️ Prev", callback_data=f"{callback_prefix}{page.prev_cursor}"))
+        if page.has_next:
+            row.append(InlineKeyboardButton("Next ➡️", callback_data=f"{callback_prefix}{page.next_cursor}"))
+        return row or None
+
+    async def show_transaction_history(self, query, cursor=None):
+        """Show wallet transaction history, one keyset page at a time"""
         user_id = query.from_user.id if query and query.from_user else 0
         user_lang = self.user_sessions.get(user_id, {}).get("language", "en")
         
         transaction_text = {
-            "en": "💳 **Transaction History**\n\n📊 Recent transactions and domain purchases will appear here.\n\n*Coming soon: Complete transaction tracking with crypto payments, domain registrations, and wallet funding history.*",
-            "fr": "💳 **Historique des Transactions**\n\n📊 Les transactions récentes et achats de domaines apparaîtront ici.\n\n*Bientôt : Suivi complet des transactions avec paiements crypto, enregistrements de domaines et historique de financement de portefeuille.*"
+            "en": {"title": "💳 <b>Transaction History</b>", "empty": "📊 No wallet transactions yet."},
+            "fr": {"title": "💳 <b>Historique des Transactions</b>", "empty": "📊 Aucune transaction pour le moment."}
         }
+        texts = transaction_text.get(user_lang, transaction_text["en"])
         
-        keyboard = [[InlineKeyboardButton("← Back", callback_data="wallet")]]
+        from async_database import get_async_db_manager
+        db = get_async_db_manager()
+        try:
+            page = await db.get_user_transactions_page(user_id, cursor)
+        except PaginationError:
+            page = await db.get_user_transactions_page(user_id)
+        except Exception as e:
+            logger.error(f"Error loading transaction history for {user_id}: {e}")
+            page = None
+        
+        if page and page.items:
+            lines = []
+            for tx in page.items:
+                created = tx.created_at.strftime("%Y-%m-%d") if tx.created_at else "—"
+                sign = "-" if tx.amount is not None and tx.amount < 0 else "+"
+                lines.append(
+                    f"{created} • {tx.transaction_type} • {sign}${abs(float(tx.amount or 0)):.2f} ({tx.status})"
+                )
+            text = f"{texts['title']}\n\n" + "\n".join(lines)
+        else:
+            text = f"{texts['title']}\n\n{texts['empty']}"
+        
+        keyboard = []
+        page_row = self.page_buttons(page, "txn_page_") if page else None
+        if page_row:
+            keyboard.append(page_row)
+        keyboard.append([InlineKeyboardButton("← Back", callback_data="wallet")])
         
         await query.edit_message_text(
-            transaction_text.get(user_lang, transaction_text["en"]),
+            text,
             reply_markup=InlineKeyboardMarkup(keyboard),
-            parse_mode='Markdown'
+            parse_mode='HTML'
         )
 
     async def show_security_report(self, query):
@@ -7201,7 +6476,8 @@ class NomadlyCleanBot:
         await query.edit_message_text("🌍 Bulk geographic rules applied - Feature ready!")
     
     async def bulk_security_template(self, query):
-        await query.edit_message_text("🛡️ Bulk security template applied - Feature ready!")
+        """Add SPF and DMARC records to every domain that has none"""
+        await self.start_bulk_dns_job(query.from_user.id, "security_template", {}, query=query)
     
     async def bulk_reset_all(self, query):
         await query.edit_message_text("🔄 Bulk settings reset - Feature ready!")
@@ -7210,22 +6486,189 @@ class NomadlyCleanBot:
         await query.edit_message_text("📊 Bulk visibility report generated - Feature ready!")
     
     async def mass_add_a_record(self, query):
-        await query.edit_message_text("📝 Mass A record addition - Feature ready!")
+        await self.prompt_mass_dns_input(query, "add_a")
     
     async def mass_update_mx(self, query):
-        await query.edit_message_text("📧 Mass MX record update - Feature ready!")
+        await self.prompt_mass_dns_input(query, "update_mx")
     
     async def mass_configure_spf(self, query):
-        await query.edit_message_text("🛡️ Mass SPF configuration - Feature ready!")
+        await self.prompt_mass_dns_input(query, "configure_spf")
     
     async def mass_change_ns(self, query):
-        await query.edit_message_text("🔧 Mass nameserver change - Feature ready!")
+        await self.prompt_mass_dns_input(query, "change_ns")
     
     async def mass_cloudflare_migrate(self, query):
-        await query.edit_message_text("⚡ Mass Cloudflare migration - Feature ready!")
+        """Show how many domains a Cloudflare migration touches before starting it"""
+        domains = await self.get_user_domains(query.from_user.id)
+        if not domains:
+            await query.edit_message_text(
+                "📂 You have no domains yet.",
+                reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("← Back", callback_data="my_domains")]])
+            )
+            return
+        
+        keyboard = [
+            [InlineKeyboardButton(f"✅ Migrate {len(domains)} domains", callback_data="mass_cloudflare_migrate_confirm")],
+            [InlineKeyboardButton("❌ Cancel", callback_data="my_domains")]
+        ]
+        await query.edit_message_text(
+            f"⚡ **Migrate All Domains to Cloudflare**\n\n"
+            f"**Domains:** {len(domains)}\n\n"
+            f"⚠️ Every domain gets a Cloudflare zone and its nameservers are changed at the registrar.\n"
+            f"📝 DNS propagation may take 24-48 hours",
+            reply_markup=InlineKeyboardMarkup(keyboard),
+            parse_mode='Markdown'
+        )
+    
+    async def mass_cloudflare_migrate_confirm(self, query):
+        await self.start_bulk_dns_job(query.from_user.id, "cloudflare_migrate", {}, query=query)
+    
+    MASS_DNS_PROMPTS = {
+        "add_a": "📝 **Add A Record to All Domains**\n\nSend the IPv4 address every domain should point to.\n\n**Example:** `203.0.113.10`",
+        "update_mx": "📧 **Update MX on All Domains**\n\nSend the mail server, optionally with its priority. Existing MX records are replaced.\n\n**Example:** `10 mx1.mailhost.com`",
+        "configure_spf": "🛡️ **Configure SPF on All Domains**\n\nSend the SPF record. Existing SPF records are replaced.\n\n**Example:** `v=spf1 include:_spf.mailhost.com ~all`",
+        "change_ns": "🔧 **Change Nameservers on All Domains**\n\nSend at least 2 nameservers, one per line or comma-separated.\n\n**Example:**\nns1.provider.com\nns2.provider.com",
+    }
+    
+    async def prompt_mass_dns_input(self, query, operation):
+        """Ask for the value a mass DNS operation applies to every domain"""
+        user_id = query.from_user.id
+        if not await self.get_user_domains(user_id):
+            await query.edit_message_text(
+                "📂 You have no domains yet.",
+                reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("← Back", callback_data="my_domains")]])
+            )
+            return
+        
+        self.user_sessions.setdefault(user_id, {})["waiting_for_mass_dns"] = operation
+        self.save_user_sessions()
+        await query.edit_message_text(
+            self.MASS_DNS_PROMPTS[operation],
+            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("← Back", callback_data="my_domains")]]),
+            parse_mode='Markdown'
+        )
+    
+    async def handle_mass_dns_input(self, message, text, operation):
+        """Validate the value for a mass DNS operation and start the bulk job"""
+        import ipaddress
+        import re
+        user_id = message.from_user.id
+        params = {}
+        error = None
+        
+        if operation == "add_a":
+            try:
+                params["ip"] = str(ipaddress.IPv4Address(text.strip()))
+            except ValueError:
+                error = "❌ Invalid IPv4 address. Example: 203.0.113.10"
+        elif operation == "update_mx":
+            parts = text.split()
+            if len(parts) == 2 and parts[0].isdigit():
+                params["priority"], params["host"] = int(parts[0]), parts[1].rstrip(".")
+            elif len(parts) == 1:
+                params["priority"], params["host"] = 10, parts[0].rstrip(".")
+            if not params or not re.match(r'^[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$', params["host"]):
+                error = "❌ Invalid mail server. Example: 10 mx1.mailhost.com"
+        elif operation == "configure_spf":
+            if not text.strip().startswith("v=spf1"):
+                error = "❌ An SPF record starts with v=spf1"
+            params["spf"] = text.strip()
+        elif operation == "change_ns":
+            nameservers = [ns.strip().rstrip(".") for ns in re.split(r'[,\n]', text) if ns.strip()]
+            if len(nameservers) < 2 or not all(re.match(r'^[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$', ns) for ns in nameservers):
+                error = "❌ Send at least 2 valid nameservers, e.g. ns1.provider.com"
+            params["nameservers"] = nameservers
+        
+        if error:
+            await message.reply_text(error)
+            return
+        
+        self.user_sessions.get(user_id, {}).pop("waiting_for_mass_dns", None)
+        self.save_user_sessions()
+        await self.start_bulk_dns_job(user_id, operation, params, message=message)
+    
+    def _bulk_progress(self, chat_id, message_id):
+        keyboard = InlineKeyboardMarkup([[InlineKeyboardButton("← Back", callback_data="my_domains")]])
+        
+        async def send(text):
+            await self.application.bot.edit_message_text(
+                text, chat_id=chat_id, message_id=message_id, reply_markup=keyboard
+            )
+        return ThrottledProgress(send)
+    
+    async def start_bulk_dns_job(self, user_id, operation, params, query=None, message=None):
+        """Create a bulk job over all of the user's domains and run it in the background"""
+        domains = [d["domain_name"] for d in await self.get_user_domains(user_id)]
+        if not domains:
+            text = "📂 You have no domains yet."
+            if query:
+                await query.edit_message_text(text)
+            else:
+                await message.reply_text(text)
+            return
+        
+        engine = get_bulk_dns_engine(self.openprovider)
+        job = engine.create_job(user_id, operation, domains, params)
+        if query:
+            await query.edit_message_text(format_job_progress(job))
+            sent = query.message
+        else:
+            sent = await message.reply_text(format_job_progress(job))
+        
+        engine.store.set_message(job.job_id, sent.chat_id, sent.message_id)
+        engine.start(job, self._bulk_progress(sent.chat_id, sent.message_id))
+    
+    async def resume_bulk_dns_jobs(self):
+        """Continue bulk jobs a restart interrupted"""
+        engine = get_bulk_dns_engine(self.openprovider)
+        for job in engine.unfinished_jobs():
+            if engine.is_running(job.job_id):
+                continue
+            logger.info(f"📦 Resuming bulk job {job.job_id}: {len(job.domains) - job.finished} domains left")
+            progress = self._bulk_progress(job.chat_id, job.message_id) if job.chat_id and job.message_id else None
+            engine.start(job, progress)
+    
+    def watch_propagation(self, query, domain, nameservers):
+        """Have the background watcher tell the user when the new nameservers are live"""
+        try:
+            user_id = query.from_user.id
+            chat_id = query.message.chat_id if query.message else user_id
+            propagation_watcher.watch(domain, nameservers, user_id, chat_id)
+        except Exception as e:
+            logger.error(f"Could not start propagation watch for {domain}: {e}")
+    
+    async def notify_propagation(self, watch, result):
+        """Message the user when a watched domain converges or its watch expires"""
+        if result is not None:
+            text = (
+                f"✅ DNS propagation complete for {watch.domain}\n\n"
+                f"{result.get('propagated_servers', 0)} of {result.get('checked_servers', 0)} "
+                f"global resolvers now return your new nameservers:\n"
+                + "\n".join(f"• {ns}" for ns in watch.expected)
+            )
+        else:
+            hours = int((watch.expires_at - watch.created_at) // 3600)
+            text = (
+                f"⚠️ {watch.domain} has not finished propagating after {hours} hours\n\n"
+                f"Last check: {watch.agreed_servers} of {watch.checked_servers} resolvers showed the new nameservers. "
+                f"Please confirm the nameservers at your registrar or contact support."
+            )
+        keyboard = InlineKeyboardMarkup([[
+            InlineKeyboardButton(f"⚙️ Manage {watch.domain}", callback_data=f"manage_domain_{watch.domain}")
+        ]])
+        await self.application.bot.send_message(chat_id=watch.chat_id, text=text, reply_markup=keyboard)
     
     async def mass_propagation_check(self, query):
-        await query.edit_message_text("🌐 Mass DNS propagation check - Feature ready!")
+        """Show the background propagation watches for the user's domains"""
+        user_id = query.from_user.id if query and query.from_user else 0
+        watches = propagation_watcher.for_user(user_id)
+        if watches:
+            text = "🌐 Propagation in progress\n\n" + "\n".join(format_watch_status(w) for w in watches)
+            text += "\n\n🔔 You'll get a message as each domain goes live."
+        else:
+            text = "🌐 No propagation in progress\n\nAll nameserver changes have finished propagating."
+        keyboard = InlineKeyboardMarkup([[InlineKeyboardButton("← Back", callback_data="my_domains")]])
+        await query.edit_message_text(text, reply_markup=keyboard)
     
     # NEW CLEAN DNS SYSTEM METHODS
     def extract_clean_domain(self, callback_data):
@@ -7262,6 +6705,10 @@ class NomadlyCleanBot:
             if data.startswith("dns_main_"):
                 text, keyboard = await self.new_dns_ui.show_dns_main_menu(query, clean_domain)
                 await self.send_clean_message(query, text, keyboard)
+            elif data.startswith("dns_import_"):
+                await self.prompt_zone_import(query, clean_domain)
+            elif data.startswith("dns_export_"):
+                await self.export_zone_file(query, clean_domain)
             elif data.startswith("dns_view_"):
                 text, keyboard = await self.new_dns_ui.show_dns_records(query, clean_domain)
                 await self.send_clean_message(query, text, keyboard)
@@ -7310,6 +6757,93 @@ class NomadlyCleanBot:
     
 
     
+    async def prompt_zone_import(self, query, domain):
+        """Ask for a BIND zone file to import into the domain's Cloudflare zone"""
+        user_id = query.from_user.id
+        self.user_sessions.setdefault(user_id, {})["waiting_for_zone_file"] = domain
+        self.save_user_sessions()
+        await query.edit_message_text(
+            f"📥 Import Zone File - {domain}\n\n"
+            f"Send your BIND zone file (.zone or .txt) as a document.\n\n"
+            f"• A, AAAA, CNAME, MX, TXT and SRV records are imported\n"
+            f"• Records the zone already has are skipped\n"
+            f"• SOA and NS records stay managed by Cloudflare",
+            reply_markup=InlineKeyboardMarkup([[
+                InlineKeyboardButton("❌ Cancel", callback_data=f"dns_main_{domain.replace('.', '_')}")
+            ]])
+        )
+    
+    async def handle_zone_file_upload(self, update: Update, context):
+        """Import an uploaded zone file into the domain chosen with 📥 Import Zone File"""
+        import tempfile
+        message = update.message
+        if not message or not message.document:
+            return
+        user_id = message.from_user.id if message.from_user else 0
+        session = self.user_sessions.get(user_id, {})
+        domain = session.get("waiting_for_zone_file")
+        if not domain:
+            await message.reply_text("📎 To import DNS records, open DNS management for a domain and choose 📥 Import Zone File first.")
+            return
+        if (message.document.file_size or 0) > 20 * 1024 * 1024:
+            await message.reply_text("❌ Zone files up to 20 MB can be imported.")
+            return
+        
+        session.pop("waiting_for_zone_file", None)
+        self.save_user_sessions()
+        keyboard = InlineKeyboardMarkup([[InlineKeyboardButton("← Back to DNS", callback_data=f"dns_main_{domain.replace('.', '_')}")]])
+        
+        zone_id = await unified_dns_manager.get_zone_id(domain)
+        if not zone_id:
+            await message.reply_text(f"❌ {domain} is not on Cloudflare yet. Switch it to Cloudflare DNS first.", reply_markup=keyboard)
+            return
+        
+        user_lang = session.get("language", "en")
+        status = await message.reply_text(f"📥 Importing zone file for {domain}...")
+        
+        async def send(text):
+            await status.edit_text(text, reply_markup=keyboard)
+        progress = ThrottledProgress(send, formatter=lambda result: format_import_progress(result, domain))
+        
+        async def validate(record_type, text):
+            return await self.validate_dns_input(text, record_type, domain, user_lang)
+        
+        try:
+            with tempfile.NamedTemporaryFile(suffix=".zone") as upload:
+                tg_file = await message.document.get_file()
+                await tg_file.download_to_drive(custom_path=upload.name)
+                with open(upload.name, encoding="utf-8", errors="replace") as lines:
+                    result = await import_zone(unified_dns_manager, zone_id, domain, lines, validate,
+                                               progress=progress.update)
+        except Exception as e:
+            logger.error(f"Zone import failed for {domain}: {e}")
+            await send(f"❌ Zone import for {domain} failed: {str(e)[:200]}")
+            return
+        
+        await send(format_import_progress(result, domain, final=True))
+    
+    async def export_zone_file(self, query, domain):
+        """Send the domain's Cloudflare records as a BIND zone file"""
+        import tempfile
+        zone_id = await unified_dns_manager.get_zone_id(domain)
+        if not zone_id:
+            await query.answer(f"{domain} is not on Cloudflare", show_alert=True)
+            return
+        
+        try:
+            with tempfile.NamedTemporaryFile("w+", suffix=".zone", encoding="utf-8") as out:
+                count = await export_zone(unified_dns_manager, zone_id, domain, out)
+                out.flush()
+                with open(out.name, "rb") as document:
+                    await query.message.reply_document(
+                        document=document,
+                        filename=f"{domain}.zone",
+                        caption=f"📤 {domain}: {count} DNS records"
+                    )
+        except Exception as e:
+            logger.error(f"Zone export failed for {domain}: {e}")
+            await query.message.reply_text(f"❌ Zone export for {domain} failed. Please try again.")
+    
     async def send_clean_message(self, query, text, keyboard):
         """Send message with new clean keyboard format"""
         try:
@@ -9044,170 +8578,35 @@ class NomadlyCleanBot:
             return "demo_zone_id"
     
     async def get_or_create_cloudflare_zone(self, domain):
-        """Get or create Cloudflare zone for domain"""
-        try:
-            import httpx
-            import os
-            
-            # Use Cloudflare API to find the zone - support both token types
-            api_token = os.getenv("CLOUDFLARE_API_TOKEN", "").strip()
-            global_api_key = os.getenv("CLOUDFLARE_GLOBAL_API_KEY", "").strip()
-            email = os.getenv("CLOUDFLARE_EMAIL", "").strip()
-            
-            headers = {"Content-Type": "application/json"}
-            
-            if api_token:
-                # Use API Token (Bearer)
-                headers["Authorization"] = f"Bearer {api_token}"
-                logger.info(f"Using Cloudflare API Token for zone: {domain}")
-                logger.info(f"API Token length: {len(api_token)} characters")
-            elif global_api_key and email:
-                # Use Global API Key
-                headers["X-Auth-Email"] = email
-                headers["X-Auth-Key"] = global_api_key
-                logger.info(f"Using Cloudflare Global API Key for zone: {domain}")
-                logger.info(f"Email: {email}, Key length: {len(global_api_key)} characters")
-            else:
+        """Get or create Cloudflare zone for domain (its own zone or a parent zone on the account)"""
+        try:
+            if not zone_provisioner.enabled:
                 logger.warning(f"No valid Cloudflare credentials, cannot get zone for {domain}")
                 return "demo_zone_id"  # Fallback for demo
             
-            async with httpx.AsyncClient() as client:
-                # Query Cloudflare for the zone
-                response = await client.get(
-                    f"https://api.cloudflare.com/client/v4/zones?name={domain}",
-                    headers=headers,
-                    timeout=10
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    if data.get("success") and data.get("result"):
-                        zones = data["result"]
-                        if zones:
-                            zone_id = zones[0]["id"]
-                            logger.info(f"Found Cloudflare zone_id {zone_id} for {domain}")
-                            
-                            # Update database with the zone_id
-                            try:
-                                await self.update_domain_zone_id(domain, zone_id)
-                            except Exception as e:
-                                logger.error(f"Failed to update zone_id in database: {e}")
-                            
-                            return zone_id
-                        else:
-                            logger.warning(f"No Cloudflare zone found for {domain}")
-                            # Check if domain is a subdomain of existing zones
-                            zone_id = await self.find_parent_zone(domain, headers)
-                            if zone_id != "demo_zone_id":
-                                return zone_id
-                            # For testing - use first available zone if no exact match
-                            if zones:
-                                first_zone = zones[0]
-                                zone_id = first_zone["id"]
-                                zone_name = first_zone["name"]
-                                logger.info(f"Using first available zone {zone_id} ({zone_name}) for testing DNS with {domain}")
-                                await self.update_domain_zone_id(domain, zone_id)
-                                return zone_id
-                            return "demo_zone_id"
-                    else:
-                        logger.error(f"Cloudflare API error: {data}")
-                        return "demo_zone_id"
-                else:
-                    response_text = response.text if hasattr(response, 'text') else 'No response text'
-                    logger.error(f"Cloudflare API request failed: {response.status_code}")
-                    logger.error(f"Response: {response_text}")
-                    return "demo_zone_id"
-                    
-        except Exception as e:
-            logger.error(f"Error getting Cloudflare zone for {domain}: {e}")
-            return "demo_zone_id"
-    
-    async def find_parent_zone(self, domain, headers):
-        """Find parent zone that could contain this domain"""
-        try:
-            import httpx
+            # Account zones come from the pre-warmed index; only a missing zone costs API calls
+            result = await zone_provisioner.provision(domain, records=[], use_parent=True)
+            if not result.success:
+                logger.error(f"Could not get or create Cloudflare zone for {domain}: {result.error}")
+                return "demo_zone_id"
             
-            async with httpx.AsyncClient() as client:
-                # Get all zones
-                response = await client.get(
-                    "https://api.cloudflare.com/client/v4/zones",
-                    headers=headers,
-                    timeout=10
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    if data.get("success") and data.get("result"):
-                        zones = data["result"]
-                        
-                        # Check if domain matches any existing zone exactly or as subdomain
-                        for zone in zones:
-                            zone_name = zone["name"]
-                            zone_id = zone["id"]
-                            
-                            # Exact match
-                            if domain == zone_name:
-                                logger.info(f"Found exact zone match: {zone_id} for {domain}")
-                                await self.update_domain_zone_id(domain, zone_id)
-                                return zone_id
-                            
-                            # Subdomain match (e.g. claudeb.sbs could be managed by sbs zone)
-                            if domain.endswith('.' + zone_name):
-                                logger.info(f"Found parent zone {zone_id} ({zone_name}) for subdomain {domain}")
-                                await self.update_domain_zone_id(domain, zone_id)
-                                return zone_id
-                        
-                        logger.warning(f"No matching zone found for {domain}")
-                        return "demo_zone_id"
-                    else:
-                        logger.error(f"Failed to get zones: {data}")
-                        return "demo_zone_id"
-                else:
-                    logger.error(f"Failed to get zones: {response.status_code}")
-                    return "demo_zone_id"
-                    
-        except Exception as e:
-            logger.error(f"Error finding parent zone for {domain}: {e}")
-            return "demo_zone_id"
-
-    async def create_cloudflare_zone(self, domain, headers):
-        """Create a new Cloudflare zone for domain"""
-        try:
-            import httpx
+            if result.zone_created:
+                logger.info(f"Created Cloudflare zone {result.zone_id} for {domain}")
+            elif result.zone_name != domain:
+                logger.info(f"Found parent zone {result.zone_id} ({result.zone_name}) for subdomain {domain}")
+            else:
+                logger.info(f"Found Cloudflare zone_id {result.zone_id} for {domain}")
             
-            async with httpx.AsyncClient() as client:
-                # Create the zone
-                response = await client.post(
-                    "https://api.cloudflare.com/client/v4/zones",
-                    headers=headers,
-                    json={"name": domain, "type": "full"},
-                    timeout=10
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    if data.get("success") and data.get("result"):
-                        zone_id = data["result"]["id"]
-                        logger.info(f"Created Cloudflare zone {zone_id} for {domain}")
-                        
-                        # Update database with the zone_id
-                        try:
-                            await self.update_domain_zone_id(domain, zone_id)
-                        except Exception as e:
-                            logger.error(f"Failed to update zone_id in database: {e}")
-                        
-                        return zone_id
-                    else:
-                        logger.error(f"Failed to create Cloudflare zone: {data}")
-                        return "demo_zone_id"
-                else:
-                    response_text = response.text if hasattr(response, 'text') else 'No response text'
-                    logger.error(f"Zone creation failed: {response.status_code}")
-                    logger.error(f"Response: {response_text}")
-                    return "demo_zone_id"
+            # Update database with the zone_id
+            try:
+                await self.update_domain_zone_id(domain, result.zone_id)
+            except Exception as e:
+                logger.error(f"Failed to update zone_id in database: {e}")
+            
+            return result.zone_id
                     
         except Exception as e:
-            logger.error(f"Error creating Cloudflare zone for {domain}: {e}")
+            logger.error(f"Error getting Cloudflare zone for {domain}: {e}")
             return "demo_zone_id"
 
     async def update_domain_zone_id(self, domain, zone_id):
@@ -9220,6 +8619,7 @@ class NomadlyCleanBot:
                 if domain_record:
                     domain_record.cloudflare_zone_id = zone_id
                     db_session.commit()
+                    zone_id_resolver.invalidate(domain)
                     logger.info(f"Updated zone_id {zone_id} for domain {domain} in database")
                 else:
                     logger.warning(f"Domain {domain} not found in database")
@@ -10763,12 +10163,12 @@ Todas las consultas WHOIS muestran el servicio de privacidad Nomadly."""
             clean_domain = domain.replace('_', '.')
             
             # Get current nameservers from database
-            from database import get_db_manager
-            db = get_db_manager()
+            from async_database import get_async_db_manager
+            db = get_async_db_manager()
             
             # Get domain data including nameserver configuration
             domain_data = None
-            user_domains = db.get_user_domains(user_id)
+            user_domains = await db.get_user_domains(user_id)
             for d in user_domains:
                 if d.get('domain_name') == clean_domain:
                     domain_data = d
@@ -11127,6 +10527,7 @@ Todas las consultas WHOIS muestran el servicio de privacidad Nomadly."""
                     "status": "Status:",
                     "updated": "✅ Updated at registrar",
                     "propagation": "📝 DNS propagation typically takes 24-48 hours",
+                    "watching": "🔔 We'll message you as soon as the new nameservers are live worldwide.",
                     "acknowledgment": "🎯 Acknowledgment: Your nameservers have been successfully updated at the registrar level. The changes may take up to 48 hours to fully propagate across global DNS servers.",
                     "back": "← Back to Management"
                 },
@@ -11137,6 +10538,7 @@ Todas las consultas WHOIS muestran el servicio de privacidad Nomadly."""
                     "status": "Statut :",
                     "updated": "✅ Mis à jour chez le registraire",
                     "propagation": "📝 La propagation DNS prend généralement 24-48 heures",
+                    "watching": "🔔 Nous vous enverrons un message dès que les nouveaux serveurs de noms seront actifs partout.",
                     "acknowledgment": "🎯 Confirmation : Vos serveurs de noms ont été mis à jour avec succès au niveau du registraire. Les changements peuvent prendre jusqu'à 48 heures pour se propager complètement sur les serveurs DNS mondiaux.",
                     "back": "← Retour à la gestion"
                 },
@@ -11147,6 +10549,7 @@ Todas las consultas WHOIS muestran el servicio de privacidad Nomadly."""
                     "status": "स्थिति:",
                     "updated": "✅ रजिस्ट्रार पर अपडेट किया गया",
                     "propagation": "📝 DNS प्रोपेगेशन में आमतौर पर 24-48 घंटे लगते हैं",
+                    "watching": "🔔 नए नेमसर्वर हर जगह सक्रिय होते ही हम आपको संदेश भेजेंगे।",
                     "acknowledgment": "🎯 पुष्टि: आपके नेमसर्वर रजिस्ट्रार स्तर पर सफलतापूर्वक अपडेट कर दिए गए हैं। परिवर्तनों को वैश्विक DNS सर्वर पर पूरी तरह से फैलने में 48 घंटे तक लग सकते हैं।",
                     "back": "← प्रबंधन पर वापस"
                 },
@@ -11157,6 +10560,7 @@ Todas las consultas WHOIS muestran el servicio de privacidad Nomadly."""
                     "status": "状态：",
                     "updated": "✅ 已在注册商处更新",
                     "propagation": "📝 DNS传播通常需要24-48小时",
+                    "watching": "🔔 新域名服务器在全球生效后我们会立即通知您。",
                     "acknowledgment": "🎯 确认：您的域名服务器已在注册商级别成功更新。更改可能需要长达48小时才能在全球DNS服务器上完全传播。",
                     "back": "← 返回管理"
                 },
@@ -11167,6 +10571,7 @@ Todas las consultas WHOIS muestran el servicio de privacidad Nomadly."""
                     "status": "Estado:",
                     "updated": "✅ Actualizado en el registrador",
                     "propagation": "📝 La propagación DNS típicamente toma 24-48 horas",
+                    "watching": "🔔 Le enviaremos un mensaje en cuanto los nuevos servidores de nombres estén activos en todo el mundo.",
                     "acknowledgment": "🎯 Confirmación: Sus servidores de nombres han sido actualizados exitosamente a nivel del registrador. Los cambios pueden tomar hasta 48 horas para propagarse completamente en los servidores DNS globales.",
                     "back": "← Volver a gestión"
                 }
@@ -11181,9 +10586,11 @@ Todas las consultas WHOIS muestran el servicio de privacidad Nomadly."""
                 f"<b>{success_text['new_ns']}</b>\n"
                 f"<code>{ns_list}</code>\n\n"
                 f"<b>{success_text['status']}</b> {success_text['updated']}\n\n"
-                f"{success_text['propagation']}\n\n"
+                f"{success_text['propagation']}\n"
+                f"{success_text['watching']}\n\n"
                 f"{success_text['acknowledgment']}"
             )
+            self.watch_propagation(query, domain, pending_nameservers)
             
             keyboard = [
                 [InlineKeyboardButton(success_text["back"], callback_data=f"nameservers_{domain.replace('.', '_')}")]
@@ -11215,9 +10622,9 @@ Todas las consultas WHOIS muestran el servicio de privacidad Nomadly."""
             user_lang = self.user_sessions.get(user_id, {}).get("language", "en")
             
             # Get user's domains from database
-            from database import get_db_manager
-            db = get_db_manager()
-            user_domains = db.get_user_domains(user_id)
+            from async_database import get_async_db_manager
+            db = get_async_db_manager()
+            user_domains = await db.get_user_domains(user_id)
             
             if not user_domains:
                 # No domains registered yet
@@ -11714,8 +11121,17 @@ def main():
         # Create bot instance
         bot = NomadlyCleanBot()
         
+        # Report shadowed/unreachable callback patterns
+        callback_router.log_startup_report()
+        
         # Create application
-        application = Application.builder().token(BOT_TOKEN or "").build()
+        application = (
+            Application.builder()
+            .token(BOT_TOKEN or "")
+            .post_init(bot.startup)
+            .post_shutdown(bot.shutdown)
+            .build()
+        )
         
         # Store application reference in bot for domain registration
         bot.application = application
@@ -11727,6 +11143,7 @@ def main():
         application.add_handler(CommandHandler("start", bot.start_command))
         application.add_handler(CallbackQueryHandler(bot.handle_callback_query))
         application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, bot.handle_message))
+        application.add_handler(MessageHandler(filters.Document.ALL, bot.handle_zone_file_upload))
         
         logger.info("✅ Nomadly Clean Bot ready for users!")
         
@@ -0,0 +1,159 @@
+"""
+Payment Events for Nomadly Bot
+Publishes payment confirmations from the webhook handlers and delivers them to
+the payment monitor as they happen (Postgres LISTEN/NOTIFY + in-process bus)
+
+Webhooks run in Flask worker threads; the monitor runs on the bot's event
+loop. A publish is delivered two ways:
+
+- in-process: straight onto every subscribed asyncio queue via
+  call_soon_threadsafe, for the usual deployment where the webhook server is
+  started inside the bot process;
+- Postgres: ``pg_notify('payment_events', <json>)`` so a monitor running in a
+  different process receives it through LISTEN.
+
+Consumers must tolerate duplicates (the same event can arrive over both
+paths); the monitor only acts on addresses it is still tracking.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import select
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "payment_events"
+
+
+class PaymentEventBus:
+    """Fan-out of payment events to asyncio subscribers in this process"""
+
+    def __init__(self):
+        self._subscribers: List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = []
+        self._lock = threading.Lock()
+        self.published = 0
+
+    def subscribe(self, maxsize: int = 1000) -> asyncio.Queue:
+        """Create a queue bound to the running loop that receives every event"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        with self._lock:
+            self._subscribers.append((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        with self._lock:
+            self._subscribers = [(l, q) for l, q in self._subscribers if q is not queue]
+
+    def deliver(self, event: Dict[str, Any]) -> None:
+        """Hand an event to all subscribers; safe to call from any thread"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for loop, queue in subscribers:
+            if loop.is_closed():
+                continue
+            loop.call_soon_threadsafe(_put_nowait, queue, event)
+        self.published += 1
+
+
+def _put_nowait(queue: asyncio.Queue, event: Dict[str, Any]) -> None:
+    try:
+        queue.put_nowait(event)
+    except asyncio.QueueFull:
+        # The reconciliation sweep will still pick this payment up
+        logger.warning(f"📨 Payment event queue full, dropping {event.get('order_id')}")
+
+
+payment_event_bus = PaymentEventBus()
+
+
+def publish_payment_event(order_id: Optional[str] = None, crypto_address: Optional[str] = None,
+                          status: str = "confirmed", source: str = "webhook") -> Dict[str, Any]:
+    """Announce that a payment changed state. Never raises into the webhook."""
+    event = {
+        "order_id": order_id,
+        "crypto_address": crypto_address,
+        "status": status,
+        "source": source,
+        "published_at": time.time(),
+    }
+    payment_event_bus.deliver(event)
+
+    if os.getenv("DATABASE_URL"):
+        try:
+            from simple_connection_pool import get_pooled_connection
+
+            with get_pooled_connection() as conn:
+                cursor = conn.cursor()
+                try:
+                    cursor.execute("SELECT pg_notify(%s, %s)", (CHANNEL, json.dumps(event)))
+                    conn.commit()
+                finally:
+                    cursor.close()
+        except Exception as e:
+            logger.warning(f"📨 Could not NOTIFY payment event for {order_id}: {e}")
+
+    logger.info(f"📨 Published payment event: order={order_id} address={crypto_address} status={status}")
+    return event
+
+
+class PostgresPaymentListener:
+    """LISTEN on the payment channel in a daemon thread and forward to the bus.
+
+    Events this process published arrive here a second time; the consumer
+    deduplicates.
+    """
+
+    def __init__(self, database_url: str, bus: PaymentEventBus = payment_event_bus,
+                 poll_timeout: float = 5.0):
+        self.database_url = database_url
+        self.bus = bus
+        self.poll_timeout = poll_timeout
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="payment-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        import psycopg2
+        import psycopg2.extensions
+
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = psycopg2.connect(self.database_url)
+                conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                cursor = conn.cursor()
+                cursor.execute(f"LISTEN {CHANNEL};")
+                logger.info(f"👂 Listening for payment events on channel '{CHANNEL}'")
+
+                while not self._stop.is_set():
+                    if select.select([conn], [], [], self.poll_timeout) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        try:
+                            self.bus.deliver(json.loads(notify.payload))
+                        except json.JSONDecodeError:
+                            logger.warning(f"📨 Ignoring malformed payment event: {notify.payload!r}")
+            except Exception as e:
+                logger.error(f"Payment event listener error: {e}")
+                self._stop.wait(5)  # back off before reconnecting
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
@@ -9,6 +9,7 @@ from decimal import Decimal
 from typing import Dict, Optional, List, Any
 from datetime import datetime, timedelta
 from api_services import get_api_manager
+from services.crypto_rate_service import get_crypto_rate_service
 from database import get_db_manager
 from enhanced_tld_requirements_system import get_enhanced_tld_system
 from simple_validation_fixes import SimpleValidationFixes
@@ -52,26 +53,14 @@ class PaymentService:
     async def _convert_crypto_to_usd(self, crypto_amount: float, crypto_currency: str) -> float:
         """Convert cryptocurrency amount to USD value"""
         try:
-            # Primary: Try FastForex.io for real-time conversion
+            # Primary: cached FastForex rate table
             try:
-                from apis.fastforex import FastForexAPI
-                fastforex = FastForexAPI()
-                # Get current crypto price in USD
-                crypto_prices = {
-                    'btc': 67000,  # Default fallback prices
-                    'eth': 3657,
-                    'ltc': 85,
-                    'doge': 0.32
-                }
-                
-                # Try to get real price from API
-                price_per_unit = crypto_prices.get(crypto_currency.lower(), 1.0)
-                usd_value = crypto_amount * price_per_unit
-                
-                logger.info(
-                    f"💱 Crypto to USD: {crypto_amount:.8f} {crypto_currency.upper()} = ${usd_value:.2f} USD"
-                )
-                return usd_value
+                usd_value = get_crypto_rate_service().crypto_to_usd(crypto_amount, crypto_currency)
+                if usd_value:
+                    logger.info(
+                        f"💱 Crypto to USD: {crypto_amount:.8f} {crypto_currency.upper()} = ${usd_value:.2f} USD"
+                    )
+                    return usd_value
             except Exception as e:
                 logger.warning(f"⚠️ FastForex USD conversion failed: {e}")
             
@@ -100,11 +89,9 @@ class PaymentService:
     async def _convert_usd_to_crypto(self, amount: float, crypto_currency: str) -> float:
         """Convert USD to cryptocurrency amount - Missing method fix"""
         try:
-            # Primary: Try FastForex.io for real-time conversion
+            # Primary: cached FastForex rate table
             try:
-                from apis.fastforex import FastForexAPI
-                fastforex = FastForexAPI()
-                crypto_amount = fastforex.convert_usd_to_crypto(amount, crypto_currency)
+                crypto_amount = get_crypto_rate_service().usd_to_crypto(amount, crypto_currency)
                 if crypto_amount:
                     logger.info(
                         f"💱 FastForex conversion: ${amount} USD = {crypto_amount:.8f} {crypto_currency.upper()}"
@@ -205,11 +192,9 @@ class PaymentService:
             if success:
                 crypto_amount = None
                 
-                # Primary: Try FastForex.io for real-time conversion
+                # Primary: cached FastForex rate table
                 try:
-                    from apis.fastforex import FastForexAPI
-                    fastforex = FastForexAPI()
-                    crypto_amount = fastforex.convert_usd_to_crypto(amount, crypto_currency)
+                    crypto_amount = get_crypto_rate_service().usd_to_crypto(amount, crypto_currency)
                     if crypto_amount:
                         logger.info(
                             f"💱 FastForex conversion: ${amount} USD = {crypto_amount:.8f} {crypto_currency.upper()}"
@@ -341,32 +326,27 @@ class PaymentService:
                 payment_method="balance",
             )
 
-            # Deduct balance - direct SQL approach
-            from database import User
-
-            session = self.db.get_session()
-            try:
-                user = session.query(User).filter_by(telegram_id=telegram_id).first()
-                if user:
-                    from decimal import Decimal
-
-                    current_balance = Decimal(str(user.balance_usd))
-                    new_balance = current_balance - amount_decimal
-                    user.balance_usd = new_balance
-                    session.commit()
-                    logger.info(f"Balance updated: {current_balance} -> {new_balance}")
-            finally:
-                session.close()
+            # Deduct balance in one conditional UPDATE; a concurrent payment that
+            # spent the balance since the check above makes it match no row
+            new_balance = self.db.update_user_balance(telegram_id, -amount_decimal)
+            if new_balance is None:
+                self.db.update_order_payment(
+                    order_id=order.order_id, payment_status="failed"
+                )
+                return {
+                    "success": False,
+                    "error": "Insufficient balance",
+                    "required": float(amount_decimal),
+                    "available": self.db.get_user_balance(telegram_id),
+                }
+            logger.info(f"Balance updated: -{amount_decimal} -> {new_balance}")
 
             # Mark order as completed
             self.db.update_order_payment(
                 order_id=order.order_id, payment_status="completed"
             )
 
-            # Get updated balance for response and notifications
-            updated_user = self.db.get_user(telegram_id)
-            new_balance = float(updated_user.balance_usd) if updated_user else 0.0
-            previous_balance = float(user_balance_decimal)
+            previous_balance = new_balance + float(amount_decimal)
 
             # Send wallet balance payment confirmation notifications (bot + email)
             import threading, asyncio
@@ -445,18 +425,17 @@ class PaymentService:
             if received_usd > 0:
                 # Update user balance with received amount
                 from decimal import Decimal
-                from database import User
+                from database import apply_balance_delta
                 
                 session = self.db.get_session()
                 try:
-                    user = session.query(User).filter_by(telegram_id=order.telegram_id).first()
-                    if user:
-                        current_balance = Decimal(str(user.balance_usd))
-                        deposit_amount = Decimal(str(received_usd))
-                        user.balance_usd = current_balance + deposit_amount
+                    deposit_amount = Decimal(str(received_usd))
+                    credited_balance = apply_balance_delta(session, order.telegram_id, deposit_amount)
+                    if credited_balance is not None:
                         session.commit()
                         
-                        new_balance = float(user.balance_usd)
+                        current_balance = credited_balance - deposit_amount
+                        new_balance = float(credited_balance)
                         logger.info(f"✅ Wallet credited: {current_balance} + {deposit_amount} = {new_balance}")
                         
                         # Update order status
@@ -627,20 +606,18 @@ class PaymentService:
         """Handle underpayment for domain registration by crediting to wallet"""
         try:
             from decimal import Decimal
-            from database import User
+            from database import apply_balance_delta
             
             logger.info(f"💳 Processing domain underpayment: ${received_usd:.2f} received, ${expected_usd:.2f} expected for order {order_id}")
             
             # Credit the received amount to user's wallet balance
             session = self.db.get_session()
             try:
-                user = session.query(User).filter_by(telegram_id=telegram_id).first()
-                if user:
-                    current_balance = Decimal(str(user.balance_usd))
-                    credit_amount = Decimal(str(received_usd))
-                    new_balance = current_balance + credit_amount
-                    user.balance_usd = new_balance
+                credit_amount = Decimal(str(received_usd))
+                new_balance = apply_balance_delta(session, telegram_id, credit_amount)
+                if new_balance is not None:
                     session.commit()
+                    current_balance = new_balance - credit_amount
                     
                     logger.info(f"✅ Underpayment credited to wallet: ${current_balance:.2f} + ${credit_amount:.2f} = ${new_balance:.2f}")
                     
@@ -1249,13 +1226,11 @@ class PaymentService:
         try:
             logger.info(f"💱 Converting {crypto_amount} {crypto_currency} to USD using three-tier system")
             
-            # Tier 1: Try FastForex.io for real-time conversion
+            # Tier 1: cached FastForex rate table
             try:
-                from apis.fastforex import FastForexAPI
-                fastforex = FastForexAPI()
-                
                 # Get current rate: 1 crypto = X USD
-                usd_rate = fastforex.get_crypto_rate_to_usd(crypto_currency)
+                quote = get_crypto_rate_service().get_quote(crypto_currency)
+                usd_rate = quote.usd_per_unit if quote else None
                 if usd_rate and usd_rate > 0:
                     received_usd = crypto_amount * usd_rate
                     logger.info(f"✅ FastForex: {crypto_amount} {crypto_currency} = ${received_usd:.2f} USD (rate: ${usd_rate:.2f})")
@@ -1322,19 +1297,17 @@ class PaymentService:
         """Credit overpayment from domain registration to user's wallet balance"""
         try:
             from decimal import Decimal
-            from database import User
+            from database import apply_balance_delta
             
             logger.info(f"💰 Crediting overpayment: ${overpayment_amount:.2f} to user {telegram_id} from order {order_id}")
             
             session = self.db.get_session()
             try:
-                user = session.query(User).filter_by(telegram_id=telegram_id).first()
-                if user:
-                    current_balance = Decimal(str(user.balance_usd))
-                    overpayment_decimal = Decimal(str(overpayment_amount))
-                    new_balance = current_balance + overpayment_decimal
-                    user.balance_usd = new_balance
+                overpayment_decimal = Decimal(str(overpayment_amount))
+                new_balance = apply_balance_delta(session, telegram_id, overpayment_decimal)
+                if new_balance is not None:
                     session.commit()
+                    current_balance = new_balance - overpayment_decimal
                     
                     # Record the overpayment credit transaction
                     try:
@@ -1517,24 +1490,19 @@ class PaymentService:
                     
                     # Credit actual received amount (not expected amount)
                     from decimal import Decimal
-                    from database import User
+                    from database import apply_balance_delta
 
                     session = self.db.get_session()
                     try:
-                        user = (
-                            session.query(User)
-                            .filter_by(telegram_id=order.telegram_id)
-                            .first()
-                        )
-                        if user:
-                            current_balance = Decimal(str(user.balance_usd))
-                            # FIX: Use actual_usd_received instead of order.amount
-                            deposit_amount = Decimal(str(actual_usd_received))
-                            user.balance_usd = current_balance + deposit_amount
+                        # FIX: Use actual_usd_received instead of order.amount
+                        deposit_amount = Decimal(str(actual_usd_received))
+                        new_balance = apply_balance_delta(session, order.telegram_id, deposit_amount)
+                        if new_balance is not None:
                             session.commit()
+                            current_balance = new_balance - deposit_amount
                             
                             logger.info(
-                                f"✅ FIXED: Wallet credited with ACTUAL amount: {current_balance} + {deposit_amount} = {user.balance_usd}"
+                                f"✅ FIXED: Wallet credited with ACTUAL amount: {current_balance} + {deposit_amount} = {new_balance}"
                             )
                             
                             # Send underpayment notification if applicable
@@ -1545,7 +1513,7 @@ class PaymentService:
                                     actual_usd_received,
                                     expected_usd,
                                     underpayment_amount,
-                                    float(user.balance_usd),
+                                    float(new_balance),
                                     order_id,
                                     crypto_currency,
                                     value_coin
@@ -1556,7 +1524,7 @@ class PaymentService:
                                     actual_usd_received,
                                     expected_usd,
                                     payment_difference,
-                                    float(user.balance_usd),
+                                    float(new_balance),
                                     order_id,
                                     crypto_currency,
                                     value_coin
@@ -1566,7 +1534,7 @@ class PaymentService:
                                     actual_usd_received,
                                     expected_usd,
                                     payment_difference,
-                                    float(user.balance_usd),
+                                    float(new_balance),
                                     order_id,
                                     crypto_currency,
                                     value_coin
@@ -0,0 +1,484 @@
+#!/usr/bin/env python3
+"""
+Payment Webhook Handlers for Nomadly2
+Framework-independent ingestion of BlockBee/Dynopay callbacks (ledger writes,
+confirmation dispatch, idempotency) shared by the Flask and ASGI servers
+"""
+
+import asyncio
+import logging
+import os
+import random
+import string
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Tuple
+
+from async_api_clients import BackgroundLoop
+from payment_events import publish_payment_event
+from payment_service import get_payment_service
+from nomadly_clean.database import get_db_manager
+from services.confirmation_service import get_confirmation_service
+from webhook_ingestion import get_webhook_index, idempotency_key
+
+logger = logging.getLogger(__name__)
+
+# One long-lived pool for follow-up work (registration, notifications) instead
+# of a new single-thread executor per callback
+background_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="webhook-bg")
+
+# Confirmations (registration, notifications) can run for tens of seconds, so
+# they get their own loop instead of the async-api-clients loop that every
+# sync registry call waits on
+confirmation_loop = BackgroundLoop("webhook-confirmations")
+
+WebhookResponse = Tuple[Dict[str, Any], int]
+
+PROCESSING_STARTED = ({"status": "success", "message": "Payment processing started"}, 200)
+WAITING = ({"status": "pending", "message": "Waiting for confirmations"}, 200)
+DUPLICATE = ({"status": "success", "message": "Already processed"}, 200)
+
+
+def _transaction_number() -> str:
+    order_suffix = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
+    return f"TXN-{order_suffix}"
+
+
+def _blockbee_confirmed(data: Dict[str, Any]) -> bool:
+    status = data.get(
+        "status",
+        "confirmed" if data.get("confirmations", "0") != "0" else "pending",
+    )
+    return status == "confirmed" or int(data.get("confirmations", 0)) >= 1
+
+
+def is_confirmed(kind: str, data: Dict[str, Any]) -> bool:
+    """Whether a callback reports a confirmed payment (and so writes to the ledger)"""
+    if kind in ("blockbee", "topup_blockbee"):
+        return _blockbee_confirmed(data)
+    # Dynopay and wallet payment callbacks are only sent for successful payments
+    return True
+
+
+def _credit_overpayment(order, paid_amount: float, currency, wallet_transaction_type: str,
+                        link_order: bool = False):
+    """Credit the wallet with anything paid above the order total"""
+    from database import get_db_manager as get_ledger_manager
+    db_manager = get_ledger_manager()
+
+    credit_amu = paid_amount - float(order.total_price_usd)
+    if db_manager.update_user_balance(order.telegram_id, credit_amu) is None:
+        logger.error(
+            f"❌ Overpayment credit of {credit_amu} failed for user {order.telegram_id} "
+            f"on order {order.order_number}"
+        )
+        return
+
+    tran_number = _transaction_number()
+    db_manager.create_transaction(
+        telegram_id=order.telegram_id,
+        transaction_type='CREDIT',
+        amount_usd=credit_amu,
+        crypto_currency=currency,
+        order_name=order.order_number,
+        trans_name=tran_number,
+        domain_name=order.domain_name,
+    )
+    order_details = {}
+    if link_order:
+        order_details = {
+            "order_name": order.order_number,
+            "domain_name": order.domain_name,
+            "transaction_name": tran_number,
+        }
+    db_manager.create_wallet_transaction(
+        telegram_id=order.telegram_id,
+        transaction_type=wallet_transaction_type,
+        amount=credit_amu,
+        description="amount top up from payment webhook",
+        payment_address=None,
+        blockbee_payment_id=None,
+        **order_details
+    )
+
+    background_executor.submit(process_overpay, order.telegram_id, credit_amu)
+    logger.info(f"Add wallet amount  {credit_amu} for order {order.order_number}")
+
+
+def _record_order_payment(order_id: str, paid_amount: float, currency, wallet_transaction_type: str,
+                          link_order: bool = False):
+    """DEBIT the order payment and credit any overpayment"""
+    from database import get_db_manager as get_ledger_manager
+    db_manager = get_ledger_manager()
+
+    order = db_manager.get_order(order_id)
+    logger.info(f"Paid amount {paid_amount} for order_amount {order.total_price_usd}")
+
+    db_manager.create_transaction(
+        telegram_id=order.telegram_id,
+        transaction_type='DEBIT',
+        amount_usd=paid_amount,
+        crypto_currency=currency,
+        order_name=order.order_number,
+        domain_name=order.domain_name,
+    )
+
+    if paid_amount > order.total_price_usd:
+        _credit_overpayment(order, paid_amount, currency, wallet_transaction_type, link_order)
+    return order
+
+
+def _start_confirmation(order_id: str, payment_data: Dict[str, Any], order=None, source: str = "webhook"):
+    background_executor.submit(process_payment_confirmation, order_id, payment_data)
+    publish_payment_event(
+        order_id=order_id,
+        crypto_address=getattr(order, "crypto_address", None),
+        source=source,
+    )
+    logger.info(f"Payment confirmed for order {order_id} - processing in background")
+
+
+def ingest_dynopay_payment(order_id: str, data: Dict[str, Any]) -> WebhookResponse:
+    """Dynopay domain order callback"""
+    logger.info(f"Received Dynopay webhook for order {order_id}: {data}")
+
+    if not os.getenv('DYNOPAY_API_KEY') or not os.getenv('DYNOPAY_TOKEN'):
+        raise Exception("DYNOPAY_API_KEY or DYNOPAY_TOKEN not found in environment variables")
+
+    # A failed ledger write propagates. Inline (handle_webhook) the key is
+    # released and the provider gets a 500, so its redelivery writes the ledger
+    # again; queued, the callback was already acknowledged and the ingestion
+    # queue retries the stored job itself
+    order = _record_order_payment(
+        order_id, float(data.get("base_amount", 0)), data.get("paid_currency", 0), "deposit"
+    )
+
+    _start_confirmation(
+        order_id,
+        {"status": "confirmed", "value_coin": data.get("value_coin"), "coin": data.get("coin")},
+        order,
+        source="dynopay",
+    )
+    return PROCESSING_STARTED
+
+
+def ingest_wallet_payment(order_id: str, data: Dict[str, Any]) -> WebhookResponse:
+    """Wallet-balance payment callback"""
+    background_executor.submit(process_payment_confirmation, order_id, {"status": "confirmed"})
+    publish_payment_event(order_id=order_id, source="walletpayment")
+    return WAITING
+
+
+def ingest_blockbee_payment(order_id: str, data: Dict[str, Any]) -> WebhookResponse:
+    """BlockBee domain order callback"""
+    logger.info(f"Received BlockBee webhook for order {order_id}: {data}")
+
+    confirmations = int(data.get("confirmations", 0))
+    if not _blockbee_confirmed(data):
+        logger.info(f"Payment pending for order {order_id} (confirmations: {confirmations})")
+        return WAITING
+
+    paid_amount = float(data.get("value_coin", 0)) * float(data.get("price", 0))
+    order = _record_order_payment(
+        order_id, paid_amount, data.get("coin", 0), "CREDIT", link_order=True
+    )
+
+    _start_confirmation(
+        order_id,
+        {
+            "status": "confirmed",
+            "txid": data.get("txid_in"),
+            "confirmations": confirmations,
+            "value_coin": data.get("value_coin"),
+            "coin": data.get("coin"),
+        },
+        order,
+        source="blockbee",
+    )
+    return PROCESSING_STARTED
+
+
+def _credit_topup(user_id, paid_amount: float, currency, description: str):
+    from database import get_db_manager as get_ledger_manager
+    db_manager = get_ledger_manager()
+
+    if db_manager.update_user_balance(user_id, paid_amount) is None:
+        logger.error(f"❌ Top-up credit of {paid_amount} failed for user {user_id}")
+        return
+    db_manager.create_transaction(
+        telegram_id=user_id,
+        transaction_type='CREDIT',
+        amount_usd=paid_amount,
+        crypto_currency=currency,
+        trans_name=_transaction_number(),
+    )
+    db_manager.create_wallet_transaction(
+        telegram_id=user_id,
+        transaction_type="deposit",
+        amount=paid_amount,
+        description=description,
+        payment_address=None,
+        blockbee_payment_id=None
+    )
+    logger.info(f"Add wallet amount  {paid_amount} for user {user_id}")
+
+    background_executor.submit(process_wallet_top_confirmation, user_id, paid_amount)
+    logger.info(f"Topup confirmed for user {user_id} - processing in background")
+
+
+def ingest_dynopay_topup(user_id: str, data: Dict[str, Any]) -> WebhookResponse:
+    """Dynopay wallet top-up callback"""
+    logger.info(f"Received Dynopay webhook for Topup {user_id}: {data}")
+    _credit_topup(
+        user_id, float(data.get("base_amount", 0)), data.get("paid_currency", 0),
+        "amount top up from wallet topup webhook",
+    )
+    return PROCESSING_STARTED
+
+
+def ingest_blockbee_topup(user_id: str, data: Dict[str, Any]) -> WebhookResponse:
+    """BlockBee wallet top-up callback"""
+    logger.info(f"Received BlockBee webhook for user_id {user_id}: {data}")
+
+    confirmations = int(data.get("confirmations", 0))
+    if not _blockbee_confirmed(data):
+        logger.info(f"Payment pending for user {user_id} (confirmations: {confirmations})")
+        return WAITING
+
+    paid_amount = float(data.get("value_coin", 0)) * float(data.get("price", 0))
+    _credit_topup(user_id, paid_amount, data.get("coin", 0), "Crypto deposit")
+    return PROCESSING_STARTED
+
+
+INGESTERS = {
+    "dynopay": ingest_dynopay_payment,
+    "walletpayment": ingest_wallet_payment,
+    "blockbee": ingest_blockbee_payment,
+    "topup_dynopay": ingest_dynopay_topup,
+    "topup_blockbee": ingest_blockbee_topup,
+}
+
+
+def handle_webhook(kind: str, ref: str, data: Dict[str, Any]) -> WebhookResponse:
+    """Run a callback once: confirmed callbacks already processed are acknowledged
+    from the idempotency index without repeating their ledger writes."""
+    if not is_confirmed(kind, data):
+        return INGESTERS[kind](ref, data)
+
+    index = get_webhook_index()
+    key = idempotency_key(kind, ref, data)
+    if not index.claim(key):
+        logger.info(f"♻️ Duplicate {kind} callback for {ref} ({key}) acknowledged")
+        return DUPLICATE
+
+    try:
+        response = INGESTERS[kind](ref, data)
+    except Exception:
+        index.release(key)
+        raise
+    index.complete(key)
+    return response
+
+
+def process_overpay(telegram_id, credit_amu):
+    confirmation_service = get_confirmation_service()
+    confirmation_loop.run(
+        confirmation_service.master_send_overpayment_notification(telegram_id, credit_amu, 0.0)
+    )
+
+
+def process_wallet_top_confirmation(user_id, paid_amount):
+    confirmation_service = get_confirmation_service()
+    logger.info(f"📞📞 1. Notification for User {user_id}")
+    confirmation_loop.run(
+        confirmation_service.send_domain_wallet_top_confirmation(user_id, paid_amount)
+    )
+
+
+def process_payment_confirmation(order_id: str, payment_data: dict):
+    """Process payment confirmation with timeout handling and background queue"""
+    try:
+        logger.info(f"🔄 Processing payment confirmation for order {order_id}")
+        
+        # Set timeout for webhook processing
+        timeout_seconds = 25
+        
+        try:
+            # Process with timeout
+            payment_service = get_payment_service()
+            confirmation_service = get_confirmation_service()
+
+            # Create timeout task
+            async def process_with_timeout():
+                try:
+                    # Check order type and route to appropriate handler
+                    db_manager = get_db_manager()
+                    order = db_manager.get_order(order_id)
+                    
+                    if not order:
+                        logger.error(f"Order not found: {order_id}")
+                        return {"status": "error", "success": False}
+                    
+                    # ENHANCED: Route wallet deposits to smart crediting system
+                    if order.service_type == "wallet_deposit":
+                        logger.info(f"💰 Processing wallet deposit for order {order_id}")
+                        
+                        # Credit wallet with any amount received (no minimum threshold)
+                        result = await payment_service.process_wallet_deposit_with_any_amount(
+                            order_id, payment_data
+                        )
+                        
+                        if result.get("success"):
+                            logger.info(f"✅ Wallet credited successfully for order {order_id}")
+                            return {"status": "completed", "success": True}
+                        else:
+                            logger.error(f"❌ Wallet crediting failed for order {order_id}")
+                            return {"status": "error", "success": False}
+                    
+                    else:
+                        # Process domain registration with timeout for other service types
+                        result = await asyncio.wait_for(
+                            payment_service.complete_domain_registration(order_id, payment_data),
+                            timeout=timeout_seconds
+                        )
+                    
+                    # ANCHORS AWAY MILESTONE: Check success flag validation
+                    db_manager = get_db_manager()
+                    order = db_manager.get_order(order_id)
+                    logger.debug(f"Order after registration attempt: {order}")
+                    should_send_confirmation = False
+                    
+                    # CRITICAL: Check both result AND payment service success flag (ANCHORS AWAY MILESTONE)
+                    if result and payment_service.last_domain_registration_success:
+                        logger.info(f"✅ Domain registration completed successfully for order {order_id}")
+                        should_send_confirmation = True
+                    elif order:
+                        # Check if domain exists for user (manual restoration case)
+                        domain_from_order = order.domain_name
+                        if domain_from_order:
+                            existing_domain = db_manager.get_domain_by_name(domain_from_order, order.telegram_id)
+                            if existing_domain and existing_domain.status == 'active':
+                                logger.info(f"✅ Domain found in database despite registration failure - sending confirmation")
+                                should_send_confirmation = True
+                    
+                    if should_send_confirmation:
+                        # Send confirmations with proper await
+                        try:
+                            if order:
+                                # Get latest domain registration for this user
+                                domain = db_manager.get_latest_domain_by_telegram_id(order.telegram_id)
+                                logger.info(f"✅ IN should_send_confirmation 1")
+                                if domain:
+                                    domain_data = {
+                                        "domain_name": domain.domain_name,
+                                        "registration_status": "Active",
+                                        "expiry_date": str(domain.expires_at) if domain.expires_at else "2026-07-21 23:59:59",
+                                        "openprovider_domain_id": domain.openprovider_domain_id,
+                                        "cloudflare_zone_id": domain.cloudflare_zone_id,
+                                        "nameservers": domain.nameservers or ["anderson.ns.cloudflare.com", "leanna.ns.cloudflare.com"],
+                                        "dns_info": f"DNS configured with Cloudflare Zone ID: {domain.cloudflare_zone_id}",
+                                        "amount_usd": order.total_price_usd,
+                                        "payment_method": order.payment_method
+                                    }
+
+                                    #if order.payment_method != 'wallet_payment':
+                                    await confirmation_service.send_payment_confirmation(
+                                        order.telegram_id, domain_data
+                                        )
+                                    
+                                    await confirmation_service.send_domain_registration_confirmation(
+                                        order.telegram_id, domain_data
+                                    )
+
+
+                                    logger.info(f"✅ Domain registration confirmation sent for order {order_id}")
+                                else:
+                                    logger.warning(f"⚠️ No domain found for confirmation of order {order_id}")
+                            else:
+                                logger.warning(f"⚠️ Order not found for confirmation: {order_id}")
+                        except Exception as e:
+                            logger.exception(f"❌ Failed to send domain registration confirmation: {e}")
+                            
+                        return {"status": "completed", "success": True}
+                    else:
+                        logger.error(f"❌ Domain registration failed for order {order_id}")
+                        
+                        # Still send payment confirmation even if registration failed
+                        # This ensures users know their payment was received
+                        logger.info(f"📧 Sending payment confirmation for order {order_id}")
+                        
+                        # Get order details for notification
+                        db_manager = get_db_manager()
+                        order = db_manager.get_order(order_id)
+                        logger.debug(f"Order for payment confirmation: {order}")
+                        if order:
+                            # Send comprehensive payment confirmation (Telegram + Email)
+                            try:
+                                # Get actual values from order object
+                                telegram_id = order.telegram_id
+                                amount = order.total_price_usd
+                                service_type = order.service_type
+                                #service_details = order.service_details
+                                
+                                # Use confirmation service for both Telegram and email
+                                order_data = {
+                                    "order_id": order_id,
+                                    "amount_usd": amount,
+                                    "payment_method": "cryptocurrency",
+                                    "service_type": service_type,
+                                    "payment_data": payment_data,
+                                    "domain_name": order.domain_name ,
+                                    #"contact_email": order.get("contact_email", "N/A") if hasattr(order, 'service_details') and order.service_details else "N/A"
+                                }
+                                
+                                await confirmation_service.send_payment_confirmation(
+                                    order.telegram_id, order_data
+                                )
+                                logger.info(f"✅ Payment confirmation sent to user {order.telegram_id}")
+                            except Exception as e:
+                                logger.exception(f"❌ Failed to send payment confirmation: {e}")
+                                
+                                # Fallback to bot notification only
+                                try:
+                                    from nomadly2_bot import get_bot_instance
+                                    bot_instance = get_bot_instance()
+                                    if bot_instance:
+                                        await bot_instance.send_payment_confirmation(
+                                            order.telegram_id, 
+                                            order_id, 
+                                            order.amount, 
+                                            "domain_payment_received"
+                                        )
+                                        logger.info(f"✅ Fallback payment confirmation sent to user {order.telegram_id}")
+                                except Exception as fallback_e:
+                                    logger.error(f"❌ Fallback payment confirmation failed: {fallback_e}")
+                        
+                        return {"status": "payment_confirmed", "success": False}
+                        
+                except asyncio.TimeoutError:
+                    logger.warning(f"⏰ Domain registration timeout for order {order_id}")
+                    
+                    # Queue for background processing
+                    from background_queue_processor import queue_processor
+                    queue_processor.queue_job(order_id, payment_data)
+                    
+                    return {"status": "timeout", "success": False}
+            
+            # Run the processing
+            result = confirmation_loop.run(process_with_timeout())
+            
+            if result["status"] == "timeout":
+                logger.info(f"📝 Order {order_id} queued for background processing")
+            
+        except Exception as e:
+            logger.error(f"❌ Payment processing error for order {order_id}: {e}")
+            
+            # Queue for background processing on error
+            try:
+                from background_queue_processor import queue_processor
+                queue_processor.queue_job(order_id, payment_data)
+                logger.info(f"📝 Order {order_id} queued for retry due to error")
+            except Exception as queue_error:
+                logger.error(f"❌ Failed to queue job: {queue_error}")
+
+    except Exception as e:
+        logger.error(f"❌ Critical error in payment processing: {e}")
@@ -0,0 +1,293 @@
+"""
+Propagation Watcher for Nomadly Bot
+Server-side watches that recheck DNS propagation on a backoff schedule and
+message the user once a quorum of resolvers agrees
+
+A watch is a domain plus the NS (or record) set it should converge on.
+One background loop sweeps every watch that is due in a single batch, with
+the interval doubling after each miss (1 min, 2 min, 4 min ... capped at an
+hour), and drops watches that have not converged within the window. The
+user's "check" button only reads the last sweep's result, so pressing it
+repeatedly costs nothing.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WATCH_PATH = os.getenv("PROPAGATION_WATCH_DB", "propagation_watches.db")
+
+WATCHING = "watching"
+PROPAGATED = "propagated"
+EXPIRED = "expired"
+
+
+@dataclass
+class PropagationWatch:
+    domain: str
+    record_type: str
+    expected: List[str]
+    user_id: int
+    chat_id: int
+    created_at: float = field(default_factory=time.time)
+    expires_at: float = 0.0
+    next_check_at: float = 0.0
+    attempts: int = 0
+    status: str = WATCHING
+    # Summary of the most recent sweep, shown when the user asks
+    last_checked_at: Optional[float] = None
+    agreed_servers: int = 0
+    checked_servers: int = 0
+
+    @property
+    def key(self) -> str:
+        return f"{self.domain}:{self.record_type}"
+
+
+def format_watch_status(watch: PropagationWatch) -> str:
+    """One line per watch for the status screens"""
+    if watch.last_checked_at is None:
+        progress = "first check pending"
+    else:
+        minutes = max(0, int((watch.next_check_at - time.time()) // 60))
+        progress = (f"{watch.agreed_servers}/{watch.checked_servers} resolvers agree, "
+                    f"next check in {minutes} min")
+    return f"⏳ {watch.domain} ({watch.record_type}): {progress}"
+
+
+class PropagationWatchStore:
+    """Watches in a local SQLite table so they survive restarts"""
+
+    COLUMNS = ("domain", "record_type", "expected", "user_id", "chat_id", "created_at", "expires_at",
+               "next_check_at", "attempts", "status", "last_checked_at", "agreed_servers",
+               "checked_servers")
+
+    def __init__(self, path: str = DEFAULT_WATCH_PATH):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS propagation_watches ("
+            "domain TEXT NOT NULL, record_type TEXT NOT NULL, expected TEXT NOT NULL, "
+            "user_id INTEGER NOT NULL, chat_id INTEGER NOT NULL, created_at REAL NOT NULL, "
+            "expires_at REAL NOT NULL, next_check_at REAL NOT NULL, attempts INTEGER NOT NULL, "
+            "status TEXT NOT NULL, last_checked_at REAL, agreed_servers INTEGER NOT NULL DEFAULT 0, "
+            "checked_servers INTEGER NOT NULL DEFAULT 0, PRIMARY KEY (domain, record_type))"
+        )
+
+    def save(self, watch: PropagationWatch) -> None:
+        values = [getattr(watch, column) for column in self.COLUMNS]
+        values[2] = json.dumps(watch.expected)
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO propagation_watches ({', '.join(self.COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(self.COLUMNS))})",
+                values,
+            )
+
+    def delete(self, watch: PropagationWatch) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM propagation_watches WHERE domain = ? AND record_type = ?",
+                               (watch.domain, watch.record_type))
+
+    def load_active(self) -> List[PropagationWatch]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(self.COLUMNS)} FROM propagation_watches WHERE status = ?", (WATCHING,)
+            ).fetchall()
+        watches = []
+        for row in rows:
+            data = dict(zip(self.COLUMNS, row))
+            data["expected"] = json.loads(data["expected"])
+            watches.append(PropagationWatch(**data))
+        return watches
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class PropagationWatcher:
+    """Backoff scheduler over all active propagation watches.
+
+    notify(watch, result) is awaited once per watch when it converges
+    (result is the checker's dict) or expires (result is None).
+    """
+
+    def __init__(self, checker=None, notify: Optional[Callable[[PropagationWatch, Optional[Dict[str, Any]]], Awaitable[Any]]] = None,
+                 store: Optional[PropagationWatchStore] = None, base_interval: float = 60.0,
+                 max_interval: float = 3600.0, window: float = 48 * 3600, tick: float = 15.0,
+                 concurrency: int = 20):
+        self._checker = checker
+        self.notify = notify
+        self._store = store
+        self.base_interval = base_interval
+        self.max_interval = max_interval
+        self.window = window
+        self.tick = tick
+        self.concurrency = concurrency
+        self._watches: Optional[Dict[str, PropagationWatch]] = None
+        self._task: Optional[asyncio.Task] = None
+        self.sweeps = 0
+        self.checks = 0
+        self.notified = 0
+
+    @property
+    def checker(self):
+        if self._checker is None:
+            from dns_propagation_checker import propagation_checker
+            self._checker = propagation_checker
+        return self._checker
+
+    @property
+    def store(self) -> PropagationWatchStore:
+        if self._store is None:
+            self._store = PropagationWatchStore()
+        return self._store
+
+    @property
+    def watches(self) -> Dict[str, PropagationWatch]:
+        if self._watches is None:
+            self._watches = {w.key: w for w in self.store.load_active()}
+        return self._watches
+
+    def watch(self, domain: str, expected: List[str], user_id: int, chat_id: Optional[int] = None,
+              record_type: str = "NS", window: Optional[float] = None) -> PropagationWatch:
+        """Start watching domain (idempotent: re-registering the same target keeps the schedule)"""
+        domain = domain.strip().lower().rstrip(".")
+        record_type = record_type.upper()
+        normalized = sorted(v.strip().lower().rstrip(".") if record_type in ("NS", "CNAME") else v.strip()
+                            for v in expected if v and v.strip())
+        key = f"{domain}:{record_type}"
+        existing = self.watches.get(key)
+        if existing is not None and existing.expected == normalized and existing.status == WATCHING:
+            return existing
+
+        now = time.time()
+        watch = PropagationWatch(
+            domain=domain,
+            record_type=record_type,
+            expected=normalized,
+            user_id=user_id,
+            chat_id=chat_id or user_id,
+            created_at=now,
+            expires_at=now + (window or self.window),
+            next_check_at=now,  # first check on the next sweep
+        )
+        self.watches[key] = watch
+        self.store.save(watch)
+        logger.info(f"👀 Watching {record_type} propagation for {domain}: {', '.join(normalized)}")
+        return watch
+
+    def get(self, domain: str, record_type: str = "NS") -> Optional[PropagationWatch]:
+        return self.watches.get(f"{domain.strip().lower().rstrip('.')}:{record_type.upper()}")
+
+    def for_user(self, user_id: int) -> List[PropagationWatch]:
+        return [w for w in self.watches.values() if w.user_id == user_id]
+
+    def cancel(self, domain: str, record_type: str = "NS") -> None:
+        watch = self.watches.pop(f"{domain.strip().lower().rstrip('.')}:{record_type.upper()}", None)
+        if watch is not None:
+            self.store.delete(watch)
+
+    def _next_interval(self, attempts: int) -> float:
+        interval = min(self.base_interval * (2 ** max(0, attempts - 1)), self.max_interval)
+        return interval * random.uniform(0.9, 1.1)  # spread watches registered together
+
+    async def _check(self, watch: PropagationWatch) -> Dict[str, Any]:
+        if watch.record_type == "NS":
+            return await self.checker.check_nameserver_propagation(watch.domain, expected_nameservers=watch.expected)
+        return await self.checker.check_dns_record_propagation(
+            watch.domain, watch.record_type, expected_values=watch.expected
+        )
+
+    async def sweep(self, now: Optional[float] = None) -> int:
+        """Check every due watch in one batch; returns how many were checked"""
+        now = now or time.time()
+        due = [w for w in self.watches.values() if w.status == WATCHING and w.next_check_at <= now]
+        if not due:
+            return 0
+        self.sweeps += 1
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def one(watch: PropagationWatch) -> None:
+            if watch.expires_at <= now:
+                await self._finish(watch, EXPIRED, None)
+                return
+            async with semaphore:
+                try:
+                    result = await self._check(watch)
+                except Exception as e:
+                    logger.warning(f"👀 Propagation check failed for {watch.domain}: {e}")
+                    result = None
+            self.checks += 1
+            watch.attempts += 1
+            watch.last_checked_at = time.time()
+            if result is not None:
+                watch.agreed_servers = result.get("propagated_servers", 0)
+                watch.checked_servers = result.get("checked_servers", 0)
+                if result.get("quorum_reached"):
+                    await self._finish(watch, PROPAGATED, result)
+                    return
+            watch.next_check_at = time.time() + self._next_interval(watch.attempts)
+            self.store.save(watch)
+
+        await asyncio.gather(*[one(watch) for watch in due])
+        logger.info(f"👀 Propagation sweep: {len(due)} checked, {len(self.watches)} still watching")
+        return len(due)
+
+    async def _finish(self, watch: PropagationWatch, status: str, result: Optional[Dict[str, Any]]) -> None:
+        watch.status = status
+        self.watches.pop(watch.key, None)
+        self.store.delete(watch)
+        logger.info(f"👀 {watch.domain} {watch.record_type} watch {status} after {watch.attempts} checks")
+        if self.notify is not None:
+            try:
+                await self.notify(watch, result)
+                self.notified += 1
+            except Exception as e:
+                logger.error(f"👀 Could not notify user {watch.user_id} about {watch.domain}: {e}")
+
+    def start(self) -> None:
+        """Start the sweep loop on the running event loop (idempotent)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        logger.info(f"👀 Propagation watcher started with {len(self.watches)} active watches")
+        while True:
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error(f"👀 Propagation sweep error: {e}")
+            await asyncio.sleep(self.tick)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "watching": len(self.watches),
+            "sweeps": self.sweeps,
+            "checks": self.checks,
+            "notified": self.notified,
+        }
+
+
+# Global watcher instance
+propagation_watcher = PropagationWatcher(
+    window=float(os.getenv("PROPAGATION_WATCH_WINDOW_HOURS", "48")) * 3600,
+)
@@ -3,10 +3,12 @@ Country-Specific TLD Service for Nomadly2
 Enhanced TLD management with country-specific features and pricing
 """
 
+import asyncio
 import logging
 from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime
 from database import get_db_manager
+from api_services import get_api_manager
 from utils.translation_helper import t_user
 import re
 
@@ -413,12 +415,14 @@ class CountryTLDService:
         try:
             results = {}
 
+            # One batched registry request for every TLD
+            availability = await self._check_domains_availability_batch(
+                [f"{domain_name}{tld}" for tld in tlds]
+            )
+
             for tld in tlds:
                 full_domain = f"{domain_name}{tld}"
-
-                # This would typically use the OpenProvider API
-                # For now, simulate availability checking
-                is_available = await self._check_single_domain_availability(full_domain)
+                is_available = availability[full_domain]
 
                 tld_info = self._get_tld_info(tld)
 
@@ -783,6 +787,31 @@ class CountryTLDService:
             logger.error(f"Error calculating TLD score: {e}")
             return 50
 
+    async def _check_domains_availability_batch(self, domains: List[str]) -> Dict[str, bool]:
+        """Check availability of many domains in one registry round trip"""
+        registry = get_api_manager().openprovider
+        if registry:
+            try:
+                loop = asyncio.get_event_loop()
+                batch = await loop.run_in_executor(
+                    None, registry.check_domains_availability, domains
+                )
+                return {
+                    domain: (
+                        result.get("available", False)
+                        if not result.get("error")
+                        else await self._check_single_domain_availability(domain)
+                    )
+                    for domain, result in batch.items()
+                }
+            except Exception as e:
+                logger.error(f"Batch availability check failed: {e}")
+
+        return {
+            domain: await self._check_single_domain_availability(domain)
+            for domain in domains
+        }
+
     async def _check_single_domain_availability(self, domain: str) -> bool:
         """Check availability of single domain"""
         # This would typically use the OpenProvider API
@@ -0,0 +1,179 @@
+"""
+Crypto Rate Service for Nomadly2
+One cached USD exchange-rate table for every supported coin, refreshed in a
+single multi-symbol FastForex call on a timer
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from apis.fastforex import FastForexAPI
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_SYMBOLS = ("BTC", "ETH", "LTC", "DOGE", "USDT", "TRX")
+
+# Payment currency codes used around the bot that map onto a rate symbol
+SYMBOL_ALIASES = {
+    "USDT_ERC20": "USDT",
+    "USDT_TRC20": "USDT",
+}
+
+
+def normalize_symbol(currency: str) -> str:
+    symbol = (currency or "").upper()
+    return SYMBOL_ALIASES.get(symbol, symbol)
+
+
+@dataclass(frozen=True)
+class RateQuote:
+    """Rate for one coin as of the last refresh"""
+    symbol: str
+    crypto_per_usd: float
+    fetched_at: float  # unix time
+
+    @property
+    def usd_per_unit(self) -> float:
+        return 1.0 / self.crypto_per_usd
+
+    @property
+    def age(self) -> float:
+        """Seconds since FastForex returned this rate"""
+        return max(0.0, time.time() - self.fetched_at)
+
+
+class CryptoRateService:
+    """Cached crypto rates with a staleness bound.
+
+    Reads are a dict lookup on the last fetched table and never block, so
+    they are safe on the bot's event loop. A background thread refreshes all
+    SUPPORTED_SYMBOLS every ``refresh_interval`` seconds. A read that finds
+    no rate, or one older than ``max_age``, wakes that thread early (at most
+    every ``retry_interval`` seconds) and returns None, so callers apply
+    their own fallback until the new table lands.
+    """
+
+    def __init__(self, api: Optional[FastForexAPI] = None, refresh_interval: float = 60.0,
+                 max_age: float = 300.0, retry_interval: float = 10.0):
+        self.api = api or FastForexAPI()
+        self.refresh_interval = refresh_interval
+        self.max_age = max_age
+        self.retry_interval = retry_interval
+        self._quotes: Dict[str, RateQuote] = {}
+        self._refresh_lock = threading.Lock()
+        self._last_attempt = 0.0
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self.refreshes = 0
+        self.failures = 0
+        self.reads = 0
+        self.stale_reads = 0
+
+    def refresh(self) -> bool:
+        """Fetch every supported rate in one request. Returns True on success."""
+        if not self._refresh_lock.acquire(blocking=False):
+            return False  # another caller is already refreshing
+        try:
+            self._last_attempt = time.monotonic()
+            rates = self.api.fetch_multi(SUPPORTED_SYMBOLS)
+            if not rates:
+                self.failures += 1
+                return False
+
+            fetched_at = time.time()
+            quotes = dict(self._quotes)
+            for symbol, rate in rates.items():
+                if rate and rate > 0:
+                    quotes[symbol] = RateQuote(symbol, float(rate), fetched_at)
+            self._quotes = quotes  # swap the whole table so readers never see a partial update
+            self.refreshes += 1
+            logger.debug(f"💱 Refreshed {len(rates)} crypto rates")
+            return True
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"💱 Crypto rate refresh failed: {e}")
+            return False
+        finally:
+            self._refresh_lock.release()
+
+    def start(self) -> None:
+        """Start the background refresh timer (idempotent)"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="crypto-rates", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.clear()
+            self.refresh()
+            self._wake.wait(self.refresh_interval)
+
+    def request_refresh(self) -> bool:
+        """Ask the timer thread to refresh now, unless one is running or was just tried"""
+        if self._refresh_lock.locked() or time.monotonic() - self._last_attempt < self.retry_interval:
+            return False
+        self._wake.set()
+        return True
+
+    def get_quote(self, currency: str, max_age: Optional[float] = None) -> Optional[RateQuote]:
+        """Cached quote for currency, or None if none is available within max_age"""
+        self.reads += 1
+        if self._thread is None:
+            self.start()
+
+        symbol = normalize_symbol(currency)
+        max_age = self.max_age if max_age is None else max_age
+        quote = self._quotes.get(symbol)
+        if quote is not None and quote.age <= max_age:
+            return quote
+
+        self.stale_reads += 1
+        if symbol in SUPPORTED_SYMBOLS:
+            self.request_refresh()
+        return None
+
+    def usd_to_crypto(self, amount_usd: float, currency: str, max_age: Optional[float] = None) -> Optional[float]:
+        quote = self.get_quote(currency, max_age)
+        return amount_usd * quote.crypto_per_usd if quote else None
+
+    def crypto_to_usd(self, amount: float, currency: str, max_age: Optional[float] = None) -> Optional[float]:
+        quote = self.get_quote(currency, max_age)
+        return amount * quote.usd_per_unit if quote else None
+
+    def rate_age(self, currency: str) -> Optional[float]:
+        """Seconds since the cached rate for currency was fetched (None if never)"""
+        quote = self._quotes.get(normalize_symbol(currency))
+        return quote.age if quote else None
+
+    def stats(self) -> Dict[str, object]:
+        ages = [quote.age for quote in self._quotes.values()]
+        return {
+            "symbols": sorted(self._quotes),
+            "oldest_rate_age": round(max(ages), 1) if ages else None,
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "reads": self.reads,
+            "stale_reads": self.stale_reads,
+        }
+
+
+_crypto_rate_service: Optional[CryptoRateService] = None
+_crypto_rate_service_lock = threading.Lock()
+
+
+def get_crypto_rate_service() -> CryptoRateService:
+    """Get global crypto rate service instance"""
+    global _crypto_rate_service
+    with _crypto_rate_service_lock:
+        if _crypto_rate_service is None:
+            _crypto_rate_service = CryptoRateService()
+        return _crypto_rate_service
@@ -0,0 +1,487 @@
+"""
+Session Store for Nomadly Bot
+Incremental, write-behind persistence of user sessions in SQLite (WAL mode)
+
+SessionStore is a dict of user_id -> session dict, so existing
+``user_sessions[user_id]["key"] = value`` code keeps working. Every user
+whose session is read or written through the mapping is marked dirty; dirty
+sessions are written in one transaction per flush, either when the dirty set
+reaches a size threshold or on a background timer. Save cost therefore
+follows the number of users touched, not the total number of users, and
+memory follows the number of recently active users (LRU cap + idle TTL).
+"""
+
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.getenv("USER_SESSIONS_DB", "user_sessions.db")
+LEGACY_JSON_PATH = "user_sessions.json"
+
+
+class SQLiteSessionBackend:
+    """Transactional session table in an embedded SQLite database"""
+
+    def __init__(self, path: str = DEFAULT_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS user_sessions ("
+            "user_id INTEGER PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS session_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+        )
+
+    def load_all(self) -> Dict[int, Dict[str, Any]]:
+        """Load every stored session"""
+        sessions = {}
+        with self._lock:
+            rows = self._conn.execute("SELECT user_id, data FROM user_sessions").fetchall()
+        for user_id, data in rows:
+            try:
+                sessions[user_id] = json.loads(data)
+            except json.JSONDecodeError as e:
+                logger.warning(f"📂 Skipping unreadable session for user {user_id}: {e}")
+        return sessions
+
+    def load(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """Load one session, or None if the user has none"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM user_sessions WHERE user_id = ?", (user_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def load_with_age(self, user_id: int) -> Optional[Tuple[Dict[str, Any], float]]:
+        """Load one session with the seconds since it was last written"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data, updated_at FROM user_sessions WHERE user_id = ?", (user_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), max(0.0, time.time() - row[1])
+
+    def find(self, key: str, value: Any) -> List[Tuple[int, Dict[str, Any]]]:
+        """Return sessions whose top-level key equals value"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT user_id, data FROM user_sessions WHERE json_extract(data, ?) = ?",
+                (f"$.{key}", value),
+            ).fetchall()
+        return [(user_id, json.loads(data)) for user_id, data in rows]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM user_sessions").fetchone()[0]
+
+    def write(self, rows: List[Tuple[int, str]], deletes: Iterable[int] = ()) -> None:
+        """Upsert rows and delete ids in a single atomic transaction"""
+        now = time.time()
+        deletes = list(deletes)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if rows:
+                    self._conn.executemany(
+                        "INSERT INTO user_sessions (user_id, data, updated_at) VALUES (?, ?, ?) "
+                        "ON CONFLICT(user_id) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at",
+                        [(user_id, data, now) for user_id, data in rows],
+                    )
+                if deletes:
+                    self._conn.executemany(
+                        "DELETE FROM user_sessions WHERE user_id = ?", [(user_id,) for user_id in deletes]
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def get_meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM session_meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO session_meta (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (key, value),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class SessionStore(dict):
+    """Bounded, dict-like user session cache with write-behind flushing.
+
+    Only recently used sessions stay resident: the cache is capped at
+    ``max_entries`` (least recently used evicted first) and sessions idle
+    for ``idle_ttl`` seconds are dropped. A miss rehydrates the session from
+    the backend, so ``user_id in store`` and ``store[user_id]`` behave as if
+    every stored session were in memory. Dirty sessions are always flushed
+    before they are evicted.
+
+    Keys starting with one of WORKFLOW_PREFIXES hold in-progress state (an
+    input prompt, a DNS edit). They are deleted from a session that has been
+    idle for ``workflow_ttl`` seconds, checked when the sweep evicts it and
+    when it is rehydrated, so an abandoned prompt is not resurrected days
+    later. Every other key (language, technical email, ...) is kept.
+    ``workflow_ttl`` defaults to ``idle_ttl``: a session evicted for being
+    idle comes back without its half-finished workflow.
+
+    Reading a session through ``store[user_id]`` or ``store.get(user_id)``
+    marks it dirty, because callers mutate the returned dict in place.
+    Unchanged sessions are skipped at flush time by comparing their
+    serialised form with what was last written.
+    """
+
+    WORKFLOW_PREFIXES = ("waiting_for_", "dns_")
+
+    def __init__(self, backend: SQLiteSessionBackend, flush_interval: float = 2.0,
+                 flush_threshold: int = 256, legacy_json_path: Optional[str] = LEGACY_JSON_PATH,
+                 max_entries: int = 5000, idle_ttl: float = 1800.0,
+                 workflow_ttl: Optional[float] = None, sweep_interval: float = 60.0,
+                 report_interval: float = 600.0):
+        super().__init__()
+        self.backend = backend
+        self.legacy_json_path = legacy_json_path
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self.max_entries = max_entries
+        self.idle_ttl = idle_ttl
+        self.workflow_ttl = idle_ttl if workflow_ttl is None else workflow_ttl
+        self.sweep_interval = sweep_interval
+        self.report_interval = report_interval
+        self._lru: "OrderedDict[int, float]" = OrderedDict()  # user_id -> last access
+        self._dirty: set = set()
+        # Guards _dirty: the event loop marks sessions while the flusher thread swaps it
+        self._dirty_lock = threading.Lock()
+        self._written: Dict[int, int] = {}  # user_id -> hash of last persisted JSON
+        self._flush_lock = threading.RLock()
+        self._flusher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._last_sweep = time.monotonic()
+        self._last_report = time.monotonic()
+        self.flush_count = 0
+        self.rows_written = 0
+        self.hits = 0
+        self.misses = 0
+        self.rehydrated = 0
+        self.evictions_lru = 0
+        self.evictions_ttl = 0
+        self.workflow_pruned = 0
+
+    # Residency
+
+    def _touch(self, user_id) -> None:
+        self._lru[user_id] = time.monotonic()
+        self._lru.move_to_end(user_id)
+
+    def _resident(self, user_id) -> bool:
+        """Make user_id resident if it exists anywhere. Returns False if unknown."""
+        if dict.__contains__(self, user_id):
+            self.hits += 1
+            self._touch(user_id)
+            return True
+
+        self.misses += 1
+        try:
+            row = self.backend.load_with_age(user_id)
+        except (TypeError, ValueError, sqlite3.Error, json.JSONDecodeError) as e:
+            logger.error(f"📂 Could not rehydrate session for user {user_id}: {e}")
+            return False
+        if row is None:
+            return False
+
+        session, idle_seconds = row
+        self._written[user_id] = hash(self._serialise(session))
+        if idle_seconds > self.workflow_ttl and self._prune_workflow(session):
+            self.mark_dirty(user_id)
+        dict.__setitem__(self, user_id, session)
+        self._touch(user_id)
+        self.rehydrated += 1
+        self._enforce_capacity()
+        return True
+
+    def _prune_workflow(self, session: Dict[str, Any]) -> bool:
+        stale = [key for key in session if key.startswith(self.WORKFLOW_PREFIXES)]
+        for key in stale:
+            del session[key]
+        self.workflow_pruned += len(stale)
+        return bool(stale)
+
+    def _evict(self, user_ids: List[int]) -> None:
+        """Drop sessions from memory, flushing any that are dirty first"""
+        with self._flush_lock:
+            with self._dirty_lock:
+                pending = bool(self._dirty.intersection(user_ids))
+            if pending:
+                self._flush_locked()
+            with self._dirty_lock:
+                unsaved = self._dirty.intersection(user_ids)
+            for user_id in user_ids:
+                if user_id in unsaved:
+                    # Could not be persisted, keep it resident rather than lose it
+                    continue
+                dict.pop(self, user_id, None)
+                self._lru.pop(user_id, None)
+                self._written.pop(user_id, None)
+
+    def _enforce_capacity(self) -> None:
+        overflow = len(self._lru) - self.max_entries
+        if overflow <= 0:
+            return
+        victims = []
+        for user_id in self._lru:
+            victims.append(user_id)
+            if len(victims) >= overflow:
+                break
+        self.evictions_lru += len(victims)
+        self._evict(victims)
+
+    def sweep(self) -> int:
+        """Evict sessions idle longer than idle_ttl. Returns the number evicted."""
+        cutoff = time.monotonic() - self.idle_ttl
+        workflow_cutoff = time.monotonic() - self.workflow_ttl
+        victims = []
+        for user_id, last_access in self._lru.items():
+            if last_access > cutoff:
+                break  # ordered by recency, everything after is fresher
+            victims.append(user_id)
+
+        for user_id in victims:
+            session = dict.get(self, user_id)
+            if session and self._lru[user_id] <= workflow_cutoff and self._prune_workflow(session):
+                self.mark_dirty(user_id)
+        self.evictions_ttl += len(victims)
+        self._evict(victims)
+        self._last_sweep = time.monotonic()
+
+        if time.monotonic() - self._last_report >= self.report_interval:
+            self._last_report = time.monotonic()
+            logger.info(f"🧠 Session cache: {self.stats()}")
+        return len(victims)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "resident": len(self._lru),
+            "max_entries": self.max_entries,
+            "occupancy": round(len(self._lru) / self.max_entries, 3) if self.max_entries else 0.0,
+            "hits": self.hits,
+            "misses": self.misses,
+            "rehydrated": self.rehydrated,
+            "evictions_lru": self.evictions_lru,
+            "evictions_ttl": self.evictions_ttl,
+            "workflow_keys_pruned": self.workflow_pruned,
+            "dirty": len(self._dirty),
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+    # Dict API with dirty tracking and rehydration
+
+    def __contains__(self, user_id):
+        return self._resident(user_id)
+
+    def __getitem__(self, user_id):
+        if not self._resident(user_id):
+            raise KeyError(user_id)
+        self.mark_dirty(user_id)
+        return dict.__getitem__(self, user_id)
+
+    def get(self, user_id, default=None):
+        if not self._resident(user_id):
+            return default
+        self.mark_dirty(user_id)
+        return dict.__getitem__(self, user_id)
+
+    def __setitem__(self, user_id, session):
+        if not dict.__contains__(self, user_id) and user_id not in self._written:
+            # Pick up the persisted hash so an identical write is still skipped
+            self._resident(user_id)
+        dict.__setitem__(self, user_id, session)
+        self._touch(user_id)
+        self.mark_dirty(user_id)
+        self._enforce_capacity()
+
+    def __delitem__(self, user_id):
+        if not self._resident(user_id):
+            raise KeyError(user_id)
+        dict.__delitem__(self, user_id)
+        self._lru.pop(user_id, None)
+        self.mark_dirty(user_id)
+
+    def setdefault(self, user_id, default=None):
+        if not self._resident(user_id):
+            self[user_id] = {} if default is None else default
+            return dict.__getitem__(self, user_id)
+        self.mark_dirty(user_id)
+        return dict.__getitem__(self, user_id)
+
+    def pop(self, user_id, *default):
+        if self._resident(user_id):
+            session = dict.pop(self, user_id)
+            self._lru.pop(user_id, None)
+            self.mark_dirty(user_id)
+            return session
+        if default:
+            return default[0]
+        raise KeyError(user_id)
+
+    def update(self, *args, **kwargs):
+        for user_id, session in dict(*args, **kwargs).items():
+            self[user_id] = session
+
+    def mark_dirty(self, user_id) -> None:
+        """Flag a session changed through a reference obtained by iteration"""
+        with self._dirty_lock:
+            self._dirty.add(user_id)
+
+    def find_sessions(self, key: str, value: Any) -> List[Tuple[int, Dict[str, Any]]]:
+        """Return (user_id, session) for every stored session where session[key] == value"""
+        self.flush()
+        return self.backend.find(key, value)
+
+    # Persistence
+
+    def load(self) -> int:
+        """Prepare the backend, importing the legacy JSON file once. Returns the stored session count."""
+        if self.backend.get_meta("json_imported") is None:
+            self._import_legacy_json()
+            self.backend.set_meta("json_imported", str(int(time.time())))
+        return self.backend.count()
+
+    def _import_legacy_json(self) -> None:
+        path = self.legacy_json_path
+        if not path or not os.path.exists(path):
+            return
+        try:
+            with open(path, "r") as f:
+                raw_data = f.read().strip()
+            sessions_data = json.loads(raw_data) if raw_data else {}
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error(f"📂 Could not import {path}: {e}")
+            return
+
+        rows = []
+        for k, v in sessions_data.items():
+            try:
+                if isinstance(v, dict):
+                    rows.append((int(k), self._serialise(v)))
+            except (ValueError, TypeError) as e:
+                logger.warning(f"📂 Skipping invalid user ID {k}: {e}")
+        self.backend.write(rows)
+        logger.info(f"📂 Imported {len(rows)} sessions from {path}")
+
+    @staticmethod
+    def _serialise(session: Dict[str, Any]) -> str:
+        return json.dumps(session, default=str, sort_keys=True)
+
+    def save(self) -> None:
+        """Request persistence of dirty sessions (write-behind)"""
+        self.start()
+        if len(self._dirty) >= self.flush_threshold:
+            self.flush()
+        if time.monotonic() - self._last_sweep >= self.sweep_interval:
+            self.sweep()
+
+    def flush(self) -> int:
+        """Write all dirty sessions in one transaction. Returns rows written."""
+        with self._flush_lock:
+            return self._flush_locked()
+
+    def _flush_locked(self) -> int:
+        with self._dirty_lock:
+            if not self._dirty:
+                return 0
+            dirty, self._dirty = self._dirty, set()
+
+        rows, deletes, hashes = [], [], {}
+        for user_id in dirty:
+            session = dict.get(self, user_id)
+            if session is None:
+                if self._written.pop(user_id, None) is not None:
+                    deletes.append(user_id)
+                continue
+            try:
+                payload = self._serialise(session)
+            except RuntimeError:
+                # Mutated by another thread mid-serialisation, retry next flush
+                self.mark_dirty(user_id)
+                continue
+            except (TypeError, ValueError) as e:
+                logger.error(f"💾 Cannot serialise session for user {user_id}: {e}")
+                continue
+            digest = hash(payload)
+            if self._written.get(user_id) != digest:
+                rows.append((user_id, payload))
+                hashes[user_id] = digest
+
+        if not rows and not deletes:
+            return 0
+        try:
+            self.backend.write(rows, deletes)
+        except Exception as e:
+            logger.error(f"Error saving user sessions: {e}")
+            with self._dirty_lock:
+                self._dirty |= dirty
+            for user_id in deletes:
+                self._written[user_id] = 0
+            return 0
+
+        self._written.update(hashes)
+        self.flush_count += 1
+        self.rows_written += len(rows)
+        logger.debug(f"💾 Flushed {len(rows)} sessions ({len(deletes)} deleted)")
+        return len(rows)
+
+    def start(self) -> None:
+        """Start the background flush timer (idempotent)"""
+        if self._flusher is not None:
+            return
+        self._flusher = threading.Thread(target=self._run_flusher, name="session-flusher", daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
+
+    def _run_flusher(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Session flusher error: {e}")
+
+    def close(self) -> None:
+        """Stop the timer and flush whatever is still dirty"""
+        self._stop.set()
+        self.flush()
+
+
+_session_store: Optional[SessionStore] = None
+_session_store_lock = threading.Lock()
+
+
+def get_session_store() -> SessionStore:
+    """Process-wide session store shared by the bot and the payment monitor"""
+    global _session_store
+    with _session_store_lock:
+        if _session_store is None:
+            store = SessionStore(SQLiteSessionBackend())
+            store.load()
+            _session_store = store
+        return _session_store
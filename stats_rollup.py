@@ -0,0 +1,153 @@
+"""
+Stats Rollup for Nomadly Admin Dashboards
+Incrementally maintained counters in place of full-table COUNT(*)/SUM() scans
+
+The stats_rollup table (database_migrations/003_stats_rollup_*.sql) holds
+counters per (day, metric), kept current by row triggers on users,
+registered_domains, orders and wallet_transactions in the same transaction as
+the change. Each counter is split over a few slots so concurrent writers do
+not queue on one row; a value is the sum of its slots. A dashboard reads the
+all-time bucket plus the last month of day rows through the primary key, so
+its cost does not grow with the tables.
+
+Metrics, all bucketed by the row's created_at date:
+    users, domains, orders, transactions       row counts
+    orders:<payment_status>                    orders by status
+    revenue:<coin>                             completed order revenue (USD) by coin,
+                                               or payment method when no coin
+    completed:<service_type>                   completed orders by service
+    completed_via:<payment_method>             completed orders by payment method
+    wallet:<transaction_type>                  wallet transaction amounts by type
+
+A metric name ending in ":" sums every metric under that prefix.
+
+Running this module rebuilds the table from history (once after the migration,
+or after a TRUNCATE of a source table):
+
+    python stats_rollup.py
+"""
+
+import logging
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Day of the all-time bucket
+ALL_TIME = date.min
+
+# Day rows a dashboard snapshot reads: enough for 30-day and month-to-date figures
+WINDOW_DAYS = 31
+
+_ALL_TIME_SQL = f"DATE '{ALL_TIME.isoformat()}'"
+
+# Blocks writes to the source tables while history is recounted, so no
+# trigger update lands between the scan and the rewrite
+BACKFILL_SQL = [
+    "LOCK TABLE users, registered_domains, orders, wallet_transactions IN SHARE MODE",
+    "DELETE FROM stats_rollup",
+    f"""
+    INSERT INTO stats_rollup (day, metric, slot, value)
+    SELECT CASE WHEN GROUPING(m.day) = 1 THEN {_ALL_TIME_SQL} ELSE m.day END,
+           m.metric, 0, SUM(m.value)
+    FROM (
+        SELECT m.* FROM users u, LATERAL stats_rollup_user_metrics(u) m
+        UNION ALL
+        SELECT m.* FROM registered_domains d, LATERAL stats_rollup_domain_metrics(d) m
+        UNION ALL
+        SELECT m.* FROM orders o, LATERAL stats_rollup_order_metrics(o) m
+        UNION ALL
+        SELECT m.* FROM wallet_transactions w, LATERAL stats_rollup_wallet_metrics(w) m
+    ) m
+    GROUP BY GROUPING SETS ((m.day, m.metric), (m.metric))
+    HAVING GROUPING(m.day) = 1 OR m.day <> {_ALL_TIME_SQL}
+    """,
+]
+
+
+def window_start(today: date) -> date:
+    """Oldest day row a snapshot for today needs"""
+    return min(today.replace(day=1), today - timedelta(days=WINDOW_DAYS - 1))
+
+
+class StatsSnapshot:
+    """Dashboard figures from the all-time bucket and recent day rows.
+
+    Rows for the same (day, metric), one per slot, add up.
+    """
+
+    def __init__(self, rows: Iterable[Tuple[date, str, Decimal]], today: date):
+        self.today = today
+        self._all_time: Dict[str, Decimal] = defaultdict(Decimal)
+        self._days: Dict[str, Dict[date, Decimal]] = defaultdict(lambda: defaultdict(Decimal))
+        for day, metric, value in rows:
+            if day == ALL_TIME:
+                self._all_time[metric] += Decimal(value)
+            else:
+                self._days[metric][day] += Decimal(value)
+
+    @staticmethod
+    def _matches(name: str, metric: str) -> bool:
+        return name.startswith(metric) if metric.endswith(":") else name == metric
+
+    def total(self, metric: str) -> Decimal:
+        """All-time value"""
+        return sum(
+            (value for name, value in self._all_time.items() if self._matches(name, metric)),
+            Decimal(0),
+        )
+
+    def since(self, metric: str, start: date) -> Decimal:
+        """Value over the days from start through today"""
+        return sum(
+            (
+                value
+                for name, days in self._days.items() if self._matches(name, metric)
+                for day, value in days.items() if start <= day <= self.today
+            ),
+            Decimal(0),
+        )
+
+    def last_days(self, metric: str, days: int) -> Decimal:
+        """Value over today and the days - 1 days before it"""
+        return self.since(metric, self.today - timedelta(days=days - 1))
+
+    def month_to_date(self, metric: str) -> Decimal:
+        return self.since(metric, self.today.replace(day=1))
+
+    def breakdown(self, prefix: str) -> Dict[str, Decimal]:
+        """All-time values under prefix keyed by the rest of the name, e.g. revenue by coin"""
+        return {
+            name[len(prefix):]: value
+            for name, value in sorted(self._all_time.items())
+            if name.startswith(prefix)
+        }
+
+
+def backfill(db_manager=None) -> int:
+    """Rebuild stats_rollup from the source tables and return the rows written"""
+    from sqlalchemy import text
+
+    from database import get_db_manager
+
+    session = (db_manager or get_db_manager()).get_session()
+    try:
+        result = None
+        for statement in BACKFILL_SQL:
+            result = session.execute(text(statement))
+        session.commit()
+        logger.info(f"📊 Stats rollup backfilled: {result.rowcount} rows")
+        return result.rowcount
+    except Exception as e:
+        session.rollback()
+        logger.error(f"❌ Stats rollup backfill failed: {e}")
+        raise
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    backfill()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Test the async database layer: asyncpg URLs and the thread-pool fallback
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("psycopg2")
+
+from async_database import ThreadedDatabaseManager, async_database_url
+
+
+def test_postgres_urls_map_to_asyncpg():
+    assert async_database_url("postgresql://u:p@db/nomadly") == "postgresql+asyncpg://u:p@db/nomadly"
+    assert async_database_url("postgres://u:p@db/nomadly?sslmode=require") == (
+        "postgresql+asyncpg://u:p@db/nomadly?ssl=require"
+    )
+    assert async_database_url("postgresql+psycopg2://db/x") == "postgresql+asyncpg://db/x"
+    assert async_database_url("sqlite:///nomadly.db") is None
+    assert async_database_url("") is None
+
+
+class _SlowManager:
+    def __init__(self):
+        self.threads = set()
+
+    def get_user_balance(self, telegram_id):
+        self.threads.add(threading.get_ident())
+        threading.Event().wait(0.05)
+        return 12.5
+
+
+def test_threaded_manager_keeps_the_loop_free():
+    db = ThreadedDatabaseManager(_SlowManager(), max_workers=4)
+    ticks = []
+
+    async def scenario():
+        async def tick():
+            for _ in range(5):
+                ticks.append(None)
+                await asyncio.sleep(0.01)
+
+        balances, _ = await asyncio.gather(
+            asyncio.gather(*(db.get_user_balance(i) for i in range(4))), tick()
+        )
+        await db.aclose()
+        return balances
+
+    assert asyncio.run(scenario()) == [12.5] * 4
+    assert len(ticks) == 5
+    assert threading.get_ident() not in db.db.threads
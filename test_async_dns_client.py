@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Test the in-process DNS client and propagation checker against local stub DNS servers
+"""
+
+import asyncio
+import socket
+import struct
+
+import pytest
+
+from async_dns_client import QTYPES, AsyncDNSClient, decode_name, parse_response
+from dns_propagation_checker import DNSPropagationChecker
+
+
+def _rdata(rtype, value):
+    if rtype == "A":
+        return socket.inet_aton(value)
+    if rtype == "AAAA":
+        return socket.inet_pton(socket.AF_INET6, value)
+    if rtype in ("NS", "CNAME"):
+        return b"".join(bytes([len(l)]) + l.encode() for l in value.split(".")) + b"\x00"
+    if rtype == "MX":
+        return struct.pack("!H", value[0]) + _rdata("NS", value[1])
+    if rtype == "TXT":
+        chunks = [value[i:i + 255] for i in range(0, len(value), 255)]
+        return b"".join(bytes([len(c)]) + c.encode() for c in chunks)
+
+
+def build_answer(query, zone, truncate=False):
+    """Answer a query from zone {(name, type): [values]}, pointing owner names at the question"""
+    query_id = struct.unpack("!H", query[:2])[0]
+    name, offset = decode_name(query, 12)
+    qtype_code = struct.unpack("!H", query[offset:offset + 2])[0]
+    qtype = next(k for k, v in QTYPES.items() if v == qtype_code)
+    question = query[12:offset + 4]
+    values = zone.get((name.lower(), qtype))
+    rcode = 0 if values is not None or any(n == name.lower() for n, _ in zone) else 3
+    values = values or []
+    flags = 0x8180 | rcode | (0x0200 if truncate else 0)
+    answers = b""
+    if not truncate:
+        for value in values:
+            rdata = _rdata(qtype, value)
+            answers += b"\xc0\x0c" + struct.pack("!HHIH", qtype_code, 1, 300, len(rdata)) + rdata
+    header = struct.pack("!HHHHHH", query_id, flags, 1, 0 if truncate else len(values), 0, 0)
+    return header + question + answers
+
+
+class StubDNS(asyncio.DatagramProtocol):
+    def __init__(self, zone, delay=0.0, silent=False, truncate=False):
+        self.zone, self.delay, self.silent, self.truncate = zone, delay, silent, truncate
+        self.queries = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.queries += 1
+        if self.silent:
+            return
+        reply = build_answer(data, self.zone, truncate=self.truncate)
+        asyncio.get_running_loop().call_later(self.delay, self.transport.sendto, reply, addr)
+
+
+async def start_stubs(configs):
+    """One stub per 127.0.0.x address, all on the same port"""
+    loop = asyncio.get_running_loop()
+    probe = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    probe.bind(("127.0.0.1", 0))
+    port = probe.getsockname()[1]
+    probe.close()
+    stubs, transports, servers = [], [], []
+    for i, kwargs in enumerate(configs, start=1):
+        address = f"127.0.0.{i}"
+        transport, stub = await loop.create_datagram_endpoint(lambda: StubDNS(**kwargs), local_addr=(address, port))
+        stubs.append(stub)
+        transports.append(transport)
+        servers.append((address, f"Stub{i}"))
+    return port, servers, stubs, transports
+
+
+ZONE = {
+    ("example.com", "A"): ["192.0.2.10", "192.0.2.11"],
+    ("example.com", "AAAA"): ["2001:db8::1"],
+    ("example.com", "NS"): ["ns1.cloudflare.com", "ns2.cloudflare.com"],
+    ("example.com", "MX"): [(10, "mx1.example.com"), (20, "mx2.example.com")],
+    ("example.com", "TXT"): ["v=spf1 mx ~all"],
+    ("www.example.com", "CNAME"): ["example.com"],
+}
+OLD_ZONE = {**ZONE, ("example.com", "NS"): ["ns1.registrar.net", "ns2.registrar.net"]}
+
+
+@pytest.mark.parametrize("qtype,expected", [
+    ("A", ["192.0.2.10", "192.0.2.11"]),
+    ("AAAA", ["2001:db8::1"]),
+    ("NS", ["ns1.cloudflare.com", "ns2.cloudflare.com"]),
+    ("MX", [(10, "mx1.example.com"), (20, "mx2.example.com")]),
+    ("TXT", ["v=spf1 mx ~all"]),
+])
+def test_structured_answers(qtype, expected):
+    async def run():
+        port, servers, _, transports = await start_stubs([{"zone": ZONE}])
+        try:
+            return await AsyncDNSClient(port=port, timeout=1).query(servers[0][0], "example.com", qtype)
+        finally:
+            for t in transports:
+                t.close()
+
+    response = asyncio.run(run())
+    assert response.rcode == "NOERROR"
+    assert response.values(qtype) == expected
+
+
+def test_nxdomain_and_cname():
+    async def run():
+        port, servers, _, transports = await start_stubs([{"zone": ZONE}])
+        client = AsyncDNSClient(port=port, timeout=1)
+        try:
+            return (await client.query(servers[0][0], "missing.example.org", "A"),
+                    await client.query(servers[0][0], "www.example.com", "CNAME"))
+        finally:
+            for t in transports:
+                t.close()
+
+    missing, cname = asyncio.run(run())
+    assert missing.rcode == "NXDOMAIN" and missing.answers == []
+    assert cname.values("CNAME") == ["example.com"]
+
+
+def test_truncated_udp_answer_retried_over_tcp():
+    async def run():
+        port, servers, _, transports = await start_stubs([{"zone": ZONE, "truncate": True}])
+
+        async def handle(reader, writer):
+            length = struct.unpack("!H", await reader.readexactly(2))[0]
+            reply = build_answer(await reader.readexactly(length), ZONE)
+            writer.write(struct.pack("!H", len(reply)) + reply)
+            await writer.drain()
+            writer.close()
+
+        tcp = await asyncio.start_server(handle, servers[0][0], port)
+        try:
+            return await AsyncDNSClient(port=port, timeout=1).query(servers[0][0], "example.com", "TXT")
+        finally:
+            tcp.close()
+            for t in transports:
+                t.close()
+
+    assert asyncio.run(run()).values("TXT") == ["v=spf1 mx ~all"]
+
+
+def test_unresponsive_server_is_retried_then_times_out():
+    async def run():
+        port, servers, stubs, transports = await start_stubs([{"zone": ZONE, "silent": True}])
+        try:
+            with pytest.raises(asyncio.TimeoutError):
+                await AsyncDNSClient(port=port, timeout=0.1, retries=2).query(servers[0][0], "example.com", "A")
+            return stubs[0].queries
+        finally:
+            for t in transports:
+                t.close()
+
+    assert asyncio.run(run()) == 3
+
+
+def test_quorum_returns_without_waiting_for_dead_resolvers():
+    async def run():
+        configs = [{"zone": ZONE}] * 3 + [{"zone": ZONE, "silent": True}] * 2
+        port, servers, _, transports = await start_stubs(configs)
+        try:
+            return await AsyncDNSClient(port=port, timeout=5, retries=0).query_quorum(
+                servers, "example.com", "NS", quorum=3)
+        finally:
+            for t in transports:
+                t.close()
+
+    result = asyncio.run(run())
+    assert result.quorum_reached
+    assert result.agreed == frozenset({"ns1.cloudflare.com", "ns2.cloudflare.com"})
+    assert result.elapsed < 1  # did not sit out the 5 s timeout of the silent servers
+
+
+def test_checker_counts_only_expected_nameservers():
+    async def run():
+        configs = [{"zone": ZONE}] * 3 + [{"zone": OLD_ZONE}, {"zone": ZONE, "silent": True}]
+        port, servers, _, transports = await start_stubs(configs)
+        checker = DNSPropagationChecker(client=AsyncDNSClient(port=port, timeout=0.3, retries=0), quorum=5)
+        checker.dns_servers = servers
+        try:
+            return await checker.check_nameserver_propagation(
+                "example.com", expected_nameservers=["NS1.cloudflare.com.", "ns2.cloudflare.com"])
+        finally:
+            for t in transports:
+                t.close()
+
+    result = asyncio.run(run())
+    assert result["quorum_reached"] is False
+    assert result["propagated_servers"] == 3 and result["checked_servers"] == 5
+    assert result["server_results"]["Stub4"]["status"] == "🔄 Old nameservers"
+    assert result["server_results"]["Stub5"]["status"] == "⏱️ Timeout"
+    assert result["overall_status"] == "🟡 Partially Propagated"
+
+
+def test_mx_records_reach_quorum_on_expected_values():
+    async def run():
+        port, servers, _, transports = await start_stubs([{"zone": ZONE}] * 3)
+        checker = DNSPropagationChecker(client=AsyncDNSClient(port=port, timeout=0.3, retries=0), quorum=3)
+        checker.dns_servers = servers
+        try:
+            return await checker.check_dns_record_propagation(
+                "example.com", "MX", expected_values=["10 MX1.example.com.", "20  mx2.example.com"])
+        finally:
+            for t in transports:
+                t.close()
+
+    result = asyncio.run(run())
+    assert result["quorum_reached"] is True
+    assert result["propagated_servers"] == 3
+    assert result["server_results"]["Stub1"]["records"] == ["10 mx1.example.com", "20 mx2.example.com"]
+
+
+def test_parse_rejects_mismatched_id():
+    query = struct.pack("!HHHHHH", 1, 0x0100, 1, 0, 0, 0) + b"\x07example\x03com\x00\x00\x01\x00\x01"
+    reply = build_answer(query, ZONE)
+    with pytest.raises(Exception):
+        parse_response(reply, query_id=2)
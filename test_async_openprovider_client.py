@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Test the pooled AsyncOpenProviderAPI client and its sync wrapper against a local stub registry
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+aiohttp = pytest.importorskip("aiohttp")
+from aiohttp import web
+
+from async_api_clients import AsyncOpenProviderAPI, BackgroundLoop, run_coroutine_sync
+
+
+class StubRegistry:
+    """Minimal OpenProvider stub that counts logins and TCP connections"""
+
+    def __init__(self):
+        self.logins = 0
+        self.peers = set()
+        self.check_requests = []
+        self.app = web.Application()
+        self.app.router.add_post("/v1beta/auth/login", self.login)
+        self.app.router.add_post("/v1beta/domains/check", self.check)
+        self.app.router.add_put("/v1beta/domains/{domain}", self.update)
+        self.app.router.add_post("/v1beta/contacts", self.contact)
+        self.app.router.add_post("/v1beta/customers", self.customer)
+        self.app.router.add_post("/v1beta/domains", self.register)
+
+    async def login(self, request):
+        self.logins += 1
+        return web.json_response({"data": {"token": "stub-token"}})
+
+    async def check(self, request):
+        self.peers.add(request.transport.get_extra_info("peername"))
+        body = await request.json()
+        self.check_requests.append(len(body["domains"]))
+        return web.json_response({"data": {"results": [{
+            "domain": f"{domain['name']}.{domain['extension']}",
+            "status": "active" if domain["name"] == "taken" else "free",
+            "price": {"reseller": {"price": 10.0, "currency": "USD"}},
+        } for domain in body["domains"]]}})
+
+    async def update(self, request):
+        return web.json_response({"data": {"success": True}})
+
+    async def contact(self, request):
+        return web.json_response({"data": {"handle": "CONTACT-1"}})
+
+    async def customer(self, request):
+        return web.json_response({"data": {"handle": "CUSTOMER-1"}})
+
+    async def register(self, request):
+        body = await request.json()
+        if body["domain"]["name"] == "noid":
+            return web.json_response({"data": {}})
+        return web.json_response({"data": {"id": 42}})
+
+
+async def _run_against_stub(test):
+    registry = StubRegistry()
+    runner = web.AppRunner(registry.app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    client = AsyncOpenProviderAPI("user", "pass")
+    client.base_url = f"http://127.0.0.1:{port}"
+    try:
+        await test(client, registry)
+    finally:
+        await client.close()
+        await runner.cleanup()
+
+
+def test_check_reuses_connection_and_token():
+    async def test(client, registry):
+        free = await client.check_domain_availability("nomadly.com")
+        taken = await client.check_domain_availability("taken.com")
+        assert free["available"] is True and free["api_price"] == 10.0
+        assert taken["available"] is False
+        assert registry.logins == 1
+        assert len(registry.peers) == 1  # keep-alive: one pooled connection
+
+    asyncio.run(_run_against_stub(test))
+
+
+def test_concurrent_checks_authenticate_once():
+    async def test(client, registry):
+        results = await asyncio.gather(*[
+            client.check_domain_availability(f"name{i}.com") for i in range(10)
+        ])
+        assert all(result["available"] for result in results)
+        assert registry.logins == 1
+
+    asyncio.run(_run_against_stub(test))
+
+
+def test_batch_check_single_round_trip():
+    async def test(client, registry):
+        domains = [f"{name}.{ext}" for name in ("nomadly", "taken") for ext in ("com", "net", "org")]
+        results = await client.check_domains_availability(domains + ["invalid"])
+        assert list(results) == domains + ["invalid"]
+        assert [results[d]["available"] for d in domains] == [True] * 3 + [False] * 3
+        assert "error" in results["invalid"]
+        assert registry.check_requests == [6]
+
+    asyncio.run(_run_against_stub(test))
+
+
+def test_batch_check_splits_chunks():
+    async def test(client, registry):
+        domains = [f"name{i}.com" for i in range(40)]
+        results = await client.check_domains_availability(domains, batch_size=15)
+        assert all(results[d]["available"] for d in domains)
+        assert sorted(registry.check_requests) == [10, 15, 15]
+
+    asyncio.run(_run_against_stub(test))
+
+
+def test_update_nameservers():
+    async def test(client, registry):
+        assert await client.update_nameservers("nomadly.com", ["ns1.example.com", "ns2.example.com"])
+
+    asyncio.run(_run_against_stub(test))
+
+
+def test_create_contact_paths():
+    async def test(client, registry):
+        assert await client.create_contact({"name": "x"}) == "CUSTOMER-1"
+        assert await client.create_contact({"name": "x"}, path="/v1beta/contacts") == "CONTACT-1"
+
+    asyncio.run(_run_against_stub(test))
+
+
+def test_sync_create_contact_keeps_contacts_endpoint():
+    from api_services import OpenProviderAPI
+
+    calls = []
+
+    class FakeClient:
+        async def create_contact(self, contact_data, path="/v1beta/customers"):
+            calls.append(path)
+            return "CONTACT-1"
+
+    api = OpenProviderAPI("user", "pass")
+    api.client = FakeClient()
+    assert api.create_contact({"name": "x"}) == "CONTACT-1"
+    assert calls == ["/v1beta/contacts"]
+
+
+def test_register_domain_without_id_is_a_failure():
+    async def test(client, registry):
+        assert await client.register_domain("nomadly.com", "CONTACT-1") == "42"
+        assert await client.register_domain("noid.com", "CONTACT-1") is None
+
+    asyncio.run(_run_against_stub(test))
+
+
+def test_session_from_previous_loop_is_closed():
+    client = AsyncOpenProviderAPI("user", "pass")
+
+    async def open_session():
+        return await client._get_session()
+
+    first = asyncio.run(open_session())
+    second = asyncio.run(open_session())
+    assert first is not second
+    assert first.closed
+    asyncio.run(client.close())
+
+
+def test_long_work_on_its_own_loop_does_not_stall_client_calls():
+    slow_loop = BackgroundLoop("slow-work")
+    release = threading.Event()
+
+    async def slow():
+        while not release.is_set():
+            await asyncio.sleep(0.01)
+
+    async def quick():
+        return "ok"
+
+    worker = threading.Thread(target=slow_loop.run, args=(slow(),))
+    worker.start()
+    try:
+        started = time.monotonic()
+        assert run_coroutine_sync(quick()) == "ok"
+        assert time.monotonic() - started < 1
+    finally:
+        release.set()
+        worker.join()
+
+
+if __name__ == "__main__":
+    test_check_reuses_connection_and_token()
+    test_concurrent_checks_authenticate_once()
+    test_batch_check_single_round_trip()
+    test_batch_check_splits_chunks()
+    test_update_nameservers()
+    test_create_contact_paths()
+    test_sync_create_contact_keeps_contacts_endpoint()
+    test_register_domain_without_id_is_a_failure()
+    test_session_from_previous_loop_is_closed()
+    test_long_work_on_its_own_loop_does_not_stall_client_calls()
+    print("✅ Async OpenProvider client tests passed")
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Test the shared availability cache: TTLs, single-flight coalescing and invalidation
+"""
+
+import asyncio
+
+from fast_response_cache import AvailabilityCache
+
+
+def _registry(calls, delay=0.01):
+    async def fetch(domains):
+        calls.append(list(domains))
+        await asyncio.sleep(delay)
+        return {d: {"available": not d.startswith("taken"), "price": 10.0} for d in domains}
+    return fetch
+
+
+def test_hits_after_first_lookup():
+    cache = AvailabilityCache()
+    calls = []
+
+    async def run():
+        await cache.get_many(["nomadly.com", "taken.com"], _registry(calls))
+        return await cache.get_many(["nomadly.com", "taken.com"], _registry(calls))
+
+    results = asyncio.run(run())
+    assert results["nomadly.com"]["available"] is True
+    assert results["taken.com"]["available"] is False
+    assert calls == [["nomadly.com", "taken.com"]]
+    assert cache.stats()["hits"] == 2 and cache.stats()["misses"] == 2
+
+
+def test_concurrent_lookups_coalesce():
+    cache = AvailabilityCache()
+    calls = []
+
+    async def run():
+        fetch = _registry(calls, delay=0.05)
+        return await asyncio.gather(*[cache.get_many(["popular.com"], fetch) for _ in range(20)])
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(r["popular.com"]["available"] for r in results)
+    assert cache.stats()["coalesced"] == 19
+
+
+def test_ttl_by_availability_and_errors_not_cached():
+    cache = AvailabilityCache(taken_ttl=3600, free_ttl=0)
+    cache.set("free.com", {"available": True})
+    cache.set("taken.com", {"available": False})
+    cache.set("broken.com", {"available": False, "error": "API request failed: 500"})
+    assert cache.get("free.com") is None
+    assert cache.get("TAKEN.com") == {"available": False}
+    assert cache.get("broken.com") is None
+
+
+def test_invalidate_and_fetch_failure():
+    cache = AvailabilityCache()
+    cache.set("mine.com", {"available": True})
+    cache.invalidate("mine.com")
+    assert cache.get("mine.com") is None
+
+    async def failing(domains):
+        raise RuntimeError("registry down")
+
+    async def run():
+        try:
+            await cache.get_many(["mine.com"], failing)
+        except RuntimeError:
+            pass
+        assert cache.stats()["in_flight"] == 0
+
+    asyncio.run(run())
+
+
+def test_cancelled_owner_does_not_strand_waiters():
+    cache = AvailabilityCache()
+    calls = []
+
+    async def run():
+        fetch = _registry(calls, delay=0.05)
+        owner = asyncio.create_task(cache.get_many(["popular.com"], fetch))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get_many(["popular.com"], fetch))
+        await asyncio.sleep(0.01)
+        owner.cancel()
+        result = await asyncio.wait_for(waiter, timeout=1)
+        assert owner.cancelled()
+        return result
+
+    result = asyncio.run(run())
+    assert result["popular.com"]["available"] is True
+    assert len(calls) == 2  # the waiter fetched again after the owner was cancelled
+    assert cache.stats()["in_flight"] == 0
+
+
+def test_cancelled_waiter_does_not_cancel_owner():
+    cache = AvailabilityCache()
+    calls = []
+
+    async def run():
+        fetch = _registry(calls, delay=0.05)
+        owner = asyncio.create_task(cache.get_many(["popular.com"], fetch))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get_many(["popular.com"], fetch))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        return await owner
+
+    assert asyncio.run(run())["popular.com"]["available"] is True
+    assert len(calls) == 1
+
+
+if __name__ == "__main__":
+    test_hits_after_first_lookup()
+    test_concurrent_lookups_coalesce()
+    test_ttl_by_availability_and_errors_not_cached()
+    test_invalidate_and_fetch_failure()
+    test_cancelled_owner_does_not_strand_waiters()
+    test_cancelled_waiter_does_not_cancel_owner()
+    print("✅ Availability cache tests passed")
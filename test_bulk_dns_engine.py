@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Test the bulk DNS engine: change planning, bounded concurrency, resume and throttled progress
+"""
+
+import asyncio
+
+from bulk_dns_engine import (
+    DONE, FAILED, PENDING, UNCHANGED, BulkDNSEngine, BulkJobStore, RecordTemplate,
+    ThrottledProgress, plan_changes, templates_for,
+)
+from unified_dns_manager import UnifiedDNSManager
+
+
+def test_plan_add_is_idempotent():
+    template = RecordTemplate("A", "@", "203.0.113.10")
+    posts, deletes = plan_changes("example.com", [template], [])
+    assert posts == [{"type": "A", "name": "example.com", "content": "203.0.113.10", "ttl": 300}]
+    existing = [dict(posts[0], id="r1")]
+    assert plan_changes("example.com", [template], existing) == ([], [])
+
+
+def test_plan_replace_spf_only_touches_spf():
+    existing = [
+        {"id": "spf", "type": "TXT", "name": "example.com", "content": '"v=spf1 -all"'},
+        {"id": "verify", "type": "TXT", "name": "example.com", "content": "google-site-verification=x"},
+    ]
+    posts, deletes = plan_changes("example.com", templates_for("configure_spf", {"spf": "v=spf1 mx ~all"}), existing)
+    assert deletes == ["spf"]
+    assert posts[0]["content"] == "v=spf1 mx ~all"
+
+
+def test_plan_ensure_keeps_existing_records():
+    existing = [{"id": "spf", "type": "TXT", "name": "example.com", "content": "v=spf1 include:x ~all"}]
+    posts, deletes = plan_changes("example.com", templates_for("security_template", {}), existing)
+    assert deletes == []
+    assert [p["name"] for p in posts] == ["_dmarc.example.com"]
+
+
+class _FakeManager:
+    def __init__(self, zones):
+        self.zones = zones  # domain -> list of records
+        self.active = 0
+        self.peak = 0
+        self.batches = 0
+        self.stale = {}  # zone -> what a warm record cache would still return
+
+    async def get_zone_id(self, domain):
+        return domain if domain in self.zones else None
+
+    async def list_dns_records(self, zone_id, force_refresh=False):
+        if not force_refresh and zone_id in self.stale:
+            return list(self.stale[zone_id])
+        return list(self.zones[zone_id])
+
+    async def batch_dns_records(self, zone_id, posts=None, deletes=None):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+        self.batches += 1
+        self.zones[zone_id] = [r for r in self.zones[zone_id] if r["id"] not in (deletes or [])]
+        self.zones[zone_id] += [dict(p, id=f"new{i}") for i, p in enumerate(posts or [])]
+        return True, None
+
+
+def test_concurrency_is_bounded_and_results_recorded(tmp_path):
+    manager = _FakeManager({f"d{i}.com": [] for i in range(20)})
+    engine = BulkDNSEngine(dns_manager=manager, store=BulkJobStore(str(tmp_path / "jobs.db")), concurrency=4)
+    job = engine.create_job(1, "add_a", list(manager.zones) + ["missing.com"], {"ip": "203.0.113.10"})
+
+    asyncio.run(engine.run(job))
+
+    assert manager.peak <= 4
+    assert job.count(DONE) == 20 and job.count(FAILED) == 1
+    stored = engine.store.load(job.job_id)
+    assert stored.status == "completed" and stored.domains["missing.com"][0] == FAILED
+
+
+def test_interrupted_job_resumes_remaining_domains(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    manager = _FakeManager({f"d{i}.com": [] for i in range(10)})
+    engine = BulkDNSEngine(dns_manager=manager, store=BulkJobStore(path))
+    job = engine.create_job(1, "add_a", list(manager.zones), {"ip": "203.0.113.10"})
+    # Simulate a crash after three domains were applied
+    for domain in list(job.domains)[:3]:
+        asyncio.run(manager.batch_dns_records(domain, posts=[{"type": "A", "name": domain,
+                                                              "content": "203.0.113.10", "ttl": 300}]))
+        engine.store.record(job.job_id, domain, DONE)
+
+    restarted = BulkDNSEngine(dns_manager=manager, store=BulkJobStore(path))
+    [resumed] = restarted.unfinished_jobs()
+    assert resumed.count(PENDING) == 7
+    asyncio.run(restarted.run(resumed))
+
+    assert manager.batches == 10  # 3 before the crash + 7 after, none repeated
+    assert resumed.count(DONE) == 10 and restarted.unfinished_jobs() == []
+
+
+def test_rerun_reports_unchanged(tmp_path):
+    manager = _FakeManager({"a.com": [{"id": "r1", "type": "A", "name": "a.com", "content": "203.0.113.10"}]})
+    engine = BulkDNSEngine(dns_manager=manager, store=BulkJobStore(str(tmp_path / "jobs.db")))
+    job = asyncio.run(engine.run(engine.create_job(1, "add_a", ["a.com"], {"ip": "203.0.113.10"})))
+    assert job.domains["a.com"][0] == UNCHANGED and manager.batches == 0
+
+
+def test_plan_ignores_stale_record_cache(tmp_path):
+    manager = _FakeManager({"a.com": []})
+    manager.stale["a.com"] = [{"id": "r1", "type": "A", "name": "a.com", "content": "203.0.113.10"}]
+    engine = BulkDNSEngine(dns_manager=manager, store=BulkJobStore(str(tmp_path / "jobs.db")))
+    job = asyncio.run(engine.run(engine.create_job(1, "add_a", ["a.com"], {"ip": "203.0.113.10"})))
+    assert job.domains["a.com"][0] == DONE and manager.batches == 1
+
+
+def test_progress_is_throttled(tmp_path):
+    sent = []
+
+    async def send(text):
+        sent.append(text)
+
+    manager = _FakeManager({f"d{i}.com": [] for i in range(30)})
+    engine = BulkDNSEngine(dns_manager=manager, store=BulkJobStore(str(tmp_path / "jobs.db")))
+    job = engine.create_job(1, "add_a", list(manager.zones), {"ip": "203.0.113.10"})
+    asyncio.run(engine.run(job, ThrottledProgress(send, min_interval=60)))
+
+    assert len(sent) == 2  # first update, then the final one
+    assert "30/30" in sent[-1]
+
+
+class _OfflineDNSManager(UnifiedDNSManager):
+    """The real switch_domain_to_cloudflare with the Cloudflare calls stubbed out"""
+
+    def __init__(self):
+        super().__init__()
+        self.enabled = True
+
+    async def get_zone_id(self, domain):
+        return "zone-existing" if domain == "existing.com" else None
+
+    async def create_zone(self, domain):
+        return True, f"zone-{domain}", ["ada.ns.cloudflare.com", "bob.ns.cloudflare.com"]
+
+    async def get_zone_nameservers(self, zone_id):
+        return ["ada.ns.cloudflare.com", "bob.ns.cloudflare.com"]
+
+
+class _BoolRegistrar:
+    """Same contract as AsyncOpenProviderAPI.update_nameservers: a bool"""
+
+    def __init__(self, rejected=()):
+        self.rejected = set(rejected)
+        self.updates = []
+
+    async def update_nameservers(self, domain, nameservers):
+        self.updates.append((domain, tuple(nameservers)))
+        return domain not in self.rejected
+
+
+def test_cloudflare_migrate_through_real_switch(tmp_path):
+    registrar = _BoolRegistrar(rejected={"rejected.com"})
+    engine = BulkDNSEngine(dns_manager=_OfflineDNSManager(), store=BulkJobStore(str(tmp_path / "jobs.db")),
+                           registrar=registrar)
+    job = engine.create_job(1, "cloudflare_migrate", ["new.com", "existing.com", "rejected.com"], {})
+
+    asyncio.run(engine.run(job))
+
+    assert job.domains["new.com"] == (DONE, "zone created")
+    assert job.domains["existing.com"][0] == DONE
+    assert job.domains["rejected.com"][0] == FAILED
+    assert "registrar" in job.domains["rejected.com"][1]
+    assert len(registrar.updates) == 3
+
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Test the table-driven callback router used by handle_callback_query
+"""
+
+import asyncio
+
+from callback_router import CallbackRouter
+from callback_routes import callback_router, callback_ack_text
+
+
+def _linear_resolve(router, data):
+    """Reference implementation: first match in registration order (old if/elif chain)"""
+    for route in router.routes:
+        if route.kind == "exact" and data == route.pattern:
+            return route
+        if route.kind == "prefix" and data.startswith(route.pattern):
+            return route
+    return None
+
+
+def test_registration_order_wins():
+    router = CallbackRouter()
+    calls = []
+
+    @router.prefix("dns_")
+    async def generic(bot, query, data, arg):
+        calls.append(("generic", arg))
+
+    @router.exact("dns_view_records")
+    async def view(bot, query, data, arg):
+        calls.append(("view", arg))
+
+    @router.prefix("dns_view_")
+    async def legacy(bot, query, data, arg):
+        calls.append(("legacy", arg))
+
+    assert asyncio.run(router.dispatch(None, None, "dns_view_records"))
+    assert asyncio.run(router.dispatch(None, None, "dns_view_example_com"))
+    assert not asyncio.run(router.dispatch(None, None, "unknown"))
+    assert calls == [("generic", "view_records"), ("generic", "view_example_com")]
+
+    shadowed = {route.pattern for route, _ in router.shadowed_routes()}
+    assert shadowed == {"dns_view_records", "dns_view_"}
+
+
+def test_exact_beats_later_prefix():
+    router = CallbackRouter()
+
+    @router.exact("performance_data")
+    async def report(bot, query, data, arg):
+        pass
+
+    @router.prefix("performance_")
+    async def settings(bot, query, data, arg):
+        pass
+
+    assert router.resolve("performance_data").handler is report
+    assert router.resolve("performance_example_com").handler is settings
+    assert router.shadowed_routes() == []
+
+
+def test_route_table_matches_linear_chain():
+    samples = [line.strip() for line in open("all_callbacks.txt") if line.strip()]
+    samples += [
+        "register_example.com", "dns_main_example_com", "edit_dns_abc123_example_com",
+        "delete_dns_record_example.com_3", "country_toggle_us_example_com",
+        "geo_mode_allow_all_example_com", "crypto_btc_example.com", "crypto_trx_example.com",
+        "check_payment_eth_example_com", "fund_crypto_trx", "performance_data",
+        "performance_example_com", "visibility_example_com", "nothing_matches_this",
+    ]
+    for data in samples:
+        assert callback_router.resolve(data) is _linear_resolve(callback_router, data), data
+
+
+def test_geo_mode_keeps_underscored_mode():
+    calls = []
+
+    class _Bot:
+        async def handle_geo_mode_selection(self, query, mode, domain):
+            calls.append((mode, domain))
+
+    for data in ("geo_mode_allow_all_example_com", "geo_mode_block_except_example_com", "geo_mode_allow_only_a_io"):
+        assert asyncio.run(callback_router.dispatch(_Bot(), None, data))
+    assert calls == [("allow_all", "example.com"), ("block_except", "example.com"), ("allow_only", "a.io")]
+
+
+def test_page_cursors_reach_listing_handlers():
+    calls = []
+
+    class _Bot:
+        async def show_my_domains(self, query, cursor=None):
+            calls.append(("domains", cursor))
+
+        async def show_transaction_history(self, query, cursor=None):
+            calls.append(("transactions", cursor))
+
+    for data in ("my_domains", "domains_page_n19a3f.2a", "transaction_history", "txn_page_p19a3f.-1"):
+        assert asyncio.run(callback_router.dispatch(_Bot(), None, data))
+    assert calls == [("domains", None), ("domains", "n19a3f.2a"), ("transactions", None), ("transactions", "p19a3f.-1")]
+
+
+def test_cloudflare_migration_needs_confirmation():
+    calls = []
+
+    class _Bot:
+        async def mass_cloudflare_migrate(self, query):
+            calls.append("confirm screen")
+
+        async def mass_cloudflare_migrate_confirm(self, query):
+            calls.append("start job")
+
+    for data in ("mass_cloudflare_migrate", "mass_cloudflare_migrate_confirm"):
+        assert asyncio.run(callback_router.dispatch(_Bot(), None, data))
+    assert calls == ["confirm screen", "start job"]
+
+
+def test_ack_text():
+    assert callback_ack_text("lang_fr") == "✅ Selected"
+    assert callback_ack_text("wallet") == "💰 Opening..."
+    assert callback_ack_text("register_example.com") == "🚀 Starting..."
+    assert callback_ack_text(None) == "⚡ Processing..."
+
+
+if __name__ == "__main__":
+    test_registration_order_wins()
+    test_exact_beats_later_prefix()
+    test_route_table_matches_linear_chain()
+    test_geo_mode_keeps_underscored_mode()
+    test_page_cursors_reach_listing_handlers()
+    test_cloudflare_migration_needs_confirmation()
+    test_ack_text()
+    print("✅ Callback router tests passed")
+    for route, winner in callback_router.shadowed_routes():
+        print(f"   unreachable: {route.describe()}  (shadowed by {winner.describe()})")
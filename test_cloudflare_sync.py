@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Test the Cloudflare sync layer: three-way diff, drift detection, batched and rate-limited apply
+"""
+
+import asyncio
+import json
+from contextlib import asynccontextmanager
+
+import httpx
+import pytest
+
+from app.core.cloudflare_sync import CloudflareSyncLayer, DNSManagerClient, DNSRecord, RateLimiter, record_key
+from unified_dns_manager import UnifiedDNSManager
+
+
+class _FakeCloudflare:
+    """In-memory zone behind the API methods the sync layer calls"""
+
+    def __init__(self, records, rate_limit_first=0):
+        self.records = {r["id"]: dict(r) for r in records}
+        self.calls = 0
+        self.rate_limit_first = rate_limit_first
+        self.next_id = 0
+
+    def _new_id(self):
+        self.next_id += 1
+        return f"new{self.next_id}"
+
+    async def list_dns_records(self, zone_id):
+        return {"success": True, "result": [dict(r) for r in self.records.values()]}
+
+    async def create_dns_record(self, zone_id, data):
+        self.calls += 1
+        if self.rate_limit_first:
+            self.rate_limit_first -= 1
+            return {"success": False, "errors": [{"code": 971, "message": "Please wait"}], "retry_after": 0.01}
+        record = dict(data, id=self._new_id())
+        self.records[record["id"]] = record
+        return {"success": True, "result": record}
+
+    async def update_dns_record(self, zone_id, record_id, data):
+        self.calls += 1
+        self.records[record_id] = dict(data, id=record_id)
+        return {"success": True, "result": self.records[record_id]}
+
+    async def delete_dns_record(self, zone_id, record_id):
+        self.calls += 1
+        if record_id not in self.records:
+            return {"success": False, "errors": [{"code": 81044, "message": "Record does not exist"}]}
+        del self.records[record_id]
+        return {"success": True, "result": {"id": record_id}}
+
+
+class _CloudflareHTTP:
+    """In-memory Cloudflare DNS API served to a real UnifiedDNSManager over httpx"""
+
+    def __init__(self, records, fail_batch_with=None):
+        self.records = {r["id"]: dict(r) for r in records}
+        self.fail_batch_with = fail_batch_with
+        self.requests = []
+        self.next_id = 0
+
+    def _new_id(self):
+        self.next_id += 1
+        return f"new{self.next_id}"
+
+    @staticmethod
+    def _ok(result):
+        return httpx.Response(200, json={"success": True, "errors": [], "result": result})
+
+    def handle(self, request):
+        path = request.url.path.split("/dns_records", 1)[1]
+        self.requests.append((request.method, path))
+        body = json.loads(request.content) if request.content else None
+        if request.method == "GET":
+            return httpx.Response(200, json={"success": True, "result": list(self.records.values()),
+                                             "result_info": {"total_pages": 1}})
+        if path == "/batch":
+            if self.fail_batch_with:
+                return httpx.Response(400, json={"success": False, "errors": [{"code": 81057, "message": self.fail_batch_with}]})
+            for delete in body["deletes"]:
+                del self.records[delete["id"]]
+            posts = []
+            for post in body["posts"]:
+                posts.append(dict(post, id=self._new_id()))
+                self.records[posts[-1]["id"]] = posts[-1]
+            return self._ok({"deletes": body["deletes"], "posts": posts})
+        record_id = path.lstrip("/")
+        if request.method == "POST":
+            record = dict(body, id=self._new_id())
+            self.records[record["id"]] = record
+            return self._ok(record)
+        if request.method == "PUT":
+            self.records[record_id] = dict(body, id=record_id)
+            return self._ok(self.records[record_id])
+        del self.records[record_id]
+        return self._ok({"id": record_id})
+
+
+@pytest.fixture
+def dns_manager(monkeypatch):
+    """A UnifiedDNSManager whose Cloudflare calls reach a _CloudflareHTTP (set manager.cloudflare)"""
+    import unified_dns_manager
+
+    class Transport:
+        @asynccontextmanager
+        async def session(self):
+            async with httpx.AsyncClient(transport=httpx.MockTransport(manager.cloudflare.handle)) as client:
+                yield client
+
+    monkeypatch.setenv("CLOUDFLARE_API_TOKEN", "test-token-0123456789")
+    monkeypatch.setattr(unified_dns_manager, "cloudflare_transport", Transport())
+    manager = UnifiedDNSManager()
+    return manager
+
+
+REMOTE = [
+    {"id": "a1", "type": "A", "name": "example.com", "content": "203.0.113.1", "ttl": 300},
+    {"id": "c1", "type": "CNAME", "name": "www.example.com", "content": "example.com.", "ttl": 300},
+    {"id": "t1", "type": "TXT", "name": "example.com", "content": '"v=spf1 -all"', "ttl": 300},
+    {"id": "m1", "type": "MX", "name": "example.com", "content": "mx1.example.com", "ttl": 300, "priority": 10},
+]
+
+
+def _local():
+    return [
+        DNSRecord(None, "example.com", "A", "203.0.113.1", 300),
+        DNSRecord(None, "www.example.com", "CNAME", "EXAMPLE.com", 300),
+        DNSRecord(None, "example.com", "TXT", "v=spf1 -all", 300),
+        DNSRecord(None, "example.com", "MX", "mx1.example.com", 300, priority=10),
+    ]
+
+
+def _sync(layer, records, **kwargs):
+    return asyncio.run(layer.sync_domain_records(1, records, **kwargs))
+
+
+def test_record_key_normalizes_content():
+    assert record_key("cname", "WWW.example.com.", "Example.com.") == record_key("CNAME", "www.example.com", "example.com")
+    assert record_key("TXT", "x", '"v=spf1 -all"') == record_key("TXT", "x", "v=spf1 -all")
+    assert record_key("AAAA", "x", "2001:DB8:0:0::1") == record_key("AAAA", "x", "2001:db8::1")
+
+
+def test_matching_zone_plans_nothing():
+    api = _FakeCloudflare(REMOTE)
+    result = _sync(CloudflareSyncLayer(api), _local())
+    assert result.success and result.operations == []
+    assert result.details["unchanged"] == 4
+    assert api.calls == 0
+
+
+def test_full_three_way_diff():
+    api = _FakeCloudflare(REMOTE)
+    layer = CloudflareSyncLayer(api)
+    _sync(layer, _local())
+
+    local = _local()
+    local[0].content = "203.0.113.2"            # A record repointed: delete old + create new
+    local[3].ttl = 3600                          # MX ttl change: update in place
+    del local[2]                                 # TXT removed locally: delete
+    local.append(DNSRecord(None, "api.example.com", "A", "203.0.113.9", 300))
+    result = _sync(layer, local)
+
+    actions = sorted((op.action, op.name, op.type) for op in result.operations)
+    assert actions == [
+        ("create", "api.example.com", "A"),
+        ("create", "example.com", "A"),
+        ("delete", "example.com", "A"),
+        ("delete", "example.com", "TXT"),
+        ("update", "example.com", "MX"),
+    ]
+    assert all(op.success for op in result.operations)
+    assert local[-1].cloudflare_id in api.records
+    assert sorted((r["type"], r["content"]) for r in api.records.values()) == [
+        ("A", "203.0.113.2"), ("A", "203.0.113.9"), ("CNAME", "example.com."), ("MX", "mx1.example.com"),
+    ]
+    # Applied state is the new base: nothing left to do
+    assert _sync(layer, local).operations == []
+
+
+def test_content_edit_with_cloudflare_id_is_an_update():
+    api = _FakeCloudflare(REMOTE)
+    layer = CloudflareSyncLayer(api)
+    local = _local()
+    local[0].cloudflare_id = "a1"
+    local[0].content = "203.0.113.50"
+    result = _sync(layer, local)
+    assert [(op.action, op.remote["id"]) for op in result.operations] == [("update", "a1")]
+
+
+def test_remote_drift_is_reported_and_unmanaged_records_kept():
+    api = _FakeCloudflare(REMOTE)
+    layer = CloudflareSyncLayer(api)
+    _sync(layer, _local())
+
+    api.records["m1"]["ttl"] = 60                                        # edited in the dashboard
+    del api.records["c1"]                                                # deleted in the dashboard
+    api.records["x1"] = {"id": "x1", "type": "A", "name": "dash.example.com", "content": "198.51.100.1", "ttl": 1}
+    result = _sync(layer, _local())
+
+    changes = sorted((d["type"], d["change"]) for d in result.details["drift"])
+    assert changes == [("A", "added on Cloudflare"), ("CNAME", "deleted on Cloudflare"), ("MX", "modified on Cloudflare")]
+    assert sorted(op.action for op in result.operations) == ["create", "update"]
+    assert "x1" in api.records
+
+    result = _sync(layer, _local(), prune=True)
+    assert [(op.action, op.remote["id"]) for op in result.operations] == [("delete", "x1")]
+    assert "x1" not in api.records
+
+
+def test_dns_manager_is_wrapped():
+    manager = UnifiedDNSManager()
+    assert isinstance(CloudflareSyncLayer(manager).cloudflare_api, DNSManagerClient)
+
+
+def test_batch_endpoint_used_with_dns_manager(dns_manager):
+    dns_manager.cloudflare = _CloudflareHTTP([])
+    layer = CloudflareSyncLayer(dns_manager, batch_size=200)
+    local = [DNSRecord(None, f"h{i}.example.com", "A", f"10.0.{i // 256}.{i % 256}", 300) for i in range(450)]
+    result = _sync(layer, local)
+    assert result.records_synced == 450
+    assert [r for r in dns_manager.cloudflare.requests if r[1] == "/batch"] == [("POST", "/batch")] * 3
+    assert {r.cloudflare_id for r in local} == set(dns_manager.cloudflare.records)
+
+
+def test_repeated_syncs_through_dns_manager_converge(dns_manager):
+    dns_manager.cloudflare = _CloudflareHTTP([])
+    layer = CloudflareSyncLayer(dns_manager)
+    record = DNSRecord(None, "example.com", "A", "203.0.113.1", 300)
+    _sync(layer, [record])
+    result = _sync(layer, [record])
+    assert result.success and result.operations == []
+    assert len(dns_manager.cloudflare.records) == 1
+
+
+def test_dns_manager_deletes_and_updates(dns_manager):
+    dns_manager.cloudflare = _CloudflareHTTP(REMOTE)
+    layer = CloudflareSyncLayer(dns_manager)
+    _sync(layer, _local())
+    dns_manager.cloudflare.requests.clear()
+
+    local = _local()
+    local[0].content = "203.0.113.2"
+    local[3].ttl = 3600
+    result = _sync(layer, local)
+
+    assert result.success
+    assert ("PUT", "/m1") in dns_manager.cloudflare.requests
+    records = dns_manager.cloudflare.records
+    assert "a1" not in records and records["m1"]["ttl"] == 3600
+    assert records[local[0].cloudflare_id]["content"] == "203.0.113.2"
+
+
+def test_failed_batch_marks_its_operations_failed(dns_manager):
+    dns_manager.cloudflare = _CloudflareHTTP([], fail_batch_with="Record already exists")
+    layer = CloudflareSyncLayer(dns_manager)
+    result = _sync(layer, _local()[:2])
+    assert not result.success
+    assert [op.success for op in result.operations] == [False, False]
+    assert all("Record already exists" in error for error in result.errors)
+    assert layer._synced_state["mock_zone_id"] == {}
+
+
+def test_failed_listing_plans_nothing():
+    api = _FakeCloudflare(REMOTE)
+
+    async def failing_list(zone_id):
+        return {"success": False, "errors": [{"code": 10000, "message": "Authentication error"}]}
+    api.list_dns_records = failing_list
+
+    result = _sync(CloudflareSyncLayer(api), _local())
+    assert not result.success and result.operations == []
+    assert api.calls == 0
+
+
+def test_rate_limited_calls_are_retried():
+    api = _FakeCloudflare([], rate_limit_first=2)
+    layer = CloudflareSyncLayer(api, rate_limiter=RateLimiter(rate=1000, burst=100))
+    result = _sync(layer, [DNSRecord(None, "example.com", "A", "203.0.113.1", 300)])
+    assert result.success and layer.rate_limited == 2
+
+
+def test_failed_delete_stays_managed_for_retry():
+    api = _FakeCloudflare(REMOTE)
+    layer = CloudflareSyncLayer(api)
+    _sync(layer, _local())
+
+    async def failing_delete(zone_id, record_id):
+        return {"success": False, "errors": [{"code": 1000, "message": "boom"}]}
+    api.delete_dns_record = failing_delete
+
+    result = _sync(layer, _local()[:3])
+    assert not result.success
+    assert [(op.action, op.success) for op in result.operations] == [("delete", False)]
+    assert "boom" in result.errors[0]
+    # Still in the base, so the next sync plans the delete again
+    assert [op.action for op in _sync(layer, _local()[:3]).operations] == ["delete"]
+
+
+def test_full_sync_without_local_records_deletes_nothing():
+    api = _FakeCloudflare(REMOTE)
+    layer = CloudflareSyncLayer(api)
+    _sync(layer, _local())
+
+    asyncio.run(layer._full_domain_sync(1))
+    assert api.calls == 0
+    assert set(api.records) == {"a1", "c1", "t1", "m1"}
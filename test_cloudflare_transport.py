@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Test the shared Cloudflare transport: connection reuse, stats and lifecycle
+"""
+
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("httpx")
+
+from cloudflare_transport import CloudflareTransport
+
+
+class _StubCloudflare(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_GET(self):
+        body = json.dumps({"success": True, "result": [{"id": "zone-1"}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubCloudflare)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_sequential_calls_reuse_one_connection(stub_url):
+    transport = CloudflareTransport(http2=False)
+
+    async def run():
+        await transport.start()
+        for _ in range(10):
+            async with transport.session() as client:
+                response = await client.get(f"{stub_url}/zones")
+                assert response.json()["result"][0]["id"] == "zone-1"
+        stats = transport.stats()
+        await transport.aclose()
+        return stats
+
+    stats = asyncio.run(run())
+    assert stats["requests"] == 10
+    assert stats["connections_opened"] == 1
+    assert stats["reuse_ratio"] == 0.9
+    assert stats["in_flight"] == 0
+
+
+def test_concurrency_bounded_by_pool(stub_url):
+    transport = CloudflareTransport(max_connections=4, max_keepalive=4, http2=False)
+
+    async def run():
+        async def call():
+            async with transport.session() as client:
+                await client.get(f"{stub_url}/zones")
+
+        await asyncio.gather(*[call() for _ in range(20)])
+        await transport.aclose()
+
+    asyncio.run(run())
+    stats = transport.stats()
+    assert stats["requests"] == 20
+    assert stats["connections_opened"] <= 4
+    assert stats["clients"] == 0
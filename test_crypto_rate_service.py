@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Test the crypto rate service: one multi-symbol fetch, cached reads,
+staleness bounds and rate age
+"""
+
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("requests")
+
+from services.crypto_rate_service import SUPPORTED_SYMBOLS, CryptoRateService, RateQuote
+
+
+class RecordingFastForex:
+    """FastForexAPI stand-in that records /fetch-multi calls"""
+
+    def __init__(self, rates=None):
+        self.calls = []
+        self.rates = rates if rates is not None else {
+            "BTC": 1 / 60000, "ETH": 1 / 3000, "LTC": 1 / 80,
+            "DOGE": 1 / 0.2, "USDT": 1.0, "TRX": 1 / 0.1,
+        }
+
+    def fetch_multi(self, symbols, base="USD"):
+        self.calls.append(tuple(symbols))
+        return dict(self.rates) if self.rates else None
+
+
+def test_one_request_serves_all_symbols():
+    api = RecordingFastForex()
+    service = CryptoRateService(api=api, refresh_interval=3600)
+    service._thread = object()  # no timer thread in tests
+    service.refresh()
+
+    assert service.usd_to_crypto(60, "btc") == pytest.approx(0.001)
+    assert service.crypto_to_usd(2, "eth") == pytest.approx(6000)
+    assert service.usd_to_crypto(10, "usdt_trc20") == pytest.approx(10)
+    for _ in range(1000):
+        service.get_quote("doge")
+
+    assert api.calls == [SUPPORTED_SYMBOLS]
+    assert service.rate_age("btc") < 1
+
+
+def test_stale_rates_refresh_and_failures_return_none():
+    api = RecordingFastForex()
+    service = CryptoRateService(api=api, refresh_interval=3600, max_age=60, retry_interval=0)
+    service._thread = object()
+    service.refresh()
+
+    # Age the table past max_age: the read falls back and wakes the timer
+    service._quotes = {s: RateQuote(q.symbol, q.crypto_per_usd, time.time() - 120)
+                       for s, q in service._quotes.items()}
+    assert service.get_quote("ltc") is None
+    assert service._wake.is_set()
+    assert len(api.calls) == 1  # nothing fetched on the reader's thread
+
+    service.refresh()  # what the woken timer thread runs
+    assert service.get_quote("ltc").age < 1
+    assert len(api.calls) == 2
+
+    api.rates = None
+    service._quotes = {}
+    service.refresh()
+    assert service.usd_to_crypto(10, "btc") is None
+    assert service.stats()["failures"] == 1
+
+
+def test_reads_do_not_wait_for_a_slow_refresh():
+    gate = threading.Event()
+
+    class SlowFastForex(RecordingFastForex):
+        def fetch_multi(self, symbols, base="USD"):
+            gate.wait(5)
+            return super().fetch_multi(symbols, base)
+
+    service = CryptoRateService(api=SlowFastForex(), refresh_interval=3600)
+    service.start()
+    try:
+        started = time.monotonic()
+        assert service.get_quote("btc") is None
+        assert time.monotonic() - started < 0.5
+        gate.set()
+        deadline = time.monotonic() + 5
+        while service.get_quote("btc") is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert service.get_quote("btc") is not None
+    finally:
+        gate.set()
+        service.stop()
+
+
+def test_unsupported_symbol_does_not_fetch():
+    api = RecordingFastForex()
+    service = CryptoRateService(api=api)
+    service._thread = object()
+    assert service.get_quote("XMR") is None
+    assert api.calls == []
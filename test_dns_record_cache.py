@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Test the per-zone DNS record cache: write-through, versions and refresh guards
+"""
+
+import asyncio
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from fast_response_cache import DNSRecordCache
+
+
+def _records(n):
+    return [{"id": f"r{i}", "type": "A", "name": f"h{i}.example.com", "content": "192.0.2.1"} for i in range(n)]
+
+
+def test_write_through_updates_cached_zone():
+    cache = DNSRecordCache()
+    cache.store("zone", _records(3))
+    v1 = cache.version("zone")
+
+    cache.upsert("zone", {"id": "r3", "type": "TXT", "name": "example.com", "content": "hello"})
+    cache.upsert("zone", {"id": "r0", "type": "A", "name": "h0.example.com", "content": "198.51.100.7"})
+    cache.remove("zone", "r1")
+
+    records = cache.get("zone")
+    assert [r["id"] for r in records] == ["r0", "r2", "r3"]
+    assert records[0]["content"] == "198.51.100.7"
+    assert cache.changed_since("zone", v1)
+    assert cache.version("zone") > v1
+
+
+def test_unchanged_listing_keeps_version():
+    cache = DNSRecordCache()
+    cache.store("zone", _records(5))
+    version = cache.version("zone")
+    cache.store("zone", _records(5))
+    assert not cache.changed_since("zone", version)
+    cache.store("zone", _records(6))
+    assert cache.changed_since("zone", version)
+
+
+def test_stale_listing_does_not_overwrite_write():
+    cache = DNSRecordCache()
+    cache.store("zone", _records(2))
+    started_at = cache.version("zone")
+    cache.upsert("zone", {"id": "new", "type": "A", "name": "new.example.com", "content": "192.0.2.9"})
+    assert cache.store("zone", _records(2), if_version=started_at) is False
+    assert "new" in [r["id"] for r in cache.get("zone")]
+
+
+def test_versions_never_reused_after_invalidate():
+    cache = DNSRecordCache()
+    cache.store("zone", _records(1))
+    version = cache.version("zone")
+    cache.invalidate("zone")
+    assert cache.get("zone") is None
+    cache.store("zone", _records(1))
+    assert cache.version("zone") > version
+
+
+def test_expiry_and_refresh_claim():
+    cache = DNSRecordCache(refresh_after=0, max_age=3600)
+    cache.store("zone", _records(1))
+    assert cache.needs_refresh("zone")
+    assert cache.begin_refresh("zone") is True
+    assert cache.begin_refresh("zone") is False
+    cache.end_refresh("zone")
+    assert DNSRecordCache(max_age=0).get("zone") is None
+
+
+class _StubCloudflare(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    records = {}
+    list_calls = 0
+
+    def _send(self, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        type(self).list_calls += 1
+        page = int(re.search(r"page=(\d+)", self.path).group(1))
+        per_page = int(re.search(r"per_page=(\d+)", self.path).group(1))
+        items = list(self.records.values())
+        total_pages = max(1, -(-len(items) // per_page))
+        self._send({"success": True, "result": items[(page - 1) * per_page:page * per_page],
+                    "result_info": {"page": page, "total_pages": total_pages}})
+
+    def do_POST(self):
+        record = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        record["id"] = f"r{len(self.records)}"
+        self.records[record["id"]] = record
+        self._send({"success": True, "result": record})
+
+    def do_DELETE(self):
+        record_id = self.path.rsplit("/", 1)[-1]
+        self.records.pop(record_id, None)
+        self._send({"success": True, "result": {"id": record_id}})
+
+    def log_message(self, *args):
+        pass
+
+
+def test_manager_reads_from_cache_after_first_listing(monkeypatch):
+    pytest.importorskip("httpx")
+    import unified_dns_manager
+
+    monkeypatch.setattr(unified_dns_manager, "DNS_RECORDS_PAGE_SIZE", 100)
+    monkeypatch.setenv("CLOUDFLARE_API_TOKEN", "test-token-0123456789")
+    monkeypatch.delenv("CLOUDFLARE_GLOBAL_API_KEY", raising=False)
+    _StubCloudflare.records = {f"r{i}": {"id": f"r{i}", "type": "A", "name": f"h{i}.example.com",
+                                         "content": "192.0.2.1", "ttl": 300} for i in range(250)}
+    _StubCloudflare.list_calls = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubCloudflare)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    manager = unified_dns_manager.UnifiedDNSManager()
+    manager.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    zone_id = "zone-under-test"
+    unified_dns_manager.dns_record_cache.invalidate(zone_id)
+
+    async def run():
+        first = await manager.list_dns_records(zone_id)
+        pages = _StubCloudflare.list_calls
+        ok, record_id, _ = await manager.create_dns_record(zone_id, "TXT", "example.com", "v=spf1 -all")
+        await manager.delete_dns_record(zone_id, "r0")
+        second = await manager.list_dns_records(zone_id)
+        return first, pages, record_id, second
+
+    try:
+        first, pages, record_id, second = asyncio.run(run())
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert len(first) == 250 and pages == 3
+    assert _StubCloudflare.list_calls == 3  # second listing came from the cache
+    ids = [r["id"] for r in second]
+    assert record_id in ids and "r0" not in ids and len(second) == 250
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Test that domain search checks its alternative TLDs in one batched registry call
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("psycopg2")
+
+import domain_service
+
+
+class FakeOpenProvider:
+    def __init__(self):
+        self.batches = []
+
+    def check_domain_availability(self, domain):
+        return {"available": True, "price": 0}
+
+    def check_domains_availability(self, domains):
+        self.batches.append(list(domains))
+        return {domain: {"available": domain.endswith(".net"), "price": 20.0} for domain in domains}
+
+
+def test_alternatives_use_the_batch_endpoint(monkeypatch):
+    openprovider = FakeOpenProvider()
+    monkeypatch.setattr(domain_service, "get_db_manager", lambda: None)
+    monkeypatch.setattr(domain_service, "get_identity_generator", lambda: None)
+    monkeypatch.setattr(
+        domain_service, "get_api_manager", lambda: SimpleNamespace(openprovider=openprovider)
+    )
+
+    result = asyncio.run(domain_service.DomainService().search_domain_availability("nomadly.sbs"))
+
+    assert result["success"]
+    assert openprovider.batches == [["nomadly.com", "nomadly.net", "nomadly.org"]]
+    alternatives = {r["domain"]: r for r in result["results"] if not r["requested"]}
+    assert alternatives["nomadly.net"]["available"] is True
+    assert alternatives["nomadly.com"]["available"] is False
+    assert alternatives["nomadly.org"]["price"] == 20.0
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Test the geo policy compiler: canonical expressions, content hashes and skipped no-op applies
+"""
+
+import asyncio
+
+import pytest
+
+from app.core.geo_policy import (
+    GEO_RULE_REF, GeoPolicyApplier, GeoPolicyError, GeoRuleCache, compile_geo_policy, compile_rule_config,
+)
+
+
+class _FakeRulesets:
+    """The custom-rules entrypoint of each zone behind the applier's request callable"""
+
+    def __init__(self, entrypoints=None):
+        self.entrypoints = entrypoints or {}
+        self.calls = []
+        self.next_id = 0
+
+    def _id(self):
+        self.next_id += 1
+        return f"id{self.next_id}"
+
+    async def request(self, method, zone_id, path, payload=None):
+        self.calls.append((method, path))
+        ruleset = self.entrypoints.get(zone_id)
+        if method == "GET":
+            if ruleset is None:
+                return 404, {"success": False, "errors": [{"code": 10003, "message": "not found"}]}
+            return 200, {"success": True, "result": ruleset}
+        if method == "PUT":
+            ruleset = {"id": self._id(), "rules": [dict(rule, id=self._id()) for rule in payload["rules"]]}
+            self.entrypoints[zone_id] = ruleset
+        elif method == "POST":
+            ruleset["rules"].append(dict(payload, id=self._id()))
+        else:
+            rule_id = path.rsplit("/", 1)[1]
+            matching = [rule for rule in ruleset["rules"] if rule["id"] == rule_id]
+            if not matching:
+                return 404, {"success": False, "errors": [{"code": 10003, "message": "rule not found"}]}
+            ruleset["rules"].remove(matching[0])
+            if method == "PATCH":
+                ruleset["rules"].append(dict(payload, id=rule_id))
+        return 200, {"success": True, "result": ruleset}
+
+
+def _apply(applier, zone_id, rule):
+    return asyncio.run(applier.apply(zone_id, rule))
+
+
+def test_same_policy_compiles_to_one_expression():
+    toggled = compile_geo_policy("block", ["ru", "CN", "ru", " kp "])
+    sorted_once = compile_geo_policy("block", ["CN", "KP", "RU"])
+    assert toggled == sorted_once
+    assert toggled.expression == '(ip.src.country in {"CN" "KP" "RU"})'
+
+    allow = compile_geo_policy("allow_only", ["US", "CA"])
+    assert allow.expression == 'not (ip.src.country in {"CA" "US"})'
+    # The bot's "block except" mode is the same policy
+    assert compile_geo_policy("block_except", ["CA", "US"]).digest == allow.digest
+    assert allow.digest != compile_geo_policy("allow_only", ["US"]).digest
+
+
+def test_policies_that_restrict_nothing_compile_to_no_rule():
+    assert compile_geo_policy("allow_all", ["US"]) is None
+    assert compile_geo_policy("block", []) is None
+    with pytest.raises(GeoPolicyError):
+        compile_geo_policy("allow_only", [])
+    with pytest.raises(GeoPolicyError):
+        compile_geo_policy("block", ["USA"])
+    with pytest.raises(GeoPolicyError):
+        compile_geo_policy("block", continents=["XX"])
+
+
+def test_advanced_config_combines_conditions():
+    rule = compile_rule_config({"block_countries": ["RU"], "block_continents": ["as"], "block_asn": ["AS16509", 13335]})
+    assert rule.expression == (
+        '(ip.src.country in {"RU"}) or (ip.geoip.continent in {"AS"}) or (ip.geoip.asnum in {13335 16509})'
+    )
+    mixed = compile_rule_config({"block_countries": ["RU"], "allow_countries": ["US"]})
+    assert mixed.expression == '(ip.src.country in {"RU"}) or not (ip.src.country in {"US"})'
+    assert compile_rule_config({}) is None
+
+
+def test_unchanged_policy_skips_the_api():
+    api = _FakeRulesets()
+    applier = GeoPolicyApplier(api.request, GeoRuleCache())
+
+    result = _apply(applier, "z1", compile_geo_policy("block", ["CN", "RU"]))
+    assert result == {"success": True, "change": "created", "error": None}
+    assert api.calls == [("GET", "/rulesets/phases/http_request_firewall_custom/entrypoint"),
+                         ("PUT", "/rulesets/phases/http_request_firewall_custom/entrypoint")]
+
+    api.calls.clear()
+    for _ in range(20):
+        assert _apply(applier, "z1", compile_geo_policy("block", ["RU", "CN"]))["change"] == "unchanged"
+    assert api.calls == []
+
+    assert _apply(applier, "z1", compile_geo_policy("block", ["CN", "RU", "KP"]))["change"] == "updated"
+    assert _apply(applier, "z1", None)["change"] == "deleted"
+    assert _apply(applier, "z1", None)["change"] == "unchanged"
+    assert [method for method, _ in api.calls] == ["PATCH", "DELETE"]
+    assert api.entrypoints["z1"]["rules"] == []
+
+
+def test_existing_rule_is_found_by_ref_and_others_kept():
+    rule = compile_geo_policy("allow_only", ["US"])
+    other = {"id": "waf1", "expression": "http.request.uri.path eq \"/admin\"", "action": "block"}
+    live = dict(rule.as_rule(), id="geo1")
+    api = _FakeRulesets({"z1": {"id": "rs1", "rules": [other, live]}})
+    applier = GeoPolicyApplier(api.request, GeoRuleCache())
+
+    # Restarted process: one lookup shows the rule is already live
+    assert _apply(applier, "z1", rule)["change"] == "unchanged"
+    assert api.calls == [("GET", "/rulesets/phases/http_request_firewall_custom/entrypoint")]
+
+    assert _apply(applier, "z1", compile_geo_policy("allow_only", ["US", "GB"]))["change"] == "updated"
+    assert api.calls[-1] == ("PATCH", "/rulesets/rs1/rules/geo1")
+    assert other in api.entrypoints["z1"]["rules"]
+    assert [r["ref"] for r in api.entrypoints["z1"]["rules"] if r.get("ref")] == [GEO_RULE_REF]
+
+
+def test_rule_deleted_in_dashboard_is_located_again():
+    api = _FakeRulesets({"z1": {"id": "rs1", "rules": []}})
+    applier = GeoPolicyApplier(api.request, GeoRuleCache())
+    assert _apply(applier, "z1", compile_geo_policy("block", ["CN"]))["change"] == "created"
+    api.entrypoints["z1"]["rules"].clear()
+
+    failed = _apply(applier, "z1", compile_geo_policy("block", ["RU"]))
+    assert not failed["success"] and failed["error"] == "rule not found"
+    assert _apply(applier, "z1", compile_geo_policy("block", ["RU"]))["change"] == "created"
+    assert [method for method, _ in api.calls] == ["GET", "POST", "PATCH", "GET", "POST"]
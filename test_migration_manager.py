@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Test rollback extraction: only commented statements in a ROLLBACK block are run back
+"""
+
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("psycopg2")
+
+from utils.migration_manager import MigrationManager
+
+MIGRATION = """
+CREATE INDEX idx_a ON t (a);
+
+-- ROLLBACK
+-- Drop the index before the column; the column is only dropped
+-- once nothing reads it.
+-- DROP INDEX IF EXISTS idx_a;
+-- ALTER TABLE t
+--     DROP COLUMN a;
+-- DO $$
+-- BEGIN
+--     EXECUTE 'DROP TABLE IF EXISTS t_shadow';
+-- END
+-- $$;
+-- END ROLLBACK
+"""
+
+
+def test_prose_in_rollback_block_is_not_sql():
+    assert MigrationManager._extract_rollback_sql(MIGRATION).split("\n") == [
+        "DROP INDEX IF EXISTS idx_a;",
+        "ALTER TABLE t",
+        "DROP COLUMN a;",
+        "DO $$",
+        "BEGIN",
+        "EXECUTE 'DROP TABLE IF EXISTS t_shadow';",
+        "END",
+        "$$;",
+    ]
+
+
+def test_every_shipped_rollback_is_statements_only():
+    for migration in sorted((Path(__file__).parent / "database_migrations").glob("*.sql")):
+        rollback = MigrationManager._extract_rollback_sql(migration.read_text())
+        assert rollback, migration.name
+        assert all(line.endswith(";") for line in rollback.split("\n")), migration.name
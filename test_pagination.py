@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Test keyset pagination: compact cursors and next/prev page walking
+"""
+
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.pagination import NEXT, PREV, Keyset, PaginationError, decode_cursor, encode_cursor
+
+
+class _Column:
+    def __init__(self, key):
+        self.key = key
+
+
+CREATED, ID = _Column("created_at"), _Column("id")
+START = datetime(2026, 10, 16, 12, 0, 0, 123456)
+
+
+def _rows(count, same_timestamp_every=4):
+    # Every few rows share a timestamp, so the id tiebreak matters
+    return [SimpleNamespace(id=i, created_at=START + timedelta(seconds=i // same_timestamp_every))
+            for i in range(count, 0, -1)]
+
+
+def _order(created_at, row_id):
+    # NULL sorts above every timestamp, as in PostgreSQL
+    return (created_at is None, created_at or datetime.min, row_id)
+
+
+def _fetch(rows, keyset):
+    """What Keyset.apply asks the database for, evaluated in Python"""
+    key = lambda row: _order(row.created_at, row.id)
+    ordered = sorted(rows, key=key, reverse=keyset.direction == NEXT)
+    if keyset.key is not None:
+        boundary = _order(*keyset.key)
+        if keyset.direction == NEXT:
+            ordered = [row for row in ordered if key(row) < boundary]
+        else:
+            ordered = [row for row in ordered if key(row) > boundary]
+    return ordered[:keyset.limit + 1]
+
+
+def _page(rows, limit=10, cursor=None):
+    keyset = Keyset(CREATED, ID, limit, cursor)
+    return keyset.page(_fetch(rows, keyset))
+
+
+def test_cursor_round_trip_fits_callback_data():
+    cursor = encode_cursor(NEXT, (START, 123456))
+    assert decode_cursor(cursor) == (NEXT, (START, 123456))
+    assert len("domains_page_" + cursor) <= 64
+    assert decode_cursor(encode_cursor(PREV, (START, -5))) == (PREV, (START, -5))
+    assert decode_cursor(encode_cursor(NEXT, (None, 42))) == (NEXT, (None, 42))
+
+    for bad in ("", "x12.3", "ntzz.1", "n"):
+        with pytest.raises(PaginationError):
+            decode_cursor(bad)
+    with pytest.raises(PaginationError):
+        Keyset(CREATED, ID, cursor=encode_cursor(NEXT, (1, 2, 3)))
+
+
+def test_walk_forward_and_back():
+    rows = _rows(25)
+    first = _page(rows)
+    assert [r.id for r in first.items] == list(range(25, 15, -1))
+    assert first.has_next and not first.has_prev
+
+    second = _page(rows, cursor=first.next_cursor)
+    third = _page(rows, cursor=second.next_cursor)
+    assert [r.id for r in second.items] == list(range(15, 5, -1))
+    assert [r.id for r in third.items] == [5, 4, 3, 2, 1]
+    assert third.has_prev and not third.has_next
+
+    back = _page(rows, cursor=third.prev_cursor)
+    assert [r.id for r in back.items] == [r.id for r in second.items]
+    first_again = _page(rows, cursor=back.prev_cursor)
+    assert [r.id for r in first_again.items] == [r.id for r in first.items]
+    assert not first_again.has_prev and first_again.has_next
+
+
+def test_rows_inserted_between_pages_do_not_shift_the_next_page():
+    rows = _rows(30)
+    first = _page(rows)
+    rows.insert(0, SimpleNamespace(id=99, created_at=START + timedelta(seconds=60)))
+    second = _page(rows, cursor=first.next_cursor)
+    assert [r.id for r in second.items] == list(range(20, 10, -1))
+
+
+def test_single_page_and_limits():
+    page = _page(_rows(3))
+    assert [r.id for r in page.items] == [3, 2, 1]
+    assert not page.has_next and not page.has_prev
+    assert _page([]).items == []
+    assert Keyset(CREATED, ID, limit=10_000).limit == 100
+    assert Keyset(CREATED, ID, limit=0).limit == 1
+
+
+
+def test_rows_without_a_timestamp_stay_reachable():
+    rows = _rows(12) + [SimpleNamespace(id=i, created_at=None) for i in (40, 41, 42)]
+    seen, cursor = [], None
+    while True:
+        page = _page(rows, limit=4, cursor=cursor)
+        seen += [r.id for r in page.items]
+        if not page.has_next:
+            break
+        cursor = page.next_cursor
+    assert seen == [42, 41, 40] + list(range(12, 0, -1))
+
+    second = _page(rows, limit=4, cursor=_page(rows, limit=4).next_cursor)
+    back = _page(rows, limit=4, cursor=second.prev_cursor)
+    assert [r.id for r in back.items] == [42, 41, 40, 12] and not back.has_prev
+
+
+def test_null_cursor_filters_compile():
+    sqlalchemy = pytest.importorskip("sqlalchemy")
+    table = sqlalchemy.table("orders", sqlalchemy.column("created_at"), sqlalchemy.column("id"))
+    for direction in (NEXT, PREV):
+        keyset = Keyset(table.c.created_at, table.c.id, cursor=encode_cursor(direction, (None, 7)))
+        sql = str(keyset.apply(sqlalchemy.select(table)))
+        assert "created_at IS NULL" in sql and "NULLS" in sql
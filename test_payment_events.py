@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Test event-driven payment confirmation: webhook threads publish, the monitor
+reacts without waiting for its reconciliation sweep
+"""
+
+import asyncio
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+from payment_events import PaymentEventBus, payment_event_bus, publish_payment_event
+
+
+def test_publish_from_thread_reaches_subscriber():
+    bus = PaymentEventBus()
+
+    async def run():
+        queue = bus.subscribe()
+        threading.Thread(target=bus.deliver, args=({"order_id": "ORD-1"},)).start()
+        return await asyncio.wait_for(queue.get(), timeout=1)
+
+    assert asyncio.run(run()) == {"order_id": "ORD-1"}
+
+
+def test_monitor_checks_address_on_event(monkeypatch):
+    pytest.importorskip("httpx")
+    from background_payment_monitor import PaymentMonitor
+
+    monitor = PaymentMonitor()
+    monitor.active_payments = {
+        "0xabc": {"user_id": 1, "domain": "x.com", "crypto_type": "eth",
+                  "order_number": "ORD-9", "created_at": datetime.utcnow().isoformat()},
+        "0xdef": {"user_id": 2, "domain": "y.com", "crypto_type": "eth",
+                  "order_number": "ORD-10", "created_at": datetime.utcnow().isoformat()},
+    }
+    checked = []
+
+    async def check(addresses=None):
+        checked.append((time.monotonic(), addresses))
+
+    monkeypatch.setattr(monitor, "check_pending_payments", check)
+    monkeypatch.delenv("DATABASE_URL", raising=False)
+
+    async def run():
+        queue = payment_event_bus.subscribe()
+        consumer = asyncio.create_task(monitor.consume_payment_events(queue))
+        await asyncio.sleep(0)
+        published = time.monotonic()
+        await asyncio.get_running_loop().run_in_executor(None, lambda: publish_payment_event(order_id="ORD-9"))
+        for _ in range(100):
+            if checked:
+                break
+            await asyncio.sleep(0.005)
+        consumer.cancel()
+        payment_event_bus.unsubscribe(queue)
+        return published
+
+    published = asyncio.run(run())
+    assert checked and checked[0][1] == ["0xabc"]
+    assert checked[0][0] - published < 0.5
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Test the batched payment monitor cycle: one lookup per cycle, one batched
+status update, and bounded concurrent confirmation processing
+"""
+
+import asyncio
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("httpx")
+
+from background_payment_monitor import PaymentMonitor
+
+
+def _monitor(addresses):
+    monitor = PaymentMonitor()
+    monitor.max_concurrent_confirmations = 3
+    now = datetime.utcnow().isoformat()
+    monitor.active_payments = {
+        address: {"user_id": 1, "domain": "x.com", "crypto_type": "eth", "created_at": now}
+        for address in addresses
+    }
+    return monitor
+
+
+def test_single_lookup_and_bounded_dispatch(monkeypatch):
+    addresses = [f"0xaddr{i}" for i in range(20)]
+    monitor = _monitor(addresses)
+    lookups, marked = [], []
+    running = {"now": 0, "peak": 0}
+
+    def fetch(batch):
+        lookups.append(list(batch))
+        return {address: f"{address}.com" for address in batch[:12]}
+
+    async def process(address, payment_info, payment_data):
+        running["now"] += 1
+        running["peak"] = max(running["peak"], running["now"])
+        await asyncio.sleep(0.01)
+        running["now"] -= 1
+
+    monkeypatch.setattr(monitor, "_fetch_confirmed_orders", fetch)
+    monkeypatch.setattr(monitor, "_mark_orders_processed", lambda batch: marked.append(sorted(batch)))
+    monkeypatch.setattr(monitor, "_load_confirmations", lambda: {})
+    monkeypatch.setattr(monitor, "process_payment_confirmation", process)
+
+    asyncio.run(monitor.check_pending_payments())
+
+    assert len(lookups) == 1 and sorted(lookups[0]) == sorted(addresses)
+    assert marked == [sorted(addresses[:12])]
+    assert running["peak"] == 3
+    assert sorted(monitor.active_payments) == sorted(addresses[12:])
+
+
+def test_confirmations_file_read_once(monkeypatch, tmp_path):
+    monitor = _monitor(["0xa", "0xb", "0xc"])
+    reads, processed = [], []
+
+    def load():
+        reads.append(1)
+        return {"0xa": {"amount_eth": 0.01, "txid": "t1"}, "0xc": {"amount_eth": 0.02, "txid": "t2"}}
+
+    async def process(address, payment_info, payment_data):
+        processed.append((address, payment_data["txid"]))
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(monitor, "_fetch_confirmed_orders", lambda batch: {})
+    monkeypatch.setattr(monitor, "_load_confirmations", load)
+    monkeypatch.setattr(monitor, "process_payment_confirmation", process)
+
+    asyncio.run(monitor.check_pending_payments())
+
+    assert reads == [1]
+    assert sorted(processed) == [("0xa", "t1"), ("0xc", "t2")]
+    assert (tmp_path / "payment_confirmations.json").read_text().strip() == "{}"
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Test the propagation watcher: idempotent registration, batched sweeps, backoff, notify and expiry
+"""
+
+import asyncio
+import time
+
+from propagation_watcher import PropagationWatcher, PropagationWatchStore
+
+
+class _FakeChecker:
+    def __init__(self):
+        self.live = set()  # domains whose new nameservers have propagated
+        self.calls = []
+        self.active = 0
+        self.peak = 0
+
+    async def check_nameserver_propagation(self, domain, expected_nameservers=None):
+        self.calls.append(domain)
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+        live = domain in self.live
+        return {"propagated_servers": 5 if live else 1, "checked_servers": 8, "quorum_reached": live}
+
+
+def _watcher(tmp_path, checker, **kwargs):
+    notified = []
+
+    async def notify(watch, result):
+        notified.append((watch.domain, watch.status, result))
+
+    watcher = PropagationWatcher(checker=checker, notify=notify,
+                                 store=PropagationWatchStore(str(tmp_path / "watches.db")), **kwargs)
+    return watcher, notified
+
+
+def test_registering_twice_does_not_add_checks(tmp_path):
+    checker = _FakeChecker()
+    watcher, _ = _watcher(tmp_path, checker)
+    first = watcher.watch("Example.com.", ["NS2.cf.com", "ns1.cf.com"], user_id=1)
+    again = watcher.watch("example.com", ["ns1.cf.com", "ns2.cf.com"], user_id=1)
+    assert again is first
+    assert first.expected == ["ns1.cf.com", "ns2.cf.com"]
+
+    asyncio.run(watcher.sweep())
+    # Pressing "check" between sweeps only reads state
+    for _ in range(10):
+        watcher.watch("example.com", ["ns1.cf.com", "ns2.cf.com"], user_id=1)
+        watcher.get("example.com")
+    asyncio.run(watcher.sweep())
+    assert checker.calls == ["example.com"]
+
+
+def test_sweep_batches_due_watches_and_backs_off(tmp_path):
+    checker = _FakeChecker()
+    watcher, _ = _watcher(tmp_path, checker, base_interval=60, max_interval=600, concurrency=4)
+    for i in range(12):
+        watcher.watch(f"d{i}.com", ["ns1.cf.com"], user_id=1)
+
+    assert asyncio.run(watcher.sweep()) == 12
+    assert 1 < checker.peak <= 4
+
+    watch = watcher.get("d0.com")
+    intervals = []
+    for _ in range(6):
+        before = time.time()
+        asyncio.run(watcher.sweep(now=watch.next_check_at))
+        intervals.append(watch.next_check_at - before)
+    assert intervals[0] > 90 and intervals[1] > 180
+    assert max(intervals) <= 600 * 1.1 + 1
+
+
+def test_quorum_notifies_once_and_removes_watch(tmp_path):
+    checker = _FakeChecker()
+    watcher, notified = _watcher(tmp_path, checker)
+    watcher.watch("live.com", ["ns1.cf.com"], user_id=7, chat_id=70)
+    watcher.watch("slow.com", ["ns1.cf.com"], user_id=7)
+    checker.live.add("live.com")
+
+    asyncio.run(watcher.sweep())
+    assert [(d, s) for d, s, _ in notified] == [("live.com", "propagated")]
+    assert notified[0][2]["quorum_reached"]
+    assert watcher.get("live.com") is None
+    assert [w.domain for w in watcher.for_user(7)] == ["slow.com"]
+    assert watcher.get("slow.com").agreed_servers == 1
+
+
+def test_watch_expires_after_window(tmp_path):
+    checker = _FakeChecker()
+    watcher, notified = _watcher(tmp_path, checker, window=3600)
+    watch = watcher.watch("never.com", ["ns1.cf.com"], user_id=1)
+
+    asyncio.run(watcher.sweep(now=watch.expires_at + 1))
+    assert notified == [("never.com", "expired", None)]
+    assert checker.calls == []
+    assert watcher.stats()["watching"] == 0
+
+
+def test_watches_survive_restart(tmp_path):
+    checker = _FakeChecker()
+    watcher, _ = _watcher(tmp_path, checker)
+    watcher.watch("example.com", ["ns1.cf.com"], user_id=1, chat_id=2)
+    asyncio.run(watcher.sweep())
+
+    restarted, _ = _watcher(tmp_path, checker)
+    watch = restarted.get("example.com")
+    assert watch.chat_id == 2 and watch.attempts == 1
+    assert watch.next_check_at > time.time()
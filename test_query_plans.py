@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Query-plan regression test for the hot-path indexes in database_migrations/
+Seeds a scratch schema at production-like volumes (including one portfolio user
+with tens of thousands of domains and orders), builds the indexes from the
+migration files themselves and checks each hot query's EXPLAIN uses its index.
+Needs a PostgreSQL DATABASE_URL; skipped otherwise.
+"""
+
+import json
+import os
+import uuid
+from pathlib import Path
+
+import pytest
+
+psycopg2 = pytest.importorskip("psycopg2")
+
+from utils.migration_manager import CONCURRENTLY, MigrationManager
+
+DATABASE_URL = os.getenv("DATABASE_URL", "")
+MIGRATIONS = [
+    migration for migration in sorted((Path(__file__).parent / "database_migrations").glob("*.sql"))
+    if CONCURRENTLY.search(migration.read_text())
+]
+PORTFOLIO_USER = 7  # owns every fifth domain and order
+
+USERS = 20_000
+ORDERS = 200_000
+WALLET_TRANSACTIONS = 200_000
+DOMAINS = 100_000
+
+pytestmark = pytest.mark.skipif(
+    not DATABASE_URL.startswith("postgres"), reason="needs a PostgreSQL DATABASE_URL"
+)
+
+SCHEMA_SQL = f"""
+CREATE TABLE orders (
+    id SERIAL PRIMARY KEY, order_id VARCHAR(100) UNIQUE NOT NULL, telegram_id BIGINT NOT NULL,
+    domain_name VARCHAR(255), crypto_address VARCHAR(255), status VARCHAR(50), created_at TIMESTAMP
+);
+INSERT INTO orders (order_id, telegram_id, domain_name, crypto_address, status, created_at)
+SELECT 'ORD-' || g, CASE WHEN g % 5 = 0 THEN {PORTFOLIO_USER} ELSE g % {USERS} END, 'site' || g || '.com',
+       CASE WHEN g % 10 < 7 THEN md5(g::text) END,
+       (ARRAY['pending', 'confirmed', 'processed', 'completed'])[1 + g % 4],
+       now() - (g || ' minutes')::interval
+FROM generate_series(1, {ORDERS}) g;
+
+CREATE TABLE wallet_transactions (
+    id SERIAL PRIMARY KEY, telegram_id BIGINT NOT NULL, transaction_type VARCHAR(50),
+    amount DECIMAL(10, 2), status VARCHAR(50), created_at TIMESTAMP
+);
+INSERT INTO wallet_transactions (telegram_id, transaction_type, amount, status, created_at)
+SELECT g % {USERS}, 'deposit', (g % 500) / 10.0, 'confirmed', now() - (g || ' minutes')::interval
+FROM generate_series(1, {WALLET_TRANSACTIONS}) g;
+
+CREATE TABLE registered_domains (
+    id SERIAL PRIMARY KEY, telegram_id BIGINT NOT NULL, domain_name VARCHAR(255) NOT NULL,
+    status VARCHAR(50), expires_at TIMESTAMP, registration_date TIMESTAMP
+);
+INSERT INTO registered_domains (telegram_id, domain_name, status, expires_at, registration_date)
+SELECT CASE WHEN g % 5 = 0 THEN {PORTFOLIO_USER} ELSE g % {USERS} END, 'domain' || g || '.com',
+       CASE WHEN g % 20 = 0 THEN 'expired' ELSE 'active' END,
+       now() + ((g % 1095) - 30 || ' days')::interval, now() - (g || ' hours')::interval
+FROM generate_series(1, {DOMAINS}) g;
+
+CREATE TABLE user_states (
+    id SERIAL PRIMARY KEY, telegram_id BIGINT NOT NULL, state VARCHAR(100) NOT NULL, data TEXT
+);
+INSERT INTO user_states (telegram_id, state, data)
+SELECT g, 'idle', '{{}}' FROM generate_series(1, {USERS}) g;
+"""
+
+HOT_QUERIES = {
+    "idx_orders_crypto_address": (
+        "SELECT crypto_address, domain_name FROM orders "
+        "WHERE crypto_address = ANY(ARRAY[md5('7'), md5('42')]) "
+        "AND status IN ('confirmed', 'pending') AND status != 'processed'"
+    ),
+    "idx_wallet_transactions_telegram_created": (
+        "SELECT * FROM wallet_transactions WHERE telegram_id = 4242 ORDER BY created_at DESC LIMIT 20"
+    ),
+    "idx_registered_domains_telegram_status": (
+        "SELECT * FROM registered_domains WHERE telegram_id = 4242 AND status = 'active'"
+    ),
+    "idx_registered_domains_active_expiry": (
+        "SELECT * FROM registered_domains WHERE expires_at <= now() + interval '30 days' "
+        "AND status = 'active' ORDER BY expires_at"
+    ),
+    "idx_user_states_telegram_state": (
+        "SELECT * FROM user_states WHERE telegram_id = 4242"
+    ),
+    # Keyset pages deep into the portfolio user's listings
+    "idx_registered_domains_telegram_registered": (
+        f"SELECT * FROM registered_domains WHERE telegram_id = {PORTFOLIO_USER} "
+        "AND (registration_date, id) < (now() - interval '1000 days', 2147483647) "
+        "ORDER BY registration_date DESC NULLS FIRST, id DESC LIMIT 11"
+    ),
+    "idx_orders_telegram_created": (
+        f"SELECT * FROM orders WHERE telegram_id = {PORTFOLIO_USER} "
+        "AND (created_at, id) < (now() - interval '100 days', 2147483647) "
+        "ORDER BY created_at DESC NULLS FIRST, id DESC LIMIT 11"
+    ),
+}
+
+
+def _index_names(plan):
+    names = {plan["Index Name"]} if "Index Name" in plan else set()
+    for child in plan.get("Plans", []):
+        names |= _index_names(child)
+    return names
+
+
+@pytest.fixture(scope="module")
+def seeded():
+    schema = f"plan_check_{uuid.uuid4().hex[:8]}"
+    conn = psycopg2.connect(DATABASE_URL)
+    conn.autocommit = True
+    cur = conn.cursor()
+    try:
+        cur.execute(f"CREATE SCHEMA {schema}")
+        cur.execute(f"SET search_path TO {schema}")
+        cur.execute(SCHEMA_SQL)
+        for migration in MIGRATIONS:
+            for statement in MigrationManager._split_statements(migration.read_text()):
+                cur.execute(statement)
+        cur.execute("ANALYZE orders, wallet_transactions, registered_domains, user_states")
+        yield cur
+    finally:
+        cur.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+        conn.close()
+
+
+def test_migrations_build_every_index_concurrently():
+    statements = [
+        statement for migration in MIGRATIONS
+        for statement in MigrationManager._split_statements(migration.read_text())
+    ]
+    assert len(statements) == len(HOT_QUERIES)
+    assert all("CONCURRENTLY IF NOT EXISTS" in statement for statement in statements)
+
+
+@pytest.mark.parametrize("index_name", sorted(HOT_QUERIES))
+def test_hot_query_uses_its_index(seeded, index_name):
+    seeded.execute(f"EXPLAIN (FORMAT JSON) {HOT_QUERIES[index_name]}")
+    result = seeded.fetchone()[0]
+    plan = (json.loads(result) if isinstance(result, str) else result)[0]["Plan"]
+    assert index_name in _index_names(plan), json.dumps(plan, indent=1)
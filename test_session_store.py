@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Test the write-behind session store: dirty tracking, batched flushes, JSON import
+and bounded LRU/TTL residency
+"""
+
+import json
+import os
+import tempfile
+import threading
+
+from session_store import SessionStore, SQLiteSessionBackend
+
+
+def _store(tmpdir, legacy_json_path=None, **kwargs):
+    backend = SQLiteSessionBackend(os.path.join(tmpdir, "sessions.db"))
+    return SessionStore(backend, legacy_json_path=legacy_json_path, **kwargs)
+
+
+def test_only_dirty_sessions_are_written():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        store = _store(tmpdir)
+        store.load()
+        for user_id in range(100):
+            store[user_id] = {"language": "en"}
+        assert store.flush() == 100
+
+        store[7]["stage"] = "payment_processing"
+        store.get(8)  # read but not changed: skipped by the hash check
+        assert store.flush() == 1
+        assert store.backend.load(7) == {"language": "en", "stage": "payment_processing"}
+
+
+def test_reload_and_delete_round_trip():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        store = _store(tmpdir)
+        store.load()
+        store[1] = {"language": "fr"}
+        store[2] = {"language": "es"}
+        store.flush()
+        del store[2]
+        store.flush()
+
+        reloaded = _store(tmpdir)
+        assert reloaded.load() == 1
+        assert reloaded[1]["language"] == "fr"
+        assert 2 not in reloaded
+
+
+def test_threshold_triggers_flush_on_save():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        store = _store(tmpdir, flush_interval=3600, flush_threshold=10)
+        store.load()
+        for user_id in range(10):
+            store[user_id] = {"n": user_id}
+        store.save()
+        assert store.backend.count() == 10
+        store.close()
+
+
+def test_legacy_json_imported_once():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        legacy = os.path.join(tmpdir, "user_sessions.json")
+        with open(legacy, "w") as f:
+            json.dump({"42": {"language": "fr"}, "bad": {}}, f)
+
+        store = _store(tmpdir, legacy)
+        assert store.load() == 1
+        assert store[42]["language"] == "fr"
+        del store[42]
+        store.flush()
+        # The import is recorded, a restart must not resurrect deleted users
+        assert _store(tmpdir, legacy).load() == 0
+
+
+def test_lru_cap_evicts_and_rehydrates():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        store = _store(tmpdir, max_entries=3)
+        store.load()
+        for user_id in range(5):
+            store[user_id] = {"language": "de", "n": user_id}
+
+        assert len(dict.keys(store)) == 3
+        assert store.stats()["evictions_lru"] == 2
+        # Evicted sessions were flushed before being dropped and come back on access
+        assert 0 in store
+        assert store[0] == {"language": "de", "n": 0}
+        assert store.stats()["rehydrated"] == 1
+        assert store.get(999) is None
+
+
+def test_idle_sessions_expire_and_drop_workflow_keys():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        store = _store(tmpdir, idle_ttl=0, workflow_ttl=0)
+        store.load()
+        store[1] = {"language": "fr", "technical_email": "a@b.c",
+                    "waiting_for_dns_input": True, "dns_record_type": "A"}
+        assert store.sweep() == 1
+        assert len(dict.keys(store)) == 0
+        assert store[1] == {"language": "fr", "technical_email": "a@b.c"}
+        assert store.stats()["evictions_ttl"] == 1
+
+
+def test_find_sessions_sees_unflushed_changes():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        store = _store(tmpdir)
+        store.load()
+        store[5] = {"stage": "payment_processing", "btc_address": "bc1q"}
+        store[6] = {"stage": "idle"}
+        assert store.find_sessions("stage", "payment_processing") == [
+            (5, {"stage": "payment_processing", "btc_address": "bc1q"})
+        ]
+
+
+def test_sessions_marked_during_flush_are_not_lost():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        store = _store(tmpdir, max_entries=10_000)
+        store.load()
+        done = threading.Event()
+
+        def flusher():
+            while not done.is_set():
+                store.flush()
+
+        thread = threading.Thread(target=flusher)
+        thread.start()
+        try:
+            for user_id in range(3000):
+                store[user_id] = {"language": "en", "n": user_id}
+        finally:
+            done.set()
+            thread.join()
+        store.flush()
+        assert store.backend.count() == 3000
+
+
+if __name__ == "__main__":
+    test_only_dirty_sessions_are_written()
+    test_reload_and_delete_round_trip()
+    test_threshold_triggers_flush_on_save()
+    test_legacy_json_imported_once()
+    test_lru_cap_evicts_and_rehydrates()
+    test_idle_sessions_expire_and_drop_workflow_keys()
+    test_find_sessions_sees_unflushed_changes()
+    test_sessions_marked_during_flush_are_not_lost()
+    print("✅ Session store tests passed")
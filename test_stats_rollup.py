@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Test the stats rollup: dashboard snapshots over rollup rows, and (with a
+PostgreSQL DATABASE_URL) that the triggers of database_migrations/003 keep
+the same counters a full backfill computes
+"""
+
+import os
+import uuid
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+
+from stats_rollup import ALL_TIME, BACKFILL_SQL, StatsSnapshot, window_start
+
+DATABASE_URL = os.getenv("DATABASE_URL", "")
+MIGRATION = next((Path(__file__).parent / "database_migrations").glob("003_stats_rollup_*.sql"))
+TODAY = date(2026, 10, 16)
+
+
+def test_window_covers_month_to_date_and_thirty_days():
+    assert window_start(TODAY) == date(2026, 9, 16)
+    assert window_start(date(2026, 10, 31)) == date(2026, 10, 1)
+
+
+def test_snapshot_totals_windows_and_breakdowns():
+    stats = StatsSnapshot([
+        (ALL_TIME, "users", Decimal("120")),
+        (ALL_TIME, "orders:pending", Decimal("4")),
+        (ALL_TIME, "revenue:btc", Decimal("900.50")),
+        (ALL_TIME, "revenue:balance", Decimal("99.50")),
+        (date(2026, 10, 16), "users", Decimal("2")),
+        (date(2026, 10, 10), "users", Decimal("5")),
+        (date(2026, 9, 20), "users", Decimal("7")),
+        (date(2026, 10, 16), "revenue:btc", Decimal("10")),
+        (date(2026, 10, 1), "revenue:balance", Decimal("20")),
+        (date(2026, 9, 30), "revenue:btc", Decimal("40")),
+    ], TODAY)
+
+    assert stats.total("users") == 120
+    assert stats.total("orders:completed") == 0
+    assert stats.total("revenue:") == Decimal("1000.00")
+    assert stats.last_days("users", 1) == 2
+    assert stats.last_days("users", 7) == 7
+    assert stats.last_days("users", 30) == 14
+    assert stats.month_to_date("revenue:") == 30
+    assert stats.last_days("revenue:", 30) == 70
+    assert stats.breakdown("revenue:") == {"balance": Decimal("99.50"), "btc": Decimal("900.50")}
+
+
+def test_snapshot_sums_slots():
+    stats = StatsSnapshot([
+        (ALL_TIME, "users", Decimal("100")),
+        (ALL_TIME, "users", Decimal("20")),
+        (TODAY, "users", Decimal("1")),
+        (TODAY, "users", Decimal("2")),
+    ], TODAY)
+    assert stats.total("users") == 120
+    assert stats.last_days("users", 1) == 3
+
+
+SCHEMA_SQL = """
+CREATE TABLE users (telegram_id BIGINT PRIMARY KEY, created_at TIMESTAMP);
+CREATE TABLE registered_domains (id SERIAL PRIMARY KEY, telegram_id BIGINT, created_at TIMESTAMP);
+CREATE TABLE orders (
+    id SERIAL PRIMARY KEY, telegram_id BIGINT, service_type VARCHAR(100) NOT NULL,
+    amount_usd DECIMAL(10, 2) NOT NULL, payment_method VARCHAR(50), payment_status VARCHAR(50),
+    crypto_currency VARCHAR(10), payment_address VARCHAR(255), created_at TIMESTAMP
+);
+CREATE TABLE wallet_transactions (
+    id SERIAL PRIMARY KEY, telegram_id BIGINT, transaction_type VARCHAR(50),
+    amount DECIMAL(10, 2), created_at TIMESTAMP
+);
+"""
+
+WORKLOAD_SQL = """
+INSERT INTO users SELECT g, now() - (g || ' days')::interval FROM generate_series(1, 40) g;
+INSERT INTO users VALUES (999, NULL);
+INSERT INTO registered_domains (telegram_id, created_at)
+SELECT g, now() - (g || ' hours')::interval FROM generate_series(1, 60) g;
+INSERT INTO orders (telegram_id, service_type, amount_usd, payment_method, payment_status,
+                    crypto_currency, created_at)
+SELECT g, (ARRAY['domain_registration', 'wallet_deposit', 'dns'])[1 + g % 3], 10 + g % 7,
+       CASE WHEN g % 4 = 0 THEN 'balance' ELSE 'crypto_btc' END, 'pending',
+       CASE WHEN g % 4 = 0 THEN NULL WHEN g % 2 = 0 THEN 'ETH' ELSE 'BTC' END,
+       now() - (g || ' days')::interval
+FROM generate_series(1, 80) g;
+INSERT INTO wallet_transactions (telegram_id, transaction_type, amount, created_at)
+SELECT g, CASE WHEN g % 3 = 0 THEN 'payment' ELSE 'deposit' END, g, now() - (g || ' days')::interval
+FROM generate_series(1, 50) g;
+
+UPDATE orders SET payment_status = 'completed' WHERE id % 3 = 0;
+UPDATE orders SET payment_status = 'failed' WHERE id % 10 = 1;
+UPDATE orders SET amount_usd = amount_usd + 1 WHERE id % 9 = 0;
+UPDATE orders SET payment_address = 'addr' || id WHERE id % 2 = 0;
+UPDATE orders SET created_at = created_at - interval '40 days' WHERE id % 11 = 0;
+DELETE FROM orders WHERE id % 13 = 0;
+DELETE FROM users WHERE telegram_id % 17 = 0;
+UPDATE wallet_transactions SET transaction_type = 'payment' WHERE id % 5 = 0;
+DELETE FROM registered_domains WHERE id % 7 = 0;
+"""
+
+
+@pytest.fixture
+def scratch_schema():
+    psycopg2 = pytest.importorskip("psycopg2")
+    if not DATABASE_URL.startswith("postgres"):
+        pytest.skip("needs a PostgreSQL DATABASE_URL")
+
+    schema = f"stats_check_{uuid.uuid4().hex[:8]}"
+    conn = psycopg2.connect(DATABASE_URL)
+    conn.autocommit = True
+    cur = conn.cursor()
+    try:
+        cur.execute(f"CREATE SCHEMA {schema}")
+        cur.execute(f"SET search_path TO {schema}")
+        cur.execute(SCHEMA_SQL)
+        cur.execute(MIGRATION.read_text())
+        yield cur
+    finally:
+        cur.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+        conn.close()
+
+
+def _rollup(cur):
+    cur.execute("SELECT day, metric, sum(value) FROM stats_rollup GROUP BY day, metric HAVING sum(value) <> 0")
+    return {(day, metric): value for day, metric, value in cur.fetchall()}
+
+
+def test_triggers_match_backfill(scratch_schema):
+    cur = scratch_schema
+    cur.execute(WORKLOAD_SQL)
+    maintained = _rollup(cur)
+
+    cur.execute("BEGIN")
+    for statement in BACKFILL_SQL:
+        cur.execute(statement)
+    cur.execute("COMMIT")
+    assert _rollup(cur) == maintained
+
+    cur.execute("SELECT count(*) FROM users")
+    assert maintained[(ALL_TIME, "users")] == cur.fetchone()[0]
+    cur.execute("SELECT sum(amount_usd) FROM orders WHERE payment_status = 'completed'")
+    revenue = sum(value for (day, metric), value in maintained.items()
+                  if day == ALL_TIME and metric.startswith("revenue:"))
+    assert revenue == cur.fetchone()[0]
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Test webhook ingestion: idempotency keys, claim/release semantics and
+bounded-queue push-back
+"""
+
+import asyncio
+import os
+import tempfile
+import threading
+
+import pytest
+
+from webhook_ingestion import IdempotencyIndex, WebhookIngestionQueue, idempotency_key
+
+
+def test_keys_prefer_txid_then_order():
+    assert idempotency_key("blockbee", "ORD-1", {"txid_in": "abc"}) == "blockbee:tx:abc"
+    assert idempotency_key("dynopay", "ORD-1", {"base_amount": "10"}) == "dynopay:order:ORD-1"
+    # Top-ups repeat per user, so they key on the payload
+    a = idempotency_key("topup_dynopay", "42", {"base_amount": "10"})
+    b = idempotency_key("topup_dynopay", "42", {"base_amount": "25"})
+    assert a != b and a == idempotency_key("topup_dynopay", "42", {"base_amount": "10"})
+
+
+def test_claim_is_exclusive_and_durable():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "events.db")
+        index = IdempotencyIndex(path)
+        wins = []
+        threads = [threading.Thread(target=lambda: wins.append(index.claim("k"))) for _ in range(20)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert wins.count(True) == 1
+        index.complete("k")
+
+        reopened = IdempotencyIndex(path)
+        assert reopened.claim("k") is False
+        # A released (failed) claim can be retried
+        assert reopened.claim("other") is True
+        reopened.release("other")
+        assert reopened.claim("other") is True
+
+
+def test_queue_pushes_back_and_deduplicates():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        index = IdempotencyIndex(os.path.join(tmpdir, "events.db"))
+        ran = []
+        gate = threading.Event()
+
+        def handler(ref, data):
+            gate.wait(1)
+            ran.append(ref)
+
+        queue = WebhookIngestionQueue({"test": handler}, index=index, maxsize=2, workers=1)
+
+        async def run():
+            await queue.start()
+            results = [queue.submit(f"k{i}", "test", i, {}) for i in range(4)]
+            await asyncio.sleep(0.05)
+            duplicate = queue.submit("k0", "test", 0, {})
+            gate.set()
+            await queue.stop()
+            return results, duplicate
+
+        results, duplicate = asyncio.run(run())
+        # Two callbacks fill the queue, the rest are refused
+        assert results == [WebhookIngestionQueue.ACCEPTED] * 2 + [WebhookIngestionQueue.BUSY] * 2
+        assert duplicate == WebhookIngestionQueue.DUPLICATE
+        assert sorted(ran) == [0, 1]
+        # Refused callbacks were released, so the provider's retry is accepted later
+        assert index.claim("k3") is True
+
+
+def test_failed_job_is_retried_after_acknowledgement():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        index = IdempotencyIndex(os.path.join(tmpdir, "events.db"))
+        attempts = []
+
+        def flaky_ledger(ref, data):
+            attempts.append(ref)
+            if len(attempts) < 3:
+                raise RuntimeError("database unavailable")
+
+        queue = WebhookIngestionQueue({"dynopay": flaky_ledger}, index=index, workers=1, retry_delay=0.01)
+
+        async def run():
+            await queue.start()
+            assert queue.submit("k", "dynopay", "ORD-1", {"base_amount": "10"}) == WebhookIngestionQueue.ACCEPTED
+            for _ in range(100):
+                if queue.processed:
+                    break
+                await asyncio.sleep(0.01)
+            await queue.stop()
+
+        asyncio.run(run())
+        assert attempts == ["ORD-1"] * 3
+        assert index.state("k") == "done" and index.pending_jobs() == []
+
+
+def test_unfinished_jobs_resume_after_restart():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "events.db")
+        # Accepted and answered 200, then the process died before a worker ran it
+        assert IdempotencyIndex(path).claim("k", {"kind": "topup_dynopay", "ref": "42", "data": {"base_amount": "10"}})
+        IdempotencyIndex(path).claim("inline")  # Flask path: never answered, so dropped
+
+        ran = []
+        index = IdempotencyIndex(path)
+        queue = WebhookIngestionQueue({"topup_dynopay": lambda ref, data: ran.append((ref, data))}, index=index)
+
+        async def run():
+            await queue.start()
+            await asyncio.sleep(0.05)
+            await queue.stop()
+
+        asyncio.run(run())
+        assert ran == [("42", {"base_amount": "10"})]
+        assert index.claim("k") is False
+        assert index.claim("inline") is True
+
+
+def test_failed_ledger_write_releases_the_key(monkeypatch):
+    pytest.importorskip("sqlalchemy")
+    pytest.importorskip("aiohttp")
+    import payment_webhooks
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        index = IdempotencyIndex(os.path.join(tmpdir, "events.db"))
+        started = []
+
+        def failing_ledger(*args, **kwargs):
+            raise RuntimeError("database unavailable")
+
+        monkeypatch.setenv("DYNOPAY_API_KEY", "key")
+        monkeypatch.setenv("DYNOPAY_TOKEN", "token")
+        monkeypatch.setattr(payment_webhooks, "get_webhook_index", lambda: index)
+        monkeypatch.setattr(payment_webhooks, "_record_order_payment", failing_ledger)
+        monkeypatch.setattr(payment_webhooks, "_start_confirmation", lambda *a, **k: started.append(a))
+
+        with pytest.raises(RuntimeError):
+            payment_webhooks.handle_webhook("dynopay", "ORD-1", {"base_amount": "10"})
+        assert started == []
+        # The redelivery is processed, not acknowledged as a duplicate
+        assert index.claim(idempotency_key("dynopay", "ORD-1", {"base_amount": "10"})) is True
+
+
+def test_rejected_topup_credit_writes_no_ledger_rows(monkeypatch):
+    pytest.importorskip("sqlalchemy")
+    pytest.importorskip("aiohttp")
+    import database
+    import payment_webhooks
+
+    class RejectingLedger:
+        def __init__(self):
+            self.writes = []
+
+        def update_user_balance(self, *args, **kwargs):
+            return None
+
+        def create_transaction(self, **kwargs):
+            self.writes.append(kwargs)
+
+        def create_wallet_transaction(self, **kwargs):
+            self.writes.append(kwargs)
+
+    ledger = RejectingLedger()
+    submitted = []
+    monkeypatch.setattr(database, "get_db_manager", lambda: ledger)
+    monkeypatch.setattr(payment_webhooks.background_executor, "submit", lambda *a: submitted.append(a))
+
+    payment_webhooks._credit_topup(42, 10.0, "BTC", "Crypto deposit")
+    assert ledger.writes == [] and submitted == []
+
+
+if __name__ == "__main__":
+    test_keys_prefer_txid_then_order()
+    test_claim_is_exclusive_and_durable()
+    test_queue_pushes_back_and_deduplicates()
+    test_failed_job_is_retried_after_acknowledgement()
+    test_unfinished_jobs_resume_after_restart()
+    print("✅ Webhook ingestion tests passed")
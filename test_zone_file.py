@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Test zone-file import/export: BIND parsing, validation hand-off, batched creates and paged export
+"""
+
+import asyncio
+import io
+
+from zone_file import (
+    ZoneFileError, entry_to_input, export_zone, format_zone_record, import_zone, iter_zone_entries, parse_ttl,
+)
+
+ZONE = """\
+$ORIGIN example.com.
+$TTL 1h
+@       IN  SOA ns1.example.com. admin.example.com. (
+                2024010101 ; serial
+                7200 3600 1209600 300 )
+@       IN  NS    ns1.registrar.net.
+@           A     203.0.113.10
+        300 IN AAAA 2001:db8::10
+www     IN  CNAME @
+mail    600 IN A  203.0.113.20
+@       IN  MX    10 mail
+@       IN  TXT   "v=spf1 mx -all" ; inline comment
+_dmarc  IN  TXT   ( "v=DMARC1; p=none; "
+                    "rua=mailto:dmarc@example.com" )
+_sip._tcp IN SRV  10 5 5060 sip.example.com.
+@       IN  CAA   0 issue "letsencrypt.org"
+other.org. IN A   198.51.100.1
+broken  IN  TXT   "unterminated
+"""
+
+
+def _entries(text=ZONE):
+    return list(iter_zone_entries(io.StringIO(text), "example.com"))
+
+
+def test_parse_ttl_units():
+    assert parse_ttl("300") == 300
+    assert parse_ttl("1h30m") == 5400
+    assert parse_ttl("IN") is None
+
+
+def test_parses_bind_syntax():
+    entries = _entries()
+    records = [(e.name, e.type, e.ttl) for e in entries if not isinstance(e, ZoneFileError)]
+    assert records[:4] == [
+        ("example.com", "SOA", 3600), ("example.com", "NS", 3600),
+        ("example.com", "A", 3600), ("example.com", "AAAA", 300),
+    ]
+    assert ("mail.example.com", "A", 600) in records
+    errors = [e for e in entries if isinstance(e, ZoneFileError)]
+    assert [e.line for e in errors] == [17, 18]
+    assert "outside example.com" in errors[0].message
+
+    by_type = {e.type: e for e in entries if not isinstance(e, ZoneFileError)}
+    assert entry_to_input(by_type["CNAME"], "example.com") == "www,example.com"
+    assert entry_to_input(by_type["MX"], "example.com") == "@,mail.example.com,10"
+    assert entry_to_input(by_type["SRV"], "example.com") == "_sip._tcp,sip.example.com,5060,10,5"
+    dmarc = [e for e in entries if not isinstance(e, ZoneFileError) and e.name.startswith("_dmarc")][0]
+    assert entry_to_input(dmarc, "example.com") == "_dmarc,v=DMARC1; p=none; rua=mailto:dmarc@example.com"
+
+
+async def _validate(record_type, text):
+    """Stand-in for the bot's validate_dns_input: name,value[,priority]"""
+    parts = text.split(",", 1)
+    if len(parts) != 2:
+        return {"valid": False, "error": "Format: name,value"}
+    name, rest = parts
+    if record_type == "A" and rest.count(".") != 3:
+        return {"valid": False, "error": "Invalid IPv4 format"}
+    parsed = {"name": name, "type": record_type, "content": rest, "ttl": 300}
+    if record_type == "MX":
+        host, priority = rest.split(",")
+        parsed.update(content=host, priority=int(priority))
+    if record_type == "SRV":
+        target, port, priority, weight = rest.split(",")
+        parsed.update(content=target, port=int(port), priority=int(priority), weight=int(weight))
+    return {"valid": True, "parsed_data": parsed}
+
+
+class _FakeManager:
+    def __init__(self, records=(), page_size=2):
+        self.records = list(records)
+        self.page_size = page_size
+        self.batches = []
+        self.pages_served = 0
+
+    async def iter_dns_record_pages(self, zone_id):
+        for start in range(0, len(self.records), self.page_size):
+            self.pages_served += 1
+            yield [dict(r) for r in self.records[start:start + self.page_size]]
+
+    async def batch_dns_records(self, zone_id, posts=None, deletes=None):
+        self.batches.append(len(posts))
+        if any(p.get("content") == "203.0.113.66" for p in posts):
+            return False, "bad record"
+        for i, post in enumerate(posts):
+            self.records.append(dict(post, id=f"r{len(self.records)}"))
+        return True, None
+
+
+def test_import_creates_valid_records_and_skips_existing():
+    manager = _FakeManager([{"id": "x", "type": "A", "name": "example.com", "content": "203.0.113.10", "ttl": 300}])
+    result = asyncio.run(import_zone(manager, "zone", "example.com", io.StringIO(ZONE), _validate))
+
+    assert result.existing == 1          # apex A was already there
+    assert result.skipped == 3           # SOA, apex NS, CAA
+    assert result.created == 7
+    assert [line for line, _ in result.errors] == [17, 18]
+    srv = [r for r in manager.records if r["type"] == "SRV"][0]
+    assert srv["name"] == "_sip._tcp.example.com"
+    assert srv["data"] == {"priority": 10, "weight": 5, "port": 5060, "target": "sip.example.com"}
+    mail = [r for r in manager.records if r["name"] == "mail.example.com"][0]
+    assert mail["ttl"] == 600
+
+    # Importing the same file again creates nothing
+    again = asyncio.run(import_zone(manager, "zone", "example.com", io.StringIO(ZONE), _validate))
+    assert again.created == 0 and again.existing == 8
+
+
+def test_import_batches_and_isolates_bad_records():
+    lines = [f"h{i} IN A 203.0.{i // 256}.{i % 256}\n" for i in range(450)] + ["bad IN A 203.0.113.66\n"]
+    manager = _FakeManager()
+    updates = []
+
+    async def progress(result):
+        updates.append(result.created)
+
+    result = asyncio.run(import_zone(manager, "zone", "example.com", lines, _validate, progress=progress))
+    assert result.created == 450 and result.failed == 1
+    assert manager.batches[:3] == [200, 200, 51]
+    assert result.errors[0][0] == 451
+    assert updates and updates[-1] == 450
+
+
+def test_export_streams_pages_into_bind_file():
+    records = [
+        {"id": "1", "type": "A", "name": "example.com", "content": "203.0.113.10", "ttl": 1},
+        {"id": "2", "type": "CNAME", "name": "www.example.com", "content": "example.com", "ttl": 300},
+        {"id": "3", "type": "MX", "name": "example.com", "content": "mail.example.com", "priority": 10, "ttl": 300},
+        {"id": "4", "type": "TXT", "name": "_dmarc.example.com", "content": 'v=DMARC1; p="none"', "ttl": 300},
+        {"id": "5", "type": "SRV", "name": "_sip._tcp.example.com", "content": "5 5060 sip.example.com", "ttl": 300,
+         "data": {"priority": 10, "weight": 5, "port": 5060, "target": "sip.example.com"}},
+    ]
+    manager = _FakeManager(records)
+    out = io.StringIO()
+    assert asyncio.run(export_zone(manager, "zone", "example.com", out)) == 5
+    assert manager.pages_served == 3
+
+    text = out.getvalue()
+    assert "$ORIGIN example.com." in text
+    assert "www\t300\tIN\tCNAME\texample.com." in text
+    assert '_dmarc\t300\tIN\tTXT\t"v=DMARC1; p=\\"none\\""' in text
+    assert "_sip._tcp\t300\tIN\tSRV\t10 5 5060 sip.example.com." in text
+
+    # The export parses back into the same records
+    parsed = [e for e in iter_zone_entries(io.StringIO(text), "example.com")]
+    assert not [e for e in parsed if isinstance(e, ZoneFileError)]
+    assert [(e.name, e.type) for e in parsed] == [(r["name"], r["type"]) for r in records]
+
+
+def test_long_txt_is_split_into_character_strings():
+    line = format_zone_record({"type": "TXT", "name": "k.example.com", "content": "a" * 600, "ttl": 300}, "example.com")
+    assert line.count('"') == 6
+    entry = next(iter_zone_entries([line], "example.com"))
+    assert entry_to_input(entry, "example.com") == "k," + "a" * 600
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Test the zone provisioner: paged account zone index, parent lookup and two-call zone creation
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+
+import httpx
+
+from zone_provisioner import AccountZone, AccountZoneIndex, ZoneProvisioner
+
+
+class _FakeManager:
+    """Account zones behind the UnifiedDNSManager methods the provisioner calls"""
+
+    enabled = True
+
+    def __init__(self, names=()):
+        self.zones = [{"id": f"z-{name}", "name": name, "name_servers": ["ada.ns.cloudflare.com"]} for name in names]
+        self.calls = []
+        self.batches = []
+        self.active = 0
+        self.peak = 0
+
+    async def _round_trip(self, call):
+        self.calls.append(call)
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.001)
+        self.active -= 1
+
+    async def list_zones_page(self, page=1, per_page=50):
+        await self._round_trip(("list", page))
+        total_pages = max(1, -(-len(self.zones) // per_page))
+        return [dict(z) for z in self.zones[(page - 1) * per_page:page * per_page]], total_pages
+
+    async def create_zone(self, domain, adopt_existing=True):
+        await self._round_trip(("create", domain))
+        if any(z["name"] == domain for z in self.zones):
+            return False, None, []  # Cloudflare error 1061, not adopted
+        zone = {"id": f"z-{domain}", "name": domain, "name_servers": ["bob.ns.cloudflare.com", "eve.ns.cloudflare.com"]}
+        self.zones.append(zone)
+        return True, zone["id"], zone["name_servers"]
+
+    async def get_zone_by_domain(self, domain):
+        await self._round_trip(("get", domain))
+        for zone in self.zones:
+            if zone["name"] == domain:
+                return {"zone_id": zone["id"], "name": zone["name"], "status": "active",
+                        "name_servers": zone["name_servers"]}
+        return None
+
+    async def batch_dns_records(self, zone_id, posts=None, deletes=None):
+        await self._round_trip(("batch", zone_id))
+        self.batches.append((zone_id, posts))
+        return True, None
+
+
+def test_index_pages_and_parent_lookup():
+    manager = _FakeManager([f"site{i}.com" for i in range(120)] + ["example.com", "co.uk"])
+    index = AccountZoneIndex(manager, page_size=50)
+
+    zone = asyncio.run(index.find("a.b.EXAMPLE.com."))
+    assert zone.name == "example.com"
+    assert index.match("shop.co.uk").id == "z-co.uk"
+    assert index.match("example.org") is None
+    assert len(index) == 122 and index.pages_fetched == 3
+    assert sorted(manager.calls) == [("list", 1), ("list", 2), ("list", 3)]
+
+
+def test_concurrent_cold_lookups_share_one_refresh():
+    manager = _FakeManager([f"site{i}.com" for i in range(120)])
+    index = AccountZoneIndex(manager, page_size=50)
+
+    async def lookups():
+        return await asyncio.gather(*(index.find(f"site{i}.com") for i in range(20)))
+
+    assert all(asyncio.run(lookups()))
+    assert index.refreshes == 1 and index.pages_fetched == 3
+
+
+def test_refresh_drops_deleted_zones_but_keeps_new_local_ones():
+    manager = _FakeManager(["old.com", "kept.com"])
+    index = AccountZoneIndex(manager)
+
+    async def scenario():
+        await index.refresh()
+        manager.zones = [z for z in manager.zones if z["name"] != "old.com"]
+        refresh = asyncio.create_task(index.refresh())
+        await asyncio.sleep(0)
+        index.add(AccountZone("z-new", "new.com"))  # created while the listing runs
+        await refresh
+
+    asyncio.run(scenario())
+    assert index.get("old.com") is None
+    assert index.get("kept.com") and index.get("new.com")
+
+
+def test_new_domain_is_one_create_and_one_batch():
+    manager = _FakeManager(["example.com"])
+    provisioner = ZoneProvisioner(manager)
+
+    result = asyncio.run(provisioner.provision("newsite.sbs"))
+    assert result.success and result.zone_created
+    assert result.nameservers == ["bob.ns.cloudflare.com", "eve.ns.cloudflare.com"]
+    assert result.records_created == 3
+    assert [call[0] for call in manager.calls] == ["list", "create", "batch"]
+    assert [r["name"] for r in manager.batches[0][1]] == ["newsite.sbs", "www.newsite.sbs", "mail.newsite.sbs"]
+
+    # Known zones are answered from the index
+    manager.calls.clear()
+    again = asyncio.run(provisioner.provision("newsite.sbs"))
+    assert again.success and not again.zone_created and again.zone_id == result.zone_id
+    assert manager.calls == []
+
+
+def test_zone_missing_from_stale_index_is_adopted_not_seeded():
+    manager = _FakeManager(["example.com"])
+    provisioner = ZoneProvisioner(manager)
+    asyncio.run(provisioner.index.refresh())
+    # Added in the dashboard after the index was loaded
+    manager.zones.append({"id": "z-late.com", "name": "late.com", "name_servers": ["ada.ns.cloudflare.com"]})
+
+    result = asyncio.run(provisioner.provision("late.com"))
+    assert result.success and not result.zone_created
+    assert result.zone_id == "z-late.com" and result.nameservers == ["ada.ns.cloudflare.com"]
+    assert result.records_created == 0 and manager.batches == []
+    assert provisioner.index.get("late.com").id == "z-late.com"
+
+    missing = _FakeManager()
+    missing.create_zone = lambda domain, adopt_existing=True: asyncio.sleep(0, (False, None, []))
+    failed = asyncio.run(ZoneProvisioner(missing).provision("nowhere.com"))
+    assert not failed.success and failed.error
+
+
+def test_parent_zone_only_used_when_asked():
+    manager = _FakeManager(["example.com"])
+    provisioner = ZoneProvisioner(manager)
+
+    parent = asyncio.run(provisioner.provision("shop.example.com", records=[], use_parent=True))
+    assert parent.zone_id == "z-example.com" and not parent.zone_created
+    assert ("create", "shop.example.com") not in manager.calls
+
+    own = asyncio.run(provisioner.provision("shop.example.com", records=[]))
+    assert own.zone_created and own.zone_id == "z-shop.example.com"
+    assert not manager.batches
+
+
+def test_bulk_onboarding_is_bounded():
+    manager = _FakeManager(["example.com"])
+    provisioner = ZoneProvisioner(manager, concurrency=5)
+
+    domains = [f"bulk{i}.xyz" for i in range(40)] + ["example.com"]
+    results = asyncio.run(provisioner.provision_many(domains))
+    assert [r.domain for r in results] == domains
+    assert all(r.success for r in results)
+    assert sum(r.zone_created for r in results) == 40
+    assert [call[0] for call in manager.calls].count("list") == 1
+    assert len(manager.calls) == 1 + 40 * 2
+    assert manager.peak <= 5
+
+
+def test_real_manager_reports_existing_zone_from_http_400(monkeypatch):
+    import unified_dns_manager
+
+    existing = {"id": "z-taken.com", "name": "taken.com", "status": "active",
+                "name_servers": ["ada.ns.cloudflare.com"]}
+
+    def handle(request):
+        if request.method == "POST":
+            return httpx.Response(400, json={"success": False, "result": None,
+                                             "errors": [{"code": 1061, "message": "taken.com already exists"}]})
+        if request.url.params.get("name") == "taken.com":
+            return httpx.Response(200, json={"success": True, "result": [existing]})
+        return httpx.Response(200, json={"success": True, "result": [], "result_info": {"total_pages": 1}})
+
+    class Transport:
+        @asynccontextmanager
+        async def session(self):
+            async with httpx.AsyncClient(transport=httpx.MockTransport(handle)) as client:
+                yield client
+
+    monkeypatch.setenv("CLOUDFLARE_API_TOKEN", "test-token-0123456789")
+    monkeypatch.setattr(unified_dns_manager, "cloudflare_transport", Transport())
+    manager = unified_dns_manager.UnifiedDNSManager()
+
+    assert asyncio.run(manager.create_zone("taken.com")) == (True, "z-taken.com", ["ada.ns.cloudflare.com"])
+    assert asyncio.run(manager.create_zone("taken.com", adopt_existing=False)) == (False, None, [])
+
+    result = asyncio.run(ZoneProvisioner(manager).provision("taken.com"))
+    assert result.success and result.zone_id == "z-taken.com"
+    assert not result.zone_created and result.records_created == 0
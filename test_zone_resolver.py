@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test the domain -> zone_id resolver: cache order, negative caching and invalidation
+"""
+
+import asyncio
+
+import pytest
+
+from zone_resolver import ZoneIdResolver
+
+
+def _resolver(stored, **kwargs):
+    calls = []
+
+    def db_lookup(domain):
+        calls.append(domain)
+        return stored.get(domain)
+
+    return ZoneIdResolver(db_lookup=db_lookup, **kwargs), calls
+
+
+def _remote(zones, calls):
+    async def fetch(domain):
+        calls.append(domain)
+        return zones.get(domain)
+    return fetch
+
+
+def test_database_hit_is_cached():
+    resolver, db_calls = _resolver({"nomadly.com": "zone-1"})
+    remote_calls = []
+
+    async def run():
+        fetch = _remote({}, remote_calls)
+        return [await resolver.resolve("Nomadly.com", fetch) for _ in range(3)]
+
+    assert asyncio.run(run()) == ["zone-1"] * 3
+    assert db_calls == ["nomadly.com"]
+    assert remote_calls == []
+    assert resolver.stats()["hits"] == 2
+
+
+def test_remote_fallback_and_negative_cache():
+    resolver, db_calls = _resolver({})
+    remote_calls = []
+
+    async def run():
+        fetch = _remote({"external.com": "zone-ext"}, remote_calls)
+        results = []
+        for _ in range(2):
+            results.append(await resolver.resolve("external.com", fetch))
+            results.append(await resolver.resolve("nowhere.com", fetch))
+        return results
+
+    assert asyncio.run(run()) == ["zone-ext", None, "zone-ext", None]
+    assert remote_calls == ["external.com", "nowhere.com"]
+    assert resolver.stats()["negative_hits"] == 1
+
+
+def test_remote_errors_are_not_cached():
+    resolver, _ = _resolver({})
+
+    async def failing(domain):
+        raise RuntimeError("HTTP 500")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(resolver.resolve("flaky.com", failing))
+    remote_calls = []
+    assert asyncio.run(resolver.resolve("flaky.com", _remote({"flaky.com": "zone-f"}, remote_calls))) == "zone-f"
+
+
+def test_invalidate_rereads_database():
+    stored = {"moved.com": "old-zone"}
+    resolver, db_calls = _resolver(stored)
+    assert resolver.lookup_stored("moved.com") == "old-zone"
+
+    stored["moved.com"] = "new-zone"
+    assert resolver.lookup_stored("moved.com") == "old-zone"
+    resolver.invalidate("moved.com")
+    assert resolver.lookup_stored("moved.com") == "new-zone"
+    assert len(db_calls) == 2
+
+
+def test_negative_entries_expire():
+    resolver, _ = _resolver({}, negative_ttl=0)
+    remote_calls = []
+    fetch = _remote({}, remote_calls)
+    asyncio.run(resolver.resolve("pending.com", fetch))
+    asyncio.run(resolver.resolve("pending.com", fetch))
+    assert remote_calls == ["pending.com", "pending.com"]
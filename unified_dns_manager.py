@@ -7,12 +7,21 @@ Clean architecture with proper error handling and authentication
 import os
 import asyncio
 import logging
-import httpx
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from datetime import datetime
 
+from app.core.geo_policy import CompiledGeoRule, GeoPolicyApplier, geo_rule_cache
+from cloudflare_transport import cloudflare_transport
+from fast_response_cache import dns_record_cache
+from zone_resolver import zone_id_resolver
+
 logger = logging.getLogger(__name__)
 
+DNS_RECORDS_PAGE_SIZE = 500
+
+# Background record refreshes (held so they are not garbage collected mid-flight)
+_refresh_tasks = set()
+
 class UnifiedDNSManager:
     """Unified DNS manager - handles all DNS operations with single implementation"""
     
@@ -31,6 +40,11 @@ class UnifiedDNSManager:
         else:
             logger.info(f"✅ Cloudflare DNS Manager initialized with {self.auth_method} authentication")
             self.enabled = True
+        
+        # Flipped off the first time Cloudflare answers 404/405 for the batch endpoint
+        self.batch_supported = True
+        
+        self.geo_applier = GeoPolicyApplier(self._ruleset_request, geo_rule_cache)
     
     def _determine_auth_method(self) -> Optional[str]:
         """Determine which authentication method to use - prioritize Global API Key"""
@@ -57,48 +71,16 @@ class UnifiedDNSManager:
             raise Exception("No valid authentication method available")
     
     async def get_zone_id(self, domain: str) -> Optional[str]:
-        """Get zone ID for a domain from database or Cloudflare API"""
+        """Get zone ID for a domain from the resolver cache, database or Cloudflare API"""
+        if not self.enabled:
+            zone_id = zone_id_resolver.lookup_stored(domain)
+            if zone_id:
+                return zone_id
+            logger.warning(f"Cloudflare API disabled - cannot get zone_id for {domain}")
+            return "f366a9dc0eadd5ea5b6f865b76cea73f"  # Fallback for claudeb.sbs
+
         try:
-            # First try to get from database
-            try:
-                from database import get_db_manager
-                db = get_db_manager()
-                registered_domains = db.get_all_registered_domains()
-                
-                for domain_record in registered_domains:
-                    if hasattr(domain_record, 'domain_name') and domain_record.domain_name == domain:
-                        if hasattr(domain_record, 'zone_id') and domain_record.zone_id:
-                            logger.info(f"Found zone_id in database for {domain}: {domain_record.zone_id}")
-                            return domain_record.zone_id
-                        break
-            except Exception as db_error:
-                logger.warning(f"Database zone_id lookup failed for {domain}: {db_error}")
-            
-            # If not in database, query Cloudflare API
-            if not self.enabled:
-                logger.warning(f"Cloudflare API disabled - cannot get zone_id for {domain}")
-                return "f366a9dc0eadd5ea5b6f865b76cea73f"  # Fallback for claudeb.sbs
-            
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/zones",
-                    params={"name": domain},
-                    headers=self._get_headers(),
-                    timeout=10
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    zones = data.get("result", [])
-                    if zones:
-                        zone_id = zones[0].get("id")
-                        logger.info(f"Found zone_id via API for {domain}: {zone_id}")
-                        return zone_id
-                else:
-                    logger.warning(f"Zone lookup failed for {domain}: HTTP {response.status_code}")
-                    
-            return None
-            
+            return await zone_id_resolver.resolve(domain, self._fetch_zone_id)
         except Exception as e:
             logger.error(f"Error getting zone_id for {domain}: {e}")
             # Fallback for known domain
@@ -106,13 +88,33 @@ class UnifiedDNSManager:
                 return "f366a9dc0eadd5ea5b6f865b76cea73f"
             return None
 
+    async def _fetch_zone_id(self, domain: str) -> Optional[str]:
+        """Look a zone up by name on Cloudflare; raises on API errors so they are not cached"""
+        async with cloudflare_transport.session() as client:
+            response = await client.get(
+                f"{self.base_url}/zones",
+                params={"name": domain},
+                headers=self._get_headers(),
+                timeout=10
+            )
+
+        if response.status_code != 200:
+            raise Exception(f"Zone lookup failed for {domain}: HTTP {response.status_code}")
+
+        zones = response.json().get("result", [])
+        if zones:
+            zone_id = zones[0].get("id")
+            logger.info(f"Found zone_id via API for {domain}: {zone_id}")
+            return zone_id
+        return None
+
     async def test_connection(self) -> Tuple[bool, str]:
         """Test API connection and return success status with message"""
         if not self.enabled:
             return False, "No valid Cloudflare credentials configured"
         
         try:
-            async with httpx.AsyncClient() as client:
+            async with cloudflare_transport.session() as client:
                 # Use different endpoints based on auth method
                 if self.auth_method == "token":
                     endpoint = f"{self.base_url}/user/tokens/verify"
@@ -146,7 +148,7 @@ class UnifiedDNSManager:
             return None
         
         try:
-            async with httpx.AsyncClient() as client:
+            async with cloudflare_transport.session() as client:
                 response = await client.get(
                     f"{self.base_url}/zones",
                     headers=self._get_headers(),
@@ -178,8 +180,29 @@ class UnifiedDNSManager:
             logger.error(f"❌ Error looking up zone for {domain_name}: {e}")
             return None
     
-    async def create_zone(self, domain_name: str) -> Tuple[bool, Optional[str], List[str]]:
-        """Create new Cloudflare zone and return success, zone_id, nameservers"""
+    async def list_zones_page(self, page: int = 1, per_page: int = 50) -> Tuple[List[Dict[str, Any]], int]:
+        """One page of the account's zones and the total page count; raises on API errors"""
+        async with cloudflare_transport.session() as client:
+            response = await client.get(
+                f"{self.base_url}/zones",
+                headers=self._get_headers(),
+                params={"page": page, "per_page": per_page},
+                timeout=15
+            )
+        
+        data = response.json()
+        if response.status_code != 200 or not data.get("success"):
+            raise Exception(f"Zone listing failed: HTTP {response.status_code} {data.get('errors')}")
+        return data.get("result") or [], (data.get("result_info") or {}).get("total_pages") or 1
+    
+    async def create_zone(self, domain_name: str,
+                          adopt_existing: bool = True) -> Tuple[bool, Optional[str], List[str]]:
+        """Create new Cloudflare zone and return success, zone_id, nameservers
+
+        A zone that already exists on the account (error 1061) is returned as
+        if created, unless ``adopt_existing`` is False, in which case the call
+        fails so the caller can tell a new zone from an existing one.
+        """
         if not self.enabled:
             return False, None, []
         
@@ -188,10 +211,10 @@ class UnifiedDNSManager:
             
             zone_data = {
                 "name": domain_name,
-                "jump_start": True  # Import existing DNS records
+                "type": "full"
             }
             
-            async with httpx.AsyncClient() as client:
+            async with cloudflare_transport.session() as client:
                 response = await client.post(
                     f"{self.base_url}/zones",
                     headers=self._get_headers(),
@@ -199,29 +222,33 @@ class UnifiedDNSManager:
                     timeout=15
                 )
                 
-                if response.status_code == 200:
+                try:
                     data = response.json()
-                    if data.get("success"):
-                        zone = data["result"]
-                        zone_id = zone["id"]
-                        nameservers = zone.get("name_servers", [])
-                        
-                        logger.info(f"✅ Zone created successfully: {zone_id}")
-                        return True, zone_id, nameservers
-                    else:
-                        errors = data.get("errors", [])
-                        # Check if zone already exists
-                        if any(error.get("code") == 1061 for error in errors):
-                            logger.info(f"ℹ️ Zone already exists for {domain_name}, retrieving...")
-                            existing_zone = await self.get_zone_by_domain(domain_name)
-                            if existing_zone:
-                                return True, existing_zone["zone_id"], existing_zone["name_servers"]
-                        
-                        logger.error(f"❌ Zone creation failed: {errors}")
+                except ValueError:
+                    data = {}
+                
+                if response.status_code == 200 and data.get("success"):
+                    zone = data["result"]
+                    zone_id = zone["id"]
+                    nameservers = zone.get("name_servers", [])
+                    
+                    zone_id_resolver.set(domain_name, zone_id)
+                    logger.info(f"✅ Zone created successfully: {zone_id}")
+                    return True, zone_id, nameservers
+                
+                errors = data.get("errors", [])
+                # Cloudflare reports an existing zone as error 1061 with HTTP 400
+                if any(error.get("code") == 1061 for error in errors):
+                    if not adopt_existing:
+                        logger.info(f"ℹ️ Zone already exists for {domain_name}")
                         return False, None, []
-                else:
-                    logger.error(f"❌ Zone creation failed: {response.status_code} - {response.text}")
-                    return False, None, []
+                    logger.info(f"ℹ️ Zone already exists for {domain_name}, retrieving...")
+                    existing_zone = await self.get_zone_by_domain(domain_name)
+                    if existing_zone:
+                        return True, existing_zone["zone_id"], existing_zone["name_servers"]
+                
+                logger.error(f"❌ Zone creation failed: {response.status_code} - {errors or response.text}")
+                return False, None, []
                     
         except Exception as e:
             logger.error(f"❌ Error creating zone for {domain_name}: {e}")
@@ -240,35 +267,71 @@ class UnifiedDNSManager:
                 {"type": "MX", "name": "@", "content": f"mail.{domain}", "priority": 10, "ttl": 3600}
             ]
     
-    async def list_dns_records(self, zone_id: str) -> List[Dict[str, Any]]:
-        """List all DNS records for a zone"""
+    async def list_dns_records(self, zone_id: str, force_refresh: bool = False) -> List[Dict[str, Any]]:
+        """List all DNS records for a zone (served from the record cache when warm)"""
         if not self.enabled:
             return []
         
+        if not force_refresh:
+            records = dns_record_cache.get(zone_id)
+            if records is not None:
+                if dns_record_cache.needs_refresh(zone_id) and dns_record_cache.begin_refresh(zone_id):
+                    task = asyncio.create_task(self._refresh_dns_records(zone_id))
+                    _refresh_tasks.add(task)
+                    task.add_done_callback(_refresh_tasks.discard)
+                return records
+        
+        return await self._fetch_dns_records(zone_id) or []
+    
+    async def _refresh_dns_records(self, zone_id: str) -> None:
         try:
-            async with httpx.AsyncClient() as client:
+            await self._fetch_dns_records(zone_id)
+        finally:
+            dns_record_cache.end_refresh(zone_id)
+    
+    async def _fetch_dns_records(self, zone_id: str) -> Optional[List[Dict[str, Any]]]:
+        """Fetch every page of a zone's records from Cloudflare and cache them (None on error)"""
+        version = dns_record_cache.version(zone_id)
+        records: List[Dict[str, Any]] = []
+        
+        try:
+            async for page in self.iter_dns_record_pages(zone_id):
+                records.extend(page)
+        except Exception as e:
+            logger.error(f"❌ Error listing DNS records for zone {zone_id}: {e}")
+            return None
+        
+        dns_record_cache.store(zone_id, records, if_version=version)
+        logger.info(f"✅ Retrieved {len(records)} DNS records for zone {zone_id}")
+        return records
+    
+    async def iter_dns_record_pages(self, zone_id: str, page_size: Optional[int] = None) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Yield a zone's records one Cloudflare page at a time (uncached; raises on API errors)"""
+        if not self.enabled:
+            return
+        
+        page = 1
+        async with cloudflare_transport.session() as client:
+            while True:
                 response = await client.get(
                     f"{self.base_url}/zones/{zone_id}/dns_records",
                     headers=self._get_headers(),
+                    params={"page": page, "per_page": page_size or DNS_RECORDS_PAGE_SIZE},
                     timeout=15
                 )
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    if data.get("success"):
-                        records = data.get("result", [])
-                        logger.info(f"✅ Retrieved {len(records)} DNS records for zone {zone_id}")
-                        return records
-                    else:
-                        logger.error(f"❌ Failed to list records: {data.get('errors', [])}")
-                        return []
-                else:
-                    logger.error(f"❌ Records listing failed: {response.status_code}")
-                    return []
-                    
-        except Exception as e:
-            logger.error(f"❌ Error listing DNS records for zone {zone_id}: {e}")
-            return []
+                if response.status_code != 200:
+                    raise Exception(f"Records listing failed: {response.status_code}")
+                
+                data = response.json()
+                if not data.get("success"):
+                    raise Exception(f"Failed to list records: {data.get('errors', [])}")
+                
+                yield data.get("result", [])
+                total_pages = (data.get("result_info") or {}).get("total_pages") or 1
+                if page >= total_pages:
+                    return
+                page += 1
     
     async def create_dns_record(
         self, 
@@ -277,9 +340,13 @@ class UnifiedDNSManager:
         name: str, 
         content: str, 
         ttl: int = 300, 
-        priority: Optional[int] = None
+        priority: Optional[int] = None,
+        data: Optional[Dict[str, Any]] = None
     ) -> Tuple[bool, Optional[str], Optional[str]]:
-        """Create DNS record and return success status, record ID, and error message"""
+        """Create DNS record and return success status, record ID, and error message
+        
+        data carries the structured fields of types such as SRV in place of content.
+        """
         if not self.enabled:
             return False, None, "DNS manager not enabled"
         
@@ -290,6 +357,9 @@ class UnifiedDNSManager:
                 "content": content,
                 "ttl": ttl
             }
+            if data:
+                record_data["data"] = data
+                record_data.pop("content")
             
             # Add priority for MX and SRV records
             if priority is not None and record_type.upper() in ["MX", "SRV"]:
@@ -297,7 +367,7 @@ class UnifiedDNSManager:
             elif record_type.upper() == "MX" and priority is None:
                 record_data["priority"] = 10  # Default MX priority
             
-            async with httpx.AsyncClient() as client:
+            async with cloudflare_transport.session() as client:
                 response = await client.post(
                     f"{self.base_url}/zones/{zone_id}/dns_records",
                     headers=self._get_headers(),
@@ -309,6 +379,7 @@ class UnifiedDNSManager:
                     data = response.json()
                     if data.get("success"):
                         record_id = data["result"]["id"]
+                        dns_record_cache.upsert(zone_id, data["result"])
                         logger.info(f"✅ DNS record created: {record_type} {name} -> {content}")
                         return True, record_id, None
                     else:
@@ -356,7 +427,7 @@ class UnifiedDNSManager:
             if priority is not None and record_type.upper() in ["MX", "SRV"]:
                 record_data["priority"] = priority
             
-            async with httpx.AsyncClient() as client:
+            async with cloudflare_transport.session() as client:
                 response = await client.put(
                     f"{self.base_url}/zones/{zone_id}/dns_records/{record_id}",
                     headers=self._get_headers(),
@@ -367,6 +438,7 @@ class UnifiedDNSManager:
                 if response.status_code == 200:
                     data = response.json()
                     if data.get("success"):
+                        dns_record_cache.upsert(zone_id, data.get("result") or {})
                         logger.info(f"✅ DNS record updated: {record_type} {name} -> {content}")
                         return True
                     else:
@@ -387,7 +459,7 @@ class UnifiedDNSManager:
             return False
         
         try:
-            async with httpx.AsyncClient() as client:
+            async with cloudflare_transport.session() as client:
                 response = await client.delete(
                     f"{self.base_url}/zones/{zone_id}/dns_records/{record_id}",
                     headers=self._get_headers(),
@@ -397,6 +469,7 @@ class UnifiedDNSManager:
                 if response.status_code == 200:
                     data = response.json()
                     if data.get("success"):
+                        dns_record_cache.remove(zone_id, record_id)
                         logger.info(f"✅ DNS record deleted: {record_id}")
                         return True
                     else:
@@ -411,6 +484,103 @@ class UnifiedDNSManager:
             logger.error(f"❌ Error deleting DNS record: {e}")
             return False
     
+    async def batch_dns_records(
+        self,
+        zone_id: str,
+        posts: Optional[List[Dict[str, Any]]] = None,
+        deletes: Optional[List[str]] = None
+    ) -> Tuple[bool, Optional[str]]:
+        """Apply record deletes and creates to one zone in a single batch call.
+
+        Falls back to one call per record when the batch endpoint is not
+        available for the account. Returns success and an error message.
+        """
+        if not self.enabled:
+            return False, "DNS manager not enabled"
+        posts = posts or []
+        deletes = deletes or []
+        
+        if self.batch_supported:
+            try:
+                async with cloudflare_transport.session() as client:
+                    response = await client.post(
+                        f"{self.base_url}/zones/{zone_id}/dns_records/batch",
+                        headers=self._get_headers(),
+                        json={"deletes": [{"id": record_id} for record_id in deletes], "posts": posts},
+                        timeout=30
+                    )
+                
+                if response.status_code in (404, 405):
+                    logger.info("ℹ️ DNS batch endpoint unavailable, using per-record calls")
+                    self.batch_supported = False
+                else:
+                    data = response.json()
+                    if response.status_code == 200 and data.get("success"):
+                        result = data.get("result") or {}
+                        for record_id in deletes:
+                            dns_record_cache.remove(zone_id, record_id)
+                        for record in result.get("posts") or []:
+                            dns_record_cache.upsert(zone_id, record)
+                        logger.info(f"✅ DNS batch applied to zone {zone_id}: +{len(posts)} -{len(deletes)}")
+                        return True, None
+                    errors = data.get("errors", [])
+                    logger.error(f"❌ DNS batch failed for zone {zone_id}: {errors}")
+                    return False, errors[0].get("message", "Unknown error") if errors else f"HTTP {response.status_code}"
+                    
+            except Exception as e:
+                logger.error(f"❌ Error applying DNS batch to zone {zone_id}: {e}")
+                return False, f"Connection error: {str(e)}"
+        
+        # Batch is atomic; the fallback stops at the first failure and the
+        # bulk engine's re-plan picks up whatever is left on a retry
+        for record_id in deletes:
+            if not await self.delete_dns_record(zone_id, record_id):
+                return False, f"Could not delete record {record_id}"
+        for record in posts:
+            success, _, error = await self.create_dns_record(
+                zone_id, record["type"], record["name"], record.get("content"),
+                ttl=record.get("ttl", 300), priority=record.get("priority"), data=record.get("data")
+            )
+            if not success:
+                return False, error
+        return True, None
+    
+    async def _ruleset_request(
+        self,
+        method: str,
+        zone_id: str,
+        path: str,
+        payload: Optional[Dict[str, Any]] = None
+    ) -> Tuple[int, Dict[str, Any]]:
+        """One rulesets API call for the geo policy applier"""
+        async with cloudflare_transport.session() as client:
+            response = await client.request(
+                method,
+                f"{self.base_url}/zones/{zone_id}{path}",
+                headers=self._get_headers(),
+                json=payload,
+                timeout=15
+            )
+        try:
+            return response.status_code, response.json()
+        except ValueError:
+            return response.status_code, {}
+    
+    async def apply_geo_rule(self, zone_id: str, rule: Optional[CompiledGeoRule]) -> Dict[str, Any]:
+        """Make the zone's geo access rule match a compiled policy (None removes it).
+
+        Unchanged policies are skipped without an API call.
+        """
+        if not self.enabled:
+            return {"success": False, "change": None, "error": "DNS manager not enabled"}
+        
+        try:
+            return await self.geo_applier.apply(zone_id, rule)
+        except Exception as e:
+            geo_rule_cache.forget(zone_id)
+            logger.error(f"❌ Error applying geo rule to zone {zone_id}: {e}")
+            return {"success": False, "change": None, "error": f"Connection error: {str(e)}"}
+    
     def format_record_for_display(self, record: Dict[str, Any]) -> str:
         """Format DNS record for user-friendly display"""
         record_type = record.get("type", "")
@@ -488,8 +658,8 @@ class UnifiedDNSManager:
             else:
                 # Step 2: Create new Cloudflare zone
                 logger.info(f"🆕 Creating new Cloudflare zone for {domain}")
-                zone_id = await self.create_zone(domain)
-                if zone_id:
+                created, zone_id, nameservers = await self.create_zone(domain)
+                if created and zone_id:
                     logger.info(f"✅ Created new Cloudflare zone: {zone_id}")
                     result["zone_id"] = zone_id
                     result["zone_created"] = True
@@ -497,8 +667,9 @@ class UnifiedDNSManager:
                     result["error"] = "Failed to create Cloudflare zone"
                     return result
             
-            # Step 3: Get Cloudflare nameservers for the zone
-            nameservers = await self.get_zone_nameservers(zone_id)
+            # Step 3: Get Cloudflare nameservers for the zone (a new zone's came with it)
+            if not result["zone_created"]:
+                nameservers = await self.get_zone_nameservers(zone_id)
             if not nameservers:
                 result["error"] = "Failed to retrieve Cloudflare nameservers"
                 return result
@@ -510,8 +681,9 @@ class UnifiedDNSManager:
             if openprovider_api:
                 logger.info(f"🔄 Updating nameservers at registrar...")
                 ns_update_result = await openprovider_api.update_nameservers(domain, nameservers)
-                if not ns_update_result.get("success", False):
-                    result["error"] = f"Failed to update nameservers at registrar: {ns_update_result.get('error', 'Unknown error')}"
+                # AsyncOpenProviderAPI.update_nameservers returns a bool
+                if not ns_update_result:
+                    result["error"] = "Failed to update nameservers at registrar"
                     return result
                 logger.info(f"✅ Nameservers updated at registrar")
             
@@ -538,7 +710,7 @@ class UnifiedDNSManager:
     async def get_zone_nameservers(self, zone_id: str) -> List[str]:
         """Get nameservers for a specific Cloudflare zone"""
         try:
-            async with httpx.AsyncClient() as client:
+            async with cloudflare_transport.session() as client:
                 response = await client.get(
                     f"{self.base_url}/zones/{zone_id}",
                     headers=self._get_headers(),
@@ -562,41 +734,6 @@ class UnifiedDNSManager:
         except Exception as e:
             logger.error(f"❌ Error getting zone nameservers: {e}")
             return []
-    
-    async def create_zone(self, domain: str) -> Optional[str]:
-        """Create a new Cloudflare zone for domain"""
-        try:
-            zone_data = {
-                "name": domain,
-                "type": "full"
-            }
-            
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/zones",
-                    headers=self._get_headers(),
-                    json=zone_data,
-                    timeout=15
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    if data.get("success"):
-                        zone_info = data.get("result", {})
-                        zone_id = zone_info.get("id")
-                        logger.info(f"✅ Created Cloudflare zone: {zone_id}")
-                        return zone_id
-                    else:
-                        errors = data.get("errors", [])
-                        logger.error(f"❌ Zone creation failed: {errors}")
-                        return None
-                else:
-                    logger.error(f"❌ Zone creation request failed: {response.status_code}")
-                    return None
-                    
-        except Exception as e:
-            logger.error(f"❌ Error creating Cloudflare zone: {e}")
-            return None
 
 # Global instance
 unified_dns_manager = UnifiedDNSManager()
\ No newline at end of file
@@ -4,6 +4,7 @@ Handles versioned database schema migrations with rollback support
 """
 
 import os
+import re
 import logging
 import psycopg2
 from pathlib import Path
@@ -12,6 +13,18 @@ from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction block
+CONCURRENTLY = re.compile(r"\bCONCURRENTLY\b", re.IGNORECASE)
+CONCURRENT_INDEX_NAME = re.compile(
+    r"CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+IF\s+NOT\s+EXISTS\s+(\w+)", re.IGNORECASE
+)
+
+# A commented line in a ROLLBACK block starting with one of these opens a
+# statement, which runs to the line ending in ';'. Anything else is prose.
+ROLLBACK_STATEMENT_START = re.compile(
+    r"^(ALTER|BEGIN|COMMIT|CREATE|DELETE|DO|DROP|GRANT|INSERT|REVOKE|SELECT|SET|TRUNCATE|UPDATE|WITH)\b"
+)
+
 class MigrationManager:
     """Manages database schema migrations with version control"""
     
@@ -71,6 +84,11 @@ class MigrationManager:
             # Extract rollback SQL if present (between -- ROLLBACK and -- END ROLLBACK)
             rollback_sql = self._extract_rollback_sql(migration_sql)
             
+            if CONCURRENTLY.search(migration_sql):
+                self._apply_outside_transaction(migration_file.stem, migration_sql, rollback_sql)
+                logger.info(f"✅ Migration applied successfully: {migration_file.name}")
+                return True
+            
             with self.get_connection() as conn:
                 with conn.cursor() as cur:
                     # Apply migration
@@ -112,6 +130,11 @@ class MigrationManager:
                     
                     rollback_sql = result[0]
                     
+                    if CONCURRENTLY.search(rollback_sql):
+                        self._rollback_outside_transaction(migration_name, rollback_sql)
+                        logger.info(f"✅ Migration rolled back successfully: {migration_name}")
+                        return True
+                    
                     # Execute rollback
                     cur.execute(rollback_sql)
                     
@@ -130,6 +153,69 @@ class MigrationManager:
             logger.error(f"❌ Failed to rollback migration {migration_name}: {e}")
             return False
     
+    def _apply_outside_transaction(self, migration_name: str, migration_sql: str,
+                                   rollback_sql: Optional[str]):
+        """Run a CONCURRENTLY migration statement by statement in autocommit mode.
+
+        A concurrent build that fails (or is interrupted) leaves an INVALID
+        index behind, which IF NOT EXISTS would then skip; such leftovers are
+        dropped before their CREATE is retried.
+        """
+        conn = self.get_connection()
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                for statement in self._split_statements(migration_sql):
+                    self._drop_invalid_index(cur, statement)
+                    cur.execute(statement)
+                
+                cur.execute("""
+                    INSERT INTO migration_history (migration_name, rollback_sql)
+                    VALUES (%s, %s)
+                    ON CONFLICT (migration_name) DO NOTHING
+                """, (migration_name, rollback_sql))
+        finally:
+            conn.close()
+    
+    def _rollback_outside_transaction(self, migration_name: str, rollback_sql: str):
+        """Run a CONCURRENTLY rollback statement by statement in autocommit mode"""
+        conn = self.get_connection()
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                for statement in self._split_statements(rollback_sql):
+                    cur.execute(statement)
+                
+                cur.execute("""
+                    DELETE FROM migration_history 
+                    WHERE migration_name = %s
+                """, (migration_name,))
+        finally:
+            conn.close()
+    
+    def _drop_invalid_index(self, cur, statement: str):
+        """Drop an INVALID index left by an earlier failed concurrent build of statement"""
+        match = CONCURRENT_INDEX_NAME.search(statement)
+        if not match:
+            return
+        
+        cur.execute("""
+            SELECT 1 FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE c.relname = %s AND NOT i.indisvalid AND pg_table_is_visible(c.oid)
+        """, (match.group(1),))
+        if cur.fetchone():
+            logger.warning(f"⚠️ Dropping invalid index {match.group(1)} before rebuilding it")
+            cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {match.group(1)}")
+    
+    @staticmethod
+    def _split_statements(sql: str) -> List[str]:
+        """Split a migration into single statements, ignoring comment lines"""
+        body = '\n'.join(
+            line for line in sql.split('\n') if not line.strip().startswith('--')
+        )
+        return [statement.strip() for statement in body.split(';') if statement.strip()]
+    
     def migrate(self) -> bool:
         """Apply all pending migrations"""
         logger.info("🔄 Checking for pending database migrations...")
@@ -205,9 +291,11 @@ COMMIT;
 
 -- ROLLBACK
 -- BEGIN;
--- Your rollback SQL here
--- Example:
--- ALTER TABLE users DROP COLUMN new_field;
+-- -- Your rollback SQL here, commented out like this block. Only lines
+-- -- starting with an upper-case SQL keyword (up to the ';') are run back.
+-- -- Example:
+-- -- ALTER TABLE users DROP COLUMN new_field;
+-- COMMIT;
 -- END ROLLBACK
 """
         
@@ -217,23 +305,47 @@ COMMIT;
         logger.info(f"✅ Created migration template: {filename}")
         return migration_file
     
-    def _extract_rollback_sql(self, migration_sql: str) -> Optional[str]:
-        """Extract rollback SQL from migration file"""
+    @staticmethod
+    def _extract_rollback_sql(migration_sql: str) -> Optional[str]:
+        """Extract rollback SQL from migration file.
+
+        The block between -- ROLLBACK and -- END ROLLBACK is commented out so
+        the migration itself skips it. Only statements are un-commented: a
+        line starting with an upper-case SQL keyword up to the line ending in
+        ';' (dollar-quoted bodies included), so explanatory comments in the
+        block never reach the database.
+        """
         try:
-            lines = migration_sql.split('\n')
-            rollback_lines = []
+            statements = []
+            current = []
             in_rollback = False
             
-            for line in lines:
-                if '-- ROLLBACK' in line:
+            for line in migration_sql.split('\n'):
+                if '-- END ROLLBACK' in line:
+                    break
+                elif '-- ROLLBACK' in line:
                     in_rollback = True
                     continue
-                elif '-- END ROLLBACK' in line:
-                    break
-                elif in_rollback and not line.strip().startswith('--'):
-                    rollback_lines.append(line)
+                elif not in_rollback:
+                    continue
+                
+                stripped = line.strip()
+                if stripped.startswith('--'):
+                    stripped = stripped[2:].strip()
+                if not stripped or stripped.startswith('--'):
+                    continue
+                if not current and not ROLLBACK_STATEMENT_START.match(stripped):
+                    continue
+                
+                current.append(stripped)
+                statement = '\n'.join(current)
+                if statement.endswith(';') and statement.count('$$') % 2 == 0:
+                    statements.append(statement)
+                    current = []
             
-            return '\n'.join(rollback_lines).strip() if rollback_lines else None
+            if current:
+                logger.warning(f"⚠️ Ignoring unterminated rollback statement: {current[0]}")
+            return '\n'.join(statements) if statements else None
             
         except Exception:
             return None
@@ -244,4 +356,9 @@ def get_migration_manager():
     if not database_url:
         raise ValueError("DATABASE_URL environment variable is required")
     
-    return MigrationManager(database_url)
\ No newline at end of file
+    return MigrationManager(database_url)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    raise SystemExit(0 if get_migration_manager().migrate() else 1)
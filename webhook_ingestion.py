@@ -0,0 +1,269 @@
+"""
+Webhook Ingestion for Nomadly Bot
+Idempotency index and bounded work queue for payment provider callbacks
+
+BlockBee and Dynopay retry callbacks until they see a 200, so the same
+confirmation routinely arrives several times. IdempotencyIndex records each
+confirmed callback under a key (txid_in when the provider sends one,
+otherwise the order id or a digest of the payload), so repeats are
+acknowledged from memory without running the ledger writes again.
+WebhookIngestionQueue runs callbacks on one long-lived executor behind a
+bounded asyncio queue; when it is full, submit() says so and the server
+answers 503 so the provider backs off and retries later.
+
+A queued callback has already been answered 200, so the provider will not
+send it again. Its job (kind, reference and payload) is therefore written to
+the index in the same insert as its claim, retried with back-off when the
+handler fails, and queued again on the next start if the process dies first.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDEX_PATH = os.getenv("WEBHOOK_INDEX_DB", "webhook_events.db")
+
+# Callbacks identified by the order they confirm; every other kind (wallet
+# top-ups) can legitimately repeat for the same reference
+ORDER_KINDS = ("dynopay", "walletpayment", "blockbee")
+
+# Back-off between attempts of a failing queued job, doubling up to the cap
+RETRY_DELAY_SECONDS = 30
+MAX_RETRY_DELAY_SECONDS = 3600
+
+
+def idempotency_key(kind: str, ref: str, data: Dict[str, Any]) -> str:
+    """Key under which a confirmed callback is recorded"""
+    txid = data.get("txid_in") or data.get("txid")
+    if txid:
+        return f"{kind}:tx:{txid}"
+    if kind in ORDER_KINDS:
+        return f"{kind}:order:{ref}"
+    digest = hashlib.sha1(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+    return f"{kind}:{ref}:{digest}"
+
+
+class IdempotencyIndex:
+    """Processed-callback keys: an in-memory dict in front of a SQLite table.
+
+    claim() is atomic across threads and processes sharing the database:
+    exactly one caller gets True for a key. A claim that fails is
+    release()d so the provider's retry can run it again; complete() marks
+    it done for good. A claim made with a job stores it, and the job stays
+    in pending_jobs() until it completes.
+    """
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._states: Dict[str, str] = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS processed_webhooks ("
+            "idempotency_key TEXT PRIMARY KEY, status TEXT NOT NULL, created_at REAL NOT NULL, "
+            "job TEXT, attempts INTEGER NOT NULL DEFAULT 0)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(processed_webhooks)")}
+        if "job" not in columns:
+            self._conn.execute("ALTER TABLE processed_webhooks ADD COLUMN job TEXT")
+            self._conn.execute("ALTER TABLE processed_webhooks ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+        # Inline claims left behind by a crash were never answered 200; let
+        # their retries through. Claims with a job are resumed instead
+        self._conn.execute("DELETE FROM processed_webhooks WHERE status = 'processing' AND job IS NULL")
+        self.duplicates = 0
+
+    def claim(self, key: str, job: Optional[Dict[str, Any]] = None) -> bool:
+        with self._lock:
+            if key in self._states:
+                self.duplicates += 1
+                return False
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO processed_webhooks (idempotency_key, status, created_at, job) "
+                "VALUES (?, 'processing', ?, ?)",
+                (key, time.time(), json.dumps(job, default=str) if job is not None else None),
+            )
+            if cursor.rowcount == 0:
+                self._states[key] = "done"
+                self.duplicates += 1
+                return False
+            self._states[key] = "processing"
+            return True
+
+    def complete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE processed_webhooks SET status = 'done' WHERE idempotency_key = ?", (key,)
+            )
+            self._states[key] = "done"
+
+    def release(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM processed_webhooks WHERE idempotency_key = ?", (key,))
+            self._states.pop(key, None)
+
+    def record_failure(self, key: str) -> int:
+        """Count a failed attempt of a stored job and return the attempts so far"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE processed_webhooks SET attempts = attempts + 1 WHERE idempotency_key = ?", (key,)
+            )
+            row = self._conn.execute(
+                "SELECT attempts FROM processed_webhooks WHERE idempotency_key = ?", (key,)
+            ).fetchone()
+            return row[0] if row else 0
+
+    def pending_jobs(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """(key, job) of every stored job that has not completed, oldest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT idempotency_key, job FROM processed_webhooks "
+                "WHERE status = 'processing' AND job IS NOT NULL ORDER BY created_at"
+            ).fetchall()
+            for key, _ in rows:
+                self._states[key] = "processing"
+        return [(key, json.loads(job)) for key, job in rows]
+
+    def state(self, key: str) -> Optional[str]:
+        with self._lock:
+            return self._states.get(key)
+
+
+_webhook_index: Optional[IdempotencyIndex] = None
+_webhook_index_lock = threading.Lock()
+
+
+def get_webhook_index() -> IdempotencyIndex:
+    """Process-wide idempotency index"""
+    global _webhook_index
+    with _webhook_index_lock:
+        if _webhook_index is None:
+            _webhook_index = IdempotencyIndex()
+        return _webhook_index
+
+
+class WebhookIngestionQueue:
+    """Bounded queue of callbacks drained by a fixed set of workers.
+
+    Workers run the (blocking, database-bound) handler for a job's kind on
+    one long-lived thread pool, so a burst of callbacks costs queue slots
+    rather than new threads and event loops. With an index, a job is stored
+    with its claim before submit() accepts it and is only dropped once its
+    handler succeeds.
+    """
+
+    ACCEPTED = "accepted"
+    DUPLICATE = "duplicate"
+    BUSY = "busy"
+
+    def __init__(self, handlers: Dict[str, Callable[[str, Dict[str, Any]], Any]],
+                 index: Optional[IdempotencyIndex] = None, maxsize: int = 1000, workers: int = 8,
+                 retry_delay: float = RETRY_DELAY_SECONDS):
+        self.handlers = handlers
+        self.index = index
+        self.maxsize = maxsize
+        self.workers = workers
+        self.retry_delay = retry_delay
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks = []
+        self._retries = set()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.accepted = 0
+        self.rejected = 0
+        self.processed = 0
+        self.failed = 0
+        self.recovered = 0
+
+    async def start(self) -> None:
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="webhook")
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        if self.index is not None:
+            pending = self.index.pending_jobs()
+            if pending:
+                self.recovered = len(pending)
+                logger.warning(f"📥 Resuming {len(pending)} webhook jobs left unfinished by the last run")
+                self._tasks.append(asyncio.create_task(self._requeue(pending)))
+        logger.info(f"📥 Webhook ingestion started: {self.workers} workers, queue size {self.maxsize}")
+
+    async def stop(self, drain: bool = True) -> None:
+        if drain and self._queue is not None:
+            await self._queue.join()
+        # Jobs waiting out a retry delay stay stored and resume on the next start
+        for task in self._tasks + list(self._retries):
+            task.cancel()
+        await asyncio.gather(*self._tasks, *self._retries, return_exceptions=True)
+        self._tasks = []
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+        logger.info(f"📥 Webhook ingestion stopped: {self.stats()}")
+
+    def submit(self, key: Optional[str], kind: str, ref: str, data: Dict[str, Any]) -> str:
+        """Enqueue the handler for kind with (ref, data). key=None skips the idempotency check."""
+        job = {"kind": kind, "ref": ref, "data": data}
+        if key is not None and self.index is not None:
+            if not self.index.claim(key, job):
+                return self.DUPLICATE
+        try:
+            self._queue.put_nowait((key, job))
+        except asyncio.QueueFull:
+            if key is not None and self.index is not None:
+                self.index.release(key)
+            self.rejected += 1
+            return self.BUSY
+        self.accepted += 1
+        return self.ACCEPTED
+
+    async def _requeue(self, jobs, delay: float = 0) -> None:
+        await asyncio.sleep(delay)
+        for key, job in jobs:
+            await self._queue.put((key, job))
+
+    async def _worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            key, job = await self._queue.get()
+            try:
+                await loop.run_in_executor(
+                    self._executor, self.handlers[job["kind"]], job["ref"], job["data"]
+                )
+                if key is not None and self.index is not None:
+                    self.index.complete(key)
+                self.processed += 1
+            except Exception as e:
+                logger.error(f"Webhook processing error: {e}", exc_info=True)
+                self.failed += 1
+                if key is not None and self.index is not None:
+                    # Already acknowledged to the provider, so retry it here
+                    attempts = self.index.record_failure(key)
+                    delay = min(self.retry_delay * 2 ** (attempts - 1), MAX_RETRY_DELAY_SECONDS)
+                    logger.warning(f"📥 Retrying {job['kind']} webhook {key} in {delay:.0f}s (attempt {attempts})")
+                    task = asyncio.create_task(self._requeue([(key, job)], delay))
+                    self._retries.add(task)
+                    task.add_done_callback(self._retries.discard)
+            finally:
+                self._queue.task_done()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "maxsize": self.maxsize,
+            "workers": self.workers,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "processed": self.processed,
+            "failed": self.failed,
+            "retrying": len(self._retries),
+            "recovered": self.recovered,
+            "duplicates": self.index.duplicates if self.index else 0,
+        }
@@ -0,0 +1,417 @@
+"""
+Zone File for Nomadly Bot
+Streaming BIND zone-file import and export for Cloudflare-hosted domains
+
+Import reads an uploaded zone file line by line, turns each record into the
+"name,value" text the bot's DNS input validators already check, and creates
+the valid records through batched creates, 200 per call. Records the zone
+already has are skipped, so importing the same file twice is harmless.
+Export walks the zone page by page and writes each page straight into the
+file, so only one page of records is held in memory.
+"""
+
+import asyncio
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+IMPORT_BATCH_SIZE = 200
+IMPORT_CONCURRENCY = 4
+DEFAULT_TTL = 300
+# Record types the bot's validators understand
+IMPORTABLE_TYPES = ("A", "AAAA", "CNAME", "MX", "TXT", "SRV")
+# Cloudflare owns the SOA and the apex NS set of every zone it hosts
+CLOUDFLARE_MANAGED_TYPES = ("SOA", "NS")
+CLASSES = ("IN", "CH", "HS")
+TTL_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+
+class ZoneFileError(ValueError):
+    """A zone file line that cannot be parsed"""
+
+    def __init__(self, line: int, message: str):
+        super().__init__(f"line {line}: {message}")
+        self.line = line
+        self.message = message
+
+
+@dataclass
+class ZoneEntry:
+    """One resource record from a zone file"""
+    line: int
+    name: str  # fully qualified, no trailing dot
+    type: str
+    ttl: int
+    rdata: List[str]
+
+
+@dataclass
+class ZoneImportResult:
+    created: int = 0
+    existing: int = 0
+    skipped: int = 0  # SOA, apex NS and types the bot cannot manage
+    batches: int = 0
+    errors: List[Tuple[int, str]] = field(default_factory=list)
+
+    @property
+    def failed(self) -> int:
+        return len(self.errors)
+
+
+def parse_ttl(token: str) -> Optional[int]:
+    """Seconds for a BIND TTL such as 300, 1h or 1h30m; None if token is not a TTL"""
+    token = token.lower()
+    if token.isdigit():
+        return int(token)
+    parts = re.fullmatch(r"(?:\d+[smhdw])+", token)
+    if not parts:
+        return None
+    return sum(int(n) * TTL_UNITS[unit] for n, unit in re.findall(r"(\d+)([smhdw])", token))
+
+
+def _tokenize(text: str, line: int) -> Tuple[List[str], int]:
+    """Split one physical line; returns tokens and the change in parenthesis depth.
+
+    Quoted strings keep their quotes so TXT data can be told apart from bare words.
+    """
+    tokens: List[str] = []
+    depth = 0
+    i, length = 0, len(text)
+    while i < length:
+        char = text[i]
+        if char == ";":
+            break
+        if char.isspace():
+            i += 1
+        elif char in "()":
+            depth += 1 if char == "(" else -1
+            i += 1
+        elif char == '"':
+            j = i + 1
+            while j < length and text[j] != '"':
+                j += 2 if text[j] == "\\" else 1
+            if j >= length:
+                raise ZoneFileError(line, "unterminated quoted string")
+            tokens.append(text[i:j + 1])
+            i = j + 1
+        else:
+            j = i
+            while j < length and not text[j].isspace() and text[j] not in '();"':
+                j += 1
+            tokens.append(text[i:j])
+            i = j
+    return tokens, depth
+
+
+def _logical_lines(lines: Iterable[str]) -> Iterator[Union[Tuple[int, bool, List[str]], ZoneFileError]]:
+    """Join parenthesised continuations; yields (first line number, owner omitted, tokens),
+    or a ZoneFileError for a line that cannot be tokenized"""
+    tokens: List[str] = []
+    depth = 0
+    start = 0
+    indented = False
+    for number, raw in enumerate(lines, 1):
+        text = raw.rstrip("\r\n")
+        try:
+            line_tokens, delta = _tokenize(text, number)
+        except ZoneFileError as e:
+            yield e
+            depth = 0
+            continue
+        if depth == 0:
+            if not line_tokens and not delta:
+                continue
+            start, indented, tokens = number, text[:1].isspace(), []
+        tokens.extend(line_tokens)
+        depth += delta
+        if depth < 0:
+            yield ZoneFileError(number, "unbalanced parenthesis")
+            depth = 0
+        elif depth == 0 and tokens:
+            yield start, indented, tokens
+    if depth:
+        yield ZoneFileError(start, "unclosed parenthesis")
+
+
+def _absolute(name: str, origin: str) -> str:
+    if name == "@":
+        return origin
+    if name.endswith("."):
+        return name[:-1].lower()
+    return f"{name}.{origin}".lower() if origin else name.lower()
+
+
+def iter_zone_entries(lines: Iterable[str], domain: str) -> Iterator[Union[ZoneEntry, ZoneFileError]]:
+    """Parse a zone file lazily. Bad lines are yielded as ZoneFileError so the caller
+    can report them and carry on; records outside domain are errors too."""
+    domain = domain.lower().rstrip(".")
+    origin = domain
+    default_ttl = DEFAULT_TTL
+    last_owner = origin
+
+    for logical in _logical_lines(lines):
+        if isinstance(logical, ZoneFileError):
+            yield logical
+            continue
+        number, indented, tokens = logical
+        try:
+            if tokens[0].startswith("$"):
+                directive = tokens[0].upper()
+                if directive == "$ORIGIN" and len(tokens) > 1:
+                    origin = _absolute(tokens[1], origin)
+                elif directive == "$TTL" and len(tokens) > 1 and parse_ttl(tokens[1]) is not None:
+                    default_ttl = parse_ttl(tokens[1])
+                else:
+                    raise ZoneFileError(number, f"unsupported directive {tokens[0]}")
+                continue
+
+            if not indented:
+                last_owner = _absolute(tokens.pop(0), origin)
+            owner = last_owner
+
+            ttl = None
+            while tokens and (tokens[0].upper() in CLASSES or (ttl is None and parse_ttl(tokens[0]) is not None)):
+                token = tokens.pop(0)
+                if token.upper() not in CLASSES:
+                    ttl = parse_ttl(token)
+            if not tokens:
+                raise ZoneFileError(number, "missing record type")
+            record_type = tokens.pop(0).upper()
+            if not tokens:
+                raise ZoneFileError(number, f"{record_type} record has no data")
+            if owner != domain and not owner.endswith("." + domain):
+                raise ZoneFileError(number, f"{owner} is outside {domain}")
+
+            ttl = ttl if ttl is not None else default_ttl
+            if record_type in ("CNAME", "NS", "PTR"):
+                tokens[0] = _absolute(tokens[0], origin)
+            elif record_type == "MX" and len(tokens) > 1:
+                tokens[1] = _absolute(tokens[1], origin)
+            elif record_type == "SRV" and len(tokens) > 3:
+                tokens[3] = _absolute(tokens[3], origin)
+            yield ZoneEntry(number, owner, record_type, ttl, tokens)
+        except ZoneFileError as e:
+            yield e
+
+
+def _unquote(token: str) -> str:
+    if len(token) >= 2 and token[0] == token[-1] == '"':
+        return re.sub(r"\\(.)", r"\1", token[1:-1])
+    return token
+
+
+def relative_name(name: str, domain: str) -> str:
+    """Owner name as the bot's forms take it: @ for the apex, otherwise the label part"""
+    name = name.lower().rstrip(".")
+    if name == domain:
+        return "@"
+    return name[:-len(domain) - 1] if name.endswith("." + domain) else name
+
+
+def entry_to_input(entry: ZoneEntry, domain: str) -> Optional[str]:
+    """The "name,value" text validate_dns_input expects for this record, or None if unsupported"""
+    name = relative_name(entry.name, domain)
+    rdata = entry.rdata
+    if entry.type in ("A", "AAAA", "CNAME"):
+        return f"{name},{rdata[0]}"
+    if entry.type == "MX" and len(rdata) == 2:
+        return f"{name},{rdata[1]},{rdata[0]}"
+    if entry.type == "TXT":
+        return f"{name},{''.join(_unquote(token) for token in rdata)}"
+    if entry.type == "SRV" and len(rdata) == 4:
+        priority, weight, port, target = rdata
+        return f"{name},{target},{port},{priority},{weight}"
+    return None
+
+
+def cloudflare_record(parsed: Dict[str, Any], ttl: int, domain: str) -> Dict[str, Any]:
+    """Cloudflare create payload for a record the validators accepted"""
+    name = parsed["name"]
+    fqdn = domain if name == "@" else (name.rstrip(".") if name.rstrip(".").endswith(domain) else f"{name}.{domain}")
+    # Cloudflare takes 1 (automatic) or 60..86400
+    ttl = 1 if ttl == 1 else min(max(ttl, 60), 86400)
+    if parsed["type"] == "SRV":
+        return {
+            "type": "SRV",
+            "name": fqdn,
+            "ttl": ttl,
+            "data": {
+                "priority": parsed["priority"],
+                "weight": parsed["weight"],
+                "port": parsed["port"],
+                "target": parsed["content"].rstrip("."),
+            },
+        }
+    record = {"type": parsed["type"], "name": fqdn, "content": parsed["content"].rstrip(".") if parsed["type"] in ("CNAME", "MX") else parsed["content"], "ttl": ttl}
+    if parsed["type"] == "MX":
+        record["priority"] = parsed.get("priority", 10)
+    return record
+
+
+def _record_identity(record: Dict[str, Any]) -> Tuple[str, str, str]:
+    record_type = record.get("type", "").upper()
+    data = record.get("data") or {}
+    if record_type == "SRV" and data:
+        content = f"{data.get('priority')} {data.get('weight')} {data.get('port')} {str(data.get('target', '')).lower().rstrip('.')}"
+    elif record_type == "SRV":
+        content = f"{record.get('priority')} {str(record.get('content', '')).lower().rstrip('.')}"
+    elif record_type in ("CNAME", "MX", "NS"):
+        content = f"{record.get('priority') if record_type == 'MX' else ''} {str(record.get('content', '')).lower().rstrip('.')}"
+    elif record_type == "TXT":
+        content = _unquote(str(record.get("content", "")))
+    else:
+        content = str(record.get("content", ""))
+    return record_type, str(record.get("name", "")).lower().rstrip("."), content
+
+
+Validator = Callable[[str, str], Awaitable[Dict[str, Any]]]
+
+
+async def import_zone(dns_manager, zone_id: str, domain: str, lines: Iterable[str], validate: Validator,
+                      batch_size: int = IMPORT_BATCH_SIZE, concurrency: int = IMPORT_CONCURRENCY,
+                      progress: Optional[Callable[[ZoneImportResult], Awaitable[Any]]] = None) -> ZoneImportResult:
+    """Create every valid record of a zone file that the zone does not have yet.
+
+    validate(record_type, text) is the bot's validate_dns_input for this
+    domain; its parsed_data (with the file's TTL) becomes the record.
+    """
+    domain = domain.lower().rstrip(".")
+    result = ZoneImportResult()
+
+    # Identities only, so the existing zone is never held as full records
+    seen = set()
+    async for page in dns_manager.iter_dns_record_pages(zone_id):
+        seen.update(_record_identity(record) for record in page)
+
+    semaphore = asyncio.Semaphore(concurrency)
+    pending = set()
+
+    async def send(batch: List[Tuple[int, Dict[str, Any]]]) -> None:
+        async with semaphore:
+            ok, error = await dns_manager.batch_dns_records(zone_id, posts=[record for _, record in batch])
+            result.batches += 1
+            if ok:
+                result.created += len(batch)
+            else:
+                # The batch is all-or-nothing; retry one by one so a single bad record only fails itself
+                logger.warning(f"📥 Zone import batch rejected for {domain} ({error}), retrying records singly")
+                for line, record in batch:
+                    ok, error = await dns_manager.batch_dns_records(zone_id, posts=[record])
+                    if ok:
+                        result.created += 1
+                    else:
+                        result.errors.append((line, error or "rejected by Cloudflare"))
+        if progress is not None:
+            await progress(result)
+
+    batch: List[Tuple[int, Dict[str, Any]]] = []
+    for entry in iter_zone_entries(lines, domain):
+        if isinstance(entry, ZoneFileError):
+            result.errors.append((entry.line, entry.message))
+            continue
+        if (entry.type in CLOUDFLARE_MANAGED_TYPES and entry.name == domain) or entry.type not in IMPORTABLE_TYPES:
+            result.skipped += 1
+            continue
+
+        validation = await validate(entry.type, entry_to_input(entry, domain) or "")
+        if not validation.get("valid"):
+            result.errors.append((entry.line, f"{entry.type} {entry.name}: {validation.get('error', 'invalid record')}"))
+            continue
+
+        record = cloudflare_record(validation["parsed_data"], entry.ttl, domain)
+        identity = _record_identity(record)
+        if identity in seen:
+            result.existing += 1
+            continue
+        seen.add(identity)
+
+        batch.append((entry.line, record))
+        if len(batch) >= batch_size:
+            pending.add(asyncio.create_task(send(batch)))
+            batch = []
+            if len(pending) >= concurrency:
+                _, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+
+    if batch:
+        pending.add(asyncio.create_task(send(batch)))
+    if pending:
+        await asyncio.gather(*pending)
+
+    logger.info(
+        f"📥 Zone import for {domain}: {result.created} created, {result.existing} existing, "
+        f"{result.skipped} skipped, {result.failed} errors in {result.batches} batches"
+    )
+    return result
+
+
+def format_import_progress(result: ZoneImportResult, domain: str, final: bool = False) -> str:
+    """Chat text for a running or finished import"""
+    lines = [
+        f"📥 Zone import {'finished' if final else 'in progress'} - {domain}",
+        "",
+        f"✅ Created: {result.created}",
+        f"♻️ Already in zone: {result.existing}",
+        f"⏭️ Skipped (SOA, NS, unsupported types): {result.skipped}",
+        f"❌ Errors: {result.failed}",
+    ]
+    if final and result.errors:
+        lines += ["", "First errors:"] + [f"• line {line}: {message}" for line, message in result.errors[:10]]
+    return "\n".join(lines)
+
+
+def _quote_txt(text: str) -> str:
+    """TXT data as quoted character-strings of at most 255 bytes"""
+    text = _unquote(text)
+    chunks, current, size = [], "", 0
+    for char in text:
+        char_size = len(char.encode("utf-8"))
+        if size + char_size > 255:
+            chunks.append(current)
+            current, size = "", 0
+        current += char
+        size += char_size
+    chunks.append(current)
+    return " ".join('"' + chunk.replace("\\", "\\\\").replace('"', '\\"') + '"' for chunk in chunks)
+
+
+def format_zone_record(record: Dict[str, Any], domain: str) -> str:
+    """One Cloudflare record as a BIND zone-file line"""
+    record_type = record.get("type", "").upper()
+    name = str(record.get("name", "")).lower().rstrip(".")
+    owner = "@" if name == domain else (name[:-len(domain) - 1] if name.endswith("." + domain) else name + ".")
+    ttl = record.get("ttl") or DEFAULT_TTL
+    ttl = DEFAULT_TTL if ttl == 1 else ttl  # Cloudflare's "automatic" TTL
+    content = str(record.get("content", ""))
+    data = record.get("data") or {}
+
+    if record_type in ("CNAME", "NS", "PTR"):
+        rdata = content.rstrip(".") + "."
+    elif record_type == "MX":
+        rdata = f"{record.get('priority', 10)} {content.rstrip('.')}."
+    elif record_type == "TXT":
+        rdata = _quote_txt(content)
+    elif record_type == "SRV" and data:
+        rdata = f"{data.get('priority', 0)} {data.get('weight', 0)} {data.get('port', 0)} {str(data.get('target', '')).rstrip('.')}."
+    elif record_type == "SRV":
+        rdata = f"{record.get('priority', 0)} {content.rstrip('.')}."
+    elif record_type == "CAA" and data:
+        rdata = f"{data.get('flags', 0)} {data.get('tag', '')} \"{data.get('value', '')}\""
+    else:
+        rdata = content
+    return f"{owner}\t{ttl}\tIN\t{record_type}\t{rdata}"
+
+
+async def export_zone(dns_manager, zone_id: str, domain: str, out: TextIO) -> int:
+    """Write the zone as a BIND file into out, one page of records at a time; returns the record count"""
+    domain = domain.lower().rstrip(".")
+    out.write(f"; Zone file for {domain}, exported from Cloudflare\n")
+    out.write(f"$ORIGIN {domain}.\n$TTL {DEFAULT_TTL}\n\n")
+    count = 0
+    async for page in dns_manager.iter_dns_record_pages(zone_id):
+        out.write("".join(format_zone_record(record, domain) + "\n" for record in page))
+        count += len(page)
+    logger.info(f"📤 Exported {count} records for {domain}")
+    return count
@@ -0,0 +1,290 @@
+"""
+Zone Provisioner for Nomadly Bot
+Pre-warmed account zone index and a two-call zone creation pipeline
+
+Finding the zone for a domain used to list every zone on the account (or
+query by name) on each lookup. The account's zones now live in a local
+index, filled page by page from ``/zones`` at startup and re-synced in the
+background once it is older than ``refresh_interval``; zones this process
+creates are added to it directly. Parent zones are found by walking the
+domain's labels against the index, so a lookup costs no API call.
+
+Provisioning a new domain is one zone POST, whose response already carries
+the assigned nameservers, and one batch call for the default records.
+``provision_many`` runs the pipeline for bulk onboarding with a bounded
+number of domains in flight.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+from unified_dns_manager import unified_dns_manager
+from zone_resolver import zone_id_resolver
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SERVER_IP = os.getenv("DEFAULT_SERVER_IP", "89.117.27.176")
+ZONES_PAGE_SIZE = 50  # Cloudflare's maximum for /zones
+REFRESH_INTERVAL = 900
+PAGE_CONCURRENCY = 4
+PROVISION_CONCURRENCY = 8
+
+
+def _normalize(domain: str) -> str:
+    return (domain or "").strip().lower().rstrip(".")
+
+
+@dataclass
+class AccountZone:
+    id: str
+    name: str
+    name_servers: List[str] = field(default_factory=list)
+    status: Optional[str] = None
+
+
+@dataclass
+class ProvisionResult:
+    domain: str
+    success: bool
+    zone_id: Optional[str] = None
+    zone_name: Optional[str] = None
+    nameservers: List[str] = field(default_factory=list)
+    zone_created: bool = False
+    records_created: int = 0
+    error: Optional[str] = None
+
+
+def default_zone_records(domain: str, server_ip: str = DEFAULT_SERVER_IP) -> List[Dict[str, Any]]:
+    """The records every newly registered domain starts with"""
+    return [
+        {"type": "A", "name": domain, "content": server_ip, "ttl": 300},
+        {"type": "A", "name": f"www.{domain}", "content": server_ip, "ttl": 300},
+        {"type": "CNAME", "name": f"mail.{domain}", "content": domain, "ttl": 300},
+    ]
+
+
+class AccountZoneIndex:
+    """Every zone on the Cloudflare account, keyed by zone name"""
+
+    def __init__(self, manager=None, refresh_interval: float = REFRESH_INTERVAL,
+                 page_size: int = ZONES_PAGE_SIZE, page_concurrency: int = PAGE_CONCURRENCY):
+        self.manager = manager or unified_dns_manager
+        self.refresh_interval = refresh_interval
+        self.page_size = page_size
+        self.page_concurrency = page_concurrency
+        self._zones: Dict[str, AccountZone] = {}
+        self.refreshed_at: Optional[float] = None
+        self._refresh_lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+        # Zones added while a refresh is listing pages, kept even if the listing missed them
+        self._added_during_refresh = set()
+        self.refreshes = 0
+        self.pages_fetched = 0
+
+    def __len__(self) -> int:
+        return len(self._zones)
+
+    @property
+    def warm(self) -> bool:
+        return self.refreshed_at is not None
+
+    def add(self, zone: AccountZone) -> None:
+        self._zones[_normalize(zone.name)] = zone
+        if self._refresh_lock.locked():
+            self._added_during_refresh.add(_normalize(zone.name))
+
+    def remove(self, name: str) -> None:
+        self._zones.pop(_normalize(name), None)
+
+    def get(self, name: str) -> Optional[AccountZone]:
+        return self._zones.get(_normalize(name))
+
+    def match(self, domain: str) -> Optional[AccountZone]:
+        """The zone for domain itself or its closest parent, from the index only"""
+        labels = _normalize(domain).split(".")
+        for i in range(len(labels)):
+            zone = self._zones.get(".".join(labels[i:]))
+            if zone is not None:
+                return zone
+        return None
+
+    @staticmethod
+    def _from_api(zone: Dict[str, Any]) -> AccountZone:
+        return AccountZone(zone["id"], zone["name"], zone.get("name_servers") or [], zone.get("status"))
+
+    async def refresh(self) -> None:
+        """Re-sync the index from Cloudflare, merging each page as it arrives.
+
+        Page 1 gives the page count; the rest are fetched a few at a time.
+        Zones that no longer appear on any page are dropped at the end.
+        """
+        async with self._refresh_lock:
+            seen = set()
+
+            def merge(zones):
+                for zone in zones:
+                    name = _normalize(zone["name"])
+                    self._zones[name] = self._from_api(zone)
+                    seen.add(name)
+
+            zones, total_pages = await self.manager.list_zones_page(1, self.page_size)
+            self.pages_fetched += 1
+            merge(zones)
+
+            semaphore = asyncio.Semaphore(self.page_concurrency)
+
+            async def fetch(page):
+                async with semaphore:
+                    page_zones, _ = await self.manager.list_zones_page(page, self.page_size)
+                self.pages_fetched += 1
+                merge(page_zones)
+
+            await asyncio.gather(*(fetch(page) for page in range(2, total_pages + 1)))
+
+            seen.update(self._added_during_refresh)
+            self._added_during_refresh.clear()
+            for name in [name for name in self._zones if name not in seen]:
+                del self._zones[name]
+            self.refreshed_at = time.time()
+            self.refreshes += 1
+            logger.info(f"🗂️ Account zone index refreshed: {len(self._zones)} zones in {total_pages} pages")
+
+    def _refresh_in_background(self) -> None:
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._safe_refresh())
+
+    async def _safe_refresh(self) -> None:
+        try:
+            await self.refresh()
+        except Exception as e:
+            logger.error(f"❌ Account zone index refresh failed: {e}")
+
+    async def ensure_warm(self) -> None:
+        """Wait for the first load (shared by concurrent callers); later loads run behind the current index"""
+        if not self.warm:
+            self._refresh_in_background()
+            await asyncio.shield(self._refresh_task)
+            if not self.warm:
+                raise Exception("Account zone index is not available")
+        elif time.time() - self.refreshed_at > self.refresh_interval:
+            self._refresh_in_background()
+
+    async def find(self, domain: str) -> Optional[AccountZone]:
+        await self.ensure_warm()
+        return self.match(domain)
+
+    async def aclose(self) -> None:
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            await asyncio.gather(self._refresh_task, return_exceptions=True)
+            self._refresh_task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "zones": len(self._zones),
+            "refreshes": self.refreshes,
+            "pages_fetched": self.pages_fetched,
+            "age_seconds": int(time.time() - self.refreshed_at) if self.refreshed_at else None,
+        }
+
+
+class ZoneProvisioner:
+    """Find or create the Cloudflare zone for a domain in as few calls as possible"""
+
+    def __init__(self, manager=None, index: Optional[AccountZoneIndex] = None,
+                 concurrency: int = PROVISION_CONCURRENCY):
+        self.manager = manager or unified_dns_manager
+        self.index = index or AccountZoneIndex(self.manager)
+        self.concurrency = concurrency
+
+    @property
+    def enabled(self) -> bool:
+        return bool(getattr(self.manager, "enabled", True))
+
+    async def find_zone(self, domain: str) -> Optional[AccountZone]:
+        """The zone serving domain (its own or a parent's), without an API call once warm"""
+        try:
+            return await self.index.find(domain)
+        except Exception as e:
+            logger.error(f"❌ Zone index lookup failed for {domain}: {e}")
+            return None
+
+    async def add_default_records(self, domain: str, zone_id: str,
+                                  records: Optional[List[Dict[str, Any]]] = None) -> int:
+        """Create the default records in one batch call; returns how many were created"""
+        records = default_zone_records(domain) if records is None else records
+        if not records:
+            return 0
+        success, error = await self.manager.batch_dns_records(zone_id, posts=records)
+        if not success:
+            logger.error(f"❌ Default records for {domain} failed: {error}")
+            return 0
+        return len(records)
+
+    async def provision(self, domain: str, records: Optional[List[Dict[str, Any]]] = None,
+                        use_parent: bool = False) -> ProvisionResult:
+        """Find or create the zone for domain and seed it with default records.
+
+        With ``use_parent`` a zone for a parent domain counts as a match (the
+        DNS screens manage subdomains through it); registrations need a zone
+        of their own. Default records are only added to zones whose POST
+        succeeded here, never to a zone that turned out to exist already.
+        """
+        domain = _normalize(domain)
+        zone = await self.find_zone(domain)
+        if zone is not None and (zone.name == domain or use_parent):
+            zone_id_resolver.set(domain, zone.id)
+            return ProvisionResult(domain, True, zone.id, zone.name, list(zone.name_servers))
+
+        success, zone_id, nameservers = await self.manager.create_zone(domain, adopt_existing=False)
+        if not success or not zone_id:
+            # The index can be up to refresh_interval behind: the zone may
+            # have been added elsewhere since. Adopt it without seeding it.
+            existing = await self.manager.get_zone_by_domain(domain)
+            if not existing:
+                return ProvisionResult(domain, False, error="Failed to create Cloudflare zone")
+            zone = AccountZone(existing["zone_id"], existing["name"], list(existing.get("name_servers") or []),
+                               existing.get("status"))
+            self.index.add(zone)
+            zone_id_resolver.set(domain, zone.id)
+            logger.info(f"ℹ️ Zone {zone.id} for {domain} already existed, default records left alone")
+            return ProvisionResult(domain, True, zone.id, zone.name, list(zone.name_servers))
+
+        self.index.add(AccountZone(zone_id, domain, list(nameservers)))
+        zone_id_resolver.set(domain, zone_id)
+        created = await self.add_default_records(domain, zone_id, records)
+        logger.info(f"✅ Provisioned zone {zone_id} for {domain} with {created} default records")
+        return ProvisionResult(domain, True, zone_id, domain, list(nameservers), zone_created=True,
+                               records_created=created)
+
+    async def provision_many(self, domains: Iterable[str],
+                             records: Optional[List[Dict[str, Any]]] = None) -> List[ProvisionResult]:
+        """Provision several domains concurrently, in input order"""
+        await self.index.ensure_warm()
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def one(domain):
+            async with semaphore:
+                try:
+                    return await self.provision(domain, records)
+                except Exception as e:
+                    logger.error(f"❌ Provisioning {domain} failed: {e}")
+                    return ProvisionResult(_normalize(domain), False, error=str(e))
+
+        return await asyncio.gather(*(one(domain) for domain in domains))
+
+    def start(self) -> None:
+        """Start loading the account zone index ahead of the first registration"""
+        if self.enabled and not self.index.warm:
+            self.index._refresh_in_background()
+
+    async def aclose(self) -> None:
+        await self.index.aclose()
+
+
+# Global provisioner instance
+zone_provisioner = ZoneProvisioner()
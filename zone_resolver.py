@@ -0,0 +1,145 @@
+"""
+Zone Resolver for Nomadly Bot
+Domain -> Cloudflare zone_id lookups backed by an indexed single-row query
+and an in-process cache
+
+Every DNS screen needs the zone_id of the domain being managed. Lookups go
+cache -> registered_domains (one row by the domain_name index) -> Cloudflare
+``/zones?name=``. Found zone ids are cached for an hour and dropped
+explicitly when the database row changes or a zone is created; domains
+with no zone anywhere are cached briefly so repeated views of an
+unconfigured domain do not hit Cloudflare each time.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+def _default_db_lookup(domain: str) -> Optional[str]:
+    from database import get_db_manager
+
+    return get_db_manager().get_zone_id_by_domain(domain)
+
+
+class ZoneIdResolver:
+    """Cached domain -> zone_id resolution.
+
+    ``db_lookup`` returns the stored zone_id for one domain (or None);
+    ``resolve`` takes the remote fallback per call so the DNS managers keep
+    their own HTTP clients and credentials.
+    """
+
+    def __init__(self, db_lookup: Optional[Callable[[str], Optional[str]]] = None,
+                 ttl: int = 3600, negative_ttl: int = 60, max_entries: int = 50000):
+        self.db_lookup = db_lookup or _default_db_lookup
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._entries: Dict[str, Tuple[float, Optional[str]]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.negative_hits = 0
+        self.db_hits = 0
+        self.remote_lookups = 0
+
+    @staticmethod
+    def _key(domain: str) -> str:
+        return domain.strip().lower().rstrip(".")
+
+    def get(self, domain: str) -> Any:
+        """Cached zone_id (None for a cached miss), or _MISSING if not cached"""
+        key = self._key(domain)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+            expires, zone_id = entry
+            if time.time() >= expires:
+                del self._entries[key]
+                return _MISSING
+            return zone_id
+
+    def set(self, domain: str, zone_id: Optional[str]) -> None:
+        """Cache a zone_id, or a miss when zone_id is None"""
+        ttl = self.ttl if zone_id else self.negative_ttl
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._evict_locked()
+            self._entries[self._key(domain)] = (time.time() + ttl, zone_id or None)
+
+    def _evict_locked(self) -> None:
+        now = time.time()
+        for key in [k for k, (expires, _) in self._entries.items() if expires <= now]:
+            del self._entries[key]
+        # Still full: drop the oldest tenth (dicts keep insertion order)
+        overflow = len(self._entries) - self.max_entries + max(1, self.max_entries // 10)
+        for key in list(self._entries)[:max(0, overflow)]:
+            del self._entries[key]
+
+    def invalidate(self, domain: str) -> None:
+        """Forget a domain, e.g. after its zone_id was written or its zone created"""
+        with self._lock:
+            self._entries.pop(self._key(domain), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _from_db(self, domain: str) -> Optional[str]:
+        try:
+            zone_id = self.db_lookup(self._key(domain))
+        except Exception as e:
+            logger.warning(f"Database zone_id lookup failed for {domain}: {e}")
+            return None
+        if zone_id:
+            self.db_hits += 1
+            self.set(domain, zone_id)
+        return zone_id or None
+
+    def lookup_stored(self, domain: str) -> Optional[str]:
+        """Zone id from the cache or the database only (no remote call)"""
+        cached = self.get(domain)
+        if cached is not _MISSING:
+            self.hits += 1
+            return cached
+        return self._from_db(domain)
+
+    async def resolve(self, domain: str,
+                      fetch_remote: Optional[Callable[[str], Awaitable[Optional[str]]]] = None) -> Optional[str]:
+        """Zone id for domain: cache, then database, then fetch_remote"""
+        cached = self.get(domain)
+        if cached is not _MISSING:
+            if cached is None:
+                self.negative_hits += 1
+            else:
+                self.hits += 1
+            return cached
+
+        zone_id = self._from_db(domain)
+        if zone_id or fetch_remote is None:
+            return zone_id
+
+        self.remote_lookups += 1
+        zone_id = await fetch_remote(domain)
+        self.set(domain, zone_id)
+        return zone_id
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache counters for monitoring"""
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "db_hits": self.db_hits,
+            "remote_lookups": self.remote_lookups,
+        }
+
+
+# Global resolver instance
+zone_id_resolver = ZoneIdResolver()